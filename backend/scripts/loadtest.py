@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do pipeline de commerce (Gateway + UCP Server).
+
+Cenarios (mix configuravel com --mix):
+- browse:   discovery UCP (/.well-known/ucp) + listagem no gateway (/api/books)
+- search:   busca no gateway (/api/books/search) e no UCP (/books/search)
+- purchase: checkout -> cupom -> token de carteira -> complete (PSP)
+
+Modos:
+- asgi (padrao): apps rodam no mesmo processo via httpx.ASGITransport,
+  sobre copias temporarias dos bancos (dados do repo nao sao alterados)
+- http: contra servidores ja rodando (--gateway-url / --ucp-url);
+  compras alteram estoque e carteira (use `make reset-db` depois)
+
+Chegadas:
+- --rate > 0: chegadas Poisson (cenarios/s), limitadas por --concurrency;
+  chegada sem slot livre conta como "dropped"
+- --rate 0: loop fechado, --concurrency usuarios em sequencia
+
+Usage:
+    python scripts/loadtest.py --duration 30 --concurrency 20 --rate 40
+    python scripts/loadtest.py --mode http --mix browse=2,search=3,purchase=5
+    python scripts/loadtest.py --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+SEARCH_TERMS = ["python", "dados", "ficcao", "machine learning", "historia", "web", "clean code"]
+DISCOUNT_CODES = ["PRIMEIRA10", "LIVROS20", "TECH15", "BEMVINDO", "INVALIDO"]
+STEPS = [
+    "discovery", "list_books", "search_gateway", "search_ucp",
+    "checkout_create", "discount_apply", "wallet_token", "checkout_complete",
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por rank mais proximo (lista ja ordenada)."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class StepStats:
+    """Latencias e erros por passo do fluxo."""
+    
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.scenarios: Counter = Counter()
+        self.dropped = 0
+    
+    def record(self, step: str, elapsed: float, error: Optional[str] = None):
+        self.latencies[step].append(elapsed)
+        if error:
+            self.errors[step][error] += 1
+    
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        steps = {}
+        for step in STEPS:
+            values = sorted(self.latencies.get(step, []))
+            if not values:
+                continue
+            errors = self.errors.get(step, Counter())
+            steps[step] = {
+                "count": len(values),
+                "errors": sum(errors.values()),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(values[-1] * 1000, 1),
+                "error_breakdown": dict(errors),
+            }
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "scenarios": dict(self.scenarios),
+            "dropped_arrivals": self.dropped,
+            "steps": steps,
+        }
+
+
+class Workload:
+    """Executa cenarios contra o gateway e o UCP Server."""
+    
+    def __init__(self, gateway: httpx.AsyncClient, ucp: httpx.AsyncClient, stats: StepStats, book_ids: List[str]):
+        self.gateway = gateway
+        self.ucp = ucp
+        self.stats = stats
+        self.book_ids = book_ids
+    
+    async def _call(self, step: str, client: httpx.AsyncClient, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats.record(step, time.perf_counter() - start, type(e).__name__)
+            return None
+        error = None if response.status_code < 400 else f"HTTP {response.status_code}"
+        self.stats.record(step, time.perf_counter() - start, error)
+        return response if error is None else None
+    
+    def _ucp_headers(self, agent: str) -> Dict[str, str]:
+        return {
+            "UCP-Agent": f'profile="https://loadtest.local/agents/{agent}"',
+            "idempotency-key": str(uuid.uuid4()),
+            "request-id": str(uuid.uuid4()),
+        }
+    
+    async def browse(self, agent: str):
+        await self._call("discovery", self.ucp, "GET", "/.well-known/ucp")
+        await self._call("list_books", self.gateway, "GET", "/api/books", params={"limit": 20})
+    
+    async def search(self, agent: str):
+        term = random.choice(SEARCH_TERMS)
+        await self._call("search_gateway", self.gateway, "GET", "/api/books/search", params={"q": term})
+        await self._call(
+            "search_ucp", self.ucp, "GET", "/books/search",
+            params={"q": term}, headers={"UCP-Agent": self._ucp_headers(agent)["UCP-Agent"]},
+        )
+    
+    async def purchase(self, agent: str):
+        book_id = random.choice(self.book_ids)
+        response = await self._call(
+            "checkout_create", self.ucp, "POST", "/checkout-sessions",
+            headers=self._ucp_headers(agent),
+            json={
+                "line_items": [{"item": {"id": book_id, "title": "", "price": 0}, "quantity": 1}],
+                "buyer": {"full_name": f"Load Test {agent}", "email": f"{agent}@loadtest.local"},
+                "currency": "BRL",
+            },
+        )
+        if response is None:
+            return
+        session_id = response.json()["id"]
+        
+        await self._call(
+            "discount_apply", self.ucp, "PUT", f"/checkout-sessions/{session_id}",
+            headers=self._ucp_headers(agent),
+            json={"id": session_id, "discounts": {"codes": [random.choice(DISCOUNT_CODES)]}},
+        )
+        
+        response = await self._call(
+            "wallet_token", self.ucp, "POST", "/payments/wallet/token",
+            headers={"UCP-Agent": self._ucp_headers(agent)["UCP-Agent"]},
+        )
+        if response is None:
+            return
+        
+        await self._call(
+            "checkout_complete", self.ucp, "POST", f"/checkout-sessions/{session_id}/complete",
+            headers=self._ucp_headers(agent),
+            json={"payment": {"token": response.json()["token"], "source": "store_wallet"}},
+        )
+    
+    async def run_scenario(self, name: str, agent: str):
+        self.stats.scenarios[name] += 1
+        await getattr(self, name)(agent)
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("browse", "search", "purchase"):
+            raise argparse.ArgumentTypeError(f"Cenario desconhecido: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+async def drive(workload: Workload, args: argparse.Namespace) -> float:
+    """Gerar carga pelo tempo configurado; retorna o tempo decorrido."""
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+    deadline = time.monotonic() + args.duration
+    started = time.monotonic()
+    
+    if args.rate <= 0:
+        async def user(n: int):
+            while time.monotonic() < deadline:
+                await workload.run_scenario(random.choices(names, weights)[0], f"vu-{n}")
+        await asyncio.gather(*(user(n) for n in range(args.concurrency)))
+        return time.monotonic() - started
+    
+    slots = asyncio.Semaphore(args.concurrency)
+    tasks = set()
+    
+    async def arrival(n: int):
+        try:
+            await workload.run_scenario(random.choices(names, weights)[0], f"vu-{n % 1000}")
+        finally:
+            slots.release()
+    
+    n = 0
+    while time.monotonic() < deadline:
+        await asyncio.sleep(random.expovariate(args.rate))
+        if slots.locked():
+            workload.stats.dropped += 1
+            continue
+        await slots.acquire()
+        task = asyncio.create_task(arrival(n))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        n += 1
+    
+    if tasks:
+        await asyncio.gather(*tasks)
+    return time.monotonic() - started
+
+
+def prepare_asgi_env() -> str:
+    """Copiar bancos para diretorio temporario antes de importar o backend."""
+    tmp_dir = tempfile.mkdtemp(prefix="loadtest-")
+    for name in ("products.db", "transactions.db"):
+        source = os.path.join(BACKEND_DIR, "data", name)
+        if os.path.exists(source):
+            shutil.copy(source, os.path.join(tmp_dir, name))
+    os.environ["PRODUCTS_DB_PATH"] = os.path.join(tmp_dir, "products.db")
+    os.environ["TRANSACTIONS_DB_PATH"] = os.path.join(tmp_dir, "transactions.db")
+    os.environ.setdefault("LOG_FORMAT", "json")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    return tmp_dir
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    stats = StepStats()
+    timeout = httpx.Timeout(args.timeout)
+    tmp_dir = None
+    
+    if args.mode == "asgi":
+        tmp_dir = prepare_asgi_env()
+        sys.path.insert(0, BACKEND_DIR)
+        from src.main import app as gateway_app
+        from src.ucp_server.server import app as ucp_app
+        
+        # ASGITransport nao executa eventos de lifespan
+        for handler in ucp_app.router.on_startup:
+            await handler()
+        gateway = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=gateway_app), base_url="http://gateway", timeout=timeout
+        )
+        ucp = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=ucp_app), base_url="http://ucp", timeout=timeout
+        )
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency * 2)
+        gateway = httpx.AsyncClient(base_url=args.gateway_url, timeout=timeout, limits=limits)
+        ucp = httpx.AsyncClient(base_url=args.ucp_url, timeout=timeout, limits=limits)
+    
+    try:
+        books = (await ucp.get("/books", params={"limit": 100})).json()
+        book_ids = [b["id"] for b in books if b.get("stock", 0) > 0] or [b["id"] for b in books]
+        # Saldo suficiente para as compras da rodada
+        await ucp.post("/payments/wallet/add-funds", json={"amount": args.wallet_funds})
+        
+        elapsed = await drive(Workload(gateway, ucp, stats, book_ids), args)
+    finally:
+        await gateway.aclose()
+        await ucp.aclose()
+        if args.mode == "asgi":
+            for handler in ucp_app.router.on_shutdown:
+                await handler()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    result = stats.summary(elapsed)
+    result["config"] = {
+        "mode": args.mode,
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "mix": args.mix,
+    }
+    return result
+
+
+def print_report(result: Dict[str, Any]):
+    config = result["config"]
+    print()
+    print(f"Load test ({config['mode']}): {result['elapsed_s']}s, concurrency={config['concurrency']}, "
+          f"rate={config['rate'] or 'closed-loop'}")
+    print(f"Scenarios: {result['scenarios']}  dropped arrivals: {result['dropped_arrivals']}")
+    print()
+    header = f"{'step':<18}{'count':>8}{'err':>7}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for step, s in result["steps"].items():
+        print(f"{step:<18}{s['count']:>8}{s['errors']:>7}{s['throughput_rps']:>9}"
+              f"{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+    
+    errors = {step: s["error_breakdown"] for step, s in result["steps"].items() if s["error_breakdown"]}
+    if errors:
+        print()
+        print("Errors:")
+        for step, breakdown in errors.items():
+            print(f"  {step}: " + ", ".join(f"{k} x{v}" for k, v in sorted(breakdown.items())))
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga Gateway + UCP Server")
+    parser.add_argument("--mode", choices=["asgi", "http"], default="asgi")
+    parser.add_argument("--gateway-url", default="http://localhost:8000")
+    parser.add_argument("--ucp-url", default="http://localhost:8182")
+    parser.add_argument("--duration", type=float, default=30.0, help="segundos")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=0.0, help="cenarios/s (0 = loop fechado)")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("browse=3,search=4,purchase=3"))
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--wallet-funds", type=int, default=100_000_000, help="centavos")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", dest="json_path", help="gravar resultado em JSON")
+    args = parser.parse_args()
+    
+    if args.seed is not None:
+        random.seed(args.seed)
+    
+    result = asyncio.run(run(args))
+    print_report(result)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
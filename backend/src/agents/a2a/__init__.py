@@ -8,6 +8,7 @@ from .protocol import (
     a2a_protocol
 )
 from .handler import A2AHandler, a2a_handler
+from .pipeline import A2APipeline
 
 # Adapters para SDK oficial
 from .adapters import (
@@ -56,6 +57,7 @@ __all__ = [
     "a2a_protocol",
     "A2AHandler",
     "a2a_handler",
+    "A2APipeline",
     # Adapters
     "is_a2a_sdk_available",
     "local_agent_profile_to_sdk",
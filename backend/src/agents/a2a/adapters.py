@@ -238,6 +238,7 @@ def create_agent_card(
     version: str = "1.0.0",
     url: str = "http://localhost:8000/a2a",
     skills: List[Dict[str, Any]] = None,
+    streaming: bool = False,
 ) -> Dict[str, Any]:
     """Cria um AgentCard compatível com o SDK."""
     return {
@@ -246,8 +247,9 @@ def create_agent_card(
         "version": version,
         "url": url,
         "protocol_version": "0.2.1",
+        "preferred_transport": "JSONRPC",
         "capabilities": {
-            "streaming": False,
+            "streaming": streaming,
             "push_notifications": False,
         },
         "skills": skills or [],
@@ -306,6 +308,8 @@ def get_store_agent_card() -> Dict[str, Any]:
         description="Agente de e-commerce para livraria virtual com suporte a UCP e A2A",
         version="1.0.0",
         url="http://localhost:8000/a2a",
+        # POST /a2a: JSON-RPC com message/stream (SSE), ver jsonrpc.py
+        streaming=True,
         skills=[
             {
                 "id": "search",
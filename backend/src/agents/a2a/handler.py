@@ -1,12 +1,15 @@
 """A2A Handler - Processa requisicoes A2A."""
-from typing import Dict, Any
+import asyncio
+from typing import Dict, Any, List
 import structlog
 
 from .protocol import (
     A2AMessage, A2AMessageType, A2AAction, A2AProtocol, AgentProfile,
-    a2a_protocol
+    ORDERED_ACTIONS, a2a_protocol
 )
 from ..graph import store_agent_runner
+from ...config import settings
+from ...realtime.events import build_topics, get_event_bus
 from ...ucp_server.discovery import get_discovery_profile
 
 logger = structlog.get_logger()
@@ -54,6 +57,9 @@ class A2AHandler:
             elif message.type == A2AMessageType.REQUEST:
                 return await self._handle_request(message, session_id)
             
+            elif message.type == A2AMessageType.BATCH:
+                return await self._handle_batch(message, session_id)
+            
             else:
                 return self.protocol.create_error(
                     message,
@@ -75,7 +81,7 @@ class A2AHandler:
             capabilities=profile_data.get("capabilities", [])
         )
         
-        self.protocol.register_agent(profile)
+        await self.protocol.register_agent(profile)
         
         # Retornar perfil da loja
         store_profile = get_discovery_profile("http://localhost:8182")
@@ -89,14 +95,15 @@ class A2AHandler:
                     "version": store_profile.ucp.version,
                     "capabilities": [cap.name for cap in store_profile.ucp.capabilities]
                 },
-                "supported_actions": [a.value for a in A2AAction]
+                "supported_actions": [a.value for a in A2AAction],
+                "batch_max_items": settings.a2a_batch_max_items
             }
         )
     
     async def _handle_disconnect(self, message: A2AMessage) -> A2AMessage:
         """Processar desconexao de agente."""
         if message.agent_id:
-            self.protocol.unregister_agent(message.agent_id)
+            await self.protocol.unregister_agent(message.agent_id)
         
         return self.protocol.create_response(
             message,
@@ -104,6 +111,134 @@ class A2AHandler:
             payload={}
         )
     
+    async def _handle_subscription(
+        self,
+        message: A2AMessage,
+        session_id: str
+    ) -> A2AMessage:
+        """
+        Assinar/cancelar eventos push (a2a.event).
+        
+        payload: {"book_ids": [...], "categories": [...], "checkout_ids": [...],
+                  "catalog": bool, "topics": [...]}; unsubscribe sem filtros
+        cancela tudo. So os checkouts criados pela propria sessao podem ser
+        assinados.
+        """
+        from ...db.products import products_repo
+        bus = get_event_bus()
+        
+        try:
+            topics = build_topics(message.payload)
+        except ValueError as e:
+            return self.protocol.create_error(message, str(e))
+        
+        if message.action == A2AAction.SUBSCRIBE.value:
+            if not topics:
+                return self.protocol.create_error(message, "Subscribe requires at least one topic")
+            checkout_ids = {t.partition(":")[2] for t in topics if t.startswith("checkout:")}
+            if checkout_ids:
+                foreign = checkout_ids - set(await store_agent_runner.owned_checkouts(session_id))
+                if foreign:
+                    return self.protocol.create_error(
+                        message, f"Checkout not owned by this session: {sorted(foreign)[0]}"
+                    )
+            try:
+                subscriptions = bus.subscribe(session_id, topics)
+            except ValueError as e:
+                return self.protocol.create_error(message, str(e))
+        else:
+            subscriptions = bus.unsubscribe(session_id, topics or None)
+        
+        return self.protocol.create_response(
+            message,
+            status="success",
+            payload={
+                "subscriptions": subscriptions,
+                # Eventos posteriores a esta versao chegam por push;
+                # antes dela, usar get_changes
+                "catalog_version": await products_repo.get_catalog_version()
+            }
+        )
+    
+    async def _handle_batch(
+        self,
+        message: A2AMessage,
+        session_id: str
+    ) -> A2AMessage:
+        """
+        Processar lote de requisicoes em uma unica ida e volta.
+        
+        payload: {"requests": [{"message_id"?, "action", "payload"}, ...]}
+        
+        Sub-requisicoes independentes executam concorrentemente; acoes de
+        pedido/checkout sao barreiras (executadas sozinhas, na ordem do lote).
+        Resposta: {"results": [...]} na ordem do lote, com status por item.
+        """
+        items = message.payload.get("requests", []) if isinstance(message.payload, dict) else None
+        if not isinstance(items, list) or not items:
+            return self.protocol.create_error(message, "Batch requires a non-empty 'requests' list")
+        if not all(isinstance(item, dict) for item in items):
+            return self.protocol.create_error(message, "Batch requests must be objects")
+        if len(items) > settings.a2a_batch_max_items:
+            return self.protocol.create_error(
+                message,
+                f"Batch too large: {len(items)} > {settings.a2a_batch_max_items}"
+            )
+        
+        requests = [
+            A2AMessage(
+                type=A2AMessageType.REQUEST,
+                message_id=item.get("message_id") or f"{message.message_id}:{i}",
+                agent_id=message.agent_id,
+                action=item.get("action"),
+                payload=item.get("payload") or {}
+            )
+            for i, item in enumerate(items)
+        ]
+        
+        # Grupos concorrentes separados pelas barreiras
+        responses: List[A2AMessage] = []
+        group: List[A2AMessage] = []
+        for request in requests + [None]:
+            if request is not None and request.action not in ORDERED_ACTIONS:
+                group.append(request)
+                continue
+            if group:
+                responses.extend(await asyncio.gather(
+                    *(self._handle_batch_item(r, session_id) for r in group)
+                ))
+                group = []
+            if request is not None:
+                responses.append(await self._handle_batch_item(request, session_id))
+        
+        results = [
+            {
+                "message_id": r.message_id,
+                "action": r.action,
+                "status": r.status,
+                "payload": r.payload,
+                "error": r.error
+            }
+            for r in responses
+        ]
+        failed = sum(1 for r in results if r["status"] == "error")
+        
+        logger.info("A2A batch processed", items=len(results), failed=failed)
+        
+        return self.protocol.create_response(
+            message,
+            status="success" if not failed else ("error" if failed == len(results) else "partial"),
+            payload={"results": results}
+        )
+    
+    async def _handle_batch_item(self, request: A2AMessage, session_id: str) -> A2AMessage:
+        """Executar uma sub-requisicao isolando falhas."""
+        try:
+            return await self._handle_request(request, session_id)
+        except Exception as e:
+            logger.error("A2A batch item error", action=request.action, error=str(e))
+            return self.protocol.create_error(request, str(e))
+    
     async def _handle_request(
         self,
         message: A2AMessage,
@@ -148,6 +283,9 @@ class A2AHandler:
                 payload=result.get("data", {})
             )
         
+        elif action in (A2AAction.SUBSCRIBE.value, A2AAction.UNSUBSCRIBE.value):
+            return await self._handle_subscription(message, session_id)
+        
         elif action == A2AAction.GET_CATEGORIES.value:
             from ...db.products import products_repo
             books = await products_repo.get_all()
@@ -159,6 +297,19 @@ class A2AHandler:
                 payload={"categories": sorted(categories)}
             )
         
+        elif action == A2AAction.GET_CHANGES.value:
+            from ...db.products import products_repo
+            changes = await products_repo.get_changes(
+                since=int(payload.get("since", 0)),
+                limit=int(payload.get("limit", 500))
+            )
+            
+            return self.protocol.create_response(
+                message,
+                status="success",
+                payload=changes.model_dump(mode="json", exclude_none=True)
+            )
+        
         else:
             return self.protocol.create_error(
                 message,
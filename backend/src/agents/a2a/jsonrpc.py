@@ -0,0 +1,328 @@
+"""
+A2A JSON-RPC - Endpoint HTTP compativel com o SDK oficial (a2a-sdk).
+
+`POST /a2a` (URL anunciada no AgentCard) com os metodos:
+
+- message/send   - executa e retorna o Task final
+- message/stream - Server-Sent Events com Task, status-update e artifact-update
+- tasks/get      - consulta um Task (session store, visivel a todos os workers)
+- tasks/cancel   - cancela um Task em execucao neste worker
+
+Mensagens com uma parte `data` contendo `action` (ex: {"action": "search",
+"payload": {...}}) usam o mesmo A2AHandler do WebSocket. Texto livre vira
+uma busca em streaming: os primeiros livros saem assim que encontrados e a
+narracao do LLM vem depois, em trechos.
+
+Formato JSON conforme a especificacao A2A (camelCase).
+"""
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import structlog
+
+from .handler import a2a_handler
+from .protocol import A2AMessage, A2AMessageType
+from ..llm import stream_response_with_llm
+from ..nodes.discovery import stream_search
+from ...db.session_store import get_session_store
+
+logger = structlog.get_logger()
+
+router = APIRouter(tags=["A2A"])
+
+# Codigos de erro JSON-RPC / A2A
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+TASK_NOT_FOUND = -32001
+TASK_NOT_CANCELABLE = -32002
+
+TERMINAL_STATES = {"completed", "failed", "canceled", "rejected"}
+
+# Tasks em execucao neste worker com cancelamento pedido
+_cancel_requested: Set[str] = set()
+_running: Set[str] = set()
+
+
+class JsonRpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def _text_part(text: str) -> Dict[str, Any]:
+    return {"kind": "text", "text": text}
+
+
+def _data_part(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {"kind": "data", "data": data}
+
+
+class TaskStream:
+    """
+    Execucao de um Task A2A como sequencia de eventos.
+    
+    Mantem o Task agregado (status + artifacts) e o grava no session store
+    a cada mudanca de status, para `tasks/get`. O namespace e limitado
+    (`a2a_task_max_entries`) e expira apos `a2a_task_ttl` segundos.
+    """
+    
+    NAMESPACE = "a2a_tasks"
+    
+    def __init__(self, message: Dict[str, Any]):
+        self.message = message
+        self.store = get_session_store()
+        self.task: Dict[str, Any] = {
+            "kind": "task",
+            "id": str(uuid.uuid4()),
+            "contextId": message.get("contextId") or str(uuid.uuid4()),
+            "status": {"state": "submitted", "timestamp": _now()},
+            "artifacts": [],
+            "history": [message],
+        }
+    
+    @property
+    def id(self) -> str:
+        return self.task["id"]
+    
+    async def _save(self):
+        await self.store.aset(self.NAMESPACE, self.id, self.task)
+    
+    async def _status(self, state: str, text: Optional[str] = None, final: bool = False) -> Dict[str, Any]:
+        status: Dict[str, Any] = {"state": state, "timestamp": _now()}
+        if text:
+            status["message"] = {
+                "kind": "message",
+                "messageId": str(uuid.uuid4()),
+                "role": "agent",
+                "parts": [_text_part(text)],
+                "taskId": self.id,
+                "contextId": self.task["contextId"],
+            }
+        self.task["status"] = status
+        await self._save()
+        return {
+            "kind": "status-update",
+            "taskId": self.id,
+            "contextId": self.task["contextId"],
+            "status": status,
+            "final": final,
+        }
+    
+    def _artifact(
+        self,
+        artifact_id: str,
+        name: str,
+        parts: List[Dict[str, Any]],
+        append: bool = False,
+        last_chunk: bool = False
+    ) -> Dict[str, Any]:
+        existing = next((a for a in self.task["artifacts"] if a["artifactId"] == artifact_id), None)
+        if existing is None:
+            existing = {"artifactId": artifact_id, "name": name, "parts": []}
+            self.task["artifacts"].append(existing)
+        if append:
+            existing["parts"].extend(parts)
+        else:
+            existing["parts"] = list(parts)
+        return {
+            "kind": "artifact-update",
+            "taskId": self.id,
+            "contextId": self.task["contextId"],
+            "artifact": {"artifactId": artifact_id, "name": name, "parts": parts},
+            "append": append,
+            "lastChunk": last_chunk,
+        }
+    
+    def _cancelled(self) -> bool:
+        return self.id in _cancel_requested
+    
+    async def run(self) -> AsyncIterator[Dict[str, Any]]:
+        """Executar o Task emitindo os eventos A2A."""
+        _running.add(self.id)
+        await self._save()
+        yield dict(self.task)
+        try:
+            yield await self._status("working")
+            
+            parts = self.message.get("parts") or []
+            request = next(
+                (p["data"] for p in parts if p.get("kind") == "data" and "action" in p.get("data", {})),
+                None
+            )
+            if request is not None:
+                async for event in self._run_action(request):
+                    yield event
+            else:
+                text = "".join(p.get("text", "") for p in parts if p.get("kind") == "text")
+                async for event in self._run_search(text.strip()):
+                    yield event
+        except (GeneratorExit, asyncio.CancelledError):
+            # Cliente SSE desconectou no meio: grava estado terminal (nada mais e emitido)
+            if self.task["status"]["state"] not in TERMINAL_STATES:
+                await self._status("canceled", "Client disconnected", final=True)
+                logger.info("A2A task abandoned by client", task_id=self.id)
+            raise
+        except Exception as e:
+            logger.error("A2A task failed", task_id=self.id, error=str(e))
+            yield await self._status("failed", str(e), final=True)
+        finally:
+            _running.discard(self.id)
+            _cancel_requested.discard(self.id)
+    
+    async def _run_action(self, request: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Acao estruturada: mesmo handler do WebSocket."""
+        message = A2AMessage(
+            type=A2AMessageType.REQUEST,
+            message_id=self.message.get("messageId") or self.id,
+            agent_id=(self.message.get("metadata") or {}).get("agent_id"),
+            action=request.get("action"),
+            payload=request.get("payload") or {},
+        )
+        response = await a2a_handler.handle_message(message, self.task["contextId"])
+        
+        if response.status == "error" or response.type == A2AMessageType.ERROR:
+            yield await self._status("failed", response.error or "Request failed", final=True)
+            return
+        
+        yield self._artifact(
+            str(uuid.uuid4()), message.action or "result", [_data_part(response.payload)], last_chunk=True
+        )
+        yield await self._status("completed", final=True)
+    
+    async def _run_search(self, text: str) -> AsyncIterator[Dict[str, Any]]:
+        """Texto livre: resultados incrementais + narracao em streaming."""
+        if not text:
+            yield await self._status("rejected", "Empty message", final=True)
+            return
+        
+        results_id = str(uuid.uuid4())
+        results: List[Dict[str, Any]] = []
+        
+        async for books in stream_search(text):
+            if self._cancelled():
+                yield await self._status("canceled", final=True)
+                return
+            batch = [
+                {
+                    "id": b.id,
+                    "title": b.title,
+                    "author": b.author,
+                    "price": b.price,
+                    "category": b.category,
+                    "stock": b.stock,
+                }
+                for b in books
+            ]
+            yield self._artifact(
+                results_id, "search_results", [_data_part({"books": batch})], append=bool(results)
+            )
+            results.extend(batch)
+        
+        if results:
+            yield self._artifact(results_id, "search_results", [], append=True, last_chunk=True)
+            context = f"Usuario buscou livros com '{text}'"
+            fallback = "Encontrei estes livros: " + "; ".join(
+                f"{b['title']} ({b['author']}) - R$ {b['price'] / 100:.2f}" for b in results[:5]
+            )
+            data = {"books": results}
+        else:
+            context = f"Busca por '{text}' nao retornou resultados"
+            fallback = "Nao encontrei livros correspondentes."
+            data = {"message": "Sugerir que o usuario tente outros termos"}
+        
+        narration_id = str(uuid.uuid4())
+        first = True
+        async for chunk in stream_response_with_llm(context, data, fallback):
+            if self._cancelled():
+                yield await self._status("canceled", final=True)
+                return
+            yield self._artifact(narration_id, "narration", [_text_part(chunk)], append=not first)
+            first = False
+        yield self._artifact(narration_id, "narration", [], append=True, last_chunk=True)
+        
+        yield await self._status("completed", final=True)
+
+
+def _rpc_result(request_id: Any, result: Any) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+
+def _rpc_error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def _get_message(params: Dict[str, Any]) -> Dict[str, Any]:
+    message = params.get("message")
+    if not isinstance(message, dict) or not message.get("parts"):
+        raise JsonRpcError(INVALID_PARAMS, "params.message with parts is required")
+    return message
+
+
+async def _sse(request_id: Any, stream: TaskStream) -> AsyncIterator[str]:
+    events = stream.run()
+    try:
+        async for event in events:
+            yield f"data: {json.dumps(_rpc_result(request_id, event), ensure_ascii=False)}\n\n"
+    finally:
+        # Desconexao do cliente: fecha o Task agora, sem esperar o GC do gerador
+        await events.aclose()
+
+
+@router.post("/a2a")
+async def a2a_jsonrpc(request: Request):
+    """Endpoint JSON-RPC 2.0 do protocolo A2A (message/send, message/stream, tasks/*)."""
+    try:
+        body = await request.json()
+    except ValueError:
+        return JSONResponse(_rpc_error(None, PARSE_ERROR, "Parse error"))
+    
+    request_id = body.get("id") if isinstance(body, dict) else None
+    if not isinstance(body, dict) or body.get("jsonrpc") != "2.0" or not body.get("method"):
+        return JSONResponse(_rpc_error(request_id, INVALID_REQUEST, "Invalid Request"))
+    
+    method = body["method"]
+    params = body.get("params") or {}
+    logger.info("A2A JSON-RPC request", method=method)
+    
+    try:
+        if method == "message/stream":
+            stream = TaskStream(_get_message(params))
+            return StreamingResponse(
+                _sse(request_id, stream),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        
+        if method == "message/send":
+            stream = TaskStream(_get_message(params))
+            async for _ in stream.run():
+                pass
+            return JSONResponse(_rpc_result(request_id, stream.task))
+        
+        if method in ("tasks/get", "tasks/cancel"):
+            task_id = params.get("id")
+            task = await get_session_store().aget(TaskStream.NAMESPACE, task_id) if task_id else None
+            if task is None:
+                raise JsonRpcError(TASK_NOT_FOUND, "Task not found")
+            if method == "tasks/cancel":
+                if task["status"]["state"] in TERMINAL_STATES or task_id not in _running:
+                    raise JsonRpcError(TASK_NOT_CANCELABLE, "Task cannot be canceled")
+                _cancel_requested.add(task_id)
+            return JSONResponse(_rpc_result(request_id, task))
+        
+        raise JsonRpcError(METHOD_NOT_FOUND, f"Method not found: {method}")
+    
+    except JsonRpcError as e:
+        return JSONResponse(_rpc_error(request_id, e.code, e.message))
@@ -0,0 +1,138 @@
+"""
+A2A Pipeline - Processamento concorrente de requisicoes por conexao.
+
+O agente pode enviar varias requisicoes sem esperar as respostas; cada
+resposta leva o `message_id` da requisicao (chave de correlacao) e e
+enviada assim que fica pronta, fora de ordem.
+
+Acoes que alteram o estado da sessao (pedido/checkout, connect/disconnect)
+funcionam como barreira: esperam tudo o que foi recebido antes e seguram
+o que chega depois, preservando a ordem onde ela importa. Acoes que nao
+tocam a sessao (ping, perfil, categorias, changes) nunca esperam.
+"""
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Set
+
+import structlog
+
+from .handler import A2AHandler, a2a_handler
+from .protocol import A2AMessage, A2AMessageType, ORDERED_ACTIONS, STATELESS_ACTIONS
+from ...observability.metrics import Gauge, registry
+
+logger = structlog.get_logger()
+
+A2A_IN_FLIGHT = registry.register(Gauge(
+    "a2a_requests_in_flight",
+    "Requisicoes A2A em processamento (WebSocket)",
+))
+
+
+def _actions(message: A2AMessage) -> Optional[list]:
+    """Acoes da mensagem; None para lote malformado (o handler responde o erro)."""
+    if message.type == A2AMessageType.BATCH:
+        items = message.payload.get("requests") if isinstance(message.payload, dict) else None
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return None
+        return [item.get("action") for item in items]
+    return [message.action]
+
+
+def requires_order(message: A2AMessage) -> bool:
+    """Mensagem precisa respeitar a ordem de chegada?"""
+    if message.type in (A2AMessageType.CONNECT, A2AMessageType.DISCONNECT):
+        return True
+    if message.type not in (A2AMessageType.REQUEST, A2AMessageType.BATCH):
+        return False
+    actions = _actions(message)
+    # Lote malformado: barreira (conservador)
+    return actions is None or any(action in ORDERED_ACTIONS for action in actions)
+
+
+def is_stateless(message: A2AMessage) -> bool:
+    """Mensagem nao toca o estado da sessao (nunca espera barreiras)?"""
+    if message.type not in (A2AMessageType.REQUEST, A2AMessageType.BATCH):
+        return False
+    actions = _actions(message)
+    return actions is not None and all(action in STATELESS_ACTIONS for action in actions)
+
+
+class A2APipeline:
+    """
+    Pipeline de uma conexao A2A.
+    
+    `submit()` espera apenas por vaga (limite de requisicoes em voo), entao
+    o loop de leitura para de consumir frames quando o agente excede o
+    limite (backpressure via TCP).
+    """
+    
+    def __init__(
+        self,
+        session_id: str,
+        send: Callable[[dict], None],
+        max_in_flight: int = 16,
+        handler: Optional[A2AHandler] = None
+    ):
+        self.session_id = session_id
+        self.send = send
+        self.handler = handler or a2a_handler
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._tasks: Set[asyncio.Task] = set()
+        # Ultima barreira e requisicoes iniciadas depois dela
+        self._barrier: Optional[asyncio.Task] = None
+        self._since_barrier: List[asyncio.Task] = []
+    
+    async def submit(self, message: A2AMessage):
+        """Agendar processamento da mensagem."""
+        # Classificar antes de pegar vaga: erro aqui nao pode vazar vaga
+        ordered = requires_order(message)
+        stateless = not ordered and is_stateless(message)
+        
+        await self._slots.acquire()
+        try:
+            self._since_barrier = [t for t in self._since_barrier if not t.done()]
+            if ordered:
+                wait_for = list(self._since_barrier)
+                if self._barrier is not None:
+                    wait_for.append(self._barrier)
+                task = asyncio.create_task(self._run(message, wait_for))
+                self._barrier = task
+                self._since_barrier = []
+            elif stateless:
+                task = asyncio.create_task(self._run(message, []))
+            else:
+                wait_for = [self._barrier] if self._barrier is not None else []
+                task = asyncio.create_task(self._run(message, wait_for))
+                self._since_barrier.append(task)
+        except BaseException:
+            self._slots.release()
+            raise
+        
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, message: A2AMessage, wait_for: List[Awaitable]):
+        A2A_IN_FLIGHT.inc()
+        try:
+            if wait_for:
+                await asyncio.gather(*wait_for, return_exceptions=True)
+            response = await self.handler.handle_message(message, self.session_id)
+            self.send(response.to_dict())
+        finally:
+            A2A_IN_FLIGHT.dec()
+            self._slots.release()
+    
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+    
+    async def drain(self):
+        """Esperar todas as requisicoes pendentes."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+    
+    def cancel(self):
+        """Cancelar requisicoes pendentes (conexao encerrada)."""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            logger.info("A2A requests cancelled", session=self.session_id, count=len(self._tasks))
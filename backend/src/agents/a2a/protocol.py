@@ -6,6 +6,8 @@ import uuid
 import time
 import structlog
 
+from ...db.session_store import get_session_store
+
 logger = structlog.get_logger()
 
 
@@ -14,6 +16,7 @@ class A2AMessageType(str, Enum):
     CONNECT = "a2a.connect"
     DISCONNECT = "a2a.disconnect"
     REQUEST = "a2a.request"
+    BATCH = "a2a.batch"
     RESPONSE = "a2a.response"
     EVENT = "a2a.event"
     ERROR = "a2a.error"
@@ -25,6 +28,7 @@ class A2AAction(str, Enum):
     SEARCH = "search"
     GET_PRODUCTS = "get_products"
     GET_CATEGORIES = "list_categories"
+    GET_CHANGES = "get_changes"
     
     # Shopping
     CREATE_ORDER = "create_order"
@@ -34,11 +38,33 @@ class A2AAction(str, Enum):
     # Recommendations
     RECOMMEND = "recommend"
     
+    # Events
+    SUBSCRIBE = "subscribe"
+    UNSUBSCRIBE = "unsubscribe"
+    
     # Info
     GET_PROFILE = "get_profile"
     PING = "ping"
 
 
+# Acoes que alteram o estado da sessao: executadas na ordem de chegada
+ORDERED_ACTIONS = {
+    A2AAction.CREATE_ORDER.value,
+    A2AAction.GET_CHECKOUT.value,
+    A2AAction.COMPLETE_CHECKOUT.value,
+}
+
+# Acoes que nao leem nem escrevem o estado da sessao
+STATELESS_ACTIONS = {
+    A2AAction.PING.value,
+    A2AAction.GET_PROFILE.value,
+    A2AAction.GET_CATEGORIES.value,
+    A2AAction.GET_CHANGES.value,
+    A2AAction.SUBSCRIBE.value,
+    A2AAction.UNSUBSCRIBE.value,
+}
+
+
 @dataclass
 class A2AMessage:
     """Mensagem A2A."""
@@ -109,33 +135,37 @@ class A2AProtocol:
     Protocolo A2A para comunicacao entre agentes.
     
     Gerencia conexoes, roteamento e processamento de mensagens.
+    Agentes conectados ficam no session store (visiveis a todos os workers).
     """
     
+    NAMESPACE = "a2a_agents"
+    
     def __init__(self):
-        self.connected_agents: Dict[str, AgentProfile] = {}
+        self.store = get_session_store()
     
-    def register_agent(self, profile: AgentProfile):
+    async def register_agent(self, profile: AgentProfile):
         """Registrar agente conectado."""
-        self.connected_agents[profile.agent_id] = profile
+        await self.store.aset(self.NAMESPACE, profile.agent_id, profile.to_dict())
         logger.info("Agent connected", agent_id=profile.agent_id, name=profile.name)
     
-    def unregister_agent(self, agent_id: str):
+    async def unregister_agent(self, agent_id: str):
         """Remover agente."""
-        if agent_id in self.connected_agents:
-            del self.connected_agents[agent_id]
+        if await self.is_connected(agent_id):
+            await self.store.adelete(self.NAMESPACE, agent_id)
             logger.info("Agent disconnected", agent_id=agent_id)
     
-    def is_connected(self, agent_id: str) -> bool:
+    async def is_connected(self, agent_id: str) -> bool:
         """Verificar se agente esta conectado."""
-        return agent_id in self.connected_agents
+        return await self.store.aget(self.NAMESPACE, agent_id) is not None
     
-    def get_agent(self, agent_id: str) -> Optional[AgentProfile]:
+    async def get_agent(self, agent_id: str) -> Optional[AgentProfile]:
         """Obter perfil do agente."""
-        return self.connected_agents.get(agent_id)
+        data = await self.store.aget(self.NAMESPACE, agent_id)
+        return AgentProfile(**data) if data else None
     
-    def list_agents(self) -> list:
+    async def list_agents(self) -> list:
         """Listar agentes conectados."""
-        return [p.to_dict() for p in self.connected_agents.values()]
+        return await self.store.avalues(self.NAMESPACE)
     
     def create_response(
         self,
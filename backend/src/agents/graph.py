@@ -1,13 +1,17 @@
 """Store Agents Graph - LangGraph principal."""
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Callable, Awaitable, List
 from langgraph.graph import StateGraph, END
 import structlog
 
-from .state import StoreAgentState, create_initial_state, Message
+from .state import StoreAgentState, create_initial_state, compact_history, remember_checkout, Message
+from .streaming import STREAMED_LLM_OPERATIONS
+from ..config import settings
+from ..db.session_store import get_session_store
+from ..observability.tracing import traced
 from .nodes.orchestrator import orchestrator_node, route_to_agent
-from .nodes.discovery import discovery_node
-from .nodes.shopping import shopping_node
-from .nodes.recommend import recommend_node
+from .nodes.discovery import discovery_node, a2a_search, a2a_get_products
+from .nodes.shopping import shopping_node, a2a_create_order
+from .nodes.recommend import recommend_node, a2a_recommend
 
 logger = structlog.get_logger()
 
@@ -28,10 +32,10 @@ def create_store_agents_graph() -> StateGraph:
     workflow = StateGraph(StoreAgentState)
     
     # Adicionar nodes
-    workflow.add_node("orchestrator", orchestrator_node)
-    workflow.add_node("discovery", discovery_node)
-    workflow.add_node("shopping", shopping_node)
-    workflow.add_node("recommend", recommend_node)
+    workflow.add_node("orchestrator", traced("agent.orchestrator")(orchestrator_node))
+    workflow.add_node("discovery", traced("agent.discovery")(discovery_node))
+    workflow.add_node("shopping", traced("agent.shopping")(shopping_node))
+    workflow.add_node("recommend", traced("agent.recommend")(recommend_node))
     
     # Definir entry point
     workflow.set_entry_point("orchestrator")
@@ -60,41 +64,44 @@ def create_store_agents_graph() -> StateGraph:
 store_graph = create_store_agents_graph()
 
 
+# Acoes A2A estruturadas -> servicos (mesma logica dos nodes, sem orchestrator,
+# copia de estado nem deteccao de intencao). O grafo fica para chat livre.
+A2A_DISPATCH: Dict[str, Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+    "search": traced("a2a.search")(a2a_search),
+    "get_products": traced("a2a.get_products")(a2a_get_products),
+    "create_order": traced("a2a.create_order")(a2a_create_order),
+    "recommend": traced("a2a.recommend")(a2a_recommend),
+}
+
+# Campos que acoes A2A gravam na sessao (usados depois pelo fluxo de checkout)
+A2A_SESSION_FIELDS = ("checkout_session_id", "checkout_status", "cart_total")
+
+
 class StoreAgentRunner:
     """
     Runner para executar o grafo de agentes.
     
-    Mantém estado entre invocações para cada sessão.
+    Mantém estado entre invocações para cada sessão no session store
+    (compartilhado entre workers quando configurado com SQLite).
     """
     
+    NAMESPACE = "chat"
+    
     def __init__(self):
-        self.sessions: Dict[str, StoreAgentState] = {}
+        self.store = get_session_store()
     
-    def get_or_create_session(self, session_id: str) -> StoreAgentState:
+    async def get_or_create_session(self, session_id: str) -> StoreAgentState:
         """Obter ou criar estado de sessão."""
-        if session_id not in self.sessions:
-            self.sessions[session_id] = create_initial_state(session_id)
-        return self.sessions[session_id]
+        state = await self.store.aget(self.NAMESPACE, session_id)
+        if state is None:
+            state = create_initial_state(session_id)
+            await self.store.aset(self.NAMESPACE, session_id, state)
+        return state
     
-    async def process_message(
-        self,
-        session_id: str,
-        message: str,
-        user_id: str = None
-    ) -> Dict[str, Any]:
-        """
-        Processar mensagem do usuário.
-        
-        Args:
-            session_id: ID da sessão
-            message: Mensagem do usuário
-            user_id: ID do usuário (opcional)
-            
-        Returns:
-            Resposta do agente
-        """
+    async def _build_input(self, session_id: str, message: str, user_id: str = None) -> Dict[str, Any]:
+        """Estado de entrada do grafo para uma mensagem do usuário."""
         # Obter estado
-        state = self.get_or_create_session(session_id)
+        state = await self.get_or_create_session(session_id)
         
         # Adicionar mensagem do usuário
         user_msg = Message(
@@ -104,20 +111,20 @@ class StoreAgentRunner:
             metadata={"user_id": user_id}
         )
         
-        # Criar novo estado com mensagem
-        input_state = {
+        # Compactar historico (janela + resumo) e adicionar mensagem
+        history, summary = compact_history(state["messages"], state.get("conversation_summary"))
+        return {
             **state,
-            "messages": state["messages"] + [user_msg],
+            "messages": history + [user_msg],
+            "conversation_summary": summary,
+            "last_user_message": message,
             "user_id": user_id
         }
-        
-        logger.info("Processing message", session=session_id, message=message[:50])
-        
-        # Executar grafo
-        result = await store_graph.ainvoke(input_state)
-        
+    
+    async def _build_result(self, session_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Gravar o estado final e extrair a resposta do agente."""
         # Atualizar estado da sessão
-        self.sessions[session_id] = result
+        await self.store.aset(self.NAMESPACE, session_id, result)
         
         # Extrair resposta do agente
         agent_messages = [
@@ -137,6 +144,71 @@ class StoreAgentRunner:
             "recommendations": result.get("recommendations", [])
         }
     
+    async def process_message(
+        self,
+        session_id: str,
+        message: str,
+        user_id: str = None
+    ) -> Dict[str, Any]:
+        """
+        Processar mensagem do usuário.
+        
+        Args:
+            session_id: ID da sessão
+            message: Mensagem do usuário
+            user_id: ID do usuário (opcional)
+        
+        Returns:
+            Resposta do agente
+        """
+        input_state = await self._build_input(session_id, message, user_id)
+        
+        logger.info("Processing message", session=session_id, message=message[:50])
+        
+        # Executar grafo
+        result = await store_graph.ainvoke(input_state)
+        
+        return await self._build_result(session_id, result)
+    
+    async def stream_message(
+        self,
+        session_id: str,
+        message: str,
+        user_id: str = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Processar mensagem emitindo eventos parciais.
+        
+        Emite, na ordem em que acontecem:
+        - {"type": "progress", "stage": ...} (routing, searching, writing, ...)
+        - {"type": "search_results", "results": [...]} assim que a busca termina
+        - {"type": "token", "text": ...} com o texto da resposta do LLM
+        
+        e por ultimo {"type": "done", ...} com o mesmo conteudo de
+        `process_message`. O texto de `done` e o definitivo: se o LLM falhar
+        ou a resposta for descartada, vale o fallback.
+        """
+        input_state = await self._build_input(session_id, message, user_id)
+        
+        logger.info("Processing message", session=session_id, message=message[:50], stream=True)
+        
+        result = input_state
+        async for mode, chunk in store_graph.astream(
+            input_state,
+            stream_mode=["custom", "messages", "values"]
+        ):
+            if mode == "values":
+                result = chunk
+            elif mode == "custom":
+                yield chunk
+            else:
+                message_chunk, metadata = chunk
+                text = message_chunk.content
+                if metadata.get("llm_operation") in STREAMED_LLM_OPERATIONS and isinstance(text, str) and text:
+                    yield {"type": "token", "text": text}
+        
+        yield {"type": "done", **(await self._build_result(session_id, result))}
+    
     async def process_a2a_request(
         self,
         session_id: str,
@@ -156,26 +228,44 @@ class StoreAgentRunner:
         Returns:
             Resposta A2A
         """
-        state = self.get_or_create_session(session_id)
+        service = A2A_DISPATCH.get(action) if settings.a2a_fast_path_enabled else None
         
-        # Criar estado com requisição A2A
-        input_state = {
-            **state,
-            "external_agent_id": agent_id,
-            "a2a_request": {
-                "action": action,
-                "payload": payload
+        if service is not None:
+            logger.info("Processing A2A request", agent=agent_id, action=action, path="direct")
+            result = await service(payload)
+            
+            # Leituras nao tocam a sessao; escritas atualizam so os proprios campos
+            updates = {k: result[k] for k in A2A_SESSION_FIELDS if k in result}
+            if updates:
+                state = await self.get_or_create_session(session_id)
+                updates["checkout_ids"] = remember_checkout(
+                    state.get("checkout_ids"), updates.get("checkout_session_id")
+                )
+                await self.store.aset(self.NAMESPACE, session_id, {**state, **updates})
+        else:
+            state = await self.get_or_create_session(session_id)
+            
+            # Criar estado com requisição A2A
+            input_state = {
+                **state,
+                "external_agent_id": agent_id,
+                "a2a_request": {
+                    "action": action,
+                    "payload": payload
+                }
             }
-        }
-        
-        logger.info("Processing A2A request", agent=agent_id, action=action)
-        
-        # Executar grafo
-        result = await store_graph.ainvoke(input_state)
-        
-        # Limpar a2a_request do estado
-        result["a2a_request"] = None
-        self.sessions[session_id] = result
+            
+            logger.info("Processing A2A request", agent=agent_id, action=action, path="graph")
+            
+            # Executar grafo
+            result = await store_graph.ainvoke(input_state)
+            
+            # Limpar a2a_request do estado
+            result["a2a_request"] = None
+            result["checkout_ids"] = remember_checkout(
+                result.get("checkout_ids"), result.get("checkout_session_id")
+            )
+            await self.store.aset(self.NAMESPACE, session_id, result)
         
         return {
             "status": "success",
@@ -189,10 +279,14 @@ class StoreAgentRunner:
             }
         }
     
-    def clear_session(self, session_id: str):
+    async def owned_checkouts(self, session_id: str) -> List[str]:
+        """Checkouts criados pela sessao (podem ser assinados por ela)."""
+        state = await self.store.aget(self.NAMESPACE, session_id) or {}
+        return remember_checkout(state.get("checkout_ids"), state.get("checkout_session_id"))
+    
+    async def clear_session(self, session_id: str):
         """Limpar sessão."""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        await self.store.adelete(self.NAMESPACE, session_id)
 
 
 # Runner global
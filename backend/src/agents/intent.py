@@ -0,0 +1,434 @@
+"""
+Classificador local de intencao - primeiro nivel antes do LLM.
+
+Modelo linear (regressao logistica multinomial) sobre n-gramas com hashing:
+palavras, pares de palavras e trigramas de caracteres. Classifica em
+microssegundos com um score de confianca.
+
+O treino nunca roda no caminho do request: `IntentTrainer` (iniciado com o
+gateway) carrega os pesos persistidos e treina em thread, a partir de
+`SEED_PHRASES` e do log de treino (mensagens rotuladas pelo LLM, sem
+duplicatas e limitado), retreinando em background quando o log muda.
+Enquanto nao ha modelo, `predict` devolve confianca 0 e tudo escala.
+
+Fluxo em `detect_intent` (orchestrator):
+    cache -> classificador local (confiante) -> LLM -> regras
+
+Sem numpy/sklearn: as features sao esparsas e cabem em dicts.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import structlog
+
+from ..config import settings
+from ..observability.metrics import Counter, registry
+
+logger = structlog.get_logger()
+
+INTENT_CLASSIFICATIONS = registry.register(Counter(
+    "intent_classifications_total",
+    "Intencoes detectadas por nivel (cache, local, llm, rules)",
+    ["tier"],
+))
+
+# Frases rotuladas usadas no treino inicial (sem acentos; normalize remove)
+SEED_PHRASES: Dict[str, List[str]] = {
+    "buy": [
+        "quero comprar esse livro", "quero comprar este", "comprar esse",
+        "vou levar esse", "vou levar o clean code", "quero esse",
+        "quero este livro", "me da esse", "quero comprar o python fluente",
+        "vou comprar esse livro", "pode ser esse, vou levar", "fico com esse",
+    ],
+    "checkout": [
+        "finalizar compra", "finalizar pedido", "quero pagar", "pagar agora",
+        "fechar pedido", "fechar compra", "concluir compra", "confirmar pedido",
+        "quero finalizar", "pode fechar", "como faco para pagar", "ir para o pagamento",
+    ],
+    "discount": [
+        "tenho cupom", "tenho um cupom de desconto", "aplicar desconto",
+        "aplicar cupom", "usar codigo promocional", "tem alguma promocao",
+        "quero usar meu cupom", "codigo de desconto", "cupom primeiracompra",
+        "tem desconto", "desconto para estudante",
+    ],
+    "cart": [
+        "ver carrinho", "ver meu carrinho", "adicionar ao carrinho",
+        "adicionar no carrinho", "remover do carrinho", "remover item",
+        "o que tem no meu carrinho", "coloca no carrinho", "tira esse do carrinho",
+        "esvaziar carrinho", "adicionar mais um",
+    ],
+    "recommend": [
+        "me recomende um livro", "recomenda algo", "sugira livros",
+        "me indique um livro", "indique algo parecido", "livros similares",
+        "algo parecido com esse", "gosto de ficcao cientifica",
+        "o que voce recomenda", "tem alguma sugestao", "me sugere uma leitura",
+        "gosto de romances, o que indica",
+    ],
+    "search": [
+        "buscar livros de python", "procurar livros de fantasia",
+        "encontrar livro sobre machine learning", "pesquisar clean code",
+        "tem livro de javascript", "livros de historia", "livro sobre economia",
+        "tem livros de fantasia", "quais livros de programacao voces tem",
+        "mostrar livros de romance", "busca tolkien", "livros do autor machado de assis",
+    ],
+    "help": [
+        "ola", "oi", "bom dia", "boa tarde", "boa noite", "ajuda",
+        "preciso de ajuda", "como funciona", "o que voce faz",
+        "oi, tudo bem", "como funciona a loja", "quais comandos existem",
+    ],
+}
+
+
+def normalize(message: str) -> str:
+    """Minusculas, sem acentos, sem pontuacao e com espacos colapsados."""
+    text = unicodedata.normalize("NFKD", message.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^a-z0-9]+", " ", text)
+    return text.strip()
+
+
+class HashedIntentClassifier:
+    """
+    Regressao logistica multinomial sobre n-gramas com hashing.
+    
+    Usage:
+        classifier = HashedIntentClassifier()
+        classifier.fit([("quero pagar", "checkout"), ...])
+        intent, confidence = classifier.predict("Quero pagar agora!")
+    """
+    
+    def __init__(
+        self,
+        n_features: int = 2 ** 18,
+        epochs: int = 30,
+        learning_rate: float = 0.5,
+        tolerance: float = 1e-3,
+    ):
+        self.n_features = n_features
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.tolerance = tolerance
+        self.classes: List[str] = []
+        self._weights: List[Dict[int, float]] = []
+        self._bias: List[float] = []
+    
+    @property
+    def is_trained(self) -> bool:
+        return bool(self.classes)
+    
+    def _hash(self, feature: str) -> int:
+        # crc32 e estavel entre processos (hash() de str nao e)
+        return zlib.crc32(feature.encode()) % self.n_features
+    
+    def features(self, message: str) -> Dict[int, float]:
+        """Vetor esparso (indice -> peso) com norma L2 = 1."""
+        words = normalize(message).split()
+        grams = [f"w:{w}" for w in words]
+        grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f" {word} "
+            grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        
+        vector: Dict[int, float] = {}
+        for gram in grams:
+            index = self._hash(gram)
+            vector[index] = vector.get(index, 0.0) + 1.0
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {i: v / norm for i, v in vector.items()}
+    
+    def _probabilities(self, vector: Dict[int, float]) -> List[float]:
+        scores = [
+            bias + sum(weights.get(i, 0.0) * v for i, v in vector.items())
+            for weights, bias in zip(self._weights, self._bias)
+        ]
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+    
+    def fit(self, examples: Sequence[Tuple[str, str]]) -> "HashedIntentClassifier":
+        """Treinar por SGD (ordem embaralhada com seed fixa, parada antecipada)."""
+        self.classes = sorted({intent for _, intent in examples})
+        self._weights = [{} for _ in self.classes]
+        self._bias = [0.0 for _ in self.classes]
+        index_of = {intent: i for i, intent in enumerate(self.classes)}
+        data = [(self.features(message), index_of[intent]) for message, intent in examples]
+        
+        rng = random.Random(0)
+        previous_loss = float("inf")
+        for epoch in range(self.epochs):
+            rng.shuffle(data)
+            rate = self.learning_rate / (1 + epoch * 0.1)
+            loss = 0.0
+            for vector, target in data:
+                probabilities = self._probabilities(vector)
+                loss -= math.log(max(probabilities[target], 1e-12))
+                for k, p in enumerate(probabilities):
+                    gradient = p - (1.0 if k == target else 0.0)
+                    # Exemplos ja bem classificados quase nao mexem nos pesos
+                    if abs(gradient) < 1e-3:
+                        continue
+                    weights = self._weights[k]
+                    for i, v in vector.items():
+                        weights[i] = weights.get(i, 0.0) - rate * gradient * v
+                    self._bias[k] -= rate * gradient * 0.1
+            # Parar quando a perda media para de cair
+            loss /= max(len(data), 1)
+            if previous_loss - loss < self.tolerance:
+                break
+            previous_loss = loss
+        return self
+    
+    def predict(self, message: str) -> Tuple[Optional[str], float]:
+        """(intencao, confianca); (None, 0.0) sem treino ou sem features."""
+        if not self.is_trained:
+            return None, 0.0
+        vector = self.features(message)
+        if not vector:
+            return None, 0.0
+        probabilities = self._probabilities(vector)
+        best = max(range(len(probabilities)), key=probabilities.__getitem__)
+        return self.classes[best], probabilities[best]
+    
+    def save(self, path: str, min_weight: float = 1e-4):
+        """Persistir pesos em JSON (escrita atomica; pesos ~0 descartados)."""
+        data = {
+            "n_features": self.n_features,
+            "classes": self.classes,
+            "bias": self._bias,
+            "weights": [
+                {str(i): round(w, 6) for i, w in weights.items() if abs(w) >= min_weight}
+                for weights in self._weights
+            ],
+        }
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path: str) -> "HashedIntentClassifier":
+        """Carregar pesos salvos por `save`."""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        classifier = cls(n_features=data["n_features"])
+        classifier.classes = data["classes"]
+        classifier._bias = data["bias"]
+        classifier._weights = [{int(i): w for i, w in weights.items()} for weights in data["weights"]]
+        return classifier
+
+
+class IntentCache:
+    """LRU de intencoes confiantes por mensagem normalizada."""
+    
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[str]:
+        intent = self._entries.get(key)
+        if intent is not None:
+            self._entries.move_to_end(key)
+        return intent
+    
+    def put(self, key: str, intent: str):
+        if self.max_entries <= 0 or not key:
+            return
+        self._entries[key] = intent
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Appends (to_thread), leitura e compactacao do log no mesmo processo
+# (reentrante: o trainer le e toma o mtime sob o mesmo lock)
+_log_lock = threading.RLock()
+
+
+def load_training_log(path: str, limit: int = 2000, compact: bool = False) -> List[Tuple[str, str]]:
+    """
+    Exemplos do log JSONL ({"message", "intent"}), sem duplicatas.
+    
+    Mensagens iguais apos `normalize` contam uma vez (vale o rotulo mais
+    recente); ficam as `limit` mais recentes. Com `compact`, o arquivo e
+    reescrito so com eles sem soltar o lock: nenhum append se perde entre
+    a leitura e a reescrita.
+    """
+    if not path or not Path(path).exists():
+        return []
+    
+    latest: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+    with _log_lock, open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                message, intent = record["message"], record["intent"]
+                key = normalize(message)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                continue
+            if key:
+                latest.pop(key, None)
+                latest[key] = (message, intent)
+        examples = list(latest.values())[-limit:] if limit > 0 else []
+        if compact and examples:
+            _write_log(path, examples)
+    return examples
+
+
+def append_training_example(path: str, message: str, intent: str):
+    """Registrar mensagem rotulada (pelo LLM) para o proximo treino."""
+    if not path:
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with _log_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"message": message, "intent": intent}, ensure_ascii=False) + "\n")
+
+
+def _write_log(path: str, examples: Sequence[Tuple[str, str]]):
+    """Reescrever o log (atomico) so com `examples`; chamar com `_log_lock`."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for message, intent in examples:
+            f.write(json.dumps({"message": message, "intent": intent}, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+
+def seed_examples(phrases: Dict[str, Iterable[str]] = SEED_PHRASES) -> List[Tuple[str, str]]:
+    return [(phrase, intent) for intent, items in phrases.items() for phrase in items]
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime if path else None
+    except OSError:
+        return None
+
+
+class IntentTrainer:
+    """
+    Treino do classificador fora do event loop.
+    
+    No start carrega o modelo salvo (`intent_model_path`), se houver; em
+    background treina quando nao ha modelo ou o log de treino mudou, e
+    depois verifica o log a cada `retrain_interval` segundos.
+    """
+    
+    def __init__(
+        self,
+        log_path: str = "",
+        model_path: str = "",
+        log_limit: int = 2000,
+        retrain_interval: float = 3600.0,
+    ):
+        self.log_path = log_path
+        self.model_path = model_path
+        self.log_limit = log_limit
+        self.retrain_interval = retrain_interval
+        self._trained_log_mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        global _classifier
+        model_mtime = _mtime(self.model_path)
+        if model_mtime is not None:
+            try:
+                _classifier = await asyncio.to_thread(HashedIntentClassifier.load, self.model_path)
+                # Modelo salvo depois da ultima mudanca do log: nao precisa retreinar
+                log_mtime = _mtime(self.log_path)
+                if log_mtime is None or log_mtime <= model_mtime:
+                    self._trained_log_mtime = log_mtime
+                logger.info("Intent classifier loaded", path=self.model_path, classes=len(_classifier.classes))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning("Intent model load failed", path=self.model_path, error=str(e))
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.retrain_if_needed()
+            except Exception as e:
+                logger.warning("Intent classifier training failed", error=str(e))
+            await asyncio.sleep(self.retrain_interval)
+    
+    async def retrain_if_needed(self) -> bool:
+        """Retreinar (em thread) se nao ha modelo ou o log mudou."""
+        log_mtime = _mtime(self.log_path)
+        if _classifier is not None and _classifier.is_trained and log_mtime == self._trained_log_mtime:
+            return False
+        await self.retrain()
+        return True
+    
+    async def retrain(self):
+        global _classifier
+        classifier, logged, log_mtime = await asyncio.to_thread(self._train)
+        _classifier = classifier
+        # mtime do snapshot treinado: appends durante o fit disparam o proximo treino
+        self._trained_log_mtime = log_mtime
+        # Rotas em cache vieram do modelo anterior
+        get_intent_cache().clear()
+        logger.info("Intent classifier trained", seeds=len(seed_examples()), logged=logged)
+    
+    def _train(self) -> Tuple[HashedIntentClassifier, int, Optional[float]]:
+        with _log_lock:
+            logged = load_training_log(self.log_path, self.log_limit, compact=True)
+            log_mtime = _mtime(self.log_path)
+        classifier = HashedIntentClassifier().fit(seed_examples() + logged)
+        if self.model_path:
+            classifier.save(self.model_path)
+        return classifier, len(logged), log_mtime
+
+
+# Singletons
+_classifier: Optional[HashedIntentClassifier] = None
+_cache: Optional[IntentCache] = None
+_trainer: Optional[IntentTrainer] = None
+
+
+def get_intent_classifier() -> HashedIntentClassifier:
+    """Classificador atual; sem treino ainda, devolve um vazio (confianca 0)."""
+    return _classifier if _classifier is not None else HashedIntentClassifier()
+
+
+def get_intent_trainer() -> IntentTrainer:
+    global _trainer
+    if _trainer is None:
+        _trainer = IntentTrainer(
+            log_path=settings.intent_training_log_path,
+            model_path=settings.intent_model_path,
+            log_limit=settings.intent_training_log_max,
+            retrain_interval=settings.intent_retrain_interval,
+        )
+    return _trainer
+
+
+def get_intent_cache() -> IntentCache:
+    global _cache
+    if _cache is None:
+        _cache = IntentCache(settings.intent_cache_size)
+    return _cache
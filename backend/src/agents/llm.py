@@ -4,10 +4,13 @@ LLM Module - Integracao com Gemini para os Store Agents.
 Este modulo fornece uma interface unificada para usar LLMs nos agentes,
 permitindo respostas mais naturais e deteccao de intencao inteligente.
 """
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 from functools import lru_cache
 import structlog
 
+from .streaming import emit
+from ..observability.metrics import LLM_REQUEST_DURATION, track
+
 logger = structlog.get_logger()
 
 # Tentar importar langchain-google-genai
@@ -93,6 +96,13 @@ Mensagem do usuario: {message}
 Responda APENAS com uma das intencoes listadas acima, nada mais."""
 
 
+async def invoke_llm(llm: Any, prompt: str, operation: str) -> Any:
+    """Chamar o LLM registrando latencia e resultado por operacao."""
+    with track(LLM_REQUEST_DURATION, span=f"llm.{operation}", operation=operation):
+        # A operacao vai nos metadados do run: stream_message filtra os tokens por ela
+        return await llm.ainvoke(prompt, config={"metadata": {"llm_operation": operation}})
+
+
 async def detect_intent_with_llm(message: str) -> Optional[str]:
     """
     Detectar intencao usando LLM.
@@ -109,7 +119,7 @@ async def detect_intent_with_llm(message: str) -> Optional[str]:
     
     try:
         prompt = INTENT_DETECTION_PROMPT.format(message=message)
-        response = await llm.ainvoke(prompt)
+        response = await invoke_llm(llm, prompt, "detect_intent")
         intent = response.content.strip().lower()
         
         # Validar intent
@@ -174,7 +184,8 @@ async def generate_response_with_llm(
             data=data_str
         )
         
-        response = await llm.ainvoke(prompt)
+        emit("progress", stage="writing")
+        response = await invoke_llm(llm, prompt, "generate_response")
         generated = response.content.strip()
         
         # Validar resposta
@@ -189,6 +200,43 @@ async def generate_response_with_llm(
         return fallback_response
 
 
+async def stream_response_with_llm(
+    context: str,
+    data: Dict[str, Any],
+    fallback_response: str
+) -> AsyncIterator[str]:
+    """
+    Versao streaming de generate_response_with_llm.
+    
+    Emite os trechos do texto conforme o LLM gera (`astream`); sem LLM,
+    ou se falhar antes do primeiro trecho, emite o fallback inteiro.
+    """
+    llm = get_llm()
+    if not llm:
+        yield fallback_response
+        return
+    
+    prompt = RESPONSE_GENERATION_PROMPT.format(
+        context=context,
+        data=_format_data_for_prompt(data)
+    )
+    emitted = False
+    try:
+        with track(LLM_REQUEST_DURATION, operation="stream_response"):
+            async for chunk in llm.astream(prompt):
+                text = chunk.content if isinstance(chunk.content, str) else ""
+                if text:
+                    emitted = True
+                    yield text
+    except Exception as e:
+        logger.error("LLM response streaming failed", error=str(e))
+        if emitted:
+            return
+    
+    if not emitted:
+        yield fallback_response
+
+
 def _format_data_for_prompt(data: Dict[str, Any]) -> str:
     """Formatar dados para incluir no prompt."""
     lines = []
@@ -1,10 +1,11 @@
 """Discovery Node - Busca de livros e informacoes."""
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 import structlog
 import json
 
-from ..state import StoreAgentState, Message
-from ..llm import generate_response_with_llm, is_llm_enabled, get_llm
+from ..state import StoreAgentState, Message, get_last_user_message
+from ..llm import generate_response_with_llm, is_llm_enabled, get_llm, invoke_llm
+from ..streaming import emit
 from ...db.products import products_repo
 
 logger = structlog.get_logger()
@@ -67,8 +68,7 @@ async def discovery_node(state: StoreAgentState) -> Dict[str, Any]:
         return await _handle_a2a_request(state)
     
     # Pegar ultima mensagem do usuario
-    user_messages = [m for m in state["messages"] if m["type"] == "user"]
-    last_message = user_messages[-1]["content"] if user_messages else ""
+    last_message = get_last_user_message(state)
     
     if intent == "help":
         fallback = _get_help_message()
@@ -86,7 +86,9 @@ async def discovery_node(state: StoreAgentState) -> Dict[str, Any]:
     
     elif intent == "search":
         # Busca inteligente com LLM
+        emit("progress", stage="searching")
         books = await _smart_search(last_message)
+        emit("progress", stage="found", count=len(books[:5]))
         
         if books:
             search_results = [
@@ -100,6 +102,8 @@ async def discovery_node(state: StoreAgentState) -> Dict[str, Any]:
                 }
                 for b in books[:5]
             ]
+            # Resultados chegam ao cliente antes da resposta do LLM
+            emit("search_results", results=search_results)
             
             fallback = _format_search_results(search_results)
             response = await generate_response_with_llm(
@@ -143,48 +147,79 @@ async def _handle_a2a_request(state: StoreAgentState) -> Dict[str, Any]:
     logger.info("A2A Discovery request", action=action)
     
     if action == "search":
-        query = payload.get("query", "")
-        books = await products_repo.search(query) if query else await products_repo.get_all()
-        
-        return {
-            "search_results": [
-                {
-                    "id": b.id,
-                    "title": b.title,
-                    "author": b.author,
-                    "price": b.price,
-                    "category": b.category,
-                    "stock": b.stock
-                }
-                for b in books[:20]
-            ],
-            "next_agent": None
-        }
+        return {**await a2a_search(payload), "next_agent": None}
     
     elif action == "get_products":
-        category = payload.get("category")
-        if category:
-            books = await products_repo.get_by_category(category)
-        else:
-            books = await products_repo.get_all()
-        
-        return {
-            "search_results": [
-                {
-                    "id": b.id,
-                    "title": b.title,
-                    "author": b.author,
-                    "price": b.price,
-                    "category": b.category
-                }
-                for b in books
-            ],
-            "next_agent": None
-        }
+        return {**await a2a_get_products(payload), "next_agent": None}
     
     return {"next_agent": None}
 
 
+async def a2a_search(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Acao A2A `search` (usada pelo grafo e pelo dispatch direto)."""
+    query = payload.get("query", "")
+    books = await products_repo.search(query) if query else await products_repo.get_all()
+    
+    return {
+        "search_results": [
+            {
+                "id": b.id,
+                "title": b.title,
+                "author": b.author,
+                "price": b.price,
+                "category": b.category,
+                "stock": b.stock
+            }
+            for b in books[:20]
+        ]
+    }
+
+
+async def a2a_get_products(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Acao A2A `get_products`."""
+    category = payload.get("category")
+    if category:
+        books = await products_repo.get_by_category(category)
+    else:
+        books = await products_repo.get_all()
+    
+    return {
+        "search_results": [
+            {
+                "id": b.id,
+                "title": b.title,
+                "author": b.author,
+                "price": b.price,
+                "category": b.category
+            }
+            for b in books
+        ]
+    }
+
+
+async def stream_search(message: str) -> AsyncIterator[List]:
+    """
+    Busca incremental: emite lotes de livros novos assim que encontrados.
+    
+    Primeiro as variantes por palavra-chave (so banco, sem LLM); depois o
+    que a busca inteligente (_smart_search) encontrar a mais.
+    """
+    seen_ids = set()
+    
+    for term in _generate_search_variants(message):
+        books = [b for b in await products_repo.search(term) if b.id not in seen_ids]
+        if books:
+            seen_ids.update(b.id for b in books)
+            yield books
+    
+    if seen_ids and not is_llm_enabled():
+        return
+    
+    books = [b for b in await _smart_search(message) if b.id not in seen_ids]
+    if books:
+        yield books
+
+
 async def _smart_search(message: str) -> List:
     """
     Busca inteligente usando LLM para interpretar a intencao do usuario.
@@ -319,7 +354,7 @@ async def _extract_search_terms_with_llm(message: str) -> List[str]:
     
     try:
         prompt = SEARCH_EXTRACTION_PROMPT.format(message=message)
-        response = await llm.ainvoke(prompt)
+        response = await invoke_llm(llm, prompt, "extract_search_terms")
         content = response.content.strip()
         
         # Extrair JSON da resposta
@@ -354,7 +389,7 @@ async def _semantic_match(query: str, books: List) -> List:
         ])
         
         prompt = SEMANTIC_MATCH_PROMPT.format(query=query, books_list=books_list)
-        response = await llm.ainvoke(prompt)
+        response = await invoke_llm(llm, prompt, "semantic_match")
         content = response.content.strip()
         
         # Extrair JSON
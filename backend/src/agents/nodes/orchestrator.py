@@ -1,14 +1,25 @@
 """Orchestrator Node - Roteador principal dos agentes."""
-from typing import Dict, Any, Literal
+import asyncio
+from typing import Dict, Any, Literal, Optional
 import structlog
 
-from ..state import StoreAgentState, Message, AgentRole
+from ...config import settings
+from ..state import StoreAgentState, Message, AgentRole, get_last_user_message
 from ..llm import detect_intent_with_llm, is_llm_enabled
+from ..intent import (
+    INTENT_CLASSIFICATIONS,
+    append_training_example,
+    get_intent_cache,
+    get_intent_classifier,
+    normalize,
+)
+from ..keywords import KeywordTable
+from ..streaming import emit
 
 logger = structlog.get_logger()
 
 # Palavras-chave para detectar intencao (fallback quando LLM nao disponivel)
-# Ordem importa! Mais especificos primeiro
+# Ordem importa! Mais especificos primeiro. Keywords extras: INTENT_KEYWORDS_PATH
 INTENT_KEYWORDS = {
     "buy": ["quero comprar", "comprar esse", "comprar este", "vou levar", "quero esse", "quero este", "me da esse", "me dá esse"],
     "checkout": ["finalizar", "finaliza", "fechar", "concluir", "pagar", "confirmar", "fechar pedido", "concluir compra", "pagar agora", "confirmar pedido", "quero pagar", "quero finalizar"],
@@ -20,41 +31,67 @@ INTENT_KEYWORDS = {
 }
 
 
+# Automato compilado das keywords (+ arquivo INTENT_KEYWORDS_PATH, recarregavel)
+_intent_keywords: Optional[KeywordTable] = None
+
+
+def get_intent_keywords() -> KeywordTable:
+    """Tabela de keywords compilada (singleton)."""
+    global _intent_keywords
+    if _intent_keywords is None:
+        _intent_keywords = KeywordTable(INTENT_KEYWORDS, settings.intent_keywords_path)
+    return _intent_keywords
+
+
 def detect_intent_rules(message: str) -> str:
-    """Detectar intencao da mensagem usando regras (fallback)."""
-    message_lower = message.lower()
-    
-    # Primeiro, verificar frases completas (mais especificas)
-    for intent, keywords in INTENT_KEYWORDS.items():
-        for keyword in keywords:
-            # Para keywords com espaco, verificar frase completa
-            if " " in keyword and keyword in message_lower:
-                return intent
-    
-    # Depois, verificar palavras individuais
-    for intent, keywords in INTENT_KEYWORDS.items():
-        for keyword in keywords:
-            if " " not in keyword and keyword in message_lower:
-                return intent
+    """
+    Detectar intencao da mensagem usando regras (fallback).
     
-    return "search"  # Default
+    Uma unica varredura: frases completas vencem palavras individuais e,
+    entre iguais, vale a ordem de INTENT_KEYWORDS.
+    """
+    return get_intent_keywords().match(message.lower()) or "search"  # Default
 
 
 async def detect_intent(message: str) -> str:
     """
     Detectar intencao da mensagem.
     
-    Usa LLM se disponivel, senao usa regras baseadas em keywords.
+    Niveis: cache por mensagem normalizada -> classificador local ->
+    LLM (so quando o local nao esta confiante) -> regras por keywords.
     """
-    # Tentar com LLM primeiro
+    key = normalize(message)
+    cache = get_intent_cache()
+    cached = cache.get(key)
+    if cached:
+        INTENT_CLASSIFICATIONS.inc(tier="cache")
+        return cached
+    
+    # Classificador local (microssegundos)
+    local_intent, confidence = get_intent_classifier().predict(message)
+    if local_intent and confidence >= settings.intent_confidence_threshold:
+        INTENT_CLASSIFICATIONS.inc(tier="local")
+        cache.put(key, local_intent)
+        logger.info("Intent detected via local classifier", intent=local_intent, confidence=round(confidence, 3))
+        return local_intent
+    
+    # Baixa confianca: escalar para o LLM
     if is_llm_enabled():
         llm_intent = await detect_intent_with_llm(message)
         if llm_intent:
-            logger.info("Intent detected via LLM", intent=llm_intent)
+            INTENT_CLASSIFICATIONS.inc(tier="llm")
+            cache.put(key, llm_intent)
+            # Rotulo do LLM alimenta o proximo treino do classificador
+            if settings.intent_training_log_path:
+                await asyncio.to_thread(
+                    append_training_example, settings.intent_training_log_path, message, llm_intent
+                )
+            logger.info("Intent detected via LLM", intent=llm_intent, local_confidence=round(confidence, 3))
             return llm_intent
     
     # Fallback para regras
     rule_intent = detect_intent_rules(message)
+    INTENT_CLASSIFICATIONS.inc(tier="rules")
     logger.info("Intent detected via rules", intent=rule_intent)
     return rule_intent
 
@@ -68,16 +105,14 @@ async def orchestrator_node(state: StoreAgentState) -> Dict[str, Any]:
     logger.info("Orchestrator processing", session=state["session_id"])
     
     # Pegar ultima mensagem do usuario
-    user_messages = [m for m in state["messages"] if m["type"] == "user"]
+    last_message = get_last_user_message(state)
     
-    if not user_messages:
+    if not last_message:
         return {
             "next_agent": AgentRole.DISCOVERY.value,
             "current_intent": "help"
         }
     
-    last_message = user_messages[-1]["content"]
-    
     # Verificar se e requisicao A2A
     if state.get("a2a_request"):
         logger.info("A2A request detected", request=state["a2a_request"])
@@ -106,6 +141,7 @@ async def orchestrator_node(state: StoreAgentState) -> Dict[str, Any]:
     }
     
     next_agent = intent_to_agent.get(intent, AgentRole.DISCOVERY.value)
+    emit("progress", stage="routing", intent=intent, agent=next_agent)
     
     return {
         "next_agent": next_agent,
@@ -3,8 +3,9 @@ from typing import Dict, Any, List
 import structlog
 import random
 
-from ..state import StoreAgentState, Message
+from ..state import StoreAgentState, Message, get_last_user_message
 from ..llm import generate_response_with_llm, is_llm_enabled
+from ..streaming import emit
 from ...db.products import products_repo
 
 logger = structlog.get_logger()
@@ -30,8 +31,8 @@ async def recommend_node(state: StoreAgentState) -> Dict[str, Any]:
         return await _handle_a2a_recommend(state)
     
     # Pegar ultima mensagem do usuario
-    user_messages = [m for m in state["messages"] if m["type"] == "user"]
-    last_message = user_messages[-1]["content"].lower() if user_messages else ""
+    last_message = get_last_user_message(state).lower()
+    emit("progress", stage="recommending")
     
     # Determinar tipo de recomendacao
     context = ""
@@ -66,6 +67,8 @@ async def recommend_node(state: StoreAgentState) -> Dict[str, Any]:
         context = "Usuario quer recomendacoes gerais de livros populares"
         fallback = _format_recommendations(recommendations, "populares")
     
+    emit("search_results", results=recommendations)
+    
     # Gerar resposta com LLM se disponivel
     response = await generate_response_with_llm(
         context=context,
@@ -185,6 +188,11 @@ async def _handle_a2a_recommend(state: StoreAgentState) -> Dict[str, Any]:
     
     logger.info("A2A Recommend request")
     
+    return {**await a2a_recommend(payload), "next_agent": None}
+
+
+async def a2a_recommend(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Acao A2A `recommend` (usada pelo grafo e pelo dispatch direto)."""
     book_id = payload.get("book_id")
     category = payload.get("category")
     limit = payload.get("limit", 5)
@@ -196,10 +204,7 @@ async def _handle_a2a_recommend(state: StoreAgentState) -> Dict[str, Any]:
     else:
         recommendations = await _get_popular_books()
     
-    return {
-        "recommendations": recommendations[:limit],
-        "next_agent": None
-    }
+    return {"recommendations": recommendations[:limit]}
 
 
 def _extract_category(message: str) -> str:
@@ -6,7 +6,7 @@ de pagamento seguindo o padrao oficial do Google.
 from typing import Dict, Any, List
 import structlog
 
-from ..state import StoreAgentState, Message, CartItem
+from ..state import StoreAgentState, Message, CartItem, get_last_user_message
 from ..llm import generate_response_with_llm, is_llm_enabled
 from ...db.products import products_repo
 from ...db.discounts import discounts_repo
@@ -37,8 +37,7 @@ async def shopping_node(state: StoreAgentState) -> Dict[str, Any]:
         return await _handle_a2a_checkout(state)
     
     # Pegar ultima mensagem do usuario
-    user_messages = [m for m in state["messages"] if m["type"] == "user"]
-    last_message = user_messages[-1]["content"].lower() if user_messages else ""
+    last_message = get_last_user_message(state).lower()
     
     cart_items = list(state.get("cart_items", []))
     cart_total = state.get("cart_total", 0)
@@ -564,52 +563,7 @@ async def _handle_a2a_checkout(state: StoreAgentState) -> Dict[str, Any]:
     logger.info("A2A Shopping request", action=action)
     
     if action == "create_order":
-        items = payload.get("items", [])
-        buyer_info = payload.get("buyer", {})
-        discount_code = payload.get("discount_code")
-        
-        # Criar line items
-        line_items = []
-        for item in items:
-            line_items.append(LineItem(
-                item=Item(
-                    id=item.get("product_id", "unknown"),
-                    title=item.get("title", "Produto"),
-                    price=item.get("price", 0)
-                ),
-                quantity=item.get("quantity", 1)
-            ))
-        
-        # Criar buyer
-        buyer_obj = Buyer(
-            full_name=buyer_info.get("name", "Agent User"),
-            email=buyer_info.get("email", "agent@example.com")
-        )
-        
-        # Criar checkout
-        checkout_session = await transactions_repo.create_session(
-            line_items=line_items,
-            buyer=buyer_obj
-        )
-        
-        if discount_code:
-            discount_info = await discounts_repo.get_by_code(discount_code)
-            if discount_info:
-                cart_total = sum(item.item.price * item.quantity for item in line_items)
-                discount_amount = discount_info.calculate_discount(cart_total)
-                await transactions_repo.apply_discount(
-                    session_id=checkout_session.id,
-                    code=discount_code,
-                    title=discount_info.title or f"Desconto {discount_code}",
-                    amount=discount_amount
-                )
-        
-        return {
-            "checkout_session_id": checkout_session.id,
-            "checkout_status": checkout_session.status,
-            "cart_total": checkout_session.totals[-1].amount if checkout_session.totals else 0,
-            "next_agent": None
-        }
+        return {**await a2a_create_order(payload), "next_agent": None}
     
     elif action == "checkout":
         # Apenas criar sessao simples
@@ -646,6 +600,55 @@ async def _handle_a2a_checkout(state: StoreAgentState) -> Dict[str, Any]:
     return {"next_agent": None}
 
 
+async def a2a_create_order(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Acao A2A `create_order` (usada pelo grafo e pelo dispatch direto)."""
+    items = payload.get("items", [])
+    buyer_info = payload.get("buyer", {})
+    discount_code = payload.get("discount_code")
+    
+    # Criar line items
+    line_items = []
+    for item in items:
+        line_items.append(LineItem(
+            item=Item(
+                id=item.get("product_id", "unknown"),
+                title=item.get("title", "Produto"),
+                price=item.get("price", 0)
+            ),
+            quantity=item.get("quantity", 1)
+        ))
+    
+    # Criar buyer
+    buyer_obj = Buyer(
+        full_name=buyer_info.get("name", "Agent User"),
+        email=buyer_info.get("email", "agent@example.com")
+    )
+    
+    # Criar checkout
+    checkout_session = await transactions_repo.create_session(
+        line_items=line_items,
+        buyer=buyer_obj
+    )
+    
+    if discount_code:
+        discount_info = await discounts_repo.get_by_code(discount_code)
+        if discount_info:
+            cart_total = sum(item.item.price * item.quantity for item in line_items)
+            discount_amount = discount_info.calculate_discount(cart_total)
+            await transactions_repo.apply_discount(
+                session_id=checkout_session.id,
+                code=discount_code,
+                title=discount_info.title or f"Desconto {discount_code}",
+                amount=discount_amount
+            )
+    
+    return {
+        "checkout_session_id": checkout_session.id,
+        "checkout_status": checkout_session.status,
+        "cart_total": checkout_session.totals[-1].amount if checkout_session.totals else 0
+    }
+
+
 def _format_cart(
     cart_items: List[CartItem], 
     cart_total: int,
@@ -1,7 +1,18 @@
 """Estado compartilhado dos Store Agents."""
-from typing import TypedDict, List, Dict, Any, Optional, Annotated
+from typing import TypedDict, List, Dict, Any, Optional, Annotated, Tuple
 from enum import Enum
-import operator
+
+# Janela de historico mantida no estado (mensagens mais recentes)
+MAX_HISTORY_MESSAGES = 40
+# Folga para as mensagens que um turno acrescenta (usuario + respostas dos
+# agentes): a compactacao acontece antes de o reducer precisar truncar
+TURN_MESSAGE_HEADROOM = 8
+# Tamanho maximo do resumo acumulado das mensagens que sairam da janela
+MAX_SUMMARY_CHARS = 2000
+# Checkouts lembrados por sessao (autorizam assinar checkout:<id>)
+MAX_SESSION_CHECKOUTS = 32
+# Caracteres de cada mensagem preservados no resumo
+SUMMARY_SNIPPET_CHARS = 160
 
 
 class AgentRole(str, Enum):
@@ -37,6 +48,79 @@ class CartItem(TypedDict):
     price: int
 
 
+def add_messages_window(left: List[Message], right: List[Message]) -> List[Message]:
+    """
+    Reducer de mensagens: concatena e mantem so a janela recente.
+    
+    O custo por turno e limitado pela janela, nao pelo historico.
+    """
+    merged = (left or []) + (right or [])
+    if len(merged) > MAX_HISTORY_MESSAGES:
+        return merged[-MAX_HISTORY_MESSAGES:]
+    return merged
+
+
+def summarize_messages(summary: Optional[str], dropped: List[Message]) -> str:
+    """
+    Acrescentar mensagens que sairam da janela ao resumo acumulado.
+    
+    Resumo extrativo (sem LLM): uma linha por mensagem, truncada, e o
+    resumo mantem apenas os ultimos MAX_SUMMARY_CHARS caracteres.
+    """
+    lines = [summary] if summary else []
+    for message in dropped:
+        content = " ".join(message["content"].split())
+        if len(content) > SUMMARY_SNIPPET_CHARS:
+            content = content[:SUMMARY_SNIPPET_CHARS] + "..."
+        lines.append(f"{message['type']}: {content}")
+    
+    text = "\n".join(lines)
+    if len(text) > MAX_SUMMARY_CHARS:
+        text = text[-MAX_SUMMARY_CHARS:]
+        # Comecar em uma linha inteira
+        text = text[text.find("\n") + 1:] if "\n" in text else text
+    return text
+
+
+def compact_history(
+    messages: List[Message],
+    summary: Optional[str]
+) -> Tuple[List[Message], Optional[str]]:
+    """
+    Compactar historico antes de um novo turno.
+    
+    Quando o turno poderia estourar a janela (menos de
+    TURN_MESSAGE_HEADROOM vagas), a metade mais antiga vai para o resumo.
+    Assim o reducer nunca descarta mensagem que nao foi resumida.
+    """
+    if len(messages) + TURN_MESSAGE_HEADROOM <= MAX_HISTORY_MESSAGES:
+        return messages, summary
+    
+    keep = MAX_HISTORY_MESSAGES // 2
+    return messages[-keep:], summarize_messages(summary, messages[:-keep])
+
+
+def remember_checkout(checkout_ids: Optional[List[str]], checkout_id: Optional[str]) -> List[str]:
+    """Acrescentar checkout criado pela sessao (mantem os mais recentes)."""
+    checkout_ids = list(checkout_ids or [])
+    if checkout_id and checkout_id not in checkout_ids:
+        checkout_ids.append(checkout_id)
+    return checkout_ids[-MAX_SESSION_CHECKOUTS:]
+
+
+def get_last_user_message(state: "StoreAgentState") -> str:
+    """Ultima mensagem do usuario (indice no estado, sem varrer o historico)."""
+    last_message = state.get("last_user_message")
+    if last_message is not None:
+        return last_message
+    
+    # Estados antigos sem o indice: procurar do fim para o inicio
+    for message in reversed(state.get("messages") or []):
+        if message["type"] == "user":
+            return message["content"]
+    return ""
+
+
 class StoreAgentState(TypedDict):
     """
     Estado compartilhado entre os agentes da loja.
@@ -48,7 +132,9 @@ class StoreAgentState(TypedDict):
     user_id: Optional[str]
     
     # Conversa
-    messages: Annotated[List[Message], operator.add]
+    messages: Annotated[List[Message], add_messages_window]
+    conversation_summary: Optional[str]
+    last_user_message: Optional[str]
     current_intent: Optional[str]
     
     # Carrinho
@@ -59,6 +145,7 @@ class StoreAgentState(TypedDict):
     # Checkout
     checkout_session_id: Optional[str]
     checkout_status: Optional[str]
+    checkout_ids: List[str]  # criados nesta sessao
     
     # Contexto de busca
     search_query: Optional[str]
@@ -83,12 +170,15 @@ def create_initial_state(session_id: str) -> StoreAgentState:
         session_id=session_id,
         user_id=None,
         messages=[],
+        conversation_summary=None,
+        last_user_message=None,
         current_intent=None,
         cart_items=[],
         cart_total=0,
         applied_discount=None,
         checkout_session_id=None,
         checkout_status=None,
+        checkout_ids=[],
         search_query=None,
         search_results=[],
         selected_book_id=None,
@@ -0,0 +1,24 @@
+"""
+Eventos parciais dos Store Agents durante o processamento.
+
+Os nodes chamam `emit()` (progresso, resultados de busca); quem executa o
+grafo com `StoreAgentRunner.stream_message` recebe os eventos na hora, via
+stream_mode "custom" do LangGraph. Fora de `astream` (ainvoke, dispatch A2A
+direto) os eventos sao descartados.
+"""
+from typing import Any
+
+from langgraph.config import get_stream_writer
+
+# Operacoes de LLM cujos tokens sao repassados ao cliente (texto da resposta)
+STREAMED_LLM_OPERATIONS = {"generate_response"}
+
+
+def emit(event_type: str, **data: Any):
+    """Emitir evento parcial (ex: emit("progress", stage="searching"))."""
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        # Fora de uma execucao do grafo
+        return
+    writer({"type": event_type, **data})
@@ -1,6 +1,6 @@
 """Configuracoes do backend."""
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
@@ -23,6 +23,16 @@ class Settings(BaseSettings):
     llm_temperature: float = 0.7
     llm_max_tokens: int = 1024
     
+    # Intencao: classificador local antes do LLM (so baixa confianca escala)
+    intent_confidence_threshold: float = 0.6
+    intent_cache_size: int = 5000  # mensagens normalizadas (0 = sem cache)
+    intent_training_log_path: str = ""  # ex: ./data/intent_log.jsonl (vazio = nao registrar)
+    intent_training_log_max: int = 2000  # exemplos distintos mais recentes usados no treino
+    intent_model_path: str = ""  # ex: ./data/intent_model.json (vazio = nao persistir pesos)
+    intent_retrain_interval: float = 3600.0  # segundos entre verificacoes do log
+    # Keywords extras das regras (JSON {intencao: [keywords]}), recarregado ao mudar
+    intent_keywords_path: str = ""
+    
     # LLM - Alternativos
     openai_api_key: str = ""
     anthropic_api_key: str = ""
@@ -31,6 +41,75 @@ class Settings(BaseSettings):
     jwt_expiry_seconds: int = 3600
     ap2_key_id: str = "livraria-key-001"
     
+    # Assinatura de requests UCP: off | report | enforce
+    ucp_signature_mode: str = "off"
+    ucp_signature_max_age: int = 300
+    ucp_signature_workers: int = 4
+    # Hosts de onde perfis de agentes podem ser buscados (vazio = qualquer host publico https)
+    ucp_profile_allowed_hosts: List[str] = []
+    
+    # Idempotencia (UCP write endpoints)
+    idempotency_ttl_seconds: int = 86400
+    idempotency_wait_timeout: float = 30.0
+    idempotency_lock_timeout: float = 120.0
+    
+    # Rate limiting (token bucket)
+    rate_limit_storage: str = "memory"  # memory | sqlite (compartilhado entre workers)
+    rate_limit_db_path: str = "./data/rate_limits.db"
+    rate_limit_burst_ratio: float = 0.25
+    mcp_default_rate_limit: int = 120  # por minuto, por ferramenta e chamador
+    ucp_rate_limit: int = 600  # por minuto, por agente
+    
+    # Session store (chat, MCP disclosure, agentes A2A, presenca WebSocket)
+    session_store: str = "memory"  # memory | sqlite (compartilhado entre workers)
+    session_store_path: str = "./data/sessions.db"
+    # Limites do backend memory para sessoes de chat e MCP (0 = sem limite)
+    session_cache_max_entries: int = 10000
+    session_cache_idle_ttl: float = 3600.0  # segundos sem acesso (no sqlite: sem escrita, via janitor)
+    session_cache_spill_path: str = ""  # ex: ./data/session_spill.db (vazio = descartar)
+    session_cache_spill_ttl: float = 86400.0  # idade maxima de uma sessao no spill (segundos)
+    session_sweep_interval: float = 60.0  # limpeza de presencas orfas, spill e chaves de idempotencia (segundos)
+    
+    # WebSocket: fila de saida por conexao e politica para cliente lento
+    ws_outbox_max_queue: int = 256
+    ws_slow_consumer_policy: str = "coalesce"  # drop_oldest | coalesce | disconnect
+    ws_send_timeout: float = 10.0
+    # /ws/chat: progresso, resultados e tokens do LLM antes do frame final
+    chat_streaming_enabled: bool = True
+    
+    # Eventos push (subscribe A2A) a partir dos change feeds
+    realtime_events_enabled: bool = True
+    realtime_poll_interval: float = 1.0
+    realtime_max_topics: int = 100  # topicos assinados por conexao
+    # Retencao do change feed do catalogo (segundos; 0 = sem poda). Versoes
+    # anteriores ao piso ressincronizam via /books/export
+    catalog_changes_retention: float = 604800.0
+    
+    # A2A WebSocket: requisicoes em voo por conexao (pipelining)
+    a2a_max_in_flight: int = 16
+    a2a_batch_max_items: int = 50
+    a2a_fast_path_enabled: bool = True  # acoes estruturadas sem o grafo LangGraph
+    # Tasks do JSON-RPC A2A (tasks/get): limite no backend memory e TTL em ambos (0 = sem limite)
+    a2a_task_max_entries: int = 10000
+    a2a_task_ttl: float = 3600.0
+    
+    # Admission control adaptativo (catalog, checkout, chat)
+    admission_control_enabled: bool = True
+    
+    # Tracing distribuido (W3C traceparent): none | jsonl | memory
+    tracing_exporter: str = "none"
+    tracing_jsonl_path: str = "./data/traces.jsonl"
+    
+    # Monitor de lag do event loop (opt-in): metrica + stack de bloqueios
+    loop_monitor_enabled: bool = False
+    loop_monitor_interval: float = 0.1  # segundos entre medicoes
+    loop_block_threshold_ms: float = 100.0
+    
+    # Rotas /debug (profile, loop): exigem X-Debug-Token (vazio = desativadas)
+    debug_token: str = ""
+    debug_profile_max_seconds: float = 60.0
+    debug_profile_interval: float = 0.005  # segundos entre amostras
+    
     # HTTP
     http_timeout: float = 30.0
     
@@ -41,6 +120,16 @@ class Settings(BaseSettings):
     debug: bool = True
     log_level: str = "INFO"
     
+    # Logging: console (dev) | json (producao: fila limitada + thread escritora)
+    log_format: str = "console"
+    log_queue_size: int = 10000
+    # Fracao mantida por evento de alta frequencia (apenas modo json)
+    log_sample_rates: Dict[str, float] = {
+        "Executing tool": 0.1,
+        "UCP Request": 0.1,
+        "MCP tool called": 0.1,
+    }
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
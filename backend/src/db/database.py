@@ -101,6 +101,56 @@ async def init_databases():
         CREATE INDEX IF NOT EXISTS idx_books_author ON books(author)
     """)
     
+    # Change feed do catalogo (preenchido por triggers em books)
+    await products_db.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id TEXT NOT NULL,
+            op TEXT NOT NULL,
+            price INTEGER,
+            stock INTEGER,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await products_db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_books_insert AFTER INSERT ON books
+        BEGIN
+            INSERT INTO catalog_changes (book_id, op, price, stock)
+            VALUES (NEW.id, 'insert', NEW.price, NEW.stock);
+        END
+    """)
+    await products_db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_books_price AFTER UPDATE OF price ON books
+        WHEN OLD.price IS NOT NEW.price
+        BEGIN
+            INSERT INTO catalog_changes (book_id, op, price)
+            VALUES (NEW.id, 'price', NEW.price);
+        END
+    """)
+    await products_db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_books_stock AFTER UPDATE OF stock ON books
+        WHEN OLD.stock IS NOT NEW.stock
+        BEGIN
+            INSERT INTO catalog_changes (book_id, op, stock)
+            VALUES (NEW.id, 'stock', NEW.stock);
+        END
+    """)
+    await products_db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_books_delete AFTER DELETE ON books
+        BEGIN
+            INSERT INTO catalog_changes (book_id, op)
+            VALUES (OLD.id, 'delete');
+        END
+    """)
+    # Livros anteriores aos triggers entram como insert, para que
+    # get_changes(since=0) seja um espelho completo enquanto nada foi podado
+    await products_db.execute("""
+        INSERT INTO catalog_changes (book_id, op, price, stock)
+        SELECT id, 'insert', price, stock FROM books
+        WHERE id NOT IN (SELECT book_id FROM catalog_changes)
+          AND (SELECT COALESCE(MIN(version), 1) FROM catalog_changes) = 1
+    """)
+    
     # Discount codes
     await products_db.execute("""
         CREATE TABLE IF NOT EXISTS discount_codes (
@@ -150,6 +200,32 @@ async def init_databases():
         )
     """)
     
+    # Change feed de status do checkout (preenchido por triggers)
+    await transactions_db.execute("""
+        CREATE TABLE IF NOT EXISTS checkout_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            total INTEGER,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await transactions_db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkout_insert AFTER INSERT ON checkout_sessions
+        BEGIN
+            INSERT INTO checkout_changes (session_id, status, total)
+            VALUES (NEW.id, NEW.status, NEW.total);
+        END
+    """)
+    await transactions_db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_checkout_status AFTER UPDATE OF status ON checkout_sessions
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            INSERT INTO checkout_changes (session_id, status, total)
+            VALUES (NEW.id, NEW.status, NEW.total);
+        END
+    """)
+    
     await transactions_db.execute("""
         CREATE TABLE IF NOT EXISTS line_items (
             id TEXT PRIMARY KEY,
@@ -193,6 +269,30 @@ async def init_databases():
             FOREIGN KEY (session_id) REFERENCES checkout_sessions(id)
         )
     """)
+    
+    # Idempotencia dos endpoints de escrita UCP
+    await transactions_db.execute("""
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            agent TEXT NOT NULL,
+            key TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            response_status INTEGER,
+            response_body BLOB,
+            content_type TEXT,
+            response_headers TEXT,
+            PRIMARY KEY (agent, key)
+        )
+    """)
+    columns = {row["name"] for row in await transactions_db.fetch_all("PRAGMA table_info(idempotency_keys)")}
+    if "response_headers" not in columns:
+        # Banco criado antes da coluna: registros antigos sao replayados sem headers extras
+        await transactions_db.execute("ALTER TABLE idempotency_keys ADD COLUMN response_headers TEXT")
+    await transactions_db.execute("""
+        CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys(expires_at)
+    """)
     await transactions_db.disconnect()
     
     print("Databases initialized successfully!")
@@ -3,6 +3,7 @@ from typing import Optional, List
 from datetime import datetime
 
 from .database import products_db
+from ..observability.metrics import instrument_repository
 
 
 class DiscountCode:
@@ -58,6 +59,7 @@ class DiscountCode:
             return min(self.value, subtotal)
 
 
+@instrument_repository("discounts")
 class DiscountsRepository:
     """Repository para cupons de desconto."""
     
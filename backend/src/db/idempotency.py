@@ -0,0 +1,122 @@
+"""Repository de chaves de idempotencia (UCP write endpoints)."""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import json
+import time
+import structlog
+
+from .database import transactions_db
+from ..observability.metrics import instrument_repository
+
+logger = structlog.get_logger()
+
+
+@dataclass
+class IdempotencyRecord:
+    """Registro de uma chave de idempotencia."""
+    agent: str
+    key: str
+    fingerprint: str
+    status: str  # in_flight | completed
+    created_at: float
+    expires_at: float
+    response_status: Optional[int] = None
+    response_body: Optional[bytes] = None
+    content_type: Optional[str] = None
+    response_headers: Optional[str] = None  # JSON: [[nome, valor], ...]
+    
+    def headers(self) -> List[Tuple[str, str]]:
+        """Headers gravados da resposta original."""
+        return [tuple(pair) for pair in json.loads(self.response_headers)] if self.response_headers else []
+
+
+@instrument_repository("idempotency")
+class IdempotencyRepository:
+    """Repository para chaves de idempotencia."""
+    
+    async def claim(
+        self,
+        agent: str,
+        key: str,
+        fingerprint: str,
+        ttl_seconds: int,
+        lock_timeout: float
+    ) -> Optional[IdempotencyRecord]:
+        """
+        Reservar a chave para execucao.
+        
+        Returns:
+            None se a chave foi reservada por esta chamada, ou o
+            registro existente (em andamento ou concluido).
+        """
+        now = time.time()
+        
+        # Chave expirada ou reserva orfa (worker caiu no meio) pode ser reaproveitada
+        await transactions_db.execute(
+            """
+            DELETE FROM idempotency_keys
+            WHERE agent = ? AND key = ?
+              AND (expires_at < ? OR (status = 'in_flight' AND created_at < ?))
+            """,
+            (agent, key, now, now - lock_timeout)
+        )
+        
+        cursor = await transactions_db.execute(
+            """
+            INSERT OR IGNORE INTO idempotency_keys
+            (agent, key, fingerprint, status, created_at, expires_at)
+            VALUES (?, ?, ?, 'in_flight', ?, ?)
+            """,
+            (agent, key, fingerprint, now, now + ttl_seconds)
+        )
+        if cursor.rowcount == 1:
+            return None
+        
+        return await self.get(agent, key)
+    
+    async def get(self, agent: str, key: str) -> Optional[IdempotencyRecord]:
+        """Buscar registro da chave."""
+        row = await transactions_db.fetch_one(
+            "SELECT * FROM idempotency_keys WHERE agent = ? AND key = ?",
+            (agent, key)
+        )
+        return IdempotencyRecord(**dict(row)) if row else None
+    
+    async def complete(
+        self,
+        agent: str,
+        key: str,
+        status_code: int,
+        body: bytes,
+        content_type: Optional[str],
+        headers: Optional[List[Tuple[str, str]]] = None
+    ) -> None:
+        """Gravar resposta final da chave (status, body e headers)."""
+        await transactions_db.execute(
+            """
+            UPDATE idempotency_keys
+            SET status = 'completed', response_status = ?, response_body = ?, content_type = ?,
+                response_headers = ?
+            WHERE agent = ? AND key = ?
+            """,
+            (status_code, body, content_type, json.dumps(headers or []), agent, key)
+        )
+    
+    async def release(self, agent: str, key: str) -> None:
+        """Liberar chave em andamento (falha nao cacheavel)."""
+        await transactions_db.execute(
+            "DELETE FROM idempotency_keys WHERE agent = ? AND key = ? AND status = 'in_flight'",
+            (agent, key)
+        )
+    
+    async def purge_expired(self) -> int:
+        """Remover chaves expiradas (periodicamente, pelo janitor do UCP Server)."""
+        cursor = await transactions_db.execute(
+            "DELETE FROM idempotency_keys WHERE expires_at < ?",
+            (time.time(),)
+        )
+        return cursor.rowcount
+
+
+# Instancia global
+idempotency_repo = IdempotencyRepository()
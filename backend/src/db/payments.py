@@ -8,6 +8,7 @@ import uuid
 import structlog
 
 from .database import products_db
+from ..observability.metrics import instrument_repository
 from ..payments.models import (
     PaymentTransaction,
     PaymentStatus,
@@ -19,6 +20,7 @@ from ..payments.models import (
 logger = structlog.get_logger()
 
 
+@instrument_repository("payments")
 class PaymentsRepository:
     """Repository para transacoes PSP e carteiras."""
     
@@ -1,12 +1,17 @@
 """Repository de produtos (livros)."""
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, AsyncIterator
 from datetime import datetime
 import uuid
 
 from .database import products_db
-from ..ucp_server.models.book import Book, BookCreate
+from ..observability.metrics import instrument_repository
+from ..ucp_server.models.book import Book, BookCreate, BookChange, CatalogChanges
 
+# Maximo de linhas do change feed por pagina
+MAX_CHANGES_PAGE = 1000
 
+
+@instrument_repository("products")
 class ProductsRepository:
     """Repository para operacoes com livros."""
     
@@ -143,6 +148,161 @@ class ProductsRepository:
         row = await products_db.fetch_one("SELECT COUNT(*) as count FROM books")
         return row["count"] if row else 0
 
+    async def iter_books(
+        self,
+        category: Optional[str] = None,
+        since: Optional[int] = None,
+        batch_size: int = 500
+    ) -> AsyncIterator[Book]:
+        """
+        Iterar o catalogo em lotes (keyset pagination por id).
+        
+        Cada lote e uma query curta, entao a memoria fica constante e
+        nenhuma leitura longa segura o banco durante o streaming.
+        
+        Args:
+            category: Filtrar por categoria
+            since: Apenas livros alterados apos esta versao do change feed
+            batch_size: Livros lidos por query
+        """
+        conditions = ["id > ?"]
+        filters: List[Any] = []
+        
+        if category:
+            conditions.append("LOWER(category) = LOWER(?)")
+            filters.append(category)
+        if since is not None:
+            conditions.append(
+                "id IN (SELECT book_id FROM catalog_changes WHERE version > ?)"
+            )
+            filters.append(since)
+        
+        sql = f"SELECT * FROM books WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?"
+        last_id = ""
+        
+        while True:
+            rows = await products_db.fetch_all(sql, (last_id, *filters, batch_size))
+            for row in rows:
+                yield Book(**dict(row))
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1]["id"]
+    
+    async def get_categories(self, book_ids: List[str]) -> Dict[str, str]:
+        """Mapear ids de livros para categoria."""
+        if not book_ids:
+            return {}
+        placeholders = ",".join("?" * len(book_ids))
+        rows = await products_db.fetch_all(
+            f"SELECT id, category FROM books WHERE id IN ({placeholders})",
+            tuple(book_ids)
+        )
+        return {row["id"]: row["category"] for row in rows}
+    
+    async def get_catalog_version(self) -> int:
+        """Versao atual do change feed (0 se vazio)."""
+        row = await products_db.fetch_one(
+            "SELECT COALESCE(MAX(version), 0) as version FROM catalog_changes"
+        )
+        return row["version"] if row else 0
+    
+    async def get_changes_floor(self) -> int:
+        """
+        Menor `since` ainda atendido pelo change feed.
+        
+        Linhas podadas pela retencao deixam de existir; clientes com versao
+        anterior ao piso precisam ressincronizar pelo export.
+        """
+        row = await products_db.fetch_one(
+            "SELECT COALESCE(MIN(version), 1) - 1 as floor FROM catalog_changes"
+        )
+        return row["floor"] if row else 0
+    
+    async def prune_changes(self, max_age: float) -> int:
+        """Remover alteracoes mais antigas que `max_age` segundos (mantem a ultima)."""
+        cursor = await products_db.execute(
+            """
+            DELETE FROM catalog_changes
+            WHERE changed_at < datetime('now', ?)
+              AND version < (SELECT MAX(version) FROM catalog_changes)
+            """,
+            (f"-{int(max_age)} seconds",)
+        )
+        return cursor.rowcount
+    
+    async def get_changes(self, since: int = 0, limit: int = 500) -> CatalogChanges:
+        """
+        Listar alteracoes do catalogo apos uma versao.
+        
+        Varias alteracoes do mesmo livro dentro da pagina sao compactadas
+        em um unico delta, ordenado pela ultima versao que o afetou. Com
+        `since` abaixo do piso de retencao, retorna `resync_required` sem
+        alteracoes (e sem avancar a versao).
+        
+        Args:
+            since: Ultima versao ja aplicada pelo cliente
+            limit: Maximo de linhas do log lidas nesta pagina (1..MAX_CHANGES_PAGE)
+        
+        Returns:
+            CatalogChanges com os deltas e a nova versao
+        """
+        # limit <= 0 devolveria has_more sem alteracoes (e um LIMIT negativo e ilimitado)
+        limit = max(1, min(limit, MAX_CHANGES_PAGE))
+        if since < await self.get_changes_floor():
+            return CatalogChanges(since=since, version=since, resync_required=True, changes=[])
+        
+        rows = await products_db.fetch_all(
+            """
+            SELECT version, book_id, op, price, stock FROM catalog_changes
+            WHERE version > ? ORDER BY version LIMIT ?
+            """,
+            (since, limit + 1)
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        compacted: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            book_id = row["book_id"]
+            # Remover e reinserir mantem a ordem pela ultima versao
+            entry = compacted.pop(book_id, None) or {"op": "update", "id": book_id}
+            op = row["op"]
+            
+            if op == "delete":
+                entry = {"op": "delete", "id": book_id}
+            elif op == "insert":
+                entry = {"op": "upsert", "id": book_id}
+            elif entry["op"] == "update":
+                # Em upsert o registro completo ja reflete o valor atual
+                entry[op] = row[op]
+            
+            entry["version"] = row["version"]
+            compacted[book_id] = entry
+        
+        upsert_ids = [e["id"] for e in compacted.values() if e["op"] == "upsert"]
+        if upsert_ids:
+            placeholders = ",".join("?" * len(upsert_ids))
+            book_rows = await products_db.fetch_all(
+                f"SELECT * FROM books WHERE id IN ({placeholders})",
+                tuple(upsert_ids)
+            )
+            books = {row["id"]: Book(**dict(row)) for row in book_rows}
+            for book_id in upsert_ids:
+                if book_id in books:
+                    compacted[book_id]["book"] = books[book_id]
+                else:
+                    # Removido depois da pagina lida; o delete vem na proxima
+                    del compacted[book_id]
+        
+        version = rows[-1]["version"] if rows else await self.get_catalog_version()
+        
+        return CatalogChanges(
+            since=since,
+            version=version,
+            has_more=has_more,
+            changes=[BookChange(**entry) for entry in compacted.values()]
+        )
+
 
 # Instancia global
 products_repo = ProductsRepository()
@@ -0,0 +1,499 @@
+"""
+Session store compartilhado (estado de chat, MCP e A2A).
+
+Backends:
+- MemorySessionStore: cache LRU + TTL de inatividade no processo (um
+  unico worker), com spill opcional das sessoes despejadas para SQLite
+- SQLiteSessionStore: arquivo SQLite em WAL compartilhado pelos workers
+  do mesmo host; valores serializados com msgpack (JSON se indisponivel)
+
+As chaves sao agrupadas por namespace ("chat", "mcp_disclosure",
+"a2a_agents", ...). Quem altera um valor lido do store deve gravar de
+volta com `set`. No caminho quente (estado de chat a cada turno), usar
+as variantes async (`aget`/`aset`/`adelete`): no SQLite elas rodam a
+consulta e a serializacao numa thread, fora do event loop.
+"""
+import asyncio
+import inspect
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+# msgpack e opcional; JSON como fallback
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+
+def _encode_default(value: Any) -> Any:
+    """Converter tipos nao nativos (sets, modelos pydantic, enums)."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if hasattr(value, "value"):
+        return value.value
+    return str(value)
+
+
+def serialize(value: Any) -> bytes:
+    """Serializar valor de sessao (prefixo indica o formato)."""
+    if MSGPACK_AVAILABLE:
+        return b"m" + msgpack.packb(value, use_bin_type=True, default=_encode_default)
+    return b"j" + json.dumps(value, separators=(",", ":"), default=_encode_default).encode("utf-8")
+
+
+def deserialize(data: bytes) -> Any:
+    """Desserializar valor gravado por `serialize`."""
+    marker, payload = data[:1], data[1:]
+    if marker == b"m":
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload)
+
+
+class SessionStore(Protocol):
+    """Interface do session store."""
+    
+    def get(self, namespace: str, key: str) -> Optional[Any]: ...
+    
+    def set(self, namespace: str, key: str, value: Any) -> None: ...
+    
+    def delete(self, namespace: str, key: str) -> None: ...
+    
+    def keys(self, namespace: str) -> List[str]: ...
+    
+    def values(self, namespace: str) -> List[Any]: ...
+    
+    async def aget(self, namespace: str, key: str) -> Optional[Any]: ...
+    
+    async def aset(self, namespace: str, key: str, value: Any) -> None: ...
+    
+    async def adelete(self, namespace: str, key: str) -> None: ...
+    
+    async def avalues(self, namespace: str) -> List[Any]: ...
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]: ...
+
+
+class SessionCache:
+    """
+    Cache LRU com TTL de inatividade para um namespace.
+    
+    A ordem do OrderedDict e a ordem de acesso, entao as entradas ociosas
+    ficam sempre no inicio: o despejo por TTL so olha a cabeca da fila.
+    Sem limites (max_entries/idle_ttl = None) o cache nunca despeja.
+    """
+    
+    def __init__(self, max_entries: Optional[int] = None, idle_ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        # chave -> (valor, ultimo_acesso)
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: str) -> Optional[Any]:
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None or self._is_idle(entry[1], now):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries[key] = (entry[0], now)
+        self._entries.move_to_end(key)
+        return entry[0]
+    
+    def set(self, key: str, value: Any) -> List[Tuple[str, Any]]:
+        """Gravar valor; retorna as entradas despejadas por capacidade (chave, valor)."""
+        now = time.monotonic()
+        self._entries[key] = (value, now)
+        self._entries.move_to_end(key)
+        return self.evict(now)
+    
+    def pop(self, key: str) -> Optional[Any]:
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+    
+    def items(self) -> List[Tuple[str, Any]]:
+        return [(key, entry[0]) for key, entry in self._entries.items()]
+    
+    def evict(self, now: Optional[float] = None) -> List[Tuple[str, Any]]:
+        """
+        Descartar entradas ociosas e despejar o excesso sobre max_entries (LRU).
+        
+        So as despejadas por capacidade sao retornadas (candidatas a spill):
+        sessao que expirou por inatividade acabou e nao volta.
+        """
+        now = now if now is not None else time.monotonic()
+        evicted = []
+        while self._entries:
+            key, (value, last_access) = next(iter(self._entries.items()))
+            if self._is_idle(last_access, now):
+                self.expirations += 1
+                self._entries.popitem(last=False)
+            elif self.max_entries is not None and len(self._entries) > self.max_entries:
+                self.evictions += 1
+                self._entries.popitem(last=False)
+                evicted.append((key, value))
+            else:
+                break
+        return evicted
+    
+    def _is_idle(self, last_access: float, now: float) -> bool:
+        return self.idle_ttl is not None and now - last_access > self.idle_ttl
+    
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class MemorySessionStore:
+    """
+    Store em memoria (um processo).
+    
+    Namespaces listados em `limits` usam cache limitado (LRU + TTL de
+    inatividade); os demais nao despejam. Com `spill`, sessoes despejadas
+    por capacidade sao gravadas em disco e restauradas no proximo acesso;
+    as expiradas por inatividade sao descartadas. `prune_spill` remove do
+    disco as sessoes gravadas ha mais de `max_age` segundos.
+    """
+    
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[Optional[int], Optional[float]]]] = None,
+        spill: Optional["SQLiteSessionStore"] = None
+    ):
+        self.limits = limits or {}
+        self.spill = spill
+        self._caches: Dict[str, SessionCache] = {}
+        self.spilled = 0
+        self.restored = 0
+    
+    def _cache(self, namespace: str) -> SessionCache:
+        cache = self._caches.get(namespace)
+        if cache is None:
+            max_entries, idle_ttl = self.limits.get(namespace, (None, None))
+            cache = self._caches[namespace] = SessionCache(max_entries, idle_ttl)
+        return cache
+    
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        cache = self._cache(namespace)
+        value = cache.get(key)
+        if value is None:
+            self._handle_evicted(namespace, cache.evict())
+            if self.spill is not None and namespace in self.limits:
+                value = self.spill.get(namespace, key)
+                if value is not None:
+                    self.spill.delete(namespace, key)
+                    self.restored += 1
+                    self.set(namespace, key, value)
+        return value
+    
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        evicted = self._cache(namespace).set(key, value)
+        self._handle_evicted(namespace, evicted)
+    
+    def delete(self, namespace: str, key: str) -> None:
+        self._cache(namespace).pop(key)
+        if self.spill is not None and namespace in self.limits:
+            self.spill.delete(namespace, key)
+    
+    async def aget(self, namespace: str, key: str) -> Optional[Any]:
+        cache = self._cache(namespace)
+        value = cache.get(key)
+        if value is None:
+            await self._ahandle_evicted(namespace, cache.evict())
+            if self.spill is not None and namespace in self.limits:
+                value = await self.spill.aget(namespace, key)
+                if value is not None:
+                    await self.spill.adelete(namespace, key)
+                    self.restored += 1
+                    await self.aset(namespace, key, value)
+        return value
+    
+    async def aset(self, namespace: str, key: str, value: Any) -> None:
+        evicted = self._cache(namespace).set(key, value)
+        await self._ahandle_evicted(namespace, evicted)
+    
+    async def adelete(self, namespace: str, key: str) -> None:
+        self._cache(namespace).pop(key)
+        if self.spill is not None and namespace in self.limits:
+            await self.spill.adelete(namespace, key)
+    
+    async def avalues(self, namespace: str) -> List[Any]:
+        return self.values(namespace)
+    
+    def keys(self, namespace: str) -> List[str]:
+        return [key for key, _ in self._cache(namespace).items()]
+    
+    def values(self, namespace: str) -> List[Any]:
+        return [value for _, value in self._cache(namespace).items()]
+    
+    def prune_spill(self, max_age: float) -> int:
+        """Remover do spill as sessoes gravadas ha mais de `max_age` segundos."""
+        if self.spill is None:
+            return 0
+        return sum(self.spill.prune(namespace, max_age) for namespace in self.limits)
+    
+    def _handle_evicted(self, namespace: str, evicted: List[Tuple[str, Any]]):
+        if not evicted:
+            return
+        if self.spill is not None:
+            self.spill.set_many(namespace, evicted)
+            self.spilled += len(evicted)
+        logger.debug("Sessions evicted", namespace=namespace, count=len(evicted), spilled=self.spill is not None)
+    
+    async def _ahandle_evicted(self, namespace: str, evicted: List[Tuple[str, Any]]):
+        if evicted and self.spill is not None:
+            await self.spill.aset_many(namespace, evicted)
+            self.spilled += len(evicted)
+            logger.debug("Sessions evicted", namespace=namespace, count=len(evicted), spilled=True)
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        stats: Dict[str, Dict[str, Any]] = {
+            namespace: cache.get_stats() for namespace, cache in self._caches.items()
+        }
+        if self.spill is not None:
+            stats["_spill"] = {"spilled": self.spilled, "restored": self.restored}
+        return stats
+
+
+class SQLiteSessionStore:
+    """
+    Store em SQLite (WAL) compartilhado entre processos.
+    
+    Os metodos sincronos bloqueiam quem chama: com outro worker escrevendo,
+    a espera pelo lock chega ao busy timeout (5s), e a serializacao cresce
+    com o estado. No event loop, usar as variantes async (thread pool).
+    """
+    
+    def __init__(self, db_path: str, idle_ttls: Optional[Dict[str, float]] = None):
+        self.db_path = db_path
+        # namespace -> segundos sem escrita ate a sessao expirar (`prune_idle`)
+        self.idle_ttls = idle_ttls or {}
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            db_path,
+            timeout=5.0,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        logger.info("SQLite session store ready", path=db_path, msgpack=MSGPACK_AVAILABLE)
+    
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM sessions WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        return deserialize(row[0]) if row else None
+    
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        self.set_many(namespace, [(key, value)])
+    
+    def set_many(self, namespace: str, items: List[Tuple[str, Any]]) -> None:
+        rows = [(namespace, key, serialize(value), time.time()) for key, value in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sessions (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+    
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM sessions WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            )
+    
+    def keys(self, namespace: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM sessions WHERE namespace = ?",
+                (namespace,)
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def values(self, namespace: str) -> List[Any]:
+        return [value for _, value in self.items(namespace)]
+    
+    def items(self, namespace: str) -> List[Tuple[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, value FROM sessions WHERE namespace = ?",
+                (namespace,)
+            ).fetchall()
+        return [(row[0], deserialize(row[1])) for row in rows]
+    
+    def prune(self, namespace: str, max_age: float) -> int:
+        """Remover linhas do namespace sem escrita ha mais de `max_age` segundos."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE namespace = ? AND updated_at < ?",
+                (namespace, time.time() - max_age)
+            )
+        return cursor.rowcount
+    
+    def prune_idle(self) -> int:
+        """Expirar sessoes ociosas dos namespaces com TTL (`idle_ttls`)."""
+        return sum(self.prune(namespace, ttl) for namespace, ttl in self.idle_ttls.items())
+    
+    async def aget(self, namespace: str, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.get, namespace, key)
+    
+    async def aset(self, namespace: str, key: str, value: Any) -> None:
+        await asyncio.to_thread(self.set, namespace, key, value)
+    
+    async def aset_many(self, namespace: str, items: List[Tuple[str, Any]]) -> None:
+        await asyncio.to_thread(self.set_many, namespace, items)
+    
+    async def adelete(self, namespace: str, key: str) -> None:
+        await asyncio.to_thread(self.delete, namespace, key)
+    
+    async def avalues(self, namespace: str) -> List[Any]:
+        return await asyncio.to_thread(self.values, namespace)
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT namespace, COUNT(*) FROM sessions GROUP BY namespace"
+            ).fetchall()
+        return {namespace: {"size": count} for namespace, count in rows}
+    
+    def close(self):
+        """Fechar conexao."""
+        with self._lock:
+            self._conn.close()
+
+
+class SessionJanitor:
+    """
+    Limpeza periodica do session store.
+    
+    Cada varredura registrada roda numa thread (consultas SQLite fora do
+    event loop) - ou e aguardada, se for async - e retorna o numero de
+    entradas removidas. A primeira rodada acontece no start, para limpar
+    o que um worker anterior deixou.
+    """
+    
+    def __init__(self, interval: float = 60.0):
+        self.interval = interval
+        self._sweeps: List[Tuple[str, Callable[[], Any]]] = []
+        self._task: Optional[asyncio.Task] = None
+    
+    def add(self, name: str, sweep: Callable[[], Any]):
+        self._sweeps.append((name, sweep))
+    
+    async def start(self):
+        await self.run_once()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Session janitor started", interval=self.interval, sweeps=[name for name, _ in self._sweeps])
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
+    
+    async def run_once(self) -> int:
+        """Executar todas as varreduras; retorna o total removido."""
+        total = 0
+        for name, sweep in self._sweeps:
+            try:
+                if inspect.iscoroutinefunction(sweep):
+                    removed = await sweep()
+                else:
+                    removed = await asyncio.to_thread(sweep)
+            except Exception as e:
+                logger.warning("Session sweep failed", sweep=name, error=str(e))
+                continue
+            if removed:
+                logger.info("Session sweep", sweep=name, removed=removed)
+            total += removed
+        return total
+
+
+# Instancia global
+_session_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    """Obter session store configurado (singleton)."""
+    global _session_store
+    if _session_store is None:
+        from ..config import settings
+        if settings.session_store == "sqlite":
+            idle_ttls = {
+                "chat": settings.session_cache_idle_ttl,
+                "mcp_disclosure": settings.session_cache_idle_ttl,
+                "a2a_tasks": settings.a2a_task_ttl,
+            }
+            _session_store = SQLiteSessionStore(
+                settings.session_store_path,
+                idle_ttls={namespace: ttl for namespace, ttl in idle_ttls.items() if ttl},
+            )
+        else:
+            bounded = (settings.session_cache_max_entries or None, settings.session_cache_idle_ttl or None)
+            tasks = (settings.a2a_task_max_entries or None, settings.a2a_task_ttl or None)
+            spill = None
+            if settings.session_cache_spill_path:
+                spill = SQLiteSessionStore(settings.session_cache_spill_path)
+            _session_store = MemorySessionStore(
+                limits={"chat": bounded, "mcp_disclosure": bounded, "a2a_tasks": tasks},
+                spill=spill,
+            )
+    return _session_store
+
+
+_session_janitor: Optional[SessionJanitor] = None
+
+
+def get_session_janitor() -> SessionJanitor:
+    """Obter janitor do session store (singleton)."""
+    global _session_janitor
+    if _session_janitor is None:
+        from ..config import settings
+        _session_janitor = SessionJanitor(settings.session_sweep_interval)
+    return _session_janitor
@@ -1,10 +1,11 @@
 """Repository de transacoes (checkout sessions)."""
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 import uuid
 import structlog
 
 from .database import transactions_db, products_db
+from ..observability.metrics import instrument_repository
 from ..ucp_server.models.checkout import (
     CheckoutSession, LineItem, Buyer, Total, Item,
     Discounts, AppliedDiscount, Allocation, UcpMeta, UcpCapability
@@ -13,6 +14,7 @@ from ..ucp_server.models.checkout import (
 logger = structlog.get_logger()
 
 
+@instrument_repository("transactions")
 class TransactionsRepository:
     """Repository para checkout sessions."""
     
@@ -235,6 +237,24 @@ class TransactionsRepository:
             (datetime.utcnow(), session_id)
         )
         return True
+    
+    async def get_status_version(self) -> int:
+        """Versao atual do change feed de checkout (0 se vazio)."""
+        row = await transactions_db.fetch_one(
+            "SELECT COALESCE(MAX(version), 0) as version FROM checkout_changes"
+        )
+        return row["version"] if row else 0
+    
+    async def get_status_changes(self, since: int = 0, limit: int = 500) -> List[Dict[str, Any]]:
+        """Mudancas de status de checkout apos uma versao (ordem de versao)."""
+        rows = await transactions_db.fetch_all(
+            """
+            SELECT version, session_id, status, total FROM checkout_changes
+            WHERE version > ? ORDER BY version LIMIT ?
+            """,
+            (since, limit)
+        )
+        return [dict(row) for row in rows]
 
 
 # Instancia global
@@ -1,31 +1,53 @@
 """API Gateway - Entry point principal."""
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set
+import asyncio
 import structlog
+import json
+import os
+import time
 import uuid
-import httpx
 
 from .config import settings
 from .db.database import init_databases, products_db, transactions_db
 from .db.products import products_repo
+from .db.session_store import MemorySessionStore, SQLiteSessionStore, get_session_janitor, get_session_store
 from .agents import store_agent_runner
-from .agents.a2a import a2a_handler, A2AMessage
+from .agents.a2a import a2a_handler, A2AMessage, A2AMessageType, A2APipeline
+from .agents.intent import get_intent_trainer
 from .mcp.http_server import router as mcp_router
+from .agents.a2a.jsonrpc import router as a2a_jsonrpc_router
+from .observability.profiling import router as debug_router
+from .realtime import (
+    A2A_MSGPACK_SUBPROTOCOL,
+    ChangeFeedTailer,
+    WebSocketOutbox,
+    get_event_bus,
+    select_subprotocol,
+    unpack,
+)
+from .observability import (
+    create_metrics_middleware,
+    configure_logging,
+    create_tracing_middleware,
+    get_loop_monitor,
+    get_tracer,
+    http_client,
+    metrics_endpoint,
+    shutdown_logging,
+)
+from .resilience import (
+    AdmissionRejected,
+    AdmissionMiddleware,
+    get_admission_controller,
+)
 
 # URL do UCP Server
 UCP_SERVER_URL = "http://localhost:8182"
 
 # Configurar logging
-structlog.configure(
-    processors=[
-        structlog.processors.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.dev.ConsoleRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.PrintLoggerFactory(),
-)
+configure_logging()
 
 logger = structlog.get_logger()
 
@@ -45,50 +67,229 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admission control por classe de rota (503 sob sobrecarga)
+if settings.admission_control_enabled:
+    app.add_middleware(AdmissionMiddleware)
+
+# Metricas (mais externo: ve tambem requests descartados)
+app.middleware("http")(create_metrics_middleware("api-gateway"))
+app.get("/metrics", include_in_schema=False)(metrics_endpoint)
+
+# Tracing (mais externo: continua o traceparent recebido)
+app.middleware("http")(create_tracing_middleware("api-gateway"))
+
 # Incluir router MCP para ferramentas
 app.include_router(mcp_router, prefix="/api")
 
+# A2A JSON-RPC (message/send, message/stream via SSE) na URL do AgentCard
+app.include_router(a2a_jsonrpc_router)
+
+# Profiling sob demanda (protegido por X-Debug-Token)
+app.include_router(debug_router)
+
 
 # WebSocket connections
+def _process_alive(pid: Any) -> bool:
+    """Processo existe neste host (sinal 0 so verifica)."""
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
 class ConnectionManager:
-    """Gerenciador de conexoes WebSocket."""
+    """
+    Gerenciador de conexoes WebSocket.
+    
+    Os sockets sao locais ao processo; a presenca de cada conexao
+    (tipo, worker) fica no session store para ser vista por todos os workers.
+    
+    Todo envio passa pela fila de saida da conexao (WebSocketOutbox), com
+    task escritora propria: broadcast so enfileira e nunca espera um socket.
+    
+    O disconnect libera o que e local na hora; a remocao da presenca e da
+    sessao no store roda numa task (no SQLite, I/O fora do event loop).
+    """
+    
+    NAMESPACE = "ws"
     
     def __init__(self):
-        self.chat_connections: Dict[str, WebSocket] = {}
-        self.a2a_connections: Dict[str, WebSocket] = {}
+        self.chat_connections: Dict[str, WebSocketOutbox] = {}
+        self.a2a_connections: Dict[str, WebSocketOutbox] = {}
+        self.store = get_session_store()
+        # Referencias das tasks de limpeza (evita coleta antes de rodar)
+        self._cleanup_tasks: Set[asyncio.Task] = set()
+    
+    def _open_outbox(
+        self,
+        websocket: WebSocket,
+        kind: str,
+        session_id: str,
+        binary: bool = False
+    ) -> WebSocketOutbox:
+        on_close = self.disconnect_chat if kind == "chat" else self.disconnect_a2a
+        outbox = WebSocketOutbox(
+            websocket,
+            kind=kind,
+            max_queue=settings.ws_outbox_max_queue,
+            policy=settings.ws_slow_consumer_policy,
+            send_timeout=settings.ws_send_timeout,
+            binary=binary,
+            on_close=lambda _: on_close(session_id),
+        )
+        outbox.start()
+        return outbox
+    
+    async def _register(self, session_id: str, kind: str):
+        await self.store.aset(self.NAMESPACE, session_id, {
+            "kind": kind,
+            "worker_pid": os.getpid(),
+            "connected_at": time.time()
+        })
+    
+    def sweep_presence(self) -> int:
+        """
+        Remover presencas orfas: de workers que morreram sem desconectar
+        (crash) ou deste pid sem conexao local (pid reaproveitado).
+        
+        So o SQLite compartilha presencas entre processos (mesmo host);
+        no backend memory elas morrem junto com o worker.
+        """
+        if not isinstance(self.store, SQLiteSessionStore):
+            return 0
+        pid = os.getpid()
+        removed = 0
+        for session_id, presence in self.store.items(self.NAMESPACE):
+            worker_pid = presence.get("worker_pid")
+            if worker_pid == pid:
+                stale = session_id not in self.chat_connections and session_id not in self.a2a_connections
+            else:
+                stale = not _process_alive(worker_pid)
+            if stale:
+                self.store.delete(self.NAMESPACE, session_id)
+                removed += 1
+        return removed
     
     async def connect_chat(self, websocket: WebSocket) -> str:
         await websocket.accept()
         session_id = str(uuid.uuid4())
-        self.chat_connections[session_id] = websocket
+        self.chat_connections[session_id] = self._open_outbox(websocket, "chat", session_id)
+        await self._register(session_id, "chat")
         logger.info("Chat WebSocket connected", session=session_id)
         return session_id
     
-    async def connect_a2a(self, websocket: WebSocket) -> str:
-        await websocket.accept()
+    async def connect_a2a(self, websocket: WebSocket, subprotocol: Optional[str] = None) -> str:
+        await websocket.accept(subprotocol=subprotocol)
         session_id = str(uuid.uuid4())
-        self.a2a_connections[session_id] = websocket
-        logger.info("A2A WebSocket connected", session=session_id)
+        binary = subprotocol == A2A_MSGPACK_SUBPROTOCOL
+        self.a2a_connections[session_id] = self._open_outbox(websocket, "a2a", session_id, binary)
+        await self._register(session_id, "a2a")
+        logger.info("A2A WebSocket connected", session=session_id, subprotocol=subprotocol)
         return session_id
     
-    def disconnect_chat(self, session_id: str):
+    def disconnect_chat(self, session_id: str) -> Optional[asyncio.Task]:
+        """Desconectar; retorna a task de limpeza do store (None se ja desconectado)."""
         if session_id in self.chat_connections:
-            del self.chat_connections[session_id]
-            store_agent_runner.clear_session(session_id)
+            self.chat_connections.pop(session_id).close_nowait()
+            get_event_bus().unsubscribe(session_id)
             logger.info("Chat WebSocket disconnected", session=session_id)
+            return self._cleanup(session_id, clear_chat=True)
+        return None
     
-    def disconnect_a2a(self, session_id: str):
+    def disconnect_a2a(self, session_id: str) -> Optional[asyncio.Task]:
+        """Desconectar; retorna a task de limpeza do store (None se ja desconectado)."""
         if session_id in self.a2a_connections:
-            del self.a2a_connections[session_id]
+            self.a2a_connections.pop(session_id).close_nowait()
+            get_event_bus().unsubscribe(session_id)
             logger.info("A2A WebSocket disconnected", session=session_id)
+            return self._cleanup(session_id)
+        return None
+    
+    def _cleanup(self, session_id: str, clear_chat: bool = False) -> asyncio.Task:
+        task = asyncio.create_task(self._forget(session_id, clear_chat))
+        self._cleanup_tasks.add(task)
+        task.add_done_callback(self._cleanup_tasks.discard)
+        return task
+    
+    async def _forget(self, session_id: str, clear_chat: bool):
+        """Remover presenca (e estado de chat) do session store."""
+        try:
+            await self.store.adelete(self.NAMESPACE, session_id)
+            if clear_chat:
+                await store_agent_runner.clear_session(session_id)
+        except Exception as e:
+            # Presenca que sobrar e removida pelo janitor
+            logger.warning("WebSocket session cleanup failed", session=session_id, error=str(e))
+    
+    async def wait_cleanup(self):
+        """Aguardar limpezas pendentes (shutdown e testes)."""
+        if self._cleanup_tasks:
+            await asyncio.gather(*self._cleanup_tasks, return_exceptions=True)
     
-    async def broadcast_chat(self, message: dict):
-        for ws in self.chat_connections.values():
-            await ws.send_json(message)
+    async def count_connections(self) -> Dict[str, int]:
+        """Conexoes ativas em todos os workers, por tipo."""
+        counts = {"chat": 0, "a2a": 0}
+        for presence in await self.store.avalues(self.NAMESPACE):
+            counts[presence["kind"]] = counts.get(presence["kind"], 0) + 1
+        return counts
+    
+    def send(self, session_id: str, message: dict):
+        """Enviar resposta a uma conexao (ordem preservada, nunca descartada)."""
+        outbox = self.chat_connections.get(session_id) or self.a2a_connections.get(session_id)
+        if outbox:
+            outbox.reply(message)
+    
+    def publish(self, session_id: str, message: dict, coalesce_key: Optional[str] = None) -> bool:
+        """Enfileirar evento para uma conexao (descartavel sob backpressure)."""
+        outbox = self.chat_connections.get(session_id) or self.a2a_connections.get(session_id)
+        return outbox.publish(message, coalesce_key) if outbox else False
+    
+    def _broadcast(self, outboxes: List[WebSocketOutbox], message: dict, coalesce_key: Optional[str]) -> int:
+        return sum(outbox.publish(message, coalesce_key) for outbox in outboxes)
+    
+    async def broadcast_chat(self, message: dict, coalesce_key: Optional[str] = None) -> int:
+        """
+        Enfileirar evento para todas as conexoes de chat.
+        
+        Args:
+            message: Frame JSON
+            coalesce_key: Chave para a politica coalesce (ex: "price:book_001")
+        
+        Returns:
+            Numero de conexoes que aceitaram o frame
+        """
+        return self._broadcast(list(self.chat_connections.values()), message, coalesce_key)
+    
+    async def broadcast_a2a(self, message: dict, coalesce_key: Optional[str] = None) -> int:
+        """Enfileirar evento (ex: estoque, preco) para todos os agentes A2A."""
+        return self._broadcast(list(self.a2a_connections.values()), message, coalesce_key)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Profundidade das filas e descartes das conexoes deste worker."""
+        stats = {}
+        for kind, outboxes in (("chat", self.chat_connections), ("a2a", self.a2a_connections)):
+            depths = [o.depth for o in outboxes.values()]
+            stats[kind] = {
+                "connections": len(depths),
+                "queued": sum(depths),
+                "max_depth": max(depths, default=0),
+                "dropped": sum(o.dropped for o in outboxes.values()),
+            }
+        return stats
 
 
 manager = ConnectionManager()
 
+# Eventos push (estoque, preco, pedidos) a partir dos change feeds
+event_bus = get_event_bus()
+event_bus.deliver = manager.publish
+change_feed_tailer = ChangeFeedTailer(event_bus, interval=settings.realtime_poll_interval)
+
 
 @app.on_event("startup")
 async def startup():
@@ -97,15 +298,37 @@ async def startup():
     await init_databases()
     await products_db.connect()
     await transactions_db.connect()
+    if settings.loop_monitor_enabled:
+        get_loop_monitor("api-gateway").start()
+    if settings.realtime_events_enabled:
+        await change_feed_tailer.start()
+    # Classificador de intencao: carrega/treina em background (fora do event loop)
+    await get_intent_trainer().start()
+    janitor = get_session_janitor()
+    janitor.add("ws_presence", manager.sweep_presence)
+    store = get_session_store()
+    if isinstance(store, MemorySessionStore) and store.spill is not None:
+        janitor.add("session_spill", lambda: store.prune_spill(settings.session_cache_spill_ttl))
+    if isinstance(store, SQLiteSessionStore) and store.idle_ttls:
+        janitor.add("session_idle", store.prune_idle)
+    await janitor.start()
     logger.info("API Gateway started", port=settings.api_port)
 
 
 @app.on_event("shutdown")
 async def shutdown():
     """Fechar conexoes."""
+    if settings.loop_monitor_enabled:
+        await get_loop_monitor().stop()
+    await change_feed_tailer.stop()
+    await get_intent_trainer().stop()
+    await get_session_janitor().stop()
+    await manager.wait_cleanup()
     await products_db.disconnect()
     await transactions_db.disconnect()
+    get_tracer().shutdown()
     logger.info("API Gateway stopped")
+    shutdown_logging()
 
 
 @app.get("/health")
@@ -114,6 +337,18 @@ async def health():
     return {"status": "healthy", "service": "api-gateway"}
 
 
+@app.get("/admission")
+async def admission_stats():
+    """Limites adaptativos e contadores do admission control."""
+    return {"admission": get_admission_controller().get_stats()}
+
+
+@app.get("/sessions")
+async def session_stats():
+    """Tamanho, hit rate e despejos do session store por namespace."""
+    return {"sessions": get_session_store().get_stats()}
+
+
 @app.get("/.well-known/agent.json")
 async def a2a_agent_discovery(request: Request):
     """
@@ -190,7 +425,7 @@ async def create_checkout_session(request: Request):
     
     logger.info("Creating UCP checkout session", items=len(line_items))
     
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.post(
             f"{UCP_SERVER_URL}/checkout-sessions",
             json=ucp_payload,
@@ -207,7 +442,7 @@ async def create_checkout_session(request: Request):
 @app.get("/api/ucp/checkout-sessions/{session_id}")
 async def get_checkout_session(session_id: str):
     """Obter sessão de checkout."""
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.get(f"{UCP_SERVER_URL}/checkout-sessions/{session_id}")
         return Response(content=response.content, status_code=response.status_code)
 
@@ -222,7 +457,7 @@ async def complete_checkout(session_id: str, request: Request):
     
     logger.info("Completing UCP checkout", session=session_id)
     
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.post(
             f"{UCP_SERVER_URL}/checkout-sessions/{session_id}/complete",
             json={
@@ -247,7 +482,7 @@ async def complete_checkout(session_id: str, request: Request):
 @app.get("/api/payments/wallet")
 async def get_wallet():
     """Obter informações da carteira virtual."""
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.get(f"{UCP_SERVER_URL}/payments/wallet")
         return Response(
             content=response.content, 
@@ -259,7 +494,7 @@ async def get_wallet():
 @app.post("/api/payments/wallet/token")
 async def create_wallet_token(request: Request, wallet_id: str = "default_wallet"):
     """Criar token de pagamento."""
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.post(
             f"{UCP_SERVER_URL}/payments/wallet/token",
             params={"wallet_id": wallet_id}
@@ -275,7 +510,7 @@ async def create_wallet_token(request: Request, wallet_id: str = "default_wallet
 async def add_funds(request: Request):
     """Adicionar fundos na carteira (simulado)."""
     body = await request.json()
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.post(
             f"{UCP_SERVER_URL}/payments/wallet/add-funds",
             json=body
@@ -294,7 +529,7 @@ async def list_transactions(status: str = None):
     if status:
         url += f"?status={status}"
     
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.get(url)
         return Response(
             content=response.content, 
@@ -306,7 +541,7 @@ async def list_transactions(status: str = None):
 @app.get("/api/payments/transactions/{transaction_id}")
 async def get_transaction(transaction_id: str):
     """Obter detalhes de uma transação."""
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.get(
             f"{UCP_SERVER_URL}/payments/transactions/{transaction_id}"
         )
@@ -321,7 +556,7 @@ async def get_transaction(transaction_id: str):
 async def refund_transaction(transaction_id: str, request: Request):
     """Processar reembolso de uma transação."""
     body = await request.json()
-    async with httpx.AsyncClient() as client:
+    async with http_client() as client:
         response = await client.post(
             f"{UCP_SERVER_URL}/payments/transactions/{transaction_id}/refund",
             json=body
@@ -333,13 +568,37 @@ async def refund_transaction(transaction_id: str, request: Request):
         )
 
 
+async def _receive_frame(websocket: WebSocket, binary: bool = False) -> Dict[str, Any]:
+    """
+    Ler e decodificar o proximo frame (JSON em texto ou MessagePack binario).
+    
+    Raises:
+        WebSocketDisconnect: Cliente desconectou
+        ValueError: Frame do tipo errado ou que nao decodifica para um objeto
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    if binary:
+        if message.get("bytes") is None:
+            raise ValueError("Expected a binary MessagePack frame")
+        data = unpack(message["bytes"])
+    else:
+        if message.get("text") is None:
+            raise ValueError("Expected a text JSON frame")
+        data = json.loads(message["text"])
+    if not isinstance(data, dict):
+        raise ValueError("Frame must be an object")
+    return data
+
+
 @app.websocket("/ws/chat")
 async def websocket_chat(websocket: WebSocket):
     """WebSocket para chat com Store Agents."""
     session_id = await manager.connect_chat(websocket)
     
     # Enviar boas-vindas
-    await websocket.send_json({
+    manager.send(session_id, {
         "type": "connected",
         "session_id": session_id,
         "message": "Conectado ao chat da livraria!"
@@ -347,18 +606,65 @@ async def websocket_chat(websocket: WebSocket):
     
     try:
         while True:
-            data = await websocket.receive_json()
-            message = data.get("message", "")
+            try:
+                data = await _receive_frame(websocket)
+            except ValueError as e:
+                # Frame invalido: responde com erro e mantem a conexao
+                manager.send(session_id, {
+                    "type": "error",
+                    "session_id": session_id,
+                    "message": f"Mensagem invalida: {e}"
+                })
+                continue
+            message = str(data.get("message", ""))
             user_id = data.get("user_id")
             
             logger.info("Chat message received", session=session_id, message=message[:50])
             
-            # Processar com Store Agents
-            result = await store_agent_runner.process_message(
-                session_id=session_id,
-                message=message,
-                user_id=user_id
-            )
+            # Chat e a primeira classe descartada sob sobrecarga
+            try:
+                limiter = await get_admission_controller().acquire("chat")
+            except AdmissionRejected as e:
+                manager.send(session_id, {
+                    "type": "error",
+                    "session_id": session_id,
+                    "message": "Estamos com muita demanda agora. Tente novamente em instantes.",
+                    "retry_after": e.retry_after
+                })
+                continue
+            
+            # Processar com Store Agents (cliente pode pedir frame unico com "stream": false)
+            stream = settings.chat_streaming_enabled and data.get("stream", True)
+            start = time.monotonic()
+            failed = True
+            try:
+                if stream:
+                    async for event in store_agent_runner.stream_message(
+                        session_id=session_id,
+                        message=message,
+                        user_id=user_id
+                    ):
+                        if event["type"] == "done":
+                            result = event
+                        else:
+                            manager.send(session_id, {**event, "session_id": session_id})
+                else:
+                    result = await store_agent_runner.process_message(
+                        session_id=session_id,
+                        message=message,
+                        user_id=user_id
+                    )
+                failed = False
+            except Exception as e:
+                logger.error("Chat message failed", session=session_id, error=str(e))
+                manager.send(session_id, {
+                    "type": "error",
+                    "session_id": session_id,
+                    "message": "Nao foi possivel processar sua mensagem. Tente novamente."
+                })
+                continue
+            finally:
+                limiter.release(time.monotonic() - start, failed=failed)
             
             response = {
                 "type": "response",
@@ -373,23 +679,48 @@ async def websocket_chat(websocket: WebSocket):
                 "recommendations": result.get("recommendations", [])
             }
             
-            await websocket.send_json(response)
+            manager.send(session_id, response)
             
     except WebSocketDisconnect:
-        manager.disconnect_chat(session_id)
+        pass
+    finally:
+        # Qualquer saida (inclusive erro inesperado) libera outbox, presenca e assinaturas
+        cleanup = manager.disconnect_chat(session_id)
+        if cleanup is not None:
+            await cleanup
 
 
 @app.websocket("/ws/a2a")
 async def websocket_a2a(websocket: WebSocket):
     """WebSocket para comunicacao A2A com User Agents externos."""
-    session_id = await manager.connect_a2a(websocket)
+    # Subprotocolo a2a.msgpack: frames binarios MessagePack nos dois sentidos
+    subprotocol = select_subprotocol(websocket.scope.get("subprotocols", []))
+    binary = subprotocol == A2A_MSGPACK_SUBPROTOCOL
+    session_id = await manager.connect_a2a(websocket, subprotocol)
+    
+    # Requisicoes processadas concorrentemente; respostas correlacionadas por message_id
+    pipeline = A2APipeline(
+        session_id,
+        send=lambda response: manager.send(session_id, response),
+        max_in_flight=settings.a2a_max_in_flight,
+    )
     
     try:
         while True:
-            data = await websocket.receive_json()
-            
-            # Converter para mensagem A2A
-            message = A2AMessage.from_dict(data)
+            try:
+                data = await _receive_frame(websocket, binary)
+                # Converter para mensagem A2A
+                message = A2AMessage.from_dict(data)
+            except ValueError as e:
+                # Frame invalido: erro A2A e a conexao continua
+                manager.send(session_id, A2AMessage(
+                    type=A2AMessageType.ERROR,
+                    message_id=str(uuid.uuid4()),
+                    agent_id="store-agent",
+                    status="error",
+                    error=f"Invalid frame: {e}"
+                ).to_dict())
+                continue
             
             logger.info(
                 "A2A message received",
@@ -398,13 +729,16 @@ async def websocket_a2a(websocket: WebSocket):
                 action=message.action
             )
             
-            # Processar com A2A Handler
-            response = await a2a_handler.handle_message(message, session_id)
-            
-            await websocket.send_json(response.to_dict())
+            # Processar com A2A Handler (sem bloquear a leitura do proximo frame)
+            await pipeline.submit(message)
             
     except WebSocketDisconnect:
-        manager.disconnect_a2a(session_id)
+        pass
+    finally:
+        pipeline.cancel()
+        cleanup = manager.disconnect_a2a(session_id)
+        if cleanup is not None:
+            await cleanup
 
 
 @app.post("/api/chat")
@@ -454,4 +788,8 @@ async def a2a_request(data: dict):
 async def list_connected_agents():
     """Listar agentes A2A conectados."""
     from .agents.a2a import a2a_protocol
-    return {"agents": a2a_protocol.list_agents()}
+    return {
+        "agents": await a2a_protocol.list_agents(),
+        "connections": await manager.count_connections(),
+        "outbox": manager.get_stats()
+    }
@@ -1,10 +1,14 @@
 """Servidor HTTP para MCP (alternativa ao SSE/stdio)."""
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
 from typing import Dict, Any, Optional
 import structlog
 
 from .server import mcp_server, list_tools, call_tool
+from .registry import get_tool_registry
 from .progressive_disclosure import get_progressive_disclosure
+from ..config import settings
+from ..resilience import get_rate_limiter, get_caller_id
 
 router = APIRouter(prefix="/mcp", tags=["MCP"])
 logger = structlog.get_logger()
@@ -19,7 +23,7 @@ async def get_tools(session_id: Optional[str] = Query(None)):
     """
     if session_id:
         disclosure = get_progressive_disclosure()
-        tools = disclosure.get_available_tools(session_id)
+        tools = await disclosure.get_available_tools(session_id)
     else:
         tools_list = await list_tools()
         tools = [
@@ -38,6 +42,7 @@ async def get_tools(session_id: Optional[str] = Query(None)):
 async def call_mcp_tool(
     tool_name: str,
     request: Dict[str, Any],
+    http_request: Request,
     session_id: Optional[str] = Query(None)
 ):
     """
@@ -47,19 +52,41 @@ async def call_mcp_tool(
         tool_name: Nome da ferramenta
         request: {"arguments": {...}}
         session_id: ID da sessao para progressive disclosure
+    
+    Retorna 404 para ferramenta desconhecida (antes do rate limit, para
+    nomes arbitrarios nao criarem escopos) e 429 com Retry-After quando o
+    chamador excede o `rate_limit` da ferramenta.
     """
     arguments = request.get("arguments", {})
     
+    tool = get_tool_registry().get(tool_name)
+    if tool is None:
+        raise HTTPException(status_code=404, detail=f"Unknown tool '{tool_name}'")
+    
+    # Rate limit por ferramenta e chamador
+    limit = tool.rate_limit or settings.mcp_default_rate_limit
+    rate = await get_rate_limiter().hit(
+        f"tool:{tool_name}",
+        get_caller_id(http_request, session_id),
+        limit=limit,
+    )
+    if not rate.allowed:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": f"Rate limit exceeded for tool '{tool_name}'"},
+            headers=rate.headers(),
+        )
+    
     # Verificar acesso se session_id fornecido
     if session_id:
         disclosure = get_progressive_disclosure()
-        context = disclosure.get_context(session_id)
+        context = await disclosure.get_context(session_id)
         if not context.can_access(tool_name):
             raise HTTPException(
                 status_code=403,
                 detail=f"Tool '{tool_name}' not available at current disclosure level"
             )
-        disclosure.record_interaction(session_id, tool_name)
+        await disclosure.record_interaction(session_id, tool_name)
     
     try:
         result = await call_tool(tool_name, arguments)
@@ -81,6 +108,12 @@ async def call_mcp_tool(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/rate-limits")
+async def get_rate_limit_stats():
+    """Contadores do rate limiter (permitidos/limitados por escopo)."""
+    return {"rate_limits": get_rate_limiter().get_stats()}
+
+
 @router.post("/sessions/{session_id}/upgrade")
 async def upgrade_disclosure_level(
     session_id: str,
@@ -95,7 +128,7 @@ async def upgrade_disclosure_level(
     level = request.get("level", "shopping")
     
     disclosure = get_progressive_disclosure()
-    new_tools = disclosure.upgrade_level(session_id, level)
+    new_tools = await disclosure.upgrade_level(session_id, level)
     
     return {
         "session_id": session_id,
@@ -108,7 +141,7 @@ async def upgrade_disclosure_level(
 async def get_session_context(session_id: str):
     """Obter contexto de disclosure de uma sessao."""
     disclosure = get_progressive_disclosure()
-    context = disclosure.get_context(session_id)
+    context = await disclosure.get_context(session_id)
     
     return {
         "session_id": session_id,
@@ -122,6 +155,6 @@ async def get_session_context(session_id: str):
 async def clear_session(session_id: str):
     """Limpar contexto de sessao."""
     disclosure = get_progressive_disclosure()
-    disclosure.clear_context(session_id)
+    await disclosure.clear_context(session_id)
     
     return {"message": "Session cleared"}
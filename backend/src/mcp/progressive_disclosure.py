@@ -8,6 +8,7 @@ from dataclasses import dataclass, field
 import structlog
 
 from .registry import ToolDefinition, get_tool_registry
+from ..db.session_store import get_session_store
 
 logger = structlog.get_logger()
 
@@ -35,18 +36,40 @@ class DisclosureContext:
     def can_access(self, tool_name: str) -> bool:
         """Verificar se pode acessar ferramenta."""
         return tool_name in self.unlocked_tools
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Converter para dicionario (session store)."""
+        return {
+            "session_id": self.session_id,
+            "current_level": self.current_level,
+            "unlocked_tools": sorted(self.unlocked_tools),
+            "interaction_count": self.interaction_count
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DisclosureContext":
+        """Criar de dicionario."""
+        return cls(
+            session_id=data["session_id"],
+            current_level=data.get("current_level", "basic"),
+            unlocked_tools=set(data.get("unlocked_tools", [])),
+            interaction_count=data.get("interaction_count", 0)
+        )
 
 
 class ProgressiveDisclosure:
     """
     Gerenciador de Progressive Disclosure.
     
-    Controla quais ferramentas sao visíveis em cada nivel.
+    Controla quais ferramentas sao visíveis em cada nivel. Os contextos
+    ficam no session store; quem altera um contexto grava com `save_context`.
     """
     
+    NAMESPACE = "mcp_disclosure"
+    
     def __init__(self):
         self.levels: Dict[str, DisclosureLevel] = {}
-        self.contexts: Dict[str, DisclosureContext] = {}
+        self.store = get_session_store()
         self._setup_default_levels()
     
     def _setup_default_levels(self):
@@ -54,7 +77,7 @@ class ProgressiveDisclosure:
         # Nivel basico - ferramentas de descoberta
         self.levels["basic"] = DisclosureLevel(
             name="basic",
-            tools={"search_books", "list_categories", "get_book_details"},
+            tools={"search_books", "list_categories", "get_book_details", "get_catalog_changes"},
             description="Ferramentas basicas de navegacao"
         )
         
@@ -63,7 +86,8 @@ class ProgressiveDisclosure:
             name="shopping",
             tools={
                 "search_books", "list_categories", "get_book_details",
-                "get_books_by_category", "check_discount_code", "calculate_cart"
+                "get_catalog_changes", "get_books_by_category",
+                "check_discount_code", "calculate_cart"
             },
             description="Ferramentas de compra"
         )
@@ -73,29 +97,38 @@ class ProgressiveDisclosure:
             name="advanced",
             tools={
                 "search_books", "list_categories", "get_book_details",
-                "get_books_by_category", "check_discount_code", "calculate_cart",
+                "get_catalog_changes", "get_books_by_category",
+                "check_discount_code", "calculate_cart",
                 "get_recommendations", "create_checkout", "complete_checkout"
             },
             description="Ferramentas completas"
         )
     
-    def get_context(self, session_id: str) -> DisclosureContext:
+    async def get_context(self, session_id: str) -> DisclosureContext:
         """Obter ou criar contexto de sessao."""
-        if session_id not in self.contexts:
-            self.contexts[session_id] = DisclosureContext(
-                session_id=session_id,
-                unlocked_tools=self.levels["basic"].tools.copy()
-            )
-        return self.contexts[session_id]
+        data = await self.store.aget(self.NAMESPACE, session_id)
+        if data is not None:
+            return DisclosureContext.from_dict(data)
+        
+        context = DisclosureContext(
+            session_id=session_id,
+            unlocked_tools=self.levels["basic"].tools.copy()
+        )
+        await self.save_context(context)
+        return context
+    
+    async def save_context(self, context: DisclosureContext):
+        """Gravar contexto no session store."""
+        await self.store.aset(self.NAMESPACE, context.session_id, context.to_dict())
     
-    def upgrade_level(self, session_id: str, new_level: str) -> List[str]:
+    async def upgrade_level(self, session_id: str, new_level: str) -> List[str]:
         """
         Fazer upgrade do nivel de uma sessao.
         
         Returns:
             Lista de novas ferramentas desbloqueadas
         """
-        context = self.get_context(session_id)
+        context = await self.get_context(session_id)
         
         if new_level not in self.levels:
             return []
@@ -105,6 +138,7 @@ class ProgressiveDisclosure:
         
         context.unlocked_tools.update(level.tools)
         context.current_level = new_level
+        await self.save_context(context)
         
         logger.info(
             "Disclosure level upgraded",
@@ -115,9 +149,9 @@ class ProgressiveDisclosure:
         
         return list(new_tools)
     
-    def get_available_tools(self, session_id: str) -> List[Dict[str, Any]]:
+    async def get_available_tools(self, session_id: str) -> List[Dict[str, Any]]:
         """Obter ferramentas disponiveis para uma sessao."""
-        context = self.get_context(session_id)
+        context = await self.get_context(session_id)
         registry = get_tool_registry()
         
         available = []
@@ -131,23 +165,23 @@ class ProgressiveDisclosure:
         
         return available
     
-    def record_interaction(self, session_id: str, tool_name: str):
+    async def record_interaction(self, session_id: str, tool_name: str):
         """
         Registrar interacao e potencialmente fazer upgrade automatico.
         """
-        context = self.get_context(session_id)
+        context = await self.get_context(session_id)
         context.interaction_count += 1
+        await self.save_context(context)
         
         # Auto-upgrade baseado em uso
         if context.interaction_count >= 3 and context.current_level == "basic":
-            self.upgrade_level(session_id, "shopping")
+            await self.upgrade_level(session_id, "shopping")
         elif context.interaction_count >= 7 and context.current_level == "shopping":
-            self.upgrade_level(session_id, "advanced")
+            await self.upgrade_level(session_id, "advanced")
     
-    def clear_context(self, session_id: str):
+    async def clear_context(self, session_id: str):
         """Limpar contexto de sessao."""
-        if session_id in self.contexts:
-            del self.contexts[session_id]
+        await self.store.adelete(self.NAMESPACE, session_id)
 
 
 # Instancia global
@@ -19,13 +19,17 @@ from mcp.types import Tool, TextContent
 import structlog
 import json
 
-from .tools import get_all_tools, call_tool_handler
+from .tools import get_all_tools, call_tool_handler, register_tools
+from .registry import get_tool_registry
 
 logger = structlog.get_logger()
 
 # Criar instancia do servidor MCP
 mcp_server = Server("livraria-mcp")
 
+# Popular registry (progressive disclosure e rate limits)
+register_tools(get_tool_registry())
+
 
 @mcp_server.list_tools()
 async def list_tools() -> List[Tool]:
@@ -54,7 +58,7 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> List[TextContent]:
     Returns:
         Lista com TextContent contendo o resultado em JSON
     """
-    logger.info("MCP tool called", tool=name, arguments=arguments)
+    logger.info("MCP tool called", tool=name, arguments=sorted(arguments))
     
     try:
         result = await call_tool_handler(name, arguments)
@@ -3,7 +3,7 @@ MCP Tools - Ferramentas do Model Context Protocol.
 
 Estrutura:
 - search.py     : Busca de livros (search_books, get_book_details)
-- catalog.py    : Catalogo e categorias (list_categories, get_books_by_category)
+- catalog.py    : Catalogo e categorias (list_categories, get_books_by_category, get_catalog_changes)
 - cart.py       : Carrinho e descontos (check_discount_code, calculate_cart)
 - recommendations.py : Recomendacoes (get_recommendations)
 - payments.py   : Pagamentos e transacoes (get_wallet_balance, list_transactions, get_transaction)
@@ -19,6 +19,7 @@ from .catalog import (
     get_catalog_tools,
     list_categories,
     get_books_by_category,
+    get_catalog_changes,
 )
 
 from .cart import (
@@ -39,6 +40,8 @@ from .payments import (
     get_transaction,
 )
 
+from ...observability.metrics import MCP_TOOL_DURATION, track
+
 
 def get_all_tools():
     """Retorna todas as ferramentas MCP."""
@@ -57,6 +60,7 @@ TOOL_HANDLERS = {
     "get_book_details": get_book_details,
     "list_categories": list_categories,
     "get_books_by_category": get_books_by_category,
+    "get_catalog_changes": get_catalog_changes,
     "check_discount_code": check_discount_code,
     "calculate_cart": calculate_cart,
     "get_recommendations": get_recommendations,
@@ -66,24 +70,77 @@ TOOL_HANDLERS = {
 }
 
 
+# Limites por ferramenta (requests por minuto, por chamador)
+TOOL_RATE_LIMITS = {
+    "search_books": 60,
+    "get_book_details": 120,
+    "list_categories": 60,
+    "get_books_by_category": 60,
+    "get_catalog_changes": 30,
+    "check_discount_code": 30,
+    "calculate_cart": 60,
+    "get_recommendations": 30,
+    "get_wallet_balance": 30,
+    "list_transactions": 30,
+    "get_transaction": 30,
+}
+
+# Categoria de cada ferramenta no registry
+TOOL_CATEGORIES = {
+    "search_books": "search",
+    "get_book_details": "search",
+    "list_categories": "catalog",
+    "get_books_by_category": "catalog",
+    "get_catalog_changes": "catalog",
+    "check_discount_code": "cart",
+    "calculate_cart": "cart",
+    "get_recommendations": "recommendations",
+    "get_wallet_balance": "payments",
+    "list_transactions": "payments",
+    "get_transaction": "payments",
+}
+
+
+def register_tools(registry) -> None:
+    """Registrar todas as ferramentas no ToolRegistry (com rate_limit)."""
+    for tool in get_all_tools():
+        if tool.name in registry.tools:
+            continue
+        registry.register(
+            name=tool.name,
+            description=tool.description,
+            input_schema=tool.inputSchema,
+            handler=lambda arguments, name=tool.name: call_tool_handler(name, arguments),
+            category=TOOL_CATEGORIES.get(tool.name, "general"),
+            rate_limit=TOOL_RATE_LIMITS.get(tool.name),
+        )
+
+
 async def call_tool_handler(name: str, arguments: dict):
     """Chama o handler de uma ferramenta pelo nome."""
     handler = TOOL_HANDLERS.get(name)
     if not handler:
         return {"error": f"Unknown tool: {name}"}
     
-    # list_categories nao recebe argumentos
-    if name == "list_categories":
-        return await handler()
-    
-    return await handler(arguments)
+    with track(MCP_TOOL_DURATION, span=f"mcp.{name}", tool=name) as op:
+        # list_categories nao recebe argumentos
+        if name == "list_categories":
+            result = await handler()
+        else:
+            result = await handler(arguments)
+        
+        if isinstance(result, dict) and result.get("error"):
+            op.outcome = "tool_error"
+        return result
 
 
 __all__ = [
     # Funcoes de tools
     "get_all_tools",
     "call_tool_handler",
+    "register_tools",
     "TOOL_HANDLERS",
+    "TOOL_RATE_LIMITS",
     # Search
     "get_search_tools",
     "search_books",
@@ -92,6 +149,7 @@ __all__ = [
     "get_catalog_tools",
     "list_categories",
     "get_books_by_category",
+    "get_catalog_changes",
     # Cart
     "get_cart_tools",
     "check_discount_code",
@@ -30,6 +30,28 @@ def get_catalog_tools() -> list[Tool]:
                 "required": ["category"]
             }
         ),
+        Tool(
+            name="get_catalog_changes",
+            description=(
+                "Obter alteracoes do catalogo (preco, estoque, inclusao e remocao) "
+                "desde uma versao, para manter um espelho local atualizado"
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "since": {
+                        "type": "integer",
+                        "description": "Ultima versao ja aplicada (0 para todo o historico)",
+                        "default": 0
+                    },
+                    "limit": {
+                        "type": "integer",
+                        "description": "Maximo de alteracoes lidas (default: 500, max: 1000)",
+                        "default": 500
+                    }
+                }
+            }
+        ),
     ]
 
 
@@ -62,3 +84,13 @@ async def get_books_by_category(args: Dict[str, Any]) -> Dict[str, Any]:
             for b in books
         ]
     }
+
+
+async def get_catalog_changes(args: Dict[str, Any]) -> Dict[str, Any]:
+    """Change feed do catalogo."""
+    changes = await products_repo.get_changes(
+        since=int(args.get("since", 0)),
+        limit=int(args.get("limit", 500))
+    )
+    
+    return changes.model_dump(mode="json", exclude_none=True)
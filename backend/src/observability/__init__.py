@@ -0,0 +1,96 @@
+"""Observability - Metricas, tracing, logging e lag do event loop."""
+from .metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    registry,
+    track,
+    timed,
+    instrument_repository,
+    create_metrics_middleware,
+    metrics_endpoint,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    DB_QUERY_DURATION,
+    PSP_OPERATION_DURATION,
+    LLM_REQUEST_DURATION,
+    MCP_TOOL_DURATION,
+)
+from .tracing import (
+    Span,
+    Tracer,
+    InMemorySpanExporter,
+    JsonlSpanExporter,
+    NoopSpanExporter,
+    get_tracer,
+    get_current_span,
+    get_request_id,
+    start_span,
+    traced,
+    inject_headers,
+    http_client,
+    parse_traceparent,
+    create_tracing_middleware,
+)
+from .logs import (
+    AsyncLogWriter,
+    EventSampler,
+    configure_logging,
+    shutdown_logging,
+    get_log_writer,
+)
+from .loop_monitor import (
+    LoopLagMonitor,
+    BlockingGuard,
+    BlockingCallError,
+    create_blocking_guard_middleware,
+    get_loop_monitor,
+)
+
+__all__ = [
+    # Metricas
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "registry",
+    "track",
+    "timed",
+    "instrument_repository",
+    "create_metrics_middleware",
+    "metrics_endpoint",
+    "HTTP_REQUEST_DURATION",
+    "HTTP_REQUESTS_IN_FLIGHT",
+    "DB_QUERY_DURATION",
+    "PSP_OPERATION_DURATION",
+    "LLM_REQUEST_DURATION",
+    "MCP_TOOL_DURATION",
+    # Tracing
+    "Span",
+    "Tracer",
+    "InMemorySpanExporter",
+    "JsonlSpanExporter",
+    "NoopSpanExporter",
+    "get_tracer",
+    "get_current_span",
+    "get_request_id",
+    "start_span",
+    "traced",
+    "inject_headers",
+    "http_client",
+    "parse_traceparent",
+    "create_tracing_middleware",
+    # Logging
+    "AsyncLogWriter",
+    "EventSampler",
+    "configure_logging",
+    "shutdown_logging",
+    "get_log_writer",
+    # Event loop
+    "LoopLagMonitor",
+    "BlockingGuard",
+    "BlockingCallError",
+    "create_blocking_guard_middleware",
+    "get_loop_monitor",
+]
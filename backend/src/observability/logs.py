@@ -0,0 +1,191 @@
+"""
+Pipeline de logging estruturado.
+
+Modos (`settings.log_format`):
+- console: ConsoleRenderer sincrono (desenvolvimento, padrao)
+- json: eventos renderizados em JSON e entregues a uma thread escritora
+  por uma fila limitada; com a fila cheia o evento e descartado (nunca
+  bloqueia o event loop). Eventos de alta frequencia sao amostrados por tipo.
+
+Usage:
+    configure_logging()  # no topo de main.py / ucp_server/server.py
+"""
+import logging
+import queue
+import sys
+import threading
+from typing import Any, Dict, Optional, TextIO
+
+import structlog
+
+from .metrics import Counter, registry
+
+LOG_EVENTS_DROPPED = registry.register(Counter(
+    "log_events_dropped_total",
+    "Eventos de log descartados (fila cheia)",
+))
+LOG_EVENTS_SAMPLED_OUT = registry.register(Counter(
+    "log_events_sampled_out_total",
+    "Eventos de log descartados pela amostragem",
+    ["event"],
+))
+
+# Niveis nunca amostrados
+_ALWAYS_KEEP = {"warning", "error", "critical", "exception"}
+
+
+class EventSampler:
+    """
+    Processor structlog: mantem 1 a cada N eventos por tipo.
+    
+    A taxa e a fracao mantida (0.1 = 1 em 10). Avisos e erros passam sempre.
+    """
+    
+    def __init__(self, rates: Dict[str, float]):
+        self.intervals = {
+            event: max(1, round(1 / rate)) if rate > 0 else 0
+            for event, rate in rates.items()
+            if rate < 1
+        }
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def __call__(self, logger: Any, method_name: str, event_dict: Dict[str, Any]):
+        event = event_dict.get("event")
+        interval = self.intervals.get(event)
+        if interval is None or method_name in _ALWAYS_KEEP:
+            return event_dict
+        
+        with self._lock:
+            count = self._counts.get(event, 0)
+            self._counts[event] = count + 1
+        if interval and count % interval == 0:
+            event_dict["sample_rate"] = 1 / interval
+            return event_dict
+        
+        LOG_EVENTS_SAMPLED_OUT.inc(event=event)
+        raise structlog.DropEvent
+
+
+class AsyncLogWriter:
+    """Thread escritora alimentada por fila limitada."""
+    
+    def __init__(self, stream: Optional[TextIO] = None, max_queue: int = 10000, batch_size: int = 256):
+        self.stream = stream or sys.stdout
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, line: str) -> bool:
+        """Enfileirar linha sem bloquear; False se descartada."""
+        try:
+            self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            LOG_EVENTS_DROPPED.inc()
+            return False
+    
+    def _run(self):
+        while True:
+            line = self._queue.get()
+            batch = [line]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            lines = [item for item in batch if item is not None]
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except Exception:
+                    pass
+            if None in batch:
+                return
+    
+    def close(self, timeout: float = 2.0):
+        """Escrever o que falta na fila e encerrar a thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+
+class QueueLogger:
+    """Logger final do structlog que entrega a linha ao AsyncLogWriter."""
+    
+    def __init__(self, writer: AsyncLogWriter):
+        self._writer = writer
+    
+    def msg(self, message: str):
+        self._writer.submit(message)
+    
+    log = debug = info = warn = warning = error = critical = exception = fatal = msg
+
+
+class QueueLoggerFactory:
+    """Factory de QueueLogger (um writer por processo)."""
+    
+    def __init__(self, writer: AsyncLogWriter):
+        self.writer = writer
+    
+    def __call__(self, *args) -> QueueLogger:
+        return QueueLogger(self.writer)
+
+
+# Instancia global
+_writer: Optional[AsyncLogWriter] = None
+
+
+def get_log_writer() -> Optional[AsyncLogWriter]:
+    """Writer ativo (apenas no modo json)."""
+    return _writer
+
+
+def configure_logging(log_format: Optional[str] = None):
+    """Configurar structlog conforme `settings.log_format`."""
+    global _writer
+    from ..config import settings
+    log_format = log_format or settings.log_format
+    
+    if log_format != "json":
+        structlog.configure(
+            processors=[
+                structlog.processors.add_log_level,
+                structlog.processors.TimeStamper(fmt="iso"),
+                structlog.dev.ConsoleRenderer()
+            ],
+            context_class=dict,
+            logger_factory=structlog.PrintLoggerFactory(),
+        )
+        return
+    
+    if _writer is None:
+        _writer = AsyncLogWriter(max_queue=settings.log_queue_size)
+    structlog.configure(
+        processors=[
+            structlog.processors.add_log_level,
+            EventSampler(settings.log_sample_rates),
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.processors.format_exc_info,
+            structlog.processors.JSONRenderer(default=str),
+        ],
+        context_class=dict,
+        wrapper_class=structlog.make_filtering_bound_logger(
+            logging.getLevelName(settings.log_level.upper())
+        ),
+        logger_factory=QueueLoggerFactory(_writer),
+        cache_logger_on_first_use=True,
+    )
+
+
+def shutdown_logging():
+    """Esvaziar a fila do writer (shutdown da aplicacao)."""
+    if _writer is not None:
+        _writer.close()
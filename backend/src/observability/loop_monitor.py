@@ -0,0 +1,232 @@
+"""
+Monitor de lag do event loop e detector de chamadas bloqueantes.
+
+- Uma task mede continuamente o atraso do event loop (`event_loop_lag_seconds`)
+- Uma thread watchdog verifica o heartbeat da task; se o loop ficar parado
+  alem do limite, captura a stack da thread do loop (o callback culpado)
+- `BlockingGuard` / `create_blocking_guard_middleware` servem para testes:
+  falham o request que bloquear o loop por mais de N ms
+
+Usage:
+    monitor = LoopLagMonitor("ucp-server", block_threshold_ms=100)
+    monitor.start()   # no startup
+    await monitor.stop()  # no shutdown
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from fastapi import Request
+import structlog
+
+from .metrics import Counter, Gauge, Histogram, registry
+
+logger = structlog.get_logger()
+
+EVENT_LOOP_LAG = registry.register(Histogram(
+    "event_loop_lag_seconds",
+    "Atraso do event loop em relacao ao agendado",
+    ["app"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+))
+EVENT_LOOP_LAG_CURRENT = registry.register(Gauge(
+    "event_loop_lag_current_seconds",
+    "Ultimo atraso medido do event loop",
+    ["app"],
+))
+EVENT_LOOP_BLOCKED = registry.register(Counter(
+    "event_loop_blocked_total",
+    "Bloqueios do event loop acima do limite",
+    ["app"],
+))
+
+
+class BlockingCallError(RuntimeError):
+    """Event loop bloqueado alem do limite permitido."""
+
+
+def _format_stack(frame: Any, limit: int = 15) -> List[str]:
+    return [line.rstrip() for line in traceback.format_stack(frame, limit=limit)]
+
+
+class LoopLagMonitor:
+    """Mede o lag do event loop e captura stacks de bloqueios."""
+    
+    def __init__(
+        self,
+        app_name: str,
+        interval: float = 0.1,
+        block_threshold_ms: float = 100.0,
+        max_captures: int = 20
+    ):
+        self.app_name = app_name
+        self.interval = interval
+        self.block_threshold = block_threshold_ms / 1000
+        self.captures: Deque[Dict[str, Any]] = deque(maxlen=max_captures)
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+    
+    def start(self):
+        """Iniciar task de medicao e watchdog (chamar dentro do loop)."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(
+            "Loop lag monitor started",
+            app=self.app_name,
+            threshold_ms=self.block_threshold * 1000,
+        )
+    
+    async def stop(self):
+        """Parar task e watchdog."""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _measure(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - expected)
+            EVENT_LOOP_LAG.observe(lag, app=self.app_name)
+            EVENT_LOOP_LAG_CURRENT.set(lag, app=self.app_name)
+    
+    def _watch(self):
+        """
+        Thread watchdog: captura a stack do loop enquanto ele esta parado.
+        
+        A captura acontece quando o bloqueio passa do limite, entao nesse
+        momento `blocked_ms` e so um minimo (`ongoing: True`). Quando o
+        heartbeat volta, a duracao total substitui o minimo.
+        """
+        captured_for: Optional[float] = None
+        pending: Optional[Dict[str, Any]] = None
+        while not self._stopped.wait(self.block_threshold / 2):
+            heartbeat = self._heartbeat
+            if pending is not None and heartbeat != captured_for:
+                # Loop voltou: duracao = intervalo entre os heartbeats
+                total_ms = round((heartbeat - captured_for - self.interval) * 1000, 1)
+                pending["blocked_ms"] = max(pending["blocked_ms"], total_ms)
+                pending["ongoing"] = False
+                logger.info("Event loop unblocked", app=self.app_name, blocked_ms=pending["blocked_ms"])
+                pending = None
+            
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.block_threshold or captured_for == heartbeat:
+                continue
+            
+            # Um registro por bloqueio (mesmo heartbeat)
+            captured_for = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = _format_stack(frame) if frame is not None else []
+            pending = {
+                "app": self.app_name,
+                "blocked_ms": round(stalled * 1000, 1),
+                "ongoing": True,
+                "captured_at": time.time(),
+                "stack": stack,
+            }
+            self.captures.append(pending)
+            EVENT_LOOP_BLOCKED.inc(app=self.app_name)
+            logger.warning(
+                "Event loop blocked",
+                app=self.app_name,
+                blocked_at_least_ms=round(stalled * 1000, 1),
+                stack="".join(stack[-5:]),
+            )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "app": self.app_name,
+            "running": self._task is not None,
+            "lag_seconds": EVENT_LOOP_LAG_CURRENT.get(app=self.app_name),
+            "blocked_total": EVENT_LOOP_BLOCKED.get(app=self.app_name),
+            "recent_blocks": [dict(capture) for capture in self.captures],
+        }
+
+
+class BlockingGuard:
+    """
+    Falha se o event loop ficar bloqueado mais que `max_ms` dentro do bloco.
+    
+    Usage (testes):
+        async with BlockingGuard(max_ms=50):
+            await handler()
+    """
+    
+    def __init__(self, max_ms: float, interval: float = 0.005):
+        self.max_lag = max_ms / 1000
+        self.interval = interval
+        self.max_observed = 0.0
+        self._last = 0.0
+        self._task: Optional[asyncio.Task] = None
+    
+    def _record(self):
+        now = time.monotonic()
+        self.max_observed = max(self.max_observed, now - self._last - self.interval)
+        self._last = now
+    
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self._record()
+    
+    async def __aenter__(self):
+        self._last = time.monotonic()
+        self._task = asyncio.create_task(self._beat())
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self._task.cancel()
+        # Bloqueio no fim do bloco (antes do proximo heartbeat)
+        self._record()
+        if exc_type is None and self.max_observed > self.max_lag:
+            raise BlockingCallError(
+                f"Event loop blocked for {self.max_observed * 1000:.0f}ms "
+                f"(limit {self.max_lag * 1000:.0f}ms)"
+            )
+        return False
+
+
+def create_blocking_guard_middleware(max_ms: float):
+    """Middleware de teste: falha o request que bloquear o loop mais que `max_ms`."""
+    async def blocking_guard_middleware(request: Request, call_next):
+        async with BlockingGuard(max_ms):
+            return await call_next(request)
+    return blocking_guard_middleware
+
+
+# Instancia global
+_monitor: Optional[LoopLagMonitor] = None
+
+
+def get_loop_monitor(app_name: str = "backend") -> LoopLagMonitor:
+    """Obter LoopLagMonitor (singleton) com limites configurados."""
+    global _monitor
+    if _monitor is None:
+        from ..config import settings
+        _monitor = LoopLagMonitor(
+            app_name,
+            interval=settings.loop_monitor_interval,
+            block_threshold_ms=settings.loop_block_threshold_ms,
+        )
+    return _monitor
@@ -0,0 +1,330 @@
+"""
+Metricas no formato de exposicao do Prometheus (texto, sem dependencias).
+
+Grupos:
+- HTTP: latencia por rota (template) e requests em andamento
+- DB: latencia por metodo de repository
+- Dependencias: PSP, LLM e ferramentas MCP, com resultado (ok/error/...)
+
+Usage:
+    app.middleware("http")(create_metrics_middleware("api-gateway"))
+    app.get("/metrics", include_in_schema=False)(metrics_endpoint)
+"""
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+
+from .tracing import start_span
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets de latencia (segundos)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base das metricas com labels."""
+    
+    type_name = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+    
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return lines
+    
+    def _samples(self) -> Iterable[str]:
+        return []
+
+
+class Counter(_Metric):
+    """Contador monotonico."""
+    
+    type_name = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+    
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+    
+    def _samples(self) -> Iterable[str]:
+        for key, value in sorted(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Valor que sobe e desce."""
+    
+    type_name = "gauge"
+    
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+    
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Histograma cumulativo por bucket."""
+    
+    type_name = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> (contagens por bucket, soma, total)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total_sum, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total_sum + value, count + 1)
+    
+    def get_count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+    
+    def _samples(self) -> Iterable[str]:
+        for key, (counts, total_sum, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total_sum)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """Registro das metricas do processo."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+    
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+    
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Registro global
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Latencia de requests HTTP por rota",
+    ["app", "method", "route", "status"],
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight",
+    "Requests HTTP em andamento",
+    ["app"],
+))
+DB_QUERY_DURATION = registry.register(Histogram(
+    "db_query_duration_seconds",
+    "Latencia de metodos de repository",
+    ["repository", "method", "outcome"],
+))
+PSP_OPERATION_DURATION = registry.register(Histogram(
+    "psp_operation_duration_seconds",
+    "Latencia de operacoes do PSP",
+    ["operation", "outcome"],
+))
+LLM_REQUEST_DURATION = registry.register(Histogram(
+    "llm_request_duration_seconds",
+    "Latencia de chamadas ao LLM",
+    ["operation", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+))
+MCP_TOOL_DURATION = registry.register(Histogram(
+    "mcp_tool_duration_seconds",
+    "Latencia de ferramentas MCP",
+    ["tool", "outcome"],
+))
+
+
+class _Tracker:
+    """Resultado de uma operacao medida (pode ser alterado pelo chamador)."""
+    
+    def __init__(self):
+        self.outcome = "ok"
+
+
+@contextmanager
+def track(histogram: Histogram, span: Optional[str] = None, **labels):
+    """
+    Medir a latencia de um bloco em `histogram` (label "outcome").
+    
+    Com `span`, o bloco tambem vira um span do trace atual.
+    
+    Usage:
+        with track(LLM_REQUEST_DURATION, operation="intent") as op:
+            response = await llm.ainvoke(prompt)
+            if not response.content:
+                op.outcome = "empty"
+    """
+    tracker = _Tracker()
+    start = time.perf_counter()
+    try:
+        if span:
+            with start_span(span, **labels) as current:
+                try:
+                    yield tracker
+                finally:
+                    current.set_attribute("outcome", tracker.outcome)
+        else:
+            yield tracker
+    except BaseException:
+        tracker.outcome = "error"
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, outcome=tracker.outcome, **labels)
+
+
+def timed(
+    histogram: Histogram,
+    outcome: Optional[Callable[[Any], str]] = None,
+    span: Optional[str] = None,
+    **labels
+):
+    """
+    Decorator de funcao async que observa a latencia em `histogram`.
+    
+    Args:
+        histogram: Histograma com label "outcome"
+        outcome: Deriva o resultado do retorno (padrao: "ok"); excecao = "error"
+        span: Nome do span de trace (opcional)
+        **labels: Demais labels fixos
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with track(histogram, span=span, **labels) as op:
+                result = await func(*args, **kwargs)
+                if outcome:
+                    op.outcome = outcome(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def instrument_repository(name: str):
+    """Decorator de classe: mede os metodos async publicos do repository (metrica + span)."""
+    def decorator(cls):
+        for attr, func in list(vars(cls).items()):
+            if attr.startswith("_") or not inspect.iscoroutinefunction(func):
+                continue
+            setattr(cls, attr, timed(
+                DB_QUERY_DURATION, span=f"db.{name}.{attr}", repository=name, method=attr
+            )(func))
+        return cls
+    return decorator
+
+
+def route_template(request: Request) -> str:
+    """
+    Template da rota (ex: /books/{book_id}) para evitar explosao de series.
+    
+    Reconstruido a partir dos path params, pois o `path` da rota de um
+    router incluido pode nao conter o prefixo.
+    """
+    if request.scope.get("route") is None:
+        return "unmatched"
+    
+    params = {str(value): name for name, value in request.scope.get("path_params", {}).items()}
+    segments = request.scope.get("path", "").split("/")
+    return "/".join(
+        "{" + params[segment] + "}" if segment in params else segment
+        for segment in segments
+    )
+
+
+def create_metrics_middleware(app_name: str):
+    """Middleware HTTP de latencia por rota e requests em andamento."""
+    async def metrics_middleware(request: Request, call_next):
+        HTTP_REQUESTS_IN_FLIGHT.inc(app=app_name)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(app=app_name)
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start,
+                app=app_name,
+                method=request.method,
+                route=route_template(request),
+                status=status,
+            )
+    return metrics_middleware
+
+
+async def metrics_endpoint():
+    """Metricas do processo no formato de texto do Prometheus."""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
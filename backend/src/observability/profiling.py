@@ -0,0 +1,237 @@
+"""
+Profiling sob demanda em servidores em execucao.
+
+`GET /debug/profile?seconds=N&mode=cpu|wall|alloc&format=collapsed|pstats`
+
+- wall: amostra a stack da thread do event loop a cada `interval` (inclui
+  o tempo ocioso esperando I/O no selector)
+- cpu: mesmas amostras, descartando as do loop ocioso no selector
+- alloc: diferenca de snapshots do tracemalloc na janela (top-N por linha)
+- format=pstats (cpu/wall): cProfile na thread do loop, arquivo `.pstats`
+
+Protegido por `X-Debug-Token` (`settings.debug_token`); sem token
+configurado, as rotas de debug respondem 404.
+"""
+import asyncio
+import cProfile
+import hmac
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter as CounterDict
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import Response
+import structlog
+
+from ..config import settings
+from .loop_monitor import get_loop_monitor
+
+logger = structlog.get_logger()
+
+router = APIRouter(prefix="/debug", tags=["Debug"])
+
+# Um profile por processo por vez
+_profile_lock = asyncio.Lock()
+
+# Frames do loop ocioso (aguardando I/O)
+_IDLE_FUNCTIONS = {"select", "poll", "epoll", "kqueue", "_run_once"}
+
+
+def _frame_key(frame: Any) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def _collapse(frame: Any) -> str:
+    """Stack no formato collapsed (raiz;...;folha)."""
+    keys: List[str] = []
+    while frame is not None:
+        keys.append(_frame_key(frame))
+        frame = frame.f_back
+    return ";".join(reversed(keys))
+
+
+def _is_idle(frame: Any) -> bool:
+    return frame.f_code.co_name in _IDLE_FUNCTIONS and "selectors" in frame.f_code.co_filename
+
+
+class SamplingProfiler:
+    """Amostra periodicamente a stack de uma thread (via thread auxiliar)."""
+    
+    def __init__(self, thread_id: int, interval: float = 0.005, include_idle: bool = True):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: CounterDict = CounterDict()
+        self.samples = 0
+        self.idle_samples = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+    
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            if _is_idle(frame):
+                self.idle_samples += 1
+                if not self.include_idle:
+                    continue
+            self.stacks[_collapse(frame)] += 1
+    
+    def collapsed(self) -> str:
+        """Texto collapsed (`stack count` por linha), compativel com flamegraph.pl."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+def _allocation_top(snapshot: tracemalloc.Snapshot, base: Optional[tracemalloc.Snapshot], top: int):
+    stats = snapshot.compare_to(base, "lineno") if base else snapshot.statistics("lineno")
+    result = []
+    for stat in stats[:top]:
+        frame = stat.traceback[0]
+        result.append({
+            "location": f"{frame.filename}:{frame.lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+            "size_diff_kb": round(getattr(stat, "size_diff", 0) / 1024, 1),
+        })
+    return result
+
+
+async def run_profile(seconds: float, mode: str, fmt: str = "collapsed", top: int = 20) -> Dict[str, Any]:
+    """
+    Perfilar o event loop atual por `seconds`.
+    
+    A coroutine dorme no loop durante a janela, entao o que e amostrado
+    e a carga real dos demais requests.
+    """
+    started = time.time()
+    result: Dict[str, Any] = {"mode": mode, "seconds": seconds}
+    
+    if mode == "alloc":
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(10)
+        base = tracemalloc.take_snapshot()
+        await asyncio.sleep(seconds)
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if started_tracing:
+            tracemalloc.stop()
+        result["allocations"] = _allocation_top(snapshot, base, top)
+        result["traced_memory_kb"] = {"current": current // 1024, "peak": peak // 1024}
+        return result
+    
+    if fmt == "pstats":
+        timer = time.process_time if mode == "cpu" else time.perf_counter
+        profile = cProfile.Profile(timer)
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+        profile.create_stats()
+        result["pstats"] = marshal.dumps(profile.stats)
+        result["top"] = _pstats_top(profile, top)
+        return result
+    
+    profiler = SamplingProfiler(
+        threading.get_ident(),
+        interval=settings.debug_profile_interval,
+        include_idle=(mode == "wall"),
+    )
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    
+    result.update({
+        "samples": profiler.samples,
+        "idle_samples": profiler.idle_samples,
+        "elapsed": round(time.time() - started, 3),
+        "collapsed": profiler.collapsed(),
+    })
+    if tracemalloc.is_tracing():
+        result["allocations"] = _allocation_top(tracemalloc.take_snapshot(), None, top)
+    return result
+
+
+def _pstats_top(profile: cProfile.Profile, top: int) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profile)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            "function": f"{filename}:{lineno}({name})",
+            "calls": calls,
+            "cumtime": round(cumtime, 4),
+            "tottime": round(tottime, 4),
+        }
+        for (filename, lineno, name), (_, calls, tottime, cumtime, _) in rows[:top]
+    ]
+
+
+def _check_token(token: Optional[str]):
+    """404 sem token configurado (rota desativada); 403 com token invalido."""
+    if not settings.debug_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    # Bytes: com str, compare_digest rejeita nao-ASCII com TypeError (500)
+    if not token or not hmac.compare_digest(token.encode(), settings.debug_token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid debug token")
+
+
+@router.get("/profile")
+async def debug_profile(
+    seconds: float = Query(5.0, gt=0),
+    mode: str = Query("cpu", pattern="^(cpu|wall|alloc)$"),
+    format: str = Query("collapsed", pattern="^(collapsed|pstats)$"),
+    top: int = Query(20, ge=1, le=200),
+    x_debug_token: Optional[str] = Header(None),
+):
+    """
+    Perfilar o processo por `seconds` segundos.
+    
+    Retorna JSON com stacks collapsed (ou top de alocacoes em mode=alloc);
+    com format=pstats retorna o arquivo para `python -m pstats`.
+    """
+    _check_token(x_debug_token)
+    if seconds > settings.debug_profile_max_seconds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"seconds must be <= {settings.debug_profile_max_seconds}",
+        )
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="Profile already running")
+    
+    async with _profile_lock:
+        logger.info("Profiling started", seconds=seconds, mode=mode, format=format)
+        result = await run_profile(seconds, mode, format, top)
+    
+    if format == "pstats" and mode != "alloc":
+        return Response(
+            content=result["pstats"],
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{mode}.pstats"'},
+        )
+    return result
+
+
+@router.get("/loop")
+async def debug_loop(x_debug_token: Optional[str] = Header(None)):
+    """Lag atual e stacks dos ultimos bloqueios do event loop."""
+    _check_token(x_debug_token)
+    return get_loop_monitor().get_stats()
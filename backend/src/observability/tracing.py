@@ -0,0 +1,356 @@
+"""
+Tracing distribuido com propagacao W3C `traceparent`.
+
+- Requests recebidos continuam o trace do header `traceparent` (ou iniciam um)
+- Chamadas httpx feitas com `http_client()` enviam `traceparent` e `request-id`
+- Spans ficam em um ContextVar (seguem o fluxo async) e, ao terminar,
+  vao para um exporter plugavel: JSONL local, memoria (testes) ou nenhum
+
+Usage:
+    with start_span("psp.process_payment", amount=amount):
+        ...
+    
+    async with http_client(timeout=10.0) as client:
+        await client.post(url, json=payload)  # traceparent propagado
+"""
+import functools
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol
+
+import httpx
+from fastapi import Request
+import structlog
+
+logger = structlog.get_logger()
+
+TRACEPARENT_HEADER = "traceparent"
+REQUEST_ID_HEADER = "request-id"
+
+
+@dataclass
+class Span:
+    """Operacao medida dentro de um trace."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    service: str = "backend"
+    kind: str = "internal"  # server | client | internal
+    start_time: float = field(default_factory=time.time)
+    end_time: Optional[float] = None
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+    
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "kind": self.kind,
+            "start_time": self.start_time,
+            "duration_ms": round(((self.end_time or time.time()) - self.start_time) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple]:
+    """Extrair (trace_id, parent_span_id) de um header traceparent valido."""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    trace_id, span_id = parts[1].lower(), parts[2].lower()
+    try:
+        int(trace_id, 16)
+        int(span_id, 16)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128):032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64):016x}"
+
+
+class SpanExporter(Protocol):
+    """Destino dos spans finalizados."""
+    
+    def export(self, span: Span) -> None: ...
+    
+    def shutdown(self) -> None: ...
+
+
+class NoopSpanExporter:
+    """Descarta spans (padrao: so propagacao de contexto)."""
+    
+    def export(self, span: Span) -> None:
+        pass
+    
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter:
+    """Guarda spans em memoria (testes)."""
+    
+    def __init__(self):
+        self.spans: List[Span] = []
+    
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+    
+    def get_spans(self, trace_id: Optional[str] = None) -> List[Span]:
+        return [s for s in self.spans if trace_id is None or s.trace_id == trace_id]
+    
+    def clear(self):
+        self.spans.clear()
+    
+    def shutdown(self) -> None:
+        pass
+
+
+class JsonlSpanExporter:
+    """
+    Grava spans em arquivo JSONL local (um span por linha).
+    
+    Linhas sao acumuladas em buffer e gravadas em lote por uma thread
+    dedicada (uma so, para manter a ordem dos lotes): o event loop nunca
+    espera o disco. `flush` espera a gravacao terminar.
+    """
+    
+    def __init__(self, path: str, flush_every: int = 64):
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="span-export")
+        self._closed = False
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) < self.flush_every:
+                return
+            lines, self._buffer = self._buffer, []
+        self._submit(lines)
+    
+    def flush(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        # Vazio ou nao, espera os lotes ja enviados a thread
+        self._submit(lines).result()
+    
+    def _submit(self, lines: List[str]) -> Future:
+        if self._closed:
+            # Depois do shutdown (spans tardios): grava direto
+            future: Future = Future()
+            self._write(lines)
+            future.set_result(None)
+            return future
+        return self._writer.submit(self._write, lines)
+    
+    def _write(self, lines: List[str]):
+        if not lines:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning("Span export failed", path=self.path, spans=len(lines), error=str(e))
+    
+    def shutdown(self) -> None:
+        self.flush()
+        self._closed = True
+        self._writer.shutdown(wait=True)
+
+
+# Span atual e request-id do request em andamento
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+class Tracer:
+    """Cria spans e os entrega ao exporter."""
+    
+    def __init__(self, exporter: Optional[SpanExporter] = None, service: str = "backend"):
+        self.exporter = exporter or NoopSpanExporter()
+        self.service = service
+    
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        traceparent: Optional[str] = None,
+        service: Optional[str] = None,
+        **attributes
+    ):
+        """
+        Abrir span filho do span atual (ou do `traceparent` recebido).
+        
+        Excecoes marcam o span com status "error" e sao repropagadas.
+        """
+        parent = _current_span.get()
+        remote = parse_traceparent(traceparent) if traceparent else None
+        if remote:
+            trace_id, parent_id = remote
+        elif parent:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        else:
+            trace_id, parent_id = _new_trace_id(), None
+        
+        span = Span(
+            name=name,
+            trace_id=trace_id,
+            span_id=_new_span_id(),
+            parent_id=parent_id,
+            service=service or (parent.service if parent else self.service),
+            kind=kind,
+            attributes=attributes,
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            span.end_time = time.time()
+            _current_span.reset(token)
+            try:
+                self.exporter.export(span)
+            except Exception as e:
+                logger.warning("Span export failed", span=name, error=str(e))
+    
+    def shutdown(self):
+        self.exporter.shutdown()
+
+
+def get_current_span() -> Optional[Span]:
+    """Span em andamento no contexto atual."""
+    return _current_span.get()
+
+
+def get_request_id() -> Optional[str]:
+    """request-id do request em andamento."""
+    return _request_id.get()
+
+
+def start_span(name: str, **attributes):
+    """Atalho para `get_tracer().start_span(...)`."""
+    return get_tracer().start_span(name, **attributes)
+
+
+def traced(name: str):
+    """Decorator de funcao async: executa dentro de um span."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with start_span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def inject_headers(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Adicionar `traceparent` e `request-id` do contexto atual aos headers."""
+    headers = dict(headers or {})
+    span = _current_span.get()
+    if span:
+        headers[TRACEPARENT_HEADER] = span.traceparent
+    request_id = _request_id.get()
+    if request_id and REQUEST_ID_HEADER not in headers:
+        headers[REQUEST_ID_HEADER] = request_id
+    return headers
+
+
+async def _trace_outgoing(request: httpx.Request):
+    """Hook httpx: propagar contexto no request de saida."""
+    span = _current_span.get()
+    if span:
+        request.headers[TRACEPARENT_HEADER] = span.traceparent
+    request_id = _request_id.get()
+    if request_id and REQUEST_ID_HEADER not in request.headers:
+        request.headers[REQUEST_ID_HEADER] = request_id
+
+
+def http_client(**kwargs) -> httpx.AsyncClient:
+    """httpx.AsyncClient que propaga `traceparent` e `request-id`."""
+    hooks = kwargs.pop("event_hooks", None) or {}
+    hooks = {**hooks, "request": [_trace_outgoing, *hooks.get("request", [])]}
+    return httpx.AsyncClient(event_hooks=hooks, **kwargs)
+
+
+def create_tracing_middleware(service: str):
+    """Middleware HTTP: span de servidor continuando o trace recebido."""
+    async def tracing_middleware(request: Request, call_next):
+        request_id = request.headers.get(REQUEST_ID_HEADER) or str(uuid.uuid4())
+        rid_token = _request_id.set(request_id)
+        try:
+            with get_tracer().start_span(
+                f"{request.method} {request.url.path}",
+                kind="server",
+                traceparent=request.headers.get(TRACEPARENT_HEADER),
+                service=service,
+                method=request.method,
+                path=request.url.path,
+                request_id=request_id,
+            ) as span:
+                response = await call_next(request)
+                span.set_attribute("status_code", response.status_code)
+                if response.status_code >= 500:
+                    span.status = "error"
+                response.headers[TRACEPARENT_HEADER] = span.traceparent
+                response.headers[REQUEST_ID_HEADER] = request_id
+                return response
+        finally:
+            _request_id.reset(rid_token)
+    return tracing_middleware
+
+
+# Instancia global
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Obter Tracer (singleton) com exporter configurado."""
+    global _tracer
+    if _tracer is None:
+        from ..config import settings
+        if settings.tracing_exporter == "jsonl":
+            exporter = JsonlSpanExporter(settings.tracing_jsonl_path)
+        elif settings.tracing_exporter == "memory":
+            exporter = InMemorySpanExporter()
+        else:
+            exporter = NoopSpanExporter()
+        _tracer = Tracer(exporter=exporter)
+    return _tracer
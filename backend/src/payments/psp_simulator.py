@@ -25,6 +25,8 @@ from .models import (
 )
 from ..db.payments import payments_repo
 from ..security import get_ap2_security
+from ..observability.metrics import PSP_OPERATION_DURATION, timed
+from ..observability.tracing import http_client
 
 logger = structlog.get_logger()
 
@@ -32,6 +34,11 @@ logger = structlog.get_logger()
 USER_AGENT_API_URL = os.environ.get("USER_AGENT_API_URL", "http://localhost:8001")
 
 
+def _payment_outcome(response) -> str:
+    """Resultado para metricas: ok ou o codigo de erro do PSP."""
+    return "ok" if response.success else (response.error_code or "failed").lower()
+
+
 class PSPSimulator:
     """
     Payment Service Provider Simulado.
@@ -56,6 +63,12 @@ class PSPSimulator:
         self._initialized = True
         logger.info("PSP Simulator initialized")
     
+    @timed(
+        PSP_OPERATION_DURATION,
+        outcome=_payment_outcome,
+        span="psp.personal_wallet_payment",
+        operation="personal_wallet_payment",
+    )
     async def _process_personal_wallet_payment(
         self,
         request: ProcessPaymentRequest,
@@ -73,7 +86,7 @@ class PSPSimulator:
         )
         
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with http_client(timeout=10.0) as client:
                 # 1. Processar pagamento via User Agent API
                 response = await client.post(
                     f"{USER_AGENT_API_URL}/wallet/process-payment",
@@ -152,6 +165,12 @@ class PSPSimulator:
                 error_code="PAYMENT_ERROR"
             )
 
+    @timed(
+        PSP_OPERATION_DURATION,
+        outcome=_payment_outcome,
+        span="psp.process_payment",
+        operation="process_payment",
+    )
     async def process_payment(
         self,
         request: ProcessPaymentRequest
@@ -288,6 +307,12 @@ class PSPSimulator:
             wallet_source=request.wallet_source
         )
     
+    @timed(
+        PSP_OPERATION_DURATION,
+        outcome=lambda r: "ok" if r.success else "failed",
+        span="psp.refund",
+        operation="refund",
+    )
     async def refund(self, request: RefundRequest) -> RefundResponse:
         """
         Processar estorno.
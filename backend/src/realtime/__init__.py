@@ -0,0 +1,46 @@
+"""Realtime - Entrega de mensagens WebSocket com backpressure, eventos push e codec binario."""
+from .outbox import (
+    WebSocketOutbox,
+    SlowConsumerPolicy,
+    WS_QUEUE_DEPTH,
+    WS_FRAMES_SENT,
+    WS_FRAMES_DROPPED,
+)
+from .codec import (
+    MSGPACK_AVAILABLE,
+    MSGPACK_MEDIA_TYPE,
+    A2A_MSGPACK_SUBPROTOCOL,
+    A2A_JSON_SUBPROTOCOL,
+    pack,
+    unpack,
+    is_msgpack,
+    accepts_msgpack,
+    select_subprotocol,
+)
+from .events import (
+    EventBus,
+    ChangeFeedTailer,
+    build_topics,
+    get_event_bus,
+)
+
+__all__ = [
+    "WebSocketOutbox",
+    "SlowConsumerPolicy",
+    "WS_QUEUE_DEPTH",
+    "WS_FRAMES_SENT",
+    "WS_FRAMES_DROPPED",
+    "MSGPACK_AVAILABLE",
+    "MSGPACK_MEDIA_TYPE",
+    "A2A_MSGPACK_SUBPROTOCOL",
+    "A2A_JSON_SUBPROTOCOL",
+    "pack",
+    "unpack",
+    "is_msgpack",
+    "accepts_msgpack",
+    "select_subprotocol",
+    "EventBus",
+    "ChangeFeedTailer",
+    "build_topics",
+    "get_event_bus",
+]
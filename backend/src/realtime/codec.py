@@ -0,0 +1,102 @@
+"""
+Codec binario (MessagePack) para trafego entre agentes.
+
+- REST: `Content-Type: application/msgpack` no request e
+  `Accept: application/msgpack` na resposta (ucp_server/negotiation.py)
+- WebSocket /ws/a2a: subprotocolo `a2a.msgpack` (frames binarios);
+  sem subprotocolo, ou com `a2a.json`, os frames continuam JSON texto
+
+Os valores sao os mesmos do JSON (A2AMessage.to_dict, model_dump dos
+modelos UCP): o codec troca apenas a representacao. msgpack e opcional;
+sem ele o servidor negocia sempre JSON.
+"""
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Iterable, Optional
+
+# msgpack e opcional; JSON como fallback
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = {MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"}
+
+A2A_MSGPACK_SUBPROTOCOL = "a2a.msgpack"
+A2A_JSON_SUBPROTOCOL = "a2a.json"
+
+
+def _default(value: Any) -> Any:
+    """Converter tipos nao nativos como o jsonable_encoder faria."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return str(value)
+
+
+def pack(value: Any) -> bytes:
+    """Serializar em MessagePack."""
+    return msgpack.packb(value, use_bin_type=True, default=_default)
+
+
+def unpack(data: bytes) -> Any:
+    """Desserializar MessagePack (strings como str, mapas como dict)."""
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    """Content-Type indica MessagePack?"""
+    if not content_type:
+        return False
+    return content_type.split(";", 1)[0].strip().lower() in MSGPACK_MEDIA_TYPES
+
+
+def _quality(params: str) -> float:
+    for param in params.split(";"):
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    """
+    Cliente prefere MessagePack na resposta?
+    
+    Verdadeiro quando um tipo msgpack aparece no Accept com q > 0 e
+    qualidade maior ou igual a de `application/json`.
+    """
+    if not MSGPACK_AVAILABLE or not accept:
+        return False
+    
+    msgpack_q = 0.0
+    json_q = 0.0
+    for media_range in accept.split(","):
+        media_type, _, params = media_range.partition(";")
+        media_type = media_type.strip().lower()
+        q = _quality(params)
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type == "application/json":
+            json_q = max(json_q, q)
+    return msgpack_q > 0 and msgpack_q >= json_q
+
+
+def select_subprotocol(offered: Iterable[str]) -> Optional[str]:
+    """Escolher o subprotocolo A2A entre os oferecidos pelo cliente."""
+    offered = list(offered)
+    if MSGPACK_AVAILABLE and A2A_MSGPACK_SUBPROTOCOL in offered:
+        return A2A_MSGPACK_SUBPROTOCOL
+    if A2A_JSON_SUBPROTOCOL in offered:
+        return A2A_JSON_SUBPROTOCOL
+    return None
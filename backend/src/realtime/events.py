@@ -0,0 +1,293 @@
+"""
+Eventos push para agentes conectados (estoque, preco, pedidos).
+
+Conexoes assinam topicos (`subscribe`):
+
+- book:<id>          - alteracoes de um livro
+- category:<nome>    - alteracoes de livros da categoria
+- checkout:<id>      - mudancas de status de uma sessao de checkout
+- catalog            - todas as alteracoes do catalogo
+
+A publicacao sai dos proprios caminhos de escrita: triggers em `books` e
+`checkout_sessions` gravam os change feeds (`catalog_changes`,
+`checkout_changes`), e o ChangeFeedTailer de cada worker le os feeds e
+publica no EventBus. Assim alteracoes feitas pelo UCP Server (outro
+processo) tambem viram eventos.
+
+A entrega usa a fila de saida da conexao com chave de coalescencia
+(`price:<id>`, `stock:<id>`, `checkout:<id>`): um agente lento recebe so
+o valor mais recente.
+"""
+import asyncio
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+import structlog
+
+from ..db.products import products_repo
+from ..db.transactions import transactions_repo
+from ..observability.metrics import Counter, Gauge, registry
+
+logger = structlog.get_logger()
+
+EVENTS_PUBLISHED = registry.register(Counter(
+    "realtime_events_published_total",
+    "Eventos publicados no event bus",
+    ["event"],
+))
+EVENTS_DELIVERED = registry.register(Counter(
+    "realtime_events_delivered_total",
+    "Eventos enfileirados para conexoes assinantes",
+    ["event"],
+))
+SUBSCRIPTIONS = registry.register(Gauge(
+    "realtime_subscriptions",
+    "Assinaturas de topicos ativas neste worker",
+))
+
+TOPIC_PREFIXES = ("book", "category", "checkout")
+CATALOG_TOPIC = "catalog"
+
+# (session_id, mensagem, chave de coalescencia) -> aceito
+Deliver = Callable[[str, Dict[str, Any], Optional[str]], bool]
+
+
+def build_topics(payload: Dict[str, Any]) -> List[str]:
+    """
+    Montar topicos a partir do payload de subscribe/unsubscribe.
+    
+    Aceita `topics` (ex: ["book:book_001"]) e/ou os filtros `book_ids`,
+    `categories`, `checkout_ids` e `catalog: true`.
+    """
+    topics = list(payload.get("topics") or [])
+    topics += [f"book:{b}" for b in payload.get("book_ids") or []]
+    topics += [f"category:{c.lower()}" for c in payload.get("categories") or []]
+    topics += [f"checkout:{c}" for c in payload.get("checkout_ids") or []]
+    if payload.get("catalog"):
+        topics.append(CATALOG_TOPIC)
+    
+    for topic in topics:
+        prefix, _, value = topic.partition(":")
+        if topic != CATALOG_TOPIC and (prefix not in TOPIC_PREFIXES or not value):
+            raise ValueError(f"Invalid topic: {topic}")
+    return topics
+
+
+class EventBus:
+    """Assinaturas locais ao worker (os sockets tambem sao)."""
+    
+    def __init__(self, deliver: Optional[Deliver] = None, max_topics: int = 100):
+        self.deliver = deliver
+        self.max_topics = max_topics
+        self._subscribers: Dict[str, Set[str]] = {}
+        self._topics: Dict[str, Set[str]] = {}
+    
+    @property
+    def active(self) -> bool:
+        return bool(self._subscribers)
+    
+    def has_prefix(self, prefix: str) -> bool:
+        return any(topic.startswith(prefix + ":") for topic in self._subscribers)
+    
+    def subscribe(self, session_id: str, topics: Iterable[str]) -> List[str]:
+        """
+        Assinar topicos; retorna todas as assinaturas da conexao.
+        
+        Raises:
+            ValueError: Conexao passaria de `max_topics` assinaturas
+        """
+        topics = set(topics)
+        current = self._topics.get(session_id, set())
+        if len(current | topics) > self.max_topics:
+            raise ValueError(f"Too many subscriptions (max {self.max_topics})")
+        
+        current = self._topics.setdefault(session_id, current)
+        for topic in topics:
+            if topic not in current:
+                current.add(topic)
+                self._subscribers.setdefault(topic, set()).add(session_id)
+                SUBSCRIPTIONS.inc()
+        return sorted(current)
+    
+    def unsubscribe(self, session_id: str, topics: Optional[Iterable[str]] = None) -> List[str]:
+        """Cancelar assinaturas (todas, sem `topics`)."""
+        current = self._topics.get(session_id, set())
+        for topic in list(current if topics is None else topics):
+            if topic not in current:
+                continue
+            current.discard(topic)
+            SUBSCRIPTIONS.dec()
+            sessions = self._subscribers.get(topic)
+            if sessions is not None:
+                sessions.discard(session_id)
+                if not sessions:
+                    del self._subscribers[topic]
+        if not current:
+            self._topics.pop(session_id, None)
+        return sorted(current)
+    
+    def publish(
+        self,
+        event: str,
+        payload: Dict[str, Any],
+        topics: Iterable[str],
+        coalesce_key: Optional[str] = None
+    ) -> int:
+        """
+        Entregar evento as conexoes que assinam qualquer um dos topicos.
+        
+        Returns:
+            Numero de conexoes que aceitaram o evento
+        """
+        sessions: Set[str] = set()
+        for topic in topics:
+            sessions |= self._subscribers.get(topic, set())
+        
+        EVENTS_PUBLISHED.inc(event=event)
+        if not sessions or self.deliver is None:
+            return 0
+        
+        # Import tardio: protocolo A2A depende do runner de agentes
+        from ..agents.a2a.protocol import a2a_protocol
+        message = a2a_protocol.create_event(event, payload).to_dict()
+        
+        delivered = sum(
+            1 for session_id in sessions
+            if self.deliver(session_id, message, coalesce_key)
+        )
+        EVENTS_DELIVERED.inc(delivered, event=event)
+        return delivered
+
+
+class ChangeFeedTailer:
+    """
+    Le `catalog_changes` e `checkout_changes` periodicamente e publica
+    eventos. Comeca da versao atual (sem replay); para ressincronizar, o
+    agente usa `get_changes` com a versao recebida no subscribe.
+    """
+    
+    def __init__(self, bus: EventBus, interval: float = 1.0, batch_size: int = 500):
+        self.bus = bus
+        self.interval = interval
+        self.batch_size = batch_size
+        self.catalog_version = 0
+        self.checkout_version = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        self.catalog_version = await products_repo.get_catalog_version()
+        self.checkout_version = await transactions_repo.get_status_version()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            "Change feed tailer started",
+            catalog_version=self.catalog_version,
+            checkout_version=self.checkout_version,
+        )
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning("Change feed poll failed", error=str(e))
+    
+    async def poll(self) -> int:
+        """Publicar alteracoes novas; retorna o numero de eventos."""
+        if not self.bus.active:
+            # Ninguem assinando: apenas acompanhar as versoes
+            self.catalog_version = await products_repo.get_catalog_version()
+            self.checkout_version = await transactions_repo.get_status_version()
+            return 0
+        return await self._poll_catalog() + await self._poll_checkouts()
+    
+    async def _poll_catalog(self) -> int:
+        page = await products_repo.get_changes(since=self.catalog_version, limit=self.batch_size)
+        if page.resync_required:
+            # Parado alem da retencao: eventos perdidos, seguir da versao atual
+            logger.warning("Change feed tailer behind retention floor", version=self.catalog_version)
+            self.catalog_version = await products_repo.get_catalog_version()
+            return 0
+        self.catalog_version = page.version
+        if not page.changes:
+            return 0
+        
+        categories: Dict[str, str] = {}
+        if self.bus.has_prefix("category"):
+            categories = await products_repo.get_categories(
+                [c.id for c in page.changes if c.op == "update"]
+            )
+        
+        count = 0
+        for change in page.changes:
+            category = change.book.category if change.book else categories.get(change.id)
+            topics = [CATALOG_TOPIC, f"book:{change.id}"]
+            if category:
+                topics.append(f"category:{category.lower()}")
+            base = {"book_id": change.id, "version": change.version}
+            
+            if change.op == "upsert":
+                self.bus.publish(
+                    "book.added",
+                    {**base, "book": change.book.model_dump(mode="json")},
+                    topics,
+                )
+                count += 1
+            elif change.op == "delete":
+                self.bus.publish("book.removed", base, topics)
+                count += 1
+            else:
+                if change.price is not None:
+                    self.bus.publish(
+                        "price.changed", {**base, "price": change.price}, topics,
+                        coalesce_key=f"price:{change.id}",
+                    )
+                    count += 1
+                if change.stock is not None:
+                    self.bus.publish(
+                        "stock.changed", {**base, "stock": change.stock}, topics,
+                        coalesce_key=f"stock:{change.id}",
+                    )
+                    count += 1
+        return count
+    
+    async def _poll_checkouts(self) -> int:
+        rows = await transactions_repo.get_status_changes(
+            since=self.checkout_version, limit=self.batch_size
+        )
+        for row in rows:
+            self.bus.publish(
+                "order.status",
+                {
+                    "checkout_session_id": row["session_id"],
+                    "status": row["status"],
+                    "total": row["total"],
+                    "version": row["version"],
+                },
+                [f"checkout:{row['session_id']}"],
+                coalesce_key=f"checkout:{row['session_id']}",
+            )
+        if rows:
+            self.checkout_version = rows[-1]["version"]
+        return len(rows)
+
+
+# Instancias globais
+_event_bus: Optional[EventBus] = None
+
+
+def get_event_bus() -> EventBus:
+    """Obter event bus global."""
+    global _event_bus
+    if _event_bus is None:
+        from ..config import settings
+        _event_bus = EventBus(max_topics=settings.realtime_max_topics)
+    return _event_bus
@@ -0,0 +1,199 @@
+"""
+Fila de saida por conexao WebSocket.
+
+Cada conexao tem uma fila limitada e uma task escritora propria: broadcast
+apenas enfileira (nao espera nenhum socket), entao um cliente lento ou morto
+nao atrasa os demais. Quando a fila de um cliente lento enche, aplica-se a
+politica configurada:
+
+- drop_oldest: descarta o frame mais antigo da fila
+- coalesce: substitui o frame pendente com a mesma chave (ex: preco do
+  mesmo livro); sem chave igual, descarta o mais antigo
+- disconnect: fecha a conexao (o cliente reconecta e ressincroniza)
+
+Respostas diretas (reply) nunca sao descartadas.
+"""
+import asyncio
+from collections import deque
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from fastapi import WebSocket
+import structlog
+
+from .codec import pack
+from ..observability.metrics import Counter, Gauge, registry
+
+logger = structlog.get_logger()
+
+WS_QUEUE_DEPTH = registry.register(Gauge(
+    "ws_outbox_queue_depth",
+    "Frames aguardando envio nas filas de saida WebSocket",
+    ["kind"],
+))
+WS_FRAMES_SENT = registry.register(Counter(
+    "ws_frames_sent_total",
+    "Frames enviados por WebSocket",
+    ["kind"],
+))
+WS_FRAMES_DROPPED = registry.register(Counter(
+    "ws_frames_dropped_total",
+    "Frames descartados por cliente lento",
+    ["kind", "reason"],
+))
+
+# Fechamento por cliente lento (RFC 6455: Try Again Later)
+CLOSE_SLOW_CONSUMER = 1013
+
+
+class SlowConsumerPolicy(str, Enum):
+    """O que fazer quando a fila de um cliente enche."""
+    DROP_OLDEST = "drop_oldest"
+    COALESCE = "coalesce"
+    DISCONNECT = "disconnect"
+
+
+class WebSocketOutbox:
+    """Fila limitada + task escritora de uma conexao."""
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        kind: str,
+        max_queue: int = 256,
+        policy: SlowConsumerPolicy = SlowConsumerPolicy.DROP_OLDEST,
+        send_timeout: float = 10.0,
+        binary: bool = False,
+        on_close: Optional[Callable[["WebSocketOutbox"], None]] = None
+    ):
+        self.websocket = websocket
+        self.kind = kind
+        self.max_queue = max_queue
+        self.policy = SlowConsumerPolicy(policy)
+        self.send_timeout = send_timeout
+        # Frames MessagePack (subprotocolo a2a.msgpack) em vez de JSON texto
+        self.binary = binary
+        self.on_close = on_close
+        # (chave de coalescencia, frame, descartavel)
+        self._queue: Deque[Tuple[Optional[str], Dict[str, Any], bool]] = deque()
+        self._droppable = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        # Fechamento do socket disparado fora de contexto async (publish)
+        self._close_task: Optional[asyncio.Task] = None
+        self.closed = False
+        self.dropped = 0
+    
+    def start(self):
+        self._task = asyncio.create_task(self._writer())
+    
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+    
+    def _push(self, item: Tuple[Optional[str], Dict[str, Any], bool]):
+        self._queue.append(item)
+        if item[2]:
+            self._droppable += 1
+        WS_QUEUE_DEPTH.inc(kind=self.kind)
+        self._wakeup.set()
+    
+    def _drop(self, reason: str):
+        self.dropped += 1
+        WS_FRAMES_DROPPED.inc(kind=self.kind, reason=reason)
+    
+    def _drop_oldest_droppable(self) -> bool:
+        for i, (_, _, droppable) in enumerate(self._queue):
+            if droppable:
+                del self._queue[i]
+                self._droppable -= 1
+                WS_QUEUE_DEPTH.dec(kind=self.kind)
+                return True
+        return False
+    
+    def publish(self, message: Dict[str, Any], coalesce_key: Optional[str] = None) -> bool:
+        """
+        Enfileirar evento (broadcast) sem bloquear.
+        
+        Returns:
+            False se o frame (ou a conexao) foi descartado
+        """
+        if self.closed:
+            return False
+        
+        if self.policy == SlowConsumerPolicy.COALESCE and coalesce_key is not None:
+            for i, (key, _, droppable) in enumerate(self._queue):
+                if key == coalesce_key and droppable:
+                    self._queue[i] = (key, message, True)
+                    self._drop("coalesced")
+                    return True
+        
+        if self._droppable >= self.max_queue:
+            if self.policy == SlowConsumerPolicy.DISCONNECT:
+                self._drop("disconnect")
+                logger.warning("Slow WebSocket consumer disconnected", kind=self.kind, depth=self.depth)
+                self.close_nowait()
+                self._close_task = asyncio.create_task(self._close_socket(CLOSE_SLOW_CONSUMER))
+                return False
+            self._drop_oldest_droppable()
+            self._drop("drop_oldest")
+        
+        self._push((coalesce_key, message, True))
+        return True
+    
+    def reply(self, message: Dict[str, Any]):
+        """Enfileirar resposta direta (nunca descartada, ordem preservada)."""
+        if not self.closed:
+            self._push((None, message, False))
+    
+    async def _writer(self):
+        try:
+            while True:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                
+                _, message, droppable = self._queue.popleft()
+                if droppable:
+                    self._droppable -= 1
+                WS_QUEUE_DEPTH.dec(kind=self.kind)
+                if self.binary:
+                    send = self.websocket.send_bytes(pack(message))
+                else:
+                    send = self.websocket.send_json(message)
+                await asyncio.wait_for(send, self.send_timeout)
+                WS_FRAMES_SENT.inc(kind=self.kind)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Socket morto ou travado alem do timeout: fechar para o
+            # handler sair do receive e o cliente reconectar
+            logger.info("WebSocket writer stopped", kind=self.kind, error=type(e).__name__)
+            await self.close(CLOSE_SLOW_CONSUMER)
+    
+    def close_nowait(self):
+        """Parar o writer e liberar a fila (idempotente)."""
+        if self.closed:
+            return
+        self.closed = True
+        WS_QUEUE_DEPTH.dec(len(self._queue), kind=self.kind)
+        self._queue.clear()
+        self._droppable = 0
+        
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        if self.on_close:
+            self.on_close(self)
+    
+    async def close(self, code: Optional[int] = None):
+        """Encerrar a conexao (com `code`, fecha tambem o socket)."""
+        self.close_nowait()
+        if code is not None:
+            await self._close_socket(code)
+    
+    async def _close_socket(self, code: int):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
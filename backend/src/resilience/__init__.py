@@ -0,0 +1,38 @@
+"""Resilience - Protecao do servidor contra sobrecarga."""
+from .rate_limit import (
+    RateLimiter,
+    RateLimitResult,
+    BucketStorage,
+    MemoryBucketStorage,
+    SQLiteBucketStorage,
+    get_caller_id,
+    get_rate_limiter,
+)
+from .admission import (
+    AdmissionController,
+    AdmissionClassConfig,
+    AdmissionRejected,
+    AdaptiveLimiter,
+    AdmissionMiddleware,
+    classify_request,
+    get_admission_controller,
+)
+
+__all__ = [
+    # Rate limiting
+    "RateLimiter",
+    "RateLimitResult",
+    "BucketStorage",
+    "MemoryBucketStorage",
+    "SQLiteBucketStorage",
+    "get_caller_id",
+    "get_rate_limiter",
+    # Admission control
+    "AdmissionController",
+    "AdmissionClassConfig",
+    "AdmissionRejected",
+    "AdaptiveLimiter",
+    "AdmissionMiddleware",
+    "classify_request",
+    "get_admission_controller",
+]
@@ -0,0 +1,306 @@
+"""
+Admission control adaptativo por classe de rota.
+
+Cada classe (catalog, checkout, chat) tem um limite de concorrencia
+ajustado por AIMD a partir da latencia observada:
+- latencia abaixo do alvo com o limite em uso: +1/limite (aditivo)
+- latencia acima do alvo ou erro: limite * backoff (multiplicativo)
+
+Requests acima do limite esperam em fila curta (por prioridade) e sao
+rejeitados rapido com 503 + Retry-After. Classes de menor prioridade
+nao admitem trabalho novo enquanto uma classe mais prioritaria tem
+requests na fila: chat e descartado antes de catalogo, e catalogo
+antes de checkout.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import structlog
+
+logger = structlog.get_logger()
+
+# Respostas em streaming: duracao depende do tamanho do corpo, nao da carga
+STREAMING_CONTENT_TYPES = (b"application/x-ndjson", b"text/event-stream")
+
+
+class AdmissionRejected(Exception):
+    """Request rejeitado pelo admission control."""
+    
+    def __init__(self, route_class: str, retry_after: float):
+        super().__init__(f"Admission rejected for {route_class}")
+        self.route_class = route_class
+        self.retry_after = retry_after
+
+
+@dataclass
+class AdmissionClassConfig:
+    """Configuracao de uma classe de rota."""
+    name: str
+    priority: int  # menor = mais prioritario
+    initial_limit: int
+    min_limit: int
+    max_limit: int
+    target_latency: float  # segundos
+    max_queue: int
+    queue_timeout: float  # segundos
+    backoff: float = 0.9
+
+
+# Classes padrao: checkout > catalog > chat
+DEFAULT_CLASSES: Dict[str, AdmissionClassConfig] = {
+    "checkout": AdmissionClassConfig(
+        name="checkout", priority=0, initial_limit=16, min_limit=4, max_limit=64,
+        target_latency=1.5, max_queue=64, queue_timeout=5.0,
+    ),
+    "catalog": AdmissionClassConfig(
+        name="catalog", priority=1, initial_limit=32, min_limit=4, max_limit=256,
+        target_latency=0.25, max_queue=64, queue_timeout=1.0,
+    ),
+    "chat": AdmissionClassConfig(
+        name="chat", priority=2, initial_limit=8, min_limit=1, max_limit=32,
+        target_latency=8.0, max_queue=16, queue_timeout=0.5,
+    ),
+}
+
+
+@dataclass
+class AdaptiveLimiter:
+    """Limite de concorrencia AIMD com fila por prioridade."""
+    config: AdmissionClassConfig
+    limit: float = 0.0
+    in_flight: int = 0
+    admitted: int = 0
+    rejected: int = 0
+    decreases: int = 0
+    _queue: List[Tuple[int, int, asyncio.Future]] = field(default_factory=list)
+    _seq: itertools.count = field(default_factory=itertools.count)
+    _last_decrease: float = 0.0
+    
+    def __post_init__(self):
+        if not self.limit:
+            self.limit = float(self.config.initial_limit)
+    
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self._queue if not fut.done())
+    
+    def has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+    
+    def retry_after(self) -> float:
+        """Estimativa de espera para o cliente tentar de novo."""
+        return max(1.0, self.config.target_latency * (1 + self.queued / max(1.0, self.limit)))
+    
+    async def acquire(self, priority: int = 1, blocked: bool = False) -> None:
+        """
+        Admitir um request ou levantar AdmissionRejected.
+        
+        Args:
+            priority: Prioridade dentro da classe (menor = antes)
+            blocked: Classe mais prioritaria esta com fila (nao admitir)
+        """
+        if not blocked and self.has_capacity() and not self.queued:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        
+        if blocked or self.queued >= self.config.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(self.config.name, self.retry_after())
+        
+        if len(self._queue) > 2 * self.config.max_queue:
+            # Descartar entradas de requests que ja desistiram
+            self._queue = [entry for entry in self._queue if not entry[2].done()]
+            heapq.heapify(self._queue)
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), future))
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.config.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Vaga concedida no limite do timeout: devolver
+                self.release(None)
+            else:
+                future.cancel()
+            self.rejected += 1
+            raise AdmissionRejected(self.config.name, self.retry_after())
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(None)
+            else:
+                future.cancel()
+            raise
+        self.admitted += 1
+    
+    def release(self, latency: Optional[float], failed: bool = False) -> None:
+        """Liberar vaga e ajustar o limite pela latencia observada."""
+        was_saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+        
+        if latency is not None:
+            self._adjust(latency, failed, was_saturated)
+        
+        self._wake()
+    
+    def _adjust(self, latency: float, failed: bool, was_saturated: bool):
+        cfg = self.config
+        now = time.monotonic()
+        if failed or latency > cfg.target_latency:
+            # Um decremento por janela evita colapsar o limite com uma rajada lenta
+            if now - self._last_decrease >= cfg.target_latency:
+                self.limit = max(cfg.min_limit, self.limit * cfg.backoff)
+                self._last_decrease = now
+                self.decreases += 1
+        elif was_saturated:
+            self.limit = min(cfg.max_limit, self.limit + 1.0 / self.limit)
+    
+    def _wake(self):
+        """Passar vagas livres para os proximos da fila."""
+        while self._queue and self.has_capacity():
+            _, _, future = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(True)
+    
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "decreases": self.decreases,
+        }
+
+
+class AdmissionController:
+    """Admission control para todas as classes de rota."""
+    
+    def __init__(self, classes: Optional[Dict[str, AdmissionClassConfig]] = None):
+        self.limiters: Dict[str, AdaptiveLimiter] = {
+            name: AdaptiveLimiter(config)
+            for name, config in (classes or DEFAULT_CLASSES).items()
+        }
+    
+    def _blocked(self, route_class: str) -> bool:
+        """Alguma classe mais prioritaria tem requests na fila."""
+        priority = self.limiters[route_class].config.priority
+        return any(
+            limiter.queued
+            for limiter in self.limiters.values()
+            if limiter.config.priority < priority
+        )
+    
+    async def acquire(self, route_class: str, priority: int = 1) -> AdaptiveLimiter:
+        limiter = self.limiters[route_class]
+        await limiter.acquire(priority, blocked=self._blocked(route_class))
+        return limiter
+    
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: limiter.get_stats() for name, limiter in self.limiters.items()}
+
+
+def classify_request(method: str, path: str) -> Optional[Tuple[str, int]]:
+    """
+    Classificar request em (classe, prioridade) ou None (sem controle).
+    
+    Dentro de checkout, a conclusao (pagamento) tem prioridade 0. Rotas
+    que passam pelo LLM (chat, POST A2A/JSON-RPC) ficam em "chat", para
+    nao derrubar o limite do catalogo com latencias de segundos.
+    """
+    if path.startswith("/api/"):
+        path = path[4:]
+    
+    if path.startswith(("/checkout-sessions", "/ucp/checkout-sessions", "/payments")):
+        if method == "GET":
+            return "catalog", 1
+        return "checkout", 0 if path.endswith("/complete") else 1
+    
+    if path.startswith("/chat"):
+        return "chat", 1
+    
+    if path.startswith("/a2a"):
+        return ("catalog", 1) if method == "GET" else ("chat", 1)
+    
+    if path.startswith(("/books", "/mcp")):
+        return "catalog", 1
+    
+    return None
+
+
+class AdmissionMiddleware:
+    """
+    Middleware ASGI de admission control (gateway e UCP server).
+    
+    A vaga so e liberada quando a resposta termina de ser enviada:
+    respostas em streaming (export NDJSON, SSE) ocupam a vaga ate o fim
+    do corpo, mas nao ajustam o limite - um export longo nao deve
+    derrubar o limite de todo o catalogo.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        classified = classify_request(scope["method"], scope["path"])
+        if classified is None:
+            await self.app(scope, receive, send)
+            return
+        
+        route_class, priority = classified
+        controller = get_admission_controller()
+        
+        try:
+            limiter = await controller.acquire(route_class, priority)
+        except AdmissionRejected as e:
+            logger.warning("Request shed", route_class=route_class, path=scope["path"])
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": f"Server overloaded ({route_class}), retry later"},
+                headers={"Retry-After": str(math.ceil(e.retry_after))},
+            )
+            await response(scope, receive, send)
+            return
+        
+        status_code = 500
+        streaming = False
+        
+        async def send_with_status(message: Message):
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                streaming = content_type.startswith(STREAMING_CONTENT_TYPES)
+            await send(message)
+        
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            latency = None if streaming else time.monotonic() - start
+            limiter.release(latency, failed=status_code >= 500)
+
+
+# Instancia global
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Obter AdmissionController (singleton)."""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
@@ -0,0 +1,310 @@
+"""
+Rate limiting por token bucket.
+
+Cada chave (escopo + chamador) tem um bucket com capacidade `burst`
+que recarrega `limit` tokens por minuto. O estado fica em um storage
+plugavel:
+- MemoryBucketStorage: por processo (padrao)
+- SQLiteBucketStorage: compartilhado entre workers via arquivo SQLite
+"""
+import asyncio
+import math
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Protocol, Tuple
+
+from fastapi import Request
+import structlog
+
+logger = structlog.get_logger()
+
+
+@dataclass
+class RateLimitResult:
+    """Resultado de uma tentativa de consumo."""
+    allowed: bool
+    limit: int  # requests por minuto
+    remaining: int
+    retry_after: float = 0.0  # segundos ate haver token
+    
+    def headers(self) -> Dict[str, str]:
+        """Headers de rate limit para a resposta."""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def _refill(tokens: float, updated_at: float, now: float, capacity: int, rate: float) -> float:
+    """Recarregar bucket pelo tempo decorrido."""
+    return min(capacity, tokens + (now - updated_at) * rate)
+
+
+def _full_at(tokens: float, now: float, capacity: int, rate: float) -> float:
+    """Instante em que o bucket volta a ficar cheio (equivalente a um bucket novo)."""
+    return now + (capacity - tokens) / rate
+
+
+class BucketStorage(Protocol):
+    """Interface de storage dos buckets."""
+    
+    async def take(
+        self,
+        key: str,
+        capacity: int,
+        rate: float,
+        cost: float = 1.0
+    ) -> Tuple[bool, float, float]:
+        """
+        Consumir tokens de um bucket.
+        
+        Returns:
+            Tupla (permitido, tokens_restantes, retry_after)
+        """
+        ...
+
+
+class MemoryBucketStorage:
+    """
+    Buckets em memoria (um processo).
+    
+    Cada bucket guarda quando volta a ficar cheio, calculado com a propria
+    capacidade e taxa (escopos diferentes tem limites diferentes). Buckets
+    cheios sao removidos a cada `prune_interval` segundos, ou antes (no
+    maximo uma vez por segundo) se passarem de `max_keys`.
+    """
+    
+    def __init__(self, max_keys: int = 100_000, prune_interval: float = 60.0):
+        self.max_keys = max_keys
+        self.prune_interval = prune_interval
+        # chave -> (tokens, atualizado_em, cheio_em)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._pruned_at = time.monotonic()
+    
+    async def take(
+        self,
+        key: str,
+        capacity: int,
+        rate: float,
+        cost: float = 1.0
+    ) -> Tuple[bool, float, float]:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        tokens, updated_at = (bucket[0], bucket[1]) if bucket else (capacity, now)
+        tokens = _refill(tokens, updated_at, now, capacity, rate)
+        
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now, _full_at(tokens, now, capacity, rate))
+        
+        elapsed = now - self._pruned_at
+        if elapsed >= self.prune_interval or (len(self._buckets) > self.max_keys and elapsed >= 1.0):
+            self._prune(now)
+        
+        retry_after = 0.0 if allowed else (cost - tokens) / rate
+        return allowed, tokens, retry_after
+    
+    def _prune(self, now: float):
+        """Remover buckets ja cheios (equivalentes a um bucket novo)."""
+        self._pruned_at = now
+        self._buckets = {k: v for k, v in self._buckets.items() if v[2] > now}
+
+
+class SQLiteBucketStorage:
+    """
+    Buckets compartilhados entre workers em um arquivo SQLite.
+    
+    Cada consumo e uma transacao `BEGIN IMMEDIATE` (read-modify-write
+    atomico entre processos), executada em uma thread dedicada para nao
+    bloquear o event loop. Cada linha guarda quando o bucket volta a ficar
+    cheio (`expires_at`); linhas expiradas sao apagadas a cada
+    `prune_interval` segundos.
+    """
+    
+    def __init__(self, db_path: str, prune_interval: float = 60.0):
+        self.db_path = db_path
+        self.prune_interval = prune_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rate-limit")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pruned_at = 0.0
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    expires_at REAL NOT NULL DEFAULT 0
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(rate_limit_buckets)")}
+            if "expires_at" not in columns:
+                # Arquivo de versao anterior: linhas antigas expiram no proximo prune
+                self._conn.execute("ALTER TABLE rate_limit_buckets ADD COLUMN expires_at REAL NOT NULL DEFAULT 0")
+        return self._conn
+    
+    def _take_sync(self, key: str, capacity: int, rate: float, cost: float) -> Tuple[bool, float, float]:
+        conn = self._connect()
+        # Relogio de parede: precisa ser comparavel entre processos
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?",
+                (key,)
+            ).fetchone()
+            tokens, updated_at = row if row else (capacity, now)
+            tokens = _refill(tokens, updated_at, now, capacity, rate)
+            
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, _full_at(tokens, now, capacity, rate))
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        
+        if now - self._pruned_at >= self.prune_interval:
+            self._prune(now)
+        
+        retry_after = 0.0 if allowed else (cost - tokens) / rate
+        return allowed, tokens, retry_after
+    
+    def _prune(self, now: float) -> int:
+        """Apagar buckets ja cheios (de todos os workers)."""
+        self._pruned_at = now
+        try:
+            cursor = self._connect().execute("DELETE FROM rate_limit_buckets WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as e:
+            # Outro worker segurando o lock: tenta no proximo intervalo
+            logger.warning("Rate limit prune failed", error=str(e))
+            return 0
+        return cursor.rowcount
+    
+    async def take(
+        self,
+        key: str,
+        capacity: int,
+        rate: float,
+        cost: float = 1.0
+    ) -> Tuple[bool, float, float]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._take_sync, key, capacity, rate, cost
+        )
+    
+    def close(self):
+        """Fechar conexao e thread."""
+        if self._conn is not None:
+            self._executor.submit(self._conn.close).result()
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+
+class RateLimiter:
+    """
+    Limitador por token bucket com contadores por escopo.
+    
+    Usage:
+        result = await limiter.hit("tool:search_books", caller, limit=60)
+        if not result.allowed:
+            # responder 429 com result.headers()
+    """
+    
+    def __init__(self, storage: Optional[BucketStorage] = None, burst_ratio: float = 0.25):
+        self.storage = storage or MemoryBucketStorage()
+        self.burst_ratio = burst_ratio
+        # escopo -> {"allowed": n, "limited": n}
+        self.counters: Dict[str, Dict[str, int]] = {}
+    
+    async def hit(
+        self,
+        scope: str,
+        caller: str,
+        limit: int,
+        burst: Optional[int] = None
+    ) -> RateLimitResult:
+        """
+        Registrar uma chamada de `caller` em `scope`.
+        
+        Args:
+            scope: Escopo do limite (ex: "tool:search_books", "ucp")
+            caller: Identificador do chamador
+            limit: Requests por minuto
+            burst: Capacidade do bucket (padrao: limit * burst_ratio)
+        """
+        capacity = burst or max(1, int(limit * self.burst_ratio))
+        rate = limit / 60.0
+        
+        try:
+            allowed, tokens, retry_after = await self.storage.take(
+                f"{scope}|{caller}", capacity, rate
+            )
+        except Exception as e:
+            # Falha no storage nao derruba a API
+            logger.error("Rate limit storage error", scope=scope, error=str(e))
+            allowed, tokens, retry_after = True, capacity, 0.0
+        
+        counter = self.counters.setdefault(scope, {"allowed": 0, "limited": 0})
+        counter["allowed" if allowed else "limited"] += 1
+        
+        if not allowed:
+            logger.warning("Rate limit exceeded", scope=scope, caller=caller, retry_after=round(retry_after, 2))
+        
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=int(tokens),
+            retry_after=retry_after,
+        )
+    
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Contadores por escopo."""
+        return {scope: dict(counter) for scope, counter in self.counters.items()}
+
+
+def get_caller_id(request: Request, session_id: Optional[str] = None) -> str:
+    """Identificar chamador: sessao, UCP-Agent, API key ou IP."""
+    if session_id:
+        return f"session:{session_id}"
+    agent = request.headers.get("UCP-Agent")
+    if agent:
+        return f"agent:{agent}"
+    api_key = request.headers.get("X-API-Key")
+    if api_key:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+# Instancia global
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Obter RateLimiter (singleton) com storage configurado."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        from ..config import settings
+        if settings.rate_limit_storage == "sqlite":
+            storage = SQLiteBucketStorage(settings.rate_limit_db_path)
+        else:
+            storage = MemoryBucketStorage()
+        _rate_limiter = RateLimiter(storage=storage, burst_ratio=settings.rate_limit_burst_ratio)
+    return _rate_limiter
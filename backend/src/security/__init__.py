@@ -6,6 +6,7 @@ do Google (google-agentic-commerce/AP2).
 from .key_manager import KeyManager, get_server_key_manager
 from .ap2_security import AP2Security, get_ap2_security, MandatePayload, MandateValidationResult
 from .signatures import RequestSigner, ConformanceHeaders, get_request_signer
+from .verification import SignatureVerifier, get_signature_verifier
 
 # Tipos AP2 oficiais
 from .ap2_types import (
@@ -45,6 +46,9 @@ __all__ = [
     "RequestSigner",
     "ConformanceHeaders",
     "get_request_signer",
+    # Verificacao de assinaturas
+    "SignatureVerifier",
+    "get_signature_verifier",
     # Tipos AP2 oficiais
     "IntentMandate",
     "CartMandate",
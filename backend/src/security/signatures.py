@@ -1,4 +1,6 @@
 """Assinaturas de requests UCP."""
+import base64
+import hashlib
 import json
 import time
 import uuid
@@ -7,6 +9,32 @@ from typing import Dict, Any, Optional, Tuple
 from .key_manager import KeyManager, get_server_key_manager
 
 
+def canonical_body(payload: Optional[Dict[str, Any]]) -> bytes:
+    """Serializar payload de forma canonica (ordenado, sem espacos)."""
+    if not payload:
+        return b""
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def body_digest(body: bytes) -> str:
+    """SHA-256 do corpo bruto em base64url (vazio para corpo vazio)."""
+    if not body:
+        return ""
+    return base64.urlsafe_b64encode(hashlib.sha256(body).digest()).decode().rstrip("=")
+
+
+def build_signing_input(timestamp: str, nonce: str, method: str, path: str, body: bytes) -> str:
+    """
+    Construir string assinada.
+    
+    Formato: timestamp.nonce.method.path.sha256(body)
+    
+    O corpo entra como hash dos bytes enviados, entao o servidor
+    verifica sem fazer parse nem re-serializar o JSON.
+    """
+    return f"{timestamp}.{nonce}.{method}.{path}.{body_digest(body)}"
+
+
 class RequestSigner:
     """
     Assinador de requests UCP.
@@ -27,7 +55,8 @@ class RequestSigner:
         self,
         payload: Optional[Dict[str, Any]] = None,
         method: str = "POST",
-        path: str = "/"
+        path: str = "/",
+        body: Optional[bytes] = None
     ) -> Dict[str, str]:
         """
         Gerar headers de conformidade UCP com assinatura.
@@ -36,6 +65,7 @@ class RequestSigner:
             payload: Corpo da requisicao (opcional)
             method: Metodo HTTP
             path: Caminho da requisicao
+            body: Bytes exatos enviados (padrao: canonical_body(payload))
             
         Returns:
             Dicionario com headers UCP
@@ -46,15 +76,10 @@ class RequestSigner:
         timestamp = str(int(time.time()))
         nonce = uuid.uuid4().hex[:16]
         
-        # Serializar payload de forma canonica (ordenado)
-        if payload:
-            payload_str = json.dumps(payload, sort_keys=True, separators=(",", ":"))
-        else:
-            payload_str = ""
+        if body is None:
+            body = canonical_body(payload)
         
-        # Construir string para assinatura
-        # Formato: timestamp.nonce.method.path.payload_hash
-        signing_input = f"{timestamp}.{nonce}.{method}.{path}.{payload_str}"
+        signing_input = build_signing_input(timestamp, nonce, method, path, body)
         
         # Assinar
         signature = self.key_manager.sign(signing_input)
@@ -74,7 +99,8 @@ class RequestSigner:
         payload: Optional[Dict[str, Any]] = None,
         method: str = "POST",
         path: str = "/",
-        max_age_seconds: int = 300
+        max_age_seconds: int = 300,
+        body: Optional[bytes] = None
     ) -> Tuple[bool, Optional[str]]:
         """
         Verificar assinatura de uma requisicao.
@@ -85,6 +111,7 @@ class RequestSigner:
             method: Metodo HTTP
             path: Caminho
             max_age_seconds: Idade maxima da requisicao
+            body: Bytes brutos recebidos (preferivel a payload)
             
         Returns:
             Tupla (valido, mensagem_erro)
@@ -106,12 +133,10 @@ class RequestSigner:
                 return False, "Request too old or from future"
             
             # Reconstruir string de assinatura
-            if payload:
-                payload_str = json.dumps(payload, sort_keys=True, separators=(",", ":"))
-            else:
-                payload_str = ""
+            if body is None:
+                body = canonical_body(payload)
             
-            signing_input = f"{timestamp}.{nonce}.{method}.{path}.{payload_str}"
+            signing_input = build_signing_input(timestamp, nonce, method, path, body)
             
             # Verificar assinatura
             if not self.key_manager.verify(signing_input, signature):
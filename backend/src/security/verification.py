@@ -0,0 +1,350 @@
+"""Verificacao de assinaturas de requests UCP no servidor.
+
+- Corpo bruto e hasheado uma unica vez (sem parse/re-serializacao)
+- Chaves publicas dos agentes sao resolvidas e cacheadas por
+  (origem do perfil, `ucp-key-id`): um perfil so publica chaves para si
+- Cache limitado (LRU por origem) e no maximo uma busca de perfil por
+  origem a cada `negative_cache_ttl`, mesmo com key ids aleatorios
+- Perfis so sao buscados via https, em hosts publicos (e da allowlist)
+- Verificacao Ed25519 roda em thread pool, fora do event loop
+"""
+import asyncio
+import base64
+import ipaddress
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import structlog
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from .key_manager import get_server_key_manager
+from .signatures import build_signing_input
+from ..observability.tracing import http_client
+
+logger = structlog.get_logger()
+
+# profile="https://agente.exemplo/.well-known/ucp" no header UCP-Agent
+_PROFILE_RE = re.compile(r'profile="([^"]+)"')
+
+
+# Chaves registradas localmente (operador/servidor) valem para qualquer perfil
+LOCAL_ORIGIN = ""
+# Chaves lidas de cada perfil (o restante e ignorado)
+MAX_PROFILE_KEYS = 16
+
+
+@dataclass
+class _ProfileKeys:
+    """Chaves em cache de uma origem."""
+    keys: Dict[str, ed25519.Ed25519PublicKey]
+    expires_at: float
+    fetched_at: float
+
+
+def _b64url_decode(value: str) -> bytes:
+    """Decodificar base64url sem padding."""
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def public_key_from_jwk(jwk: Dict[str, Any]) -> ed25519.Ed25519PublicKey:
+    """Converter JWK OKP/Ed25519 em chave publica."""
+    if jwk.get("kty") != "OKP" or jwk.get("crv") != "Ed25519":
+        raise ValueError("Unsupported key type")
+    return ed25519.Ed25519PublicKey.from_public_bytes(_b64url_decode(jwk["x"]))
+
+
+def _verify_signature(public_key: ed25519.Ed25519PublicKey, signing_input: str, signature: str) -> bool:
+    """Verificacao Ed25519 (bloqueante, executada no pool)."""
+    try:
+        public_key.verify(_b64url_decode(signature), signing_input.encode("utf-8"))
+        return True
+    except (InvalidSignature, ValueError):
+        return False
+
+
+def profile_origin(profile_url: str) -> str:
+    """Origem (scheme://host[:porta]) do perfil, em minusculas."""
+    parts = urlsplit(profile_url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def extract_profile(ucp_agent: Optional[str]) -> Optional[str]:
+    """
+    URL do perfil no header UCP-Agent.
+    
+    Raises:
+        ValueError: Header com mais de um `profile=` (identidade ambigua)
+    """
+    profiles = _PROFILE_RE.findall(ucp_agent or "")
+    if len(profiles) > 1:
+        raise ValueError("Multiple profiles in UCP-Agent")
+    return profiles[0] if profiles else None
+
+
+def _is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%")[0])
+    return ip.is_global and not ip.is_multicast
+
+
+class SignatureVerifier:
+    """
+    Verificador de assinaturas de requests UCP.
+    
+    Resolve a chave do agente por (origem do perfil, `ucp-key-id`):
+    1. Chaves registradas localmente (inclui a do proprio servidor)
+    2. Cache de chaves ja resolvidas para aquele perfil
+    3. `signing_keys` do perfil indicado no header UCP-Agent
+    
+    O cache guarda todas as chaves do perfil, por origem, com no maximo
+    `max_cached_profiles` origens (LRU). Key id desconhecido so provoca
+    nova busca depois de `negative_cache_ttl` desde a ultima busca
+    daquela origem.
+    
+    O perfil vem do mesmo header UCP-Agent que identifica o agente na
+    idempotencia e no rate limiting; um perfil nao consegue publicar
+    chaves para outra origem.
+    """
+    
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_age_seconds: int = 300,
+        key_cache_ttl: float = 3600.0,
+        negative_cache_ttl: float = 60.0,
+        allowed_profile_hosts: Sequence[str] = (),
+        max_cached_profiles: int = 1024,
+    ):
+        self.max_age_seconds = max_age_seconds
+        self.key_cache_ttl = key_cache_ttl
+        self.negative_cache_ttl = negative_cache_ttl
+        self.max_cached_profiles = max_cached_profiles
+        # Vazio = qualquer host publico; "*.exemplo.com" aceita subdominios
+        self.allowed_profile_hosts = [h.lower() for h in allowed_profile_hosts]
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ucp-verify")
+        # key_id -> (chave, expira_em)
+        self._local_keys: Dict[str, Tuple[ed25519.Ed25519PublicKey, float]] = {}
+        # origem do perfil -> chaves publicadas (ordem = ultimo acesso)
+        self._profiles: "OrderedDict[str, _ProfileKeys]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.stats = {"verified": 0, "failed": 0, "key_hits": 0, "key_misses": 0}
+        
+        server_km = get_server_key_manager()
+        self.register_jwk(server_km.get_public_jwk(), ttl=None)
+    
+    def register_jwk(self, jwk: Dict[str, Any], ttl: Optional[float] = None) -> str:
+        """Registrar chave publica de um agente (ttl=None nunca expira)."""
+        key_id = jwk["kid"]
+        expires_at = time.monotonic() + ttl if ttl else float("inf")
+        self._local_keys[key_id] = (public_key_from_jwk(jwk), expires_at)
+        return key_id
+    
+    def _host_allowed(self, host: str) -> bool:
+        if not self.allowed_profile_hosts:
+            return True
+        for allowed in self.allowed_profile_hosts:
+            if allowed.startswith("*.") and host.endswith(allowed[1:]):
+                return True
+            if host == allowed:
+                return True
+        return False
+    
+    async def check_profile_url(self, profile_url: str):
+        """
+        Validar URL de perfil antes de buscar (evita SSRF).
+        
+        Raises:
+            ValueError: Esquema nao https, host fora da allowlist ou
+                resolvendo para endereco privado/loopback
+        """
+        parts = urlsplit(profile_url)
+        host = (parts.hostname or "").lower()
+        if parts.scheme != "https" or not host:
+            raise ValueError("Profile URL must be https")
+        if not self._host_allowed(host):
+            raise ValueError(f"Profile host not allowed: {host}")
+        
+        loop = asyncio.get_running_loop()
+        infos = await loop.getaddrinfo(host, parts.port or 443)
+        addresses = {info[4][0] for info in infos}
+        if not addresses or not all(_is_public_address(a) for a in addresses):
+            raise ValueError(f"Profile host resolves to non-public address: {host}")
+    
+    async def _fetch_profile_keys(self, profile_url: str) -> List[Dict[str, Any]]:
+        """Buscar `signing_keys` no perfil do agente (sem seguir redirects)."""
+        await self.check_profile_url(profile_url)
+        async with http_client(timeout=5.0, follow_redirects=False) as client:
+            response = await client.get(profile_url)
+            response.raise_for_status()
+            profile = response.json()
+        return profile.get("signing_keys") or profile.get("keys") or []
+    
+    def _cached_key(self, origin: str, key_id: str) -> Tuple[bool, Optional[ed25519.Ed25519PublicKey]]:
+        """
+        Consultar o cache da origem.
+        
+        Returns:
+            (respondido, chave): respondido=False pede nova busca do perfil
+        """
+        entry = self._profiles.get(origin)
+        if entry is None:
+            return False, None
+        
+        now = time.monotonic()
+        if key_id in entry.keys and entry.expires_at > now:
+            self._profiles.move_to_end(origin)
+            return True, entry.keys[key_id]
+        if now - entry.fetched_at < self.negative_cache_ttl:
+            self._profiles.move_to_end(origin)
+            return True, None
+        return False, None
+    
+    async def _refresh_profile(self, origin: str, profile_url: Optional[str]):
+        """Buscar as chaves do perfil e atualizar o cache da origem."""
+        now = time.monotonic()
+        entry = _ProfileKeys(keys={}, expires_at=now + self.key_cache_ttl, fetched_at=now)
+        if profile_url:
+            try:
+                jwks = [jwk for jwk in await self._fetch_profile_keys(profile_url) if jwk.get("kid")]
+                entry.keys = {jwk["kid"]: public_key_from_jwk(jwk) for jwk in jwks[:MAX_PROFILE_KEYS]}
+            except Exception as e:
+                logger.warning("Agent profile fetch failed", origin=origin, error=str(e))
+                previous = self._profiles.get(origin)
+                if previous is not None:
+                    # Chaves ja conhecidas continuam valendo ate expirar
+                    entry.keys, entry.expires_at = previous.keys, previous.expires_at
+        
+        self._profiles[origin] = entry
+        self._profiles.move_to_end(origin)
+        self._prune_profiles(now)
+    
+    def _prune_profiles(self, now: float):
+        """Remover origens expiradas e as menos usadas acima do limite."""
+        expired = [
+            origin for origin, entry in self._profiles.items()
+            if entry.expires_at <= now and now - entry.fetched_at >= self.negative_cache_ttl
+        ]
+        for origin in expired:
+            del self._profiles[origin]
+        while len(self._profiles) > self.max_cached_profiles:
+            self._profiles.popitem(last=False)
+    
+    async def resolve_key(
+        self,
+        key_id: str,
+        ucp_agent: Optional[str] = None
+    ) -> Optional[ed25519.Ed25519PublicKey]:
+        """Resolver chave publica por (perfil do UCP-Agent, key_id), com cache."""
+        local = self._local_keys.get(key_id)
+        if local and local[1] > time.monotonic():
+            self.stats["key_hits"] += 1
+            return local[0]
+        
+        try:
+            profile_url = extract_profile(ucp_agent)
+        except ValueError:
+            return None
+        origin = profile_origin(profile_url) if profile_url else LOCAL_ORIGIN
+        
+        answered, key = self._cached_key(origin, key_id)
+        if answered:
+            self.stats["key_hits"] += 1
+            return key
+        
+        # Uma unica busca por origem mesmo com requests concorrentes
+        lock = self._locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            answered, key = self._cached_key(origin, key_id)
+            if answered:
+                self.stats["key_hits"] += 1
+                return key
+            
+            self.stats["key_misses"] += 1
+            await self._refresh_profile(origin, profile_url)
+            _, key = self._cached_key(origin, key_id)
+        
+        self._locks.pop(origin, None)
+        return key
+    
+    async def verify(
+        self,
+        headers: Dict[str, str],
+        body: bytes,
+        method: str,
+        path: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verificar assinatura do request.
+        
+        Args:
+            headers: Headers do request (chaves em minusculas)
+            body: Corpo bruto recebido
+            method: Metodo HTTP
+            path: Caminho do request
+        
+        Returns:
+            Tupla (valido, mensagem_erro)
+        """
+        timestamp = headers.get("ucp-timestamp")
+        nonce = headers.get("ucp-nonce")
+        signature = headers.get("request-signature")
+        key_id = headers.get("ucp-key-id")
+        
+        if not all([timestamp, nonce, signature, key_id]):
+            return self._fail("Missing required headers")
+        
+        try:
+            extract_profile(headers.get("ucp-agent"))
+        except ValueError as e:
+            return self._fail(str(e))
+        
+        try:
+            if abs(int(time.time()) - int(timestamp)) > self.max_age_seconds:
+                return self._fail("Request too old or from future")
+        except ValueError:
+            return self._fail("Invalid timestamp")
+        
+        public_key = await self.resolve_key(key_id, headers.get("ucp-agent"))
+        if public_key is None:
+            return self._fail("Unknown key id")
+        
+        signing_input = build_signing_input(timestamp, nonce, method, path, body)
+        loop = asyncio.get_running_loop()
+        valid = await loop.run_in_executor(
+            self._executor, _verify_signature, public_key, signing_input, signature
+        )
+        if not valid:
+            return self._fail("Invalid signature")
+        
+        self.stats["verified"] += 1
+        return True, None
+    
+    def _fail(self, error: str) -> Tuple[bool, str]:
+        self.stats["failed"] += 1
+        return False, error
+    
+    def shutdown(self):
+        """Encerrar thread pool."""
+        self._executor.shutdown(wait=False)
+
+
+# Instancia global
+_signature_verifier: Optional[SignatureVerifier] = None
+
+
+def get_signature_verifier() -> SignatureVerifier:
+    """Obter SignatureVerifier (singleton)."""
+    global _signature_verifier
+    if _signature_verifier is None:
+        from ..config import settings
+        _signature_verifier = SignatureVerifier(
+            max_workers=settings.ucp_signature_workers,
+            max_age_seconds=settings.ucp_signature_max_age,
+            allowed_profile_hosts=settings.ucp_profile_allowed_hosts,
+        )
+    return _signature_verifier
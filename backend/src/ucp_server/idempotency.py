@@ -0,0 +1,166 @@
+"""
+Idempotencia dos endpoints de escrita UCP.
+
+Requests POST/PUT em /checkout-sessions com header `idempotency-key`
+sao executados uma unica vez por (UCP-Agent, idempotency-key):
+- Retries recebem a resposta gravada (status, body e headers, como
+  Location e Vary) com `Idempotent-Replayed: true`
+- O formato negociado pelo Accept (JSON ou MessagePack) entra no
+  fingerprint: retry pedindo outro formato e tratado como outro request
+- Duplicatas concorrentes aguardam o resultado da primeira execucao
+- Mesma chave com payload diferente retorna 422
+- Respostas 5xx nao sao gravadas, liberando a chave para novo retry
+"""
+import asyncio
+import hashlib
+from typing import Dict, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+import structlog
+
+from ..config import settings
+from ..db.idempotency import idempotency_repo, IdempotencyRecord
+from ..realtime.codec import accepts_msgpack
+
+logger = structlog.get_logger()
+
+IDEMPOTENT_METHODS = {"POST", "PUT"}
+IDEMPOTENT_PATH_PREFIX = "/checkout-sessions"
+
+# Headers recalculados na reconstrucao da resposta (nao sao gravados)
+UNSTORED_HEADERS = {"content-length", "content-type", "idempotent-replayed"}
+
+# Intervalo de polling quando a execucao original esta em outro worker
+POLL_INTERVAL = 0.1
+
+# Execucoes em andamento neste processo
+_in_flight: Dict[Tuple[str, str], asyncio.Event] = {}
+
+
+def _fingerprint(request: Request, body: bytes) -> str:
+    """Hash do request para detectar reuso de chave com payload diferente."""
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.url.path.encode())
+    # Formato da resposta: bytes gravados so servem para o mesmo Accept
+    digest.update(b"msgpack" if accepts_msgpack(request.headers.get("accept")) else b"json")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _replay(record: IdempotencyRecord) -> Response:
+    """Reconstruir resposta gravada."""
+    response = Response(
+        content=record.response_body or b"",
+        status_code=record.response_status,
+        media_type=record.content_type,
+    )
+    for name, value in record.headers():
+        response.headers.append(name, value)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+async def _wait_for_result(agent: str, key: str) -> IdempotencyRecord:
+    """Aguardar a execucao em andamento terminar."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.idempotency_wait_timeout
+    event = _in_flight.get((agent, key))
+    
+    while loop.time() < deadline:
+        if event is not None:
+            # Mesmo processo: acordar assim que a primeira execucao terminar
+            try:
+                await asyncio.wait_for(event.wait(), timeout=deadline - loop.time())
+            except asyncio.TimeoutError:
+                break
+            event = None
+        else:
+            await asyncio.sleep(POLL_INTERVAL)
+        
+        record = await idempotency_repo.get(agent, key)
+        if record is None or record.status == "completed":
+            return record
+    
+    return await idempotency_repo.get(agent, key)
+
+
+async def idempotency_middleware(request: Request, call_next):
+    """Middleware de idempotencia para os endpoints de checkout."""
+    key = request.headers.get("idempotency-key")
+    if (
+        not key
+        or request.method not in IDEMPOTENT_METHODS
+        or not request.url.path.startswith(IDEMPOTENT_PATH_PREFIX)
+    ):
+        return await call_next(request)
+    
+    agent = request.headers.get("UCP-Agent", "")
+    fingerprint = _fingerprint(request, await request.body())
+    
+    # Tentar reservar; se outra execucao terminar com 5xx a chave e liberada
+    while True:
+        record = await idempotency_repo.claim(
+            agent,
+            key,
+            fingerprint,
+            ttl_seconds=settings.idempotency_ttl_seconds,
+            lock_timeout=settings.idempotency_lock_timeout,
+        )
+        if record is None:
+            break
+        
+        if record.fingerprint != fingerprint:
+            logger.warning("Idempotency key reused with different payload", agent=agent, key=key)
+            return JSONResponse(
+                status_code=422,
+                content={"detail": "Idempotency key already used with a different request"},
+            )
+        
+        if record.status == "in_flight":
+            logger.info("Waiting for in-flight duplicate", agent=agent, key=key)
+            record = await _wait_for_result(agent, key)
+            if record is None:
+                continue
+            if record.status != "completed":
+                return JSONResponse(
+                    status_code=409,
+                    content={"detail": "Request with this idempotency key is still in progress"},
+                    headers={"Retry-After": "1"},
+                )
+        
+        logger.info("Idempotent replay", agent=agent, key=key, status=record.response_status)
+        return _replay(record)
+    
+    event = asyncio.Event()
+    _in_flight[(agent, key)] = event
+    
+    try:
+        response = await call_next(request)
+        
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        
+        if response.status_code >= 500:
+            await idempotency_repo.release(agent, key)
+        else:
+            await idempotency_repo.complete(
+                agent,
+                key,
+                response.status_code,
+                body,
+                response.headers.get("content-type"),
+                [(name, value) for name, value in response.headers.items() if name not in UNSTORED_HEADERS],
+            )
+        
+        return Response(
+            content=body,
+            status_code=response.status_code,
+            headers=dict(response.headers),
+        )
+    except BaseException:
+        await idempotency_repo.release(agent, key)
+        raise
+    finally:
+        _in_flight.pop((agent, key), None)
+        event.set()
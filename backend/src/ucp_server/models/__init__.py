@@ -1,5 +1,5 @@
 """Models do UCP Server."""
-from .book import Book, BookCreate
+from .book import Book, BookCreate, BookChange, CatalogChanges
 from .checkout import CheckoutSession, LineItem, Buyer, Total, Item
 from .payment import PaymentHandler, Payment
 
@@ -27,7 +27,7 @@ except ImportError:
 
 __all__ = [
     # Modelos locais
-    "Book", "BookCreate",
+    "Book", "BookCreate", "BookChange", "CatalogChanges",
     "CheckoutSession", "LineItem", "Buyer", "Total", "Item",
     "PaymentHandler", "Payment",
     # Adapters
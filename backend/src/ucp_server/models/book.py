@@ -29,6 +29,33 @@ class BookCreate(BaseModel):
     stock: int = 0
 
 
+class BookChange(BaseModel):
+    """
+    Delta compacto de um livro no change feed.
+    
+    op:
+    - upsert: livro novo (ou recriado), `book` traz o registro completo
+    - update: apenas os campos alterados (`price` e/ou `stock`)
+    - delete: livro removido
+    """
+    op: str
+    id: str
+    version: int
+    price: Optional[int] = None
+    stock: Optional[int] = None
+    book: Optional[Book] = None
+
+
+class CatalogChanges(BaseModel):
+    """Pagina do change feed do catalogo."""
+    since: int
+    version: int  # Usar como `since` na proxima chamada
+    has_more: bool = False
+    # `since` anterior ao piso de retencao: ressincronizar via /books/export
+    resync_required: bool = False
+    changes: list[BookChange]
+
+
 class BookSearch(BaseModel):
     """Resultado de busca de livros."""
     books: list[Book]
@@ -0,0 +1,97 @@
+"""
+Negociacao de conteudo MessagePack nas rotas UCP.
+
+Routers criados com `APIRouter(route_class=MsgPackRoute)` aceitam:
+
+- Request com `Content-Type: application/msgpack`: o body e decodificado
+  direto para o modelo pydantic (sem passar por JSON)
+- `Accept: application/msgpack`: a resposta sai em MessagePack
+
+A resposta e serializada uma unica vez, no formato escolhido. Erros
+(HTTPException, validacao) continuam em JSON. Assinatura e idempotencia
+veem os bytes originais do request (os middlewares rodam antes).
+"""
+from contextvars import ContextVar
+from typing import Any, Callable, Coroutine
+
+from fastapi import Request, Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute
+from starlette.responses import JSONResponse
+import structlog
+
+from ..realtime.codec import (
+    MSGPACK_AVAILABLE,
+    MSGPACK_MEDIA_TYPE,
+    accepts_msgpack,
+    is_msgpack,
+    pack,
+    unpack,
+)
+
+logger = structlog.get_logger()
+
+# Formato escolhido pelo Accept do request em andamento
+_prefer_msgpack: ContextVar[bool] = ContextVar("prefer_msgpack", default=False)
+
+
+class NegotiatedResponse(JSONResponse):
+    """JSON ou MessagePack conforme o Accept do request."""
+    
+    def render(self, content: Any) -> bytes:
+        if _prefer_msgpack.get():
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return pack(content)
+        return super().render(content)
+
+
+class MsgPackRequest(Request):
+    """Request com body MessagePack exposto como se fosse JSON."""
+    
+    def __init__(self, scope, receive):
+        # O FastAPI so chama `json()` para content-types JSON
+        headers = [
+            (name, b"application/json" if name == b"content-type" else value)
+            for name, value in scope["headers"]
+        ]
+        super().__init__({**scope, "headers": headers}, receive)
+    
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = unpack(await self.body())
+        return self._json
+
+
+class MsgPackRoute(APIRoute):
+    """Rota com negociacao JSON/MessagePack por Content-Type e Accept."""
+    
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        # Rotas sem response_class explicito serializam via NegotiatedResponse
+        response_class = kwargs.get("response_class")
+        if MSGPACK_AVAILABLE and (response_class is None or isinstance(response_class, DefaultPlaceholder)):
+            kwargs["response_class"] = NegotiatedResponse
+        super().__init__(path, endpoint, **kwargs)
+    
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        if not MSGPACK_AVAILABLE:
+            return handler
+        
+        async def route_handler(request: Request) -> Response:
+            if is_msgpack(request.headers.get("content-type")):
+                try:
+                    request = MsgPackRequest(request.scope, request.receive)
+                    await request.json()
+                except Exception as e:
+                    logger.warning("Invalid MessagePack body", path=request.url.path, error=str(e))
+                    return JSONResponse({"detail": "Invalid MessagePack body"}, status_code=400)
+            
+            token = _prefer_msgpack.set(accepts_msgpack(request.headers.get("accept")))
+            try:
+                response = await handler(request)
+            finally:
+                _prefer_msgpack.reset(token)
+            response.headers.setdefault("Vary", "Accept")
+            return response
+        
+        return route_handler
@@ -0,0 +1,31 @@
+"""Rate limiting por agente nas rotas UCP."""
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from ..config import settings
+from ..resilience import get_rate_limiter, get_caller_id
+
+# Rotas de discovery e health nao sao limitadas
+EXEMPT_PREFIXES = ("/health", "/metrics", "/debug", "/.well-known", "/docs", "/openapi.json")
+
+
+async def rate_limit_middleware(request: Request, call_next):
+    """Aplicar limite de requests por agente (UCP-Agent, API key ou IP)."""
+    if request.url.path.startswith(EXEMPT_PREFIXES):
+        return await call_next(request)
+    
+    result = await get_rate_limiter().hit(
+        "ucp",
+        get_caller_id(request),
+        limit=settings.ucp_rate_limit,
+    )
+    if not result.allowed:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Rate limit exceeded"},
+            headers=result.headers(),
+        )
+    
+    response = await call_next(request)
+    response.headers.update(result.headers())
+    return response
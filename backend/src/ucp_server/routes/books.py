@@ -1,11 +1,24 @@
 """Routes para livros."""
+import zlib
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional, List
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, AsyncIterator
 
 from ...db.products import products_repo
-from ..models.book import Book
+from ..models.book import Book, CatalogChanges
+from ..negotiation import MsgPackRoute
 
-router = APIRouter()
+# zstd e opcional; gzip sempre disponivel
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+router = APIRouter(route_class=MsgPackRoute)
+
+# Tamanho minimo de chunk comprimido enviado ao cliente
+EXPORT_CHUNK_SIZE = 64 * 1024
 
 
 @router.get("", response_model=List[Book])
@@ -35,6 +48,86 @@ async def list_categories():
     return {"categories": sorted(categories)}
 
 
+@router.get("/changes", response_model=CatalogChanges, response_model_exclude_none=True)
+async def list_changes(
+    since: int = Query(default=0, ge=0),
+    limit: int = Query(default=500, ge=1, le=1000),
+):
+    """
+    Change feed do catalogo para espelhamento incremental.
+    
+    Retorna deltas compactos (preco, estoque, inclusao e remocao) apos
+    a versao `since`. O cliente guarda `version` e usa como `since` na
+    proxima chamada; `has_more` indica que ainda ha alteracoes pendentes.
+    Alteracoes antigas sao podadas (`catalog_changes_retention`): com
+    `since` anterior ao piso, `resync_required` pede um `/books/export`
+    completo, continuando a partir do `X-Catalog-Version` dele.
+    """
+    return await products_repo.get_changes(since=since, limit=limit)
+
+
+async def _export_stream(
+    compression: str,
+    category: Optional[str],
+    since: Optional[int],
+) -> AsyncIterator[bytes]:
+    """Gerar NDJSON comprimido a partir do cursor do repositorio."""
+    if compression == "zstd":
+        compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    elif compression == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    else:
+        compressor = None
+    
+    buffer = bytearray()
+    async for book in products_repo.iter_books(category=category, since=since):
+        line = book.model_dump_json().encode() + b"\n"
+        buffer += compressor.compress(line) if compressor else line
+        if len(buffer) >= EXPORT_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    
+    if compressor:
+        buffer += compressor.flush()
+    if buffer:
+        yield bytes(buffer)
+
+
+@router.get("/export")
+async def export_books(
+    compression: str = Query(default="gzip", pattern="^(gzip|zstd|none)$"),
+    category: Optional[str] = None,
+    since: Optional[int] = Query(default=None, ge=0),
+):
+    """
+    Exportar catalogo como NDJSON (um livro por linha) em streaming.
+    
+    Substitui a paginacao de `/books` para indexadores e agentes de
+    comparacao. O header `X-Catalog-Version` traz a versao do change
+    feed no inicio do export; o cliente continua em `/books/changes`
+    a partir dela. Livros removidos nao aparecem com `since`, apenas
+    no change feed; `since` anterior ao piso de retencao retorna 410.
+    """
+    if compression == "zstd" and not ZSTD_AVAILABLE:
+        raise HTTPException(status_code=400, detail="zstd compression not available")
+    if since is not None and since < await products_repo.get_changes_floor():
+        raise HTTPException(status_code=410, detail="Version older than change feed retention, export without since")
+    
+    version = await products_repo.get_catalog_version()
+    headers = {
+        "X-Catalog-Version": str(version),
+        "Content-Disposition": 'attachment; filename="catalog.ndjson"',
+    }
+    if compression != "none":
+        headers["Content-Encoding"] = compression
+    
+    return StreamingResponse(
+        _export_stream(compression, category, since),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
+
+
 @router.get("/{book_id}", response_model=Book)
 async def get_book(book_id: str):
     """Obter livro por ID."""
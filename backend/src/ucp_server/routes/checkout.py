@@ -12,8 +12,9 @@ from ...db.products import products_repo
 from ...db.discounts import discounts_repo
 from ...security import get_ap2_security, get_request_signer
 from ...payments import get_psp_simulator, ProcessPaymentRequest, PaymentStatus, WalletSource
+from ..negotiation import MsgPackRoute
 
-router = APIRouter()
+router = APIRouter(route_class=MsgPackRoute)
 logger = structlog.get_logger()
 
 
@@ -23,13 +24,15 @@ def validate_ucp_headers(
     idempotency_key: Optional[str],
     request_id: Optional[str],
 ):
-    """Validar headers UCP obrigatorios."""
+    """
+    Validar headers UCP obrigatorios.
+    
+    A assinatura (`request-signature`) e a deduplicacao por
+    `idempotency-key` sao tratadas antes, nos middlewares do servidor
+    (signature_middleware e idempotency_middleware).
+    """
     if ucp_agent:
         logger.debug("UCP headers", agent=ucp_agent, idempotency_key=idempotency_key)
-    
-    # TODO: Validar assinatura em producao
-    # signer = get_request_signer()
-    # valid, error = signer.verify_request(headers, payload, method, path)
 
 
 @router.post("/checkout-sessions", response_model=CheckoutSession)
@@ -15,9 +15,10 @@ from ...payments import (
     RefundRequest,
     get_psp_simulator,
 )
+from ..negotiation import MsgPackRoute
 
 logger = structlog.get_logger()
-router = APIRouter(prefix="/payments", tags=["Payments"])
+router = APIRouter(prefix="/payments", tags=["Payments"], route_class=MsgPackRoute)
 
 
 # =========================================================================
@@ -1,28 +1,38 @@
 """Servidor UCP da Livraria."""
 from fastapi import FastAPI, Request, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from functools import partial
 from typing import Optional
 import structlog
 
 from .discovery import get_discovery_profile, get_a2a_agent_card
+from .idempotency import idempotency_middleware
+from .signatures import signature_middleware
+from .rate_limit import rate_limit_middleware
 from .routes.checkout import router as checkout_router
 from .routes.books import router as books_router
 from .routes.payments import router as payments_router
 from ..db.database import init_databases, products_db, transactions_db
+from ..db.idempotency import idempotency_repo
+from ..db.products import products_repo
+from ..db.session_store import get_session_janitor
 from ..mcp.http_server import router as mcp_router
+from ..observability.profiling import router as debug_router
 from ..payments import get_psp_simulator
 from ..config import settings
+from ..resilience import get_rate_limiter, get_admission_controller, AdmissionMiddleware
+from ..observability import (
+    configure_logging,
+    create_metrics_middleware,
+    create_tracing_middleware,
+    get_loop_monitor,
+    get_tracer,
+    metrics_endpoint,
+    shutdown_logging,
+)
 
 # Configurar logging
-structlog.configure(
-    processors=[
-        structlog.processors.add_log_level,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.dev.ConsoleRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.PrintLoggerFactory(),
-)
+configure_logging()
 
 logger = structlog.get_logger()
 
@@ -50,21 +60,34 @@ async def startup():
     await init_databases()
     await products_db.connect()
     await transactions_db.connect()
+    # Chaves expiradas: no start e depois a cada session_sweep_interval
+    janitor = get_session_janitor()
+    janitor.add("idempotency_keys", idempotency_repo.purge_expired)
+    if settings.catalog_changes_retention:
+        janitor.add("catalog_changes", partial(products_repo.prune_changes, settings.catalog_changes_retention))
+    await janitor.start()
     
     # Inicializar PSP Simulator
     psp = get_psp_simulator()
     await psp.initialize()
     logger.info("PSP Simulator initialized")
     
+    if settings.loop_monitor_enabled:
+        get_loop_monitor("ucp-server").start()
     logger.info("UCP Server started", port=settings.ucp_port)
 
 
 @app.on_event("shutdown")
 async def shutdown():
     """Fechar conexoes."""
+    if settings.loop_monitor_enabled:
+        await get_loop_monitor().stop()
+    await get_session_janitor().stop()
     await products_db.disconnect()
     await transactions_db.disconnect()
+    get_tracer().shutdown()
     logger.info("UCP Server stopped")
+    shutdown_logging()
 
 
 @app.get("/.well-known/ucp")
@@ -104,11 +127,38 @@ async def health():
     return {"status": "healthy", "service": "ucp-server"}
 
 
+@app.get("/rate-limits")
+async def rate_limit_stats():
+    """Contadores do rate limiter por escopo."""
+    return {"rate_limits": get_rate_limiter().get_stats()}
+
+
+@app.get("/admission")
+async def admission_stats():
+    """Limites adaptativos e contadores do admission control."""
+    return {"admission": get_admission_controller().get_stats()}
+
+
 # Incluir routers
 app.include_router(checkout_router, tags=["Checkout"])
 app.include_router(books_router, prefix="/books", tags=["Books"])
 app.include_router(payments_router)  # PSP Payments
 app.include_router(mcp_router)  # MCP Tools
+app.include_router(debug_router)  # Profiling sob demanda (X-Debug-Token)
+
+
+# Idempotencia dos endpoints de escrita (executa dentro do log de requests)
+app.middleware("http")(idempotency_middleware)
+
+# Assinatura verificada antes da idempotencia (request invalido nao reserva chave)
+app.middleware("http")(signature_middleware)
+
+# Admission control por classe de rota (503 sob sobrecarga)
+if settings.admission_control_enabled:
+    app.add_middleware(AdmissionMiddleware)
+
+# Rate limit por agente antes de qualquer verificacao custosa
+app.middleware("http")(rate_limit_middleware)
 
 
 # Middleware para logar requests UCP
@@ -126,3 +176,11 @@ async def log_ucp_requests(request: Request, call_next):
     
     response = await call_next(request)
     return response
+
+
+# Metricas (mais externo: ve tambem requests limitados e descartados)
+app.middleware("http")(create_metrics_middleware("ucp-server"))
+app.get("/metrics", include_in_schema=False)(metrics_endpoint)
+
+# Tracing (mais externo: continua o traceparent recebido)
+app.middleware("http")(create_tracing_middleware("ucp-server"))
@@ -36,7 +36,9 @@ SHOPPING_RESOURCES = [
             "list": "GET /books",
             "search": "GET /books/search?q={query}",
             "get": "GET /books/{book_id}",
-            "categories": "GET /books/categories"
+            "categories": "GET /books/categories",
+            "changes": "GET /books/changes?since={version}",
+            "export": "GET /books/export?compression={gzip|zstd}"
         }
     },
     {
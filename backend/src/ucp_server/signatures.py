@@ -0,0 +1,55 @@
+"""
+Verificacao de assinaturas nos endpoints de escrita UCP.
+
+Modo definido por `settings.ucp_signature_mode`:
+- off: nao verifica
+- report: verifica e apenas loga falhas
+- enforce: rejeita requests sem assinatura valida (401)
+"""
+from fastapi import Request
+from fastapi.responses import JSONResponse
+import structlog
+
+from ..config import settings
+from ..security.verification import get_signature_verifier
+
+logger = structlog.get_logger()
+
+SIGNED_METHODS = {"POST", "PUT", "DELETE"}
+SIGNED_PATH_PREFIX = "/checkout-sessions"
+
+
+async def signature_middleware(request: Request, call_next):
+    """Middleware de verificacao de assinatura UCP."""
+    mode = settings.ucp_signature_mode
+    if (
+        mode == "off"
+        or request.method not in SIGNED_METHODS
+        or not request.url.path.startswith(SIGNED_PATH_PREFIX)
+    ):
+        return await call_next(request)
+    
+    verifier = get_signature_verifier()
+    valid, error = await verifier.verify(
+        headers=request.headers,
+        body=await request.body(),
+        method=request.method,
+        path=request.url.path,
+    )
+    
+    if not valid:
+        logger.warning(
+            "UCP signature verification failed",
+            mode=mode,
+            path=request.url.path,
+            agent=request.headers.get("UCP-Agent"),
+            key_id=request.headers.get("ucp-key-id"),
+            error=error,
+        )
+        if mode == "enforce":
+            return JSONResponse(
+                status_code=401,
+                content={"detail": f"Invalid request signature: {error}"},
+            )
+    
+    return await call_next(request)
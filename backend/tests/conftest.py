@@ -9,3 +9,19 @@ def event_loop():
     loop = asyncio.get_event_loop_policy().new_event_loop()
     yield loop
     loop.close()
+
+
+@pytest.fixture
+async def temp_databases(tmp_path, monkeypatch):
+    """Bancos SQLite temporarios com schema inicializado."""
+    from src.db.database import init_databases, products_db, transactions_db
+    
+    monkeypatch.setattr(products_db, "db_path", str(tmp_path / "products.db"))
+    monkeypatch.setattr(transactions_db, "db_path", str(tmp_path / "transactions.db"))
+    
+    await init_databases()
+    await products_db.connect()
+    await transactions_db.connect()
+    yield products_db, transactions_db
+    await products_db.disconnect()
+    await transactions_db.disconnect()
@@ -0,0 +1,61 @@
+"""Testes do dispatch direto de acoes A2A (sem o grafo)."""
+import pytest
+
+from src.agents import graph as graph_module
+from src.agents.graph import StoreAgentRunner
+from src.config import settings
+from src.db.products import products_repo
+from src.ucp_server.models.book import BookCreate
+
+
+@pytest.fixture
+async def catalog(temp_databases):
+    for title, category in (("Python Fluente", "Python"), ("Dom Casmurro", "Romance")):
+        await products_repo.create(
+            BookCreate(title=title, author="Autor", price=5000, category=category, stock=3)
+        )
+    return temp_databases
+
+
+class FailingGraph:
+    async def ainvoke(self, state):
+        raise AssertionError("graph should not run for structured A2A actions")
+
+
+class TestA2ADispatch:
+    """Acoes estruturadas devem usar os servicos diretamente."""
+    
+    async def test_search_skips_graph(self, catalog, monkeypatch):
+        """search nao executa o grafo nem grava estado de sessao."""
+        monkeypatch.setattr(graph_module, "store_graph", FailingGraph())
+        runner = StoreAgentRunner()
+        
+        result = await runner.process_a2a_request("s-dispatch", "agent", "search", {"query": "python"})
+        
+        assert [b["title"] for b in result["data"]["search_results"]] == ["Python Fluente"]
+        assert runner.store.get(runner.NAMESPACE, "s-dispatch") is None
+    
+    async def test_same_result_as_graph(self, catalog, monkeypatch):
+        """Dispatch direto e grafo devem produzir os mesmos dados."""
+        runner = StoreAgentRunner()
+        direct = await runner.process_a2a_request("s1", "agent", "get_products", {"category": "Romance"})
+        
+        monkeypatch.setattr(settings, "a2a_fast_path_enabled", False)
+        via_graph = await runner.process_a2a_request("s2", "agent", "get_products", {"category": "Romance"})
+        
+        assert direct["data"]["search_results"] == via_graph["data"]["search_results"]
+    
+    async def test_create_order_updates_session(self, catalog, monkeypatch):
+        """create_order grava o checkout na sessao para o fluxo seguinte."""
+        monkeypatch.setattr(graph_module, "store_graph", FailingGraph())
+        runner = StoreAgentRunner()
+        
+        result = await runner.process_a2a_request("s-order", "agent", "create_order", {
+            "items": [{"product_id": "book_x", "title": "Livro", "price": 5000, "quantity": 2}],
+            "buyer": {"name": "Agente", "email": "agente@example.com"},
+        })
+        
+        session = runner.store.get(runner.NAMESPACE, "s-order")
+        assert result["data"]["checkout_session_id"].startswith("sess_")
+        assert session["checkout_session_id"] == result["data"]["checkout_session_id"]
+        assert session["cart_total"] == 10000
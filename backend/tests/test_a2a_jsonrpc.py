@@ -0,0 +1,92 @@
+"""Testes do endpoint A2A JSON-RPC (message/send, message/stream)."""
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.agents import llm as llm_module
+from src.agents.a2a.jsonrpc import TaskStream, router
+from src.agents.nodes import discovery
+from src.db.products import products_repo
+from src.ucp_server.models.book import BookCreate
+
+
+@pytest.fixture
+async def client(temp_databases, monkeypatch):
+    monkeypatch.setattr(llm_module, "get_llm", lambda: None)
+    monkeypatch.setattr(discovery, "is_llm_enabled", lambda: False)
+    for title in ("Python Fluente", "Python para Dados"):
+        await products_repo.create(
+            BookCreate(title=title, author="Autor", price=5000, category="Python", stock=3)
+        )
+    
+    app = FastAPI()
+    app.include_router(router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+def _rpc(method: str, params: dict) -> dict:
+    return {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+
+
+def _message(*parts) -> dict:
+    return {"message": {"kind": "message", "messageId": "m1", "role": "user", "parts": list(parts)}}
+
+
+class TestA2AJsonRpc:
+    """Testes do JSON-RPC A2A."""
+    
+    async def test_stream_results_before_narration(self, client):
+        """message/stream: Task, working, resultados, narracao e status final."""
+        events = []
+        async with client.stream(
+            "POST", "/a2a", json=_rpc("message/stream", _message({"kind": "text", "text": "livros de python"}))
+        ) as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    events.append(json.loads(line[6:])["result"])
+        
+        kinds = [e["kind"] for e in events]
+        assert kinds[:2] == ["task", "status-update"]
+        names = [e["artifact"]["name"] for e in events if e["kind"] == "artifact-update"]
+        assert names.index("search_results") < names.index("narration")
+        first = next(e for e in events if e["kind"] == "artifact-update")
+        assert first["artifact"]["parts"][0]["data"]["books"]
+        assert events[-1]["status"]["state"] == "completed" and events[-1]["final"]
+    
+    async def test_send_structured_action_and_get(self, client):
+        """message/send com parte data usa o handler A2A; tasks/get retorna o Task."""
+        response = await client.post("/a2a", json=_rpc("message/send", _message(
+            {"kind": "data", "data": {"action": "list_categories"}}
+        )))
+        
+        task = response.json()["result"]
+        assert task["status"]["state"] == "completed"
+        assert task["artifacts"][0]["parts"][0]["data"]["categories"] == ["Python"]
+        
+        fetched = await client.post("/a2a", json=_rpc("tasks/get", {"id": task["id"]}))
+        assert fetched.json()["result"]["id"] == task["id"]
+    
+    async def test_errors(self, client):
+        """Metodo desconhecido, params invalidos e task inexistente."""
+        unknown = await client.post("/a2a", json=_rpc("foo/bar", {}))
+        invalid = await client.post("/a2a", json=_rpc("message/send", {}))
+        missing = await client.post("/a2a", json=_rpc("tasks/get", {"id": "nao-existe"}))
+        
+        assert unknown.json()["error"]["code"] == -32601
+        assert invalid.json()["error"]["code"] == -32602
+        assert missing.json()["error"]["code"] == -32001
+    
+    async def test_client_disconnect_cancels_task(self, client):
+        """Stream abandonado no meio: o Task gravado termina em canceled."""
+        stream = TaskStream(_message({"kind": "text", "text": "livros de python"})["message"])
+        events = stream.run()
+        assert (await events.__anext__())["kind"] == "task"
+        assert (await events.__anext__())["status"]["state"] == "working"
+        await events.aclose()
+        
+        fetched = await client.post("/a2a", json=_rpc("tasks/get", {"id": stream.id}))
+        assert fetched.json()["result"]["status"]["state"] == "canceled"
@@ -0,0 +1,196 @@
+"""Testes do pipeline A2A (requisicoes concorrentes por conexao) e do a2a.batch."""
+import asyncio
+
+import pytest
+
+from src.agents.a2a import A2AHandler, A2AMessage, A2AMessageType, A2APipeline, a2a_protocol
+from src.agents.a2a import handler as handler_module
+from src.config import settings
+
+
+class SlowHandler:
+    """Handler que registra a ordem de inicio/fim e atrasa por acao."""
+    
+    def __init__(self, delays):
+        self.delays = delays
+        self.events = []
+        self.active = 0
+        self.max_active = 0
+    
+    async def handle_message(self, message, session_id):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        self.events.append(("start", message.message_id))
+        await asyncio.sleep(self.delays.get(message.action, 0))
+        self.events.append(("end", message.message_id))
+        self.active -= 1
+        return a2a_protocol.create_response(message, status="success", payload={})
+
+
+def _request(message_id: str, action: str) -> A2AMessage:
+    return A2AMessage(type=A2AMessageType.REQUEST, message_id=message_id, action=action)
+
+
+class TestA2APipeline:
+    """Testes de concorrencia, correlacao e ordem."""
+    
+    async def test_slow_order_does_not_block_ping(self):
+        """Ping enviado depois de um create_order lento deve responder antes."""
+        sent = []
+        handler = SlowHandler({"create_order": 0.1})
+        pipeline = A2APipeline("s1", send=sent.append, handler=handler)
+        
+        await pipeline.submit(_request("m1", "search"))
+        await pipeline.submit(_request("m2", "create_order"))
+        await pipeline.submit(_request("m3", "search"))
+        await pipeline.submit(_request("m4", "ping"))
+        await pipeline.drain()
+        
+        ids = [r["message_id"] for r in sent]
+        assert sorted(ids) == ["m1", "m2", "m3", "m4"]
+        assert ids.index("m4") < ids.index("m2")
+        # Busca apos a barreira le a sessao ja atualizada pelo pedido
+        assert ids.index("m2") < ids.index("m3")
+    
+    async def test_unordered_requests_run_concurrently(self):
+        """Buscas independentes devem executar em paralelo."""
+        sent = []
+        handler = SlowHandler({"search": 0.05})
+        pipeline = A2APipeline("s1", send=sent.append, handler=handler)
+        
+        for i in range(5):
+            await pipeline.submit(_request(f"m{i}", "search"))
+        await pipeline.drain()
+        
+        assert handler.max_active == 5
+        assert len(sent) == 5
+    
+    async def test_ordered_actions_keep_arrival_order(self):
+        """Pedido/checkout devem executar na ordem de chegada."""
+        handler = SlowHandler({"create_order": 0.03, "get_checkout": 0.0})
+        pipeline = A2APipeline("s1", send=lambda r: None, handler=handler)
+        
+        await pipeline.submit(_request("m1", "create_order"))
+        await pipeline.submit(_request("m2", "search"))
+        await pipeline.submit(_request("m3", "complete_checkout"))
+        await pipeline.drain()
+        
+        assert handler.events.index(("end", "m1")) < handler.events.index(("start", "m2"))
+        assert handler.events.index(("end", "m2")) < handler.events.index(("start", "m3"))
+    
+    async def test_in_flight_limit(self):
+        """Limite de requisicoes em voo deve ser respeitado."""
+        handler = SlowHandler({"search": 0.02})
+        pipeline = A2APipeline("s1", send=lambda r: None, max_in_flight=2, handler=handler)
+        
+        for i in range(6):
+            await pipeline.submit(_request(f"m{i}", "search"))
+        await pipeline.drain()
+        
+        assert handler.max_active == 2
+    
+    async def test_malformed_batch_answers_error_without_leaking_slot(self):
+        """Lote malformado vira erro do handler; a vaga volta para o pipeline."""
+        sent = []
+        pipeline = A2APipeline("s1", send=sent.append, max_in_flight=1, handler=A2AHandler())
+        
+        for i, requests in enumerate(("abc", ["abc"], [{"action": "ping"}])):
+            message = A2AMessage(type=A2AMessageType.BATCH, message_id=f"b{i}", payload={"requests": requests})
+            await asyncio.wait_for(pipeline.submit(message), timeout=1.0)
+        await pipeline.drain()
+        
+        assert [r["type"] for r in sent] == ["a2a.error", "a2a.error", "a2a.response"]
+
+
+class FakeRunner:
+    """Runner que atrasa cada acao delegada."""
+    
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+    
+    async def process_a2a_request(self, session_id, agent_id, action, payload):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        if payload.get("fail"):
+            raise ValueError("boom")
+        return {"status": "success", "data": {"action": action, "query": payload.get("query")}}
+
+
+class TestA2ABatch:
+    """Testes da mensagem a2a.batch."""
+    
+    @pytest.fixture
+    def runner(self, monkeypatch):
+        runner = FakeRunner()
+        monkeypatch.setattr(handler_module, "store_agent_runner", runner)
+        return runner
+    
+    async def test_batch_runs_items_concurrently(self, runner):
+        """Sub-requisicoes independentes executam em paralelo, resultados na ordem do lote."""
+        message = A2AMessage(
+            type=A2AMessageType.BATCH,
+            message_id="b1",
+            payload={"requests": [
+                {"action": "search", "payload": {"query": q}} for q in ("python", "ia", "dados")
+            ] + [{"message_id": "p", "action": "ping"}]},
+        )
+        
+        response = await A2AHandler().handle_message(message, "s1")
+        
+        results = response.payload["results"]
+        assert response.status == "success"
+        assert [r["payload"].get("query") for r in results[:3]] == ["python", "ia", "dados"]
+        assert results[0]["message_id"] == "b1:0"
+        assert results[3]["message_id"] == "p" and results[3]["payload"]["pong"]
+        assert runner.max_active == 3
+    
+    async def test_batch_per_item_status(self, runner):
+        """Falha de um item nao derruba o lote."""
+        message = A2AMessage(
+            type=A2AMessageType.BATCH,
+            payload={"requests": [
+                {"action": "search", "payload": {"query": "ok"}},
+                {"action": "search", "payload": {"fail": True}},
+                {"action": "nao_existe"},
+            ]},
+        )
+        
+        response = await A2AHandler().handle_message(message, "s1")
+        
+        statuses = [r["status"] for r in response.payload["results"]]
+        assert statuses == ["success", "error", "error"]
+        assert response.status == "partial"
+    
+    async def test_batch_orders_around_create_order(self, runner):
+        """create_order no lote executa sozinho, entre os grupos concorrentes."""
+        message = A2AMessage(
+            type=A2AMessageType.BATCH,
+            payload={"requests": [
+                {"action": "search", "payload": {"query": "a"}},
+                {"action": "create_order", "payload": {}},
+                {"action": "search", "payload": {"query": "b"}},
+            ]},
+        )
+        
+        response = await A2AHandler().handle_message(message, "s1")
+        
+        assert len(response.payload["results"]) == 3
+        assert runner.max_active == 1
+    
+    async def test_batch_limit(self, runner, monkeypatch):
+        """Lote vazio ou acima do limite deve ser recusado."""
+        monkeypatch.setattr(settings, "a2a_batch_max_items", 2)
+        handler = A2AHandler()
+        
+        empty = await handler.handle_message(A2AMessage(type=A2AMessageType.BATCH), "s1")
+        large = await handler.handle_message(
+            A2AMessage(type=A2AMessageType.BATCH, payload={"requests": [{"action": "ping"}] * 3}),
+            "s1",
+        )
+        
+        assert empty.type == A2AMessageType.ERROR
+        assert "too large" in large.error
@@ -0,0 +1,155 @@
+"""Testes do admission control adaptativo."""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from src.resilience import admission
+from src.resilience.admission import (
+    AdmissionClassConfig,
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejected,
+    AdaptiveLimiter,
+    classify_request,
+)
+
+
+def _config(name: str = "test", priority: int = 0, **overrides) -> AdmissionClassConfig:
+    values = dict(
+        name=name, priority=priority, initial_limit=2, min_limit=1, max_limit=10,
+        target_latency=0.1, max_queue=2, queue_timeout=0.05,
+    )
+    values.update(overrides)
+    return AdmissionClassConfig(**values)
+
+
+class TestAdaptiveLimiter:
+    """Testes do AdaptiveLimiter."""
+    
+    async def test_queue_then_reject(self):
+        """Acima do limite deve enfileirar e rejeitar rapido apos timeout."""
+        limiter = AdaptiveLimiter(_config())
+        await limiter.acquire()
+        await limiter.acquire()
+        
+        with pytest.raises(AdmissionRejected) as exc:
+            await limiter.acquire()
+        
+        assert exc.value.retry_after >= 1
+        assert limiter.rejected == 1
+        assert limiter.in_flight == 2
+    
+    async def test_release_wakes_by_priority(self):
+        """Vaga liberada deve ir primeiro para a maior prioridade."""
+        limiter = AdaptiveLimiter(_config(initial_limit=1, queue_timeout=1.0))
+        await limiter.acquire()
+        order = []
+        
+        async def wait(priority):
+            await limiter.acquire(priority)
+            order.append(priority)
+        
+        low = asyncio.create_task(wait(1))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(wait(0))
+        await asyncio.sleep(0)
+        
+        limiter.release(None)
+        await asyncio.sleep(0.01)
+        limiter.release(None)
+        await asyncio.gather(low, high)
+        
+        assert order == [0, 1]
+    
+    async def test_aimd_adjustment(self):
+        """Latencia alta reduz o limite; latencia baixa saturada aumenta."""
+        limiter = AdaptiveLimiter(_config(initial_limit=4))
+        
+        limiter.in_flight = 1
+        limiter.release(latency=1.0)
+        assert limiter.limit == pytest.approx(3.6)
+        
+        limiter.in_flight = 3
+        limiter.release(latency=0.01)
+        assert limiter.limit == pytest.approx(3.6 + 1 / 3.6)
+
+
+class TestAdmissionController:
+    """Testes de prioridade entre classes."""
+    
+    async def test_lower_class_shed_while_higher_queued(self):
+        """Chat deve ser descartado enquanto checkout tem fila."""
+        controller = AdmissionController({
+            "checkout": _config("checkout", priority=0, initial_limit=1, queue_timeout=1.0),
+            "chat": _config("chat", priority=2, initial_limit=5),
+        })
+        checkout = await controller.acquire("checkout")
+        waiting = asyncio.create_task(controller.acquire("checkout"))
+        await asyncio.sleep(0)
+        
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("chat")
+        
+        checkout.release(None)
+        await waiting
+        assert (await controller.acquire("chat")).in_flight == 1
+    
+    def test_classify_request(self):
+        """Rotas devem ser classificadas com prioridade para conclusao."""
+        assert classify_request("POST", "/checkout-sessions/s1/complete") == ("checkout", 0)
+        assert classify_request("POST", "/api/ucp/checkout-sessions") == ("checkout", 1)
+        assert classify_request("GET", "/books/search") == ("catalog", 1)
+        assert classify_request("POST", "/api/chat") == ("chat", 1)
+        assert classify_request("POST", "/api/a2a") == ("chat", 1)
+        assert classify_request("POST", "/a2a") == ("chat", 1)
+        assert classify_request("GET", "/api/a2a/agents") == ("catalog", 1)
+        assert classify_request("GET", "/health") is None
+    
+    async def test_streaming_holds_slot_until_body_ends(self, monkeypatch):
+        """Vaga de resposta em streaming so e liberada no fim do corpo."""
+        controller = AdmissionController()
+        monkeypatch.setattr(admission, "_admission_controller", controller)
+        catalog = controller.limiters["catalog"]
+        seen = []
+        
+        async def body():
+            for chunk in (b"a", b"b"):
+                seen.append(catalog.in_flight)
+                yield chunk
+        
+        app = FastAPI()
+        app.add_middleware(AdmissionMiddleware)
+        app.get("/books/export")(lambda: StreamingResponse(body()))
+        
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/books/export")
+        
+        assert response.content == b"ab"
+        assert seen == [1, 1]
+        assert catalog.in_flight == 0
+        assert catalog.admitted == 1
+    
+    async def test_slow_export_does_not_lower_limit(self, monkeypatch):
+        """Export NDJSON longo nao deve reduzir o limite do catalogo."""
+        controller = AdmissionController({"catalog": _config("catalog", target_latency=0.01)})
+        monkeypatch.setattr(admission, "_admission_controller", controller)
+        catalog = controller.limiters["catalog"]
+        
+        async def body():
+            await asyncio.sleep(0.05)
+            yield b"{}\n"
+        
+        app = FastAPI()
+        app.add_middleware(AdmissionMiddleware)
+        app.get("/books/export")(lambda: StreamingResponse(body(), media_type="application/x-ndjson"))
+        
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/books/export")
+        
+        assert catalog.decreases == 0
+        assert catalog.in_flight == 0
@@ -0,0 +1,73 @@
+"""Testes da compactacao do historico dos Store Agents."""
+from src.agents.state import (
+    MAX_HISTORY_MESSAGES,
+    MAX_SUMMARY_CHARS,
+    TURN_MESSAGE_HEADROOM,
+    Message,
+    add_messages_window,
+    compact_history,
+    create_initial_state,
+    get_last_user_message,
+)
+
+
+def _msg(content: str, type: str = "user") -> Message:
+    return Message(role=type, content=content, type=type, metadata=None)
+
+
+class TestHistoryWindow:
+    """Testes da janela de mensagens e do resumo acumulado."""
+    
+    def test_reducer_keeps_window(self):
+        """Reducer deve manter apenas as mensagens mais recentes."""
+        left = [_msg(f"m{i}") for i in range(MAX_HISTORY_MESSAGES)]
+        
+        merged = add_messages_window(left, [_msg("nova")])
+        
+        assert len(merged) == MAX_HISTORY_MESSAGES
+        assert merged[-1]["content"] == "nova"
+        assert merged[0]["content"] == "m1"
+    
+    def test_compact_moves_oldest_to_summary(self):
+        """Com a janela cheia, a metade antiga deve ir para o resumo."""
+        messages = [_msg(f"m{i}") for i in range(MAX_HISTORY_MESSAGES)]
+        
+        history, summary = compact_history(messages, None)
+        
+        assert len(history) == MAX_HISTORY_MESSAGES // 2
+        assert summary.splitlines()[0] == "user: m0"
+        assert compact_history(history, summary) == (history, summary)
+    
+    def test_turn_never_truncates_unsummarized_messages(self):
+        """Com 39 mensagens, o turno (usuario + agente) nao perde a mais antiga."""
+        messages = [_msg(str(i)) for i in range(MAX_HISTORY_MESSAGES - 1)]
+        
+        history, summary = compact_history(messages, None)
+        merged = add_messages_window(history, [_msg("nova"), _msg("resposta", "agent")])
+        
+        assert summary.splitlines()[0] == "user: 0"
+        assert len(merged) <= MAX_HISTORY_MESSAGES
+        short = [_msg(str(i)) for i in range(MAX_HISTORY_MESSAGES - TURN_MESSAGE_HEADROOM)]
+        assert compact_history(short, None) == (short, None)
+    
+    def test_summary_is_bounded(self):
+        """Resumo nao deve crescer alem de MAX_SUMMARY_CHARS."""
+        summary = None
+        messages = []
+        for turn in range(2000):
+            messages, summary = compact_history(messages, summary)
+            messages = messages + [_msg(f"turno {turn} " + "x" * 300)]
+        
+        assert len(messages) <= MAX_HISTORY_MESSAGES
+        assert len(summary) <= MAX_SUMMARY_CHARS
+        assert summary.startswith("user: turno")
+    
+    def test_last_user_message_index(self):
+        """Indice deve ter precedencia; sem ele, busca do fim do historico."""
+        state = create_initial_state("s1")
+        state["messages"] = [_msg("primeira"), _msg("resposta", "agent")]
+        
+        assert get_last_user_message(state) == "primeira"
+        
+        state["last_user_message"] = "segunda"
+        assert get_last_user_message(state) == "segunda"
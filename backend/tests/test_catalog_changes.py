@@ -0,0 +1,154 @@
+"""Testes do change feed do catalogo."""
+from src.db.products import products_repo
+from src.ucp_server.models.book import BookCreate
+
+
+def _book(title: str, price: int = 1000, stock: int = 5, category: str = "Teste") -> BookCreate:
+    return BookCreate(title=title, author="Autor", price=price, category=category, stock=stock)
+
+
+class TestCatalogChanges:
+    """Testes do ProductsRepository.get_changes."""
+    
+    async def test_insert_returns_full_book(self, temp_databases):
+        """Livro novo deve vir como upsert com registro completo."""
+        book = await products_repo.create(_book("Livro A"))
+        
+        changes = await products_repo.get_changes(since=0)
+        
+        assert [c.op for c in changes.changes] == ["upsert"]
+        assert changes.changes[0].book.id == book.id
+        assert changes.version == await products_repo.get_catalog_version()
+    
+    async def test_update_only_changed_fields(self, temp_databases):
+        """Alteracoes de estoque e preco devem trazer apenas os campos alterados."""
+        products_db, _ = temp_databases
+        book = await products_repo.create(_book("Livro B"))
+        base = await products_repo.get_catalog_version()
+        
+        await products_repo.update_stock(book.id, -2)
+        await products_db.execute("UPDATE books SET price = 1500 WHERE id = ?", (book.id,))
+        
+        changes = await products_repo.get_changes(since=base)
+        
+        assert len(changes.changes) == 1
+        delta = changes.changes[0]
+        assert delta.op == "update"
+        assert delta.stock == 3
+        assert delta.price == 1500
+        assert delta.book is None
+    
+    async def test_noop_update_is_not_logged(self, temp_databases):
+        """Update sem mudanca de valor nao deve gerar alteracao."""
+        book = await products_repo.create(_book("Livro C"))
+        base = await products_repo.get_catalog_version()
+        
+        await products_repo.update_stock(book.id, 0)
+        
+        changes = await products_repo.get_changes(since=base)
+        assert changes.changes == []
+        assert changes.version == base
+    
+    async def test_delete_supersedes_previous_changes(self, temp_databases):
+        """Delete deve compactar alteracoes anteriores do mesmo livro."""
+        products_db, _ = temp_databases
+        book = await products_repo.create(_book("Livro D"))
+        await products_repo.update_stock(book.id, 1)
+        await products_db.execute("DELETE FROM books WHERE id = ?", (book.id,))
+        
+        changes = await products_repo.get_changes(since=0)
+        
+        assert [(c.op, c.id) for c in changes.changes] == [("delete", book.id)]
+    
+    async def test_pagination(self, temp_databases):
+        """Paginas devem encadear via version e has_more."""
+        for i in range(3):
+            await products_repo.create(_book(f"Livro {i}"))
+        
+        first = await products_repo.get_changes(since=0, limit=2)
+        assert first.has_more is True
+        assert len(first.changes) == 2
+        
+        second = await products_repo.get_changes(since=first.version, limit=2)
+        assert second.has_more is False
+        assert len(second.changes) == 1
+    
+    async def test_limit_is_clamped(self, temp_databases):
+        """limit <= 0 le uma linha: a versao nunca pula alteracoes pendentes."""
+        for i in range(3):
+            await products_repo.create(_book(f"Livro {i}"))
+        
+        for limit in (0, -1):
+            page = await products_repo.get_changes(since=0, limit=limit)
+            assert len(page.changes) == 1
+            assert page.has_more is True
+            assert page.version < await products_repo.get_catalog_version()
+    
+    async def test_existing_books_are_backfilled(self, temp_databases):
+        """Livros anteriores aos triggers devem entrar no feed como upsert."""
+        from src.db.database import init_databases
+        products_db, _ = temp_databases
+        book = await products_repo.create(_book("Legado"))
+        await products_db.execute("DROP TABLE catalog_changes")
+        
+        await init_databases()
+        await products_db.connect()
+        
+        changes = await products_repo.get_changes(since=0)
+        assert [(c.op, c.id) for c in changes.changes] == [("upsert", book.id)]
+    
+    async def test_retention_floor_requires_resync(self, temp_databases):
+        """Versoes anteriores ao piso de retencao pedem ressincronizacao."""
+        products_db, _ = temp_databases
+        book = await products_repo.create(_book("Livro E"))
+        await products_repo.update_stock(book.id, 1)
+        await products_repo.update_stock(book.id, 1)
+        await products_db.execute("UPDATE catalog_changes SET changed_at = '2000-01-01 00:00:00'")
+        
+        assert await products_repo.prune_changes(3600) == 2
+        floor = await products_repo.get_changes_floor()
+        
+        stale = await products_repo.get_changes(since=0)
+        assert stale.resync_required is True
+        assert (stale.version, stale.changes) == (0, [])
+        
+        fresh = await products_repo.get_changes(since=floor)
+        assert fresh.resync_required is False
+        assert fresh.version == await products_repo.get_catalog_version()
+
+
+class TestCatalogExport:
+    """Testes do export NDJSON do catalogo."""
+    
+    async def test_iter_books_crosses_batches(self, temp_databases):
+        """Iteracao em lotes deve retornar todos os livros uma unica vez."""
+        created = {(await products_repo.create(_book(f"Livro {i}"))).id for i in range(5)}
+        
+        seen = [b.id async for b in products_repo.iter_books(batch_size=2)]
+        
+        assert sorted(seen) == sorted(created)
+    
+    async def test_iter_books_since_version(self, temp_databases):
+        """Filtro por versao deve retornar apenas livros alterados."""
+        old = await products_repo.create(_book("Antigo"))
+        base = await products_repo.get_catalog_version()
+        new = await products_repo.create(_book("Novo"))
+        
+        seen = [b.id async for b in products_repo.iter_books(since=base)]
+        
+        assert seen == [new.id]
+        assert old.id not in seen
+    
+    async def test_export_stream_gzip(self, temp_databases):
+        """Stream gzip deve descomprimir para NDJSON valido."""
+        import gzip
+        import json
+        from src.ucp_server.routes.books import _export_stream
+        
+        await products_repo.create(_book("Livro A", category="Ficcao"))
+        await products_repo.create(_book("Livro B"))
+        
+        data = b"".join([chunk async for chunk in _export_stream("gzip", "ficcao", None)])
+        lines = gzip.decompress(data).decode().splitlines()
+        
+        assert [json.loads(line)["title"] for line in lines] == ["Livro A"]
@@ -0,0 +1,59 @@
+"""Testes do streaming de respostas do chat (StoreAgentRunner.stream_message)."""
+import itertools
+
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from src.agents import llm as llm_module
+from src.agents.graph import StoreAgentRunner
+from src.agents.nodes import discovery, orchestrator
+from src.db.products import products_repo
+from src.ucp_server.models.book import BookCreate
+
+NARRATION = "Encontrei otimos livros de Python para voce, comece pelo Python Fluente que e excelente!"
+
+
+@pytest.fixture
+async def catalog(temp_databases, monkeypatch):
+    # Intencao e termos de busca por regras; so a resposta usa o LLM (fake)
+    monkeypatch.setattr(orchestrator, "is_llm_enabled", lambda: False)
+    monkeypatch.setattr(discovery, "get_llm", lambda: None)
+    await products_repo.create(
+        BookCreate(title="Python Fluente", author="Autor", price=5000, category="Python", stock=3)
+    )
+    return temp_databases
+
+
+class TestChatStreaming:
+    """Eventos parciais do chat."""
+    
+    async def test_results_then_tokens_then_done(self, catalog, monkeypatch):
+        """Progresso e resultados antes dos tokens; done com o estado final."""
+        model = GenericFakeChatModel(messages=itertools.repeat(AIMessage(content=NARRATION)))
+        monkeypatch.setattr(llm_module, "get_llm", lambda: model)
+        runner = StoreAgentRunner()
+        
+        events = [e async for e in runner.stream_message("s-stream", "buscar livros de python")]
+        types = [e["type"] for e in events]
+        
+        assert types[-1] == "done"
+        assert types.index("search_results") < types.index("token")
+        assert [e["stage"] for e in events if e["type"] == "progress"] == ["routing", "searching", "found", "writing"]
+        assert "".join(e["text"] for e in events if e["type"] == "token") == NARRATION
+        assert events[-1]["response"] == NARRATION
+        assert events[-1]["search_results"][0]["title"] == "Python Fluente"
+        assert runner.store.get(runner.NAMESPACE, "s-stream")["search_results"]
+    
+    async def test_without_llm_same_as_process_message(self, catalog, monkeypatch):
+        """Sem LLM nao ha tokens; done igual ao resultado de process_message."""
+        monkeypatch.setattr(llm_module, "get_llm", lambda: None)
+        runner = StoreAgentRunner()
+        
+        events = [e async for e in runner.stream_message("s1", "buscar livros de python")]
+        expected = await runner.process_message("s2", "buscar livros de python")
+        
+        assert not [e for e in events if e["type"] == "token"]
+        done = events[-1]
+        assert done["response"] == expected["response"]
+        assert done["search_results"] == expected["search_results"]
@@ -0,0 +1,113 @@
+"""Testes do codec MessagePack (A2A WebSocket e negociacao REST UCP)."""
+import httpx
+import msgpack
+import pytest
+from fastapi import FastAPI
+
+from src.agents.a2a.protocol import A2AMessage, A2AMessageType
+from src.db.products import products_repo
+from src.realtime.codec import (
+    A2A_JSON_SUBPROTOCOL,
+    A2A_MSGPACK_SUBPROTOCOL,
+    accepts_msgpack,
+    pack,
+    select_subprotocol,
+    unpack,
+)
+from src.ucp_server.models.book import BookCreate
+from src.ucp_server.models.checkout import CheckoutSession
+from src.ucp_server.routes.books import router as books_router
+from src.ucp_server.routes.checkout import router as checkout_router
+
+
+@pytest.fixture
+async def ucp_app(temp_databases):
+    book = await products_repo.create(
+        BookCreate(title="Python Fluente", author="Autor", price=5000, category="Python", stock=3)
+    )
+    app = FastAPI()
+    app.include_router(checkout_router)
+    app.include_router(books_router, prefix="/books")
+    app.state.book = book
+    return app
+
+
+def _client(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+class TestCodec:
+    """Round-trip e negociacao."""
+    
+    def test_a2a_message_round_trip(self):
+        """A2AMessage.to_dict/from_dict atravessa o codec sem perda."""
+        message = A2AMessage(
+            type=A2AMessageType.RESPONSE,
+            action="search",
+            payload={"books": [{"id": "book_001", "price": 4990, "tags": ["python"]}], "total": 1},
+            status="success",
+        )
+        
+        decoded = A2AMessage.from_dict(unpack(pack(message.to_dict())))
+        
+        assert decoded == message
+    
+    def test_checkout_session_round_trip(self):
+        """Modelos UCP (com datetime) voltam iguais apos o codec."""
+        session = CheckoutSession.model_validate({
+            "id": "sess_1",
+            "line_items": [{"item": {"id": "book_001", "title": "Livro", "price": 5000}, "quantity": 2}],
+            "buyer": {"full_name": "Agente", "email": "agente@example.com"},
+            "totals": [{"type": "total", "amount": 10000}],
+            "created_at": "2026-01-11T10:00:00",
+        })
+        
+        decoded = CheckoutSession.model_validate(unpack(pack(session.model_dump(mode="json"))))
+        
+        assert decoded == session
+    
+    def test_negotiation(self):
+        """Accept com q e escolha de subprotocolo."""
+        assert accepts_msgpack("application/msgpack")
+        assert accepts_msgpack("application/json;q=0.5, application/x-msgpack")
+        assert not accepts_msgpack("application/json, application/msgpack;q=0.8")
+        assert not accepts_msgpack("*/*")
+        assert select_subprotocol(["a2a.json", "a2a.msgpack"]) == A2A_MSGPACK_SUBPROTOCOL
+        assert select_subprotocol(["a2a.json"]) == A2A_JSON_SUBPROTOCOL
+        assert select_subprotocol([]) is None
+
+
+class TestMsgPackRoutes:
+    """Rotas UCP com Content-Type/Accept MessagePack."""
+    
+    async def test_create_checkout_msgpack(self, ucp_app):
+        """Body e resposta em MessagePack no mesmo endpoint JSON."""
+        body = {
+            "line_items": [{"item": {"id": ucp_app.state.book.id, "title": "x"}, "quantity": 2}],
+            "buyer": {"full_name": "Agente", "email": "agente@example.com"},
+        }
+        async with _client(ucp_app) as client:
+            response = await client.post(
+                "/checkout-sessions",
+                content=msgpack.packb(body),
+                headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"},
+            )
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/msgpack"
+        session = CheckoutSession.model_validate(unpack(response.content))
+        assert session.line_items[0].item.price == 5000
+        assert sum(t.amount for t in session.totals if t.type == "total") == 10000
+    
+    async def test_json_clients_unchanged(self, ucp_app):
+        """Sem Accept msgpack a resposta continua JSON; body invalido da 400."""
+        async with _client(ucp_app) as client:
+            books = await client.get("/books")
+            packed = await client.get("/books", headers={"Accept": "application/msgpack"})
+            invalid = await client.post(
+                "/checkout-sessions", content=b"\xc1", headers={"Content-Type": "application/msgpack"}
+            )
+        
+        assert books.headers["content-type"] == "application/json"
+        assert unpack(packed.content) == books.json()
+        assert invalid.status_code == 400
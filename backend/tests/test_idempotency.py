@@ -0,0 +1,123 @@
+"""Testes da camada de idempotencia UCP."""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from src.ucp_server.idempotency import idempotency_middleware
+
+
+@pytest.fixture
+def counted_app(temp_databases):
+    """App minimo com endpoint de checkout que conta execucoes."""
+    app = FastAPI()
+    app.middleware("http")(idempotency_middleware)
+    app.state.calls = 0
+    
+    @app.post("/checkout-sessions")
+    async def create(request: Request):
+        app.state.calls += 1
+        await asyncio.sleep(0.05)
+        body = await request.json()
+        if body.get("fail"):
+            return JSONResponse(status_code=503, content={"detail": "unavailable"})
+        return JSONResponse(
+            content={"call": app.state.calls},
+            headers={"Location": f"/checkout-sessions/{app.state.calls}", "Vary": "Accept"},
+        )
+    
+    return app
+
+
+def _client(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+HEADERS = {"UCP-Agent": "agent-a", "idempotency-key": "key-1"}
+
+
+class TestIdempotency:
+    """Testes do idempotency_middleware."""
+    
+    async def test_retry_replays_stored_response(self, counted_app):
+        """Retry com mesma chave deve retornar resposta gravada sem reexecutar."""
+        async with _client(counted_app) as client:
+            first = await client.post("/checkout-sessions", json={"a": 1}, headers=HEADERS)
+            second = await client.post("/checkout-sessions", json={"a": 1}, headers=HEADERS)
+        
+        assert first.json() == second.json() == {"call": 1}
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert second.headers["Location"] == "/checkout-sessions/1"
+        assert second.headers["Vary"] == "Accept"
+        assert counted_app.state.calls == 1
+    
+    async def test_retry_with_other_format_is_rejected(self, counted_app):
+        """Bytes gravados em JSON nao sao servidos a quem pede MessagePack."""
+        async with _client(counted_app) as client:
+            await client.post("/checkout-sessions", json={"a": 1}, headers=HEADERS)
+            other = await client.post(
+                "/checkout-sessions",
+                json={"a": 1},
+                headers={**HEADERS, "Accept": "application/msgpack"},
+            )
+        
+        assert other.status_code == 422
+        assert counted_app.state.calls == 1
+    
+    async def test_concurrent_duplicates_execute_once(self, counted_app):
+        """Duplicatas concorrentes devem aguardar a primeira execucao."""
+        async with _client(counted_app) as client:
+            responses = await asyncio.gather(*[
+                client.post("/checkout-sessions", json={"a": 1}, headers=HEADERS)
+                for _ in range(5)
+            ])
+        
+        assert {r.status_code for r in responses} == {200}
+        assert all(r.json() == {"call": 1} for r in responses)
+        assert counted_app.state.calls == 1
+    
+    async def test_keys_are_scoped_per_agent(self, counted_app):
+        """A mesma chave de agentes diferentes nao deve colidir."""
+        async with _client(counted_app) as client:
+            await client.post("/checkout-sessions", json={"a": 1}, headers=HEADERS)
+            other = await client.post(
+                "/checkout-sessions",
+                json={"a": 1},
+                headers={**HEADERS, "UCP-Agent": "agent-b"},
+            )
+        
+        assert other.json() == {"call": 2}
+    
+    async def test_different_payload_is_rejected(self, counted_app):
+        """Reuso da chave com outro payload deve retornar 422."""
+        async with _client(counted_app) as client:
+            await client.post("/checkout-sessions", json={"a": 1}, headers=HEADERS)
+            response = await client.post("/checkout-sessions", json={"a": 2}, headers=HEADERS)
+        
+        assert response.status_code == 422
+        assert counted_app.state.calls == 1
+    
+    async def test_server_error_releases_key(self, counted_app):
+        """Resposta 5xx nao deve ser gravada."""
+        async with _client(counted_app) as client:
+            first = await client.post("/checkout-sessions", json={"fail": True}, headers=HEADERS)
+            second = await client.post("/checkout-sessions", json={"fail": True}, headers=HEADERS)
+        
+        assert first.status_code == second.status_code == 503
+        assert counted_app.state.calls == 2
+    
+    async def test_janitor_purges_expired_keys(self, temp_databases):
+        """Chaves expiradas devem sair na varredura periodica do janitor."""
+        from src.db.idempotency import idempotency_repo
+        from src.db.session_store import SessionJanitor
+        
+        await idempotency_repo.claim("agent-a", "old", "fp", ttl_seconds=-1, lock_timeout=30)
+        await idempotency_repo.claim("agent-a", "new", "fp", ttl_seconds=60, lock_timeout=30)
+        janitor = SessionJanitor()
+        janitor.add("idempotency_keys", idempotency_repo.purge_expired)
+        
+        assert await janitor.run_once() == 1
+        assert await idempotency_repo.get("agent-a", "old") is None
+        assert await idempotency_repo.get("agent-a", "new") is not None
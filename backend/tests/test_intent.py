@@ -0,0 +1,133 @@
+"""Testes do classificador local de intencao e da escalada para o LLM."""
+import json
+
+import pytest
+
+from src.agents import intent as intent_module
+from src.agents.intent import (
+    HashedIntentClassifier,
+    IntentCache,
+    IntentTrainer,
+    get_intent_classifier,
+    normalize,
+    seed_examples,
+)
+from src.agents.nodes import orchestrator
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    """Cache vazio e LLM fake que registra as chamadas."""
+    calls = []
+    
+    async def fake_llm(message):
+        calls.append(message)
+        return "discount"
+    
+    monkeypatch.setattr(intent_module, "_cache", IntentCache(100))
+    monkeypatch.setattr(intent_module, "_classifier", HashedIntentClassifier().fit(seed_examples()))
+    monkeypatch.setattr(orchestrator, "is_llm_enabled", lambda: True)
+    monkeypatch.setattr(orchestrator, "detect_intent_with_llm", fake_llm)
+    return calls
+
+
+class TestIntentClassifier:
+    """Classificador hashed n-gram e detect_intent em niveis."""
+    
+    def test_held_out_phrases(self):
+        """Frases fora das seeds sao classificadas com confianca."""
+        classifier = HashedIntentClassifier().fit(seed_examples())
+        held_out = {
+            "Vou levar esse aqui": "buy",
+            "quero pagar com pix": "checkout",
+            "aplica o desconto": "discount",
+            "mostra meu carrinho": "cart",
+            "me recomenda algo de fantasia": "recommend",
+            "procurar livros de java": "search",
+            "Olá, bom dia!": "help",
+        }
+        
+        for message, expected in held_out.items():
+            intent, confidence = classifier.predict(message)
+            assert intent == expected, message
+            assert confidence >= 0.6, message
+        
+        assert classifier.predict("asdkj qwe")[1] < 0.6
+        assert normalize("  Olá,   BOM dia!! ") == "ola bom dia"
+    
+    async def test_confident_prediction_skips_llm_and_is_cached(self, detector):
+        """Confiante: sem LLM; a mesma mensagem normalizada vem do cache."""
+        hits = intent_module.INTENT_CLASSIFICATIONS.get(tier="cache")
+        
+        assert await orchestrator.detect_intent("Adiciona no carrinho") == "cart"
+        assert await orchestrator.detect_intent("adiciona no carrinho!") == "cart"
+        
+        assert detector == []
+        assert intent_module.INTENT_CLASSIFICATIONS.get(tier="cache") == hits + 1
+    
+    async def test_low_confidence_escalates_and_logs(self, detector, monkeypatch, tmp_path):
+        """Baixa confianca vai ao LLM; o rotulo vai para o log de treino."""
+        log_path = tmp_path / "intent_log.jsonl"
+        monkeypatch.setattr(orchestrator.settings, "intent_training_log_path", str(log_path))
+        
+        assert await orchestrator.detect_intent("xpto 42") == "discount"
+        assert await orchestrator.detect_intent("XPTO 42") == "discount"
+        
+        assert detector == ["xpto 42"]
+        assert json.loads(log_path.read_text()) == {"message": "xpto 42", "intent": "discount"}
+        assert intent_module.load_training_log(str(log_path)) == [("xpto 42", "discount")]
+    
+    async def test_untrained_escalates(self, detector, monkeypatch):
+        """Sem modelo treinado (startup), nada e classificado localmente."""
+        monkeypatch.setattr(intent_module, "_classifier", None)
+        
+        assert get_intent_classifier().predict("adiciona no carrinho") == (None, 0.0)
+        assert await orchestrator.detect_intent("adiciona no carrinho") == "discount"
+        assert detector == ["adiciona no carrinho"]
+    
+    async def test_trainer_dedupes_log_and_persists(self, monkeypatch, tmp_path):
+        """Log sem duplicatas e limitado; pesos salvos e recarregados."""
+        monkeypatch.setattr(intent_module, "_classifier", None)
+        log_path, model_path = tmp_path / "log.jsonl", tmp_path / "model.json"
+        for message, intent in [("Xpto 1", "cart"), ("xpto 1!", "discount"), ("xpto 2", "cart"), ("xpto 3", "help")]:
+            intent_module.append_training_example(str(log_path), message, intent)
+        
+        assert intent_module.load_training_log(str(log_path), limit=2) == [("xpto 2", "cart"), ("xpto 3", "help")]
+        
+        trainer = IntentTrainer(str(log_path), str(model_path), log_limit=10)
+        assert await trainer.retrain_if_needed() is True
+        assert await trainer.retrain_if_needed() is False
+        assert len(log_path.read_text().splitlines()) == 3
+        
+        trained = get_intent_classifier()
+        monkeypatch.setattr(intent_module, "_classifier", None)
+        reloaded = IntentTrainer(str(log_path), str(model_path))
+        await reloaded.start()
+        await reloaded.stop()
+        loaded = get_intent_classifier()
+        
+        assert loaded.classes == trained.classes
+        assert loaded.predict("mostra meu carrinho")[0] == trained.predict("mostra meu carrinho")[0] == "cart"
+    
+    async def test_append_during_training_is_kept(self, monkeypatch, tmp_path):
+        """Exemplo gravado durante o fit sobrevive e dispara novo treino; cache limpo."""
+        monkeypatch.setattr(intent_module, "_classifier", None)
+        monkeypatch.setattr(intent_module, "_cache", IntentCache(100))
+        log_path = tmp_path / "log.jsonl"
+        intent_module.append_training_example(str(log_path), "xpto 1", "cart")
+        intent_module.get_intent_cache().put("xpto 1", "help")
+        
+        fit = HashedIntentClassifier.fit
+        
+        def fit_with_append(classifier, examples):
+            intent_module.append_training_example(str(log_path), "xpto 2", "help")
+            return fit(classifier, examples)
+        
+        monkeypatch.setattr(HashedIntentClassifier, "fit", fit_with_append)
+        trainer = IntentTrainer(str(log_path))
+        await trainer.retrain()
+        monkeypatch.setattr(HashedIntentClassifier, "fit", fit)
+        
+        assert intent_module.load_training_log(str(log_path)) == [("xpto 1", "cart"), ("xpto 2", "help")]
+        assert len(intent_module.get_intent_cache()) == 0
+        assert await trainer.retrain_if_needed() is True
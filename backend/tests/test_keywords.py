@@ -0,0 +1,64 @@
+"""Testes do matcher Aho-Corasick das regras de intencao."""
+import json
+import os
+
+from src.agents.keywords import KeywordMatcher, KeywordTable
+from src.agents.nodes.orchestrator import INTENT_KEYWORDS, detect_intent_rules
+
+
+class TestKeywordMatcher:
+    """Prioridade, precedencia de frases e recarga do arquivo."""
+    
+    def test_phrase_over_word_and_priority(self):
+        """Frase vence palavra; entre iguais vale a ordem da tabela."""
+        matcher = KeywordMatcher(INTENT_KEYWORDS)
+        
+        assert matcher.match("quero adicionar ao meu carrinho e pagar") == "cart"
+        assert matcher.match("adicionar e pagar") == "checkout"
+        assert matcher.match("me recomende algo parecido") == "recommend"
+        assert matcher.match("xyz") is None
+        assert detect_intent_rules("Usar CUPOM e FINALIZAR") == "checkout"
+        assert detect_intent_rules("xyz") == "search"
+    
+    def test_priority_only(self):
+        """Sem phrase_first, a primeira intencao da tabela vence."""
+        table = {"remove": ["remover"], "view": ["meu carrinho"]}
+        
+        assert KeywordMatcher(table, phrase_first=False).match("remover do meu carrinho") == "remove"
+        assert KeywordMatcher(table).match("remover do meu carrinho") == "view"
+    
+    def test_overlapping_keywords(self):
+        """Keywords sobrepostas e sufixos de outras (links de falha)."""
+        matcher = KeywordMatcher({"a": ["abcd"], "b": ["bc"], "c": ["cde"]})
+        
+        assert matcher.match("xabcdx") == "a"
+        assert matcher.match("xabcex") == "b"
+        assert matcher.match("abcde") == "a"
+        assert matcher.match("zcdez") == "c"
+    
+    def test_reload_from_file(self, tmp_path):
+        """Keywords do arquivo somam as do codigo; arquivo invalido mantem o automato."""
+        path = tmp_path / "keywords.json"
+        path.write_text(json.dumps({"checkout": ["bora fechar"], "wishlist": ["lista de desejos"]}))
+        table = KeywordTable({"checkout": ["pagar"]}, str(path), check_interval=0)
+        
+        assert table.match("bora fechar isso") == "checkout"
+        assert table.match("pagar") == "checkout"
+        assert table.match("minha lista de desejos") == "wishlist"
+        
+        path.write_text("{invalid")
+        os.utime(path, (1, 1))
+        assert table.match("minha lista de desejos") == "wishlist"
+        
+        path.write_text(json.dumps({"cart": [1]}))
+        os.utime(path, (1.5, 1.5))
+        assert table.match("minha lista de desejos") == "wishlist"
+        
+        path.write_text(json.dumps({"wishlist": ["favoritos"]}))
+        os.utime(path, (2, 2))
+        assert table.match("meus favoritos") == "wishlist"
+        assert table.match("lista de desejos") is None
+        
+        path.unlink()
+        assert table.match("meus favoritos") is None
+        assert table.match("pagar") == "checkout"
@@ -0,0 +1,56 @@
+"""Testes do pipeline de logging."""
+import io
+import json
+
+import pytest
+import structlog
+
+from src.observability.logs import AsyncLogWriter, EventSampler, LOG_EVENTS_DROPPED
+
+
+class TestLogPipeline:
+    """Testes de amostragem e escrita assincrona."""
+    
+    def test_sampler_keeps_one_in_n(self):
+        """Evento amostrado a 0.25 deve manter 1 a cada 4; demais passam."""
+        sampler = EventSampler({"Executing tool": 0.25})
+        kept = 0
+        for _ in range(8):
+            try:
+                sampler(None, "info", {"event": "Executing tool"})
+                kept += 1
+            except structlog.DropEvent:
+                pass
+        
+        assert kept == 2
+        assert sampler(None, "info", {"event": "Chat message"}) == {"event": "Chat message"}
+    
+    def test_sampler_never_drops_errors(self):
+        """Erros de eventos amostrados devem passar sempre."""
+        sampler = EventSampler({"UCP Request": 0.0})
+        
+        with pytest.raises(structlog.DropEvent):
+            sampler(None, "info", {"event": "UCP Request"})
+        assert sampler(None, "error", {"event": "UCP Request"})["event"] == "UCP Request"
+    
+    def test_writer_flushes_on_close(self):
+        """Linhas enfileiradas devem ser escritas ate o close."""
+        stream = io.StringIO()
+        writer = AsyncLogWriter(stream=stream, max_queue=100)
+        
+        for i in range(10):
+            writer.submit(json.dumps({"event": "tick", "i": i}))
+        writer.close()
+        
+        lines = stream.getvalue().splitlines()
+        assert [json.loads(line)["i"] for line in lines] == list(range(10))
+    
+    def test_writer_drops_when_full(self):
+        """Fila cheia deve descartar sem bloquear."""
+        writer = AsyncLogWriter(stream=io.StringIO(), max_queue=1)
+        writer.close()  # sem consumidor
+        before = LOG_EVENTS_DROPPED.get()
+        
+        assert writer.submit("a") is True
+        assert writer.submit("b") is False
+        assert LOG_EVENTS_DROPPED.get() == before + 1
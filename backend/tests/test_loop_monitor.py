@@ -0,0 +1,71 @@
+"""Testes do monitor de lag do event loop."""
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.observability.loop_monitor import (
+    EVENT_LOOP_BLOCKED,
+    BlockingCallError,
+    BlockingGuard,
+    LoopLagMonitor,
+    create_blocking_guard_middleware,
+)
+
+
+def _blocking_wallet_save():
+    time.sleep(0.15)
+
+
+class TestLoopMonitor:
+    """Testes de deteccao de bloqueio do event loop."""
+    
+    def test_guard_fails_blocking_request(self):
+        """Request que bloqueia o loop alem do limite deve falhar."""
+        app = FastAPI()
+        app.middleware("http")(create_blocking_guard_middleware(max_ms=50))
+        
+        @app.get("/blocking")
+        async def blocking():
+            _blocking_wallet_save()
+            return {"ok": True}
+        
+        @app.get("/async")
+        async def non_blocking():
+            await asyncio.sleep(0.1)
+            return {"ok": True}
+        
+        client = TestClient(app)
+        assert client.get("/async").status_code == 200
+        with pytest.raises(BlockingCallError):
+            client.get("/blocking")
+    
+    async def test_guard_measures_lag(self):
+        """Bloqueio dentro do guard deve aparecer em max_observed."""
+        with pytest.raises(BlockingCallError):
+            async with BlockingGuard(max_ms=50) as guard:
+                await asyncio.sleep(0.01)
+                _blocking_wallet_save()
+                await asyncio.sleep(0.01)
+        
+        assert guard.max_observed >= 0.1
+    
+    async def test_monitor_captures_blocking_stack(self):
+        """Watchdog deve registrar a stack da funcao que bloqueou."""
+        monitor = LoopLagMonitor("test-app", interval=0.01, block_threshold_ms=50)
+        before = EVENT_LOOP_BLOCKED.get(app="test-app")
+        monitor.start()
+        await asyncio.sleep(0.03)
+        
+        _blocking_wallet_save()
+        await asyncio.sleep(0.08)
+        await monitor.stop()
+        
+        assert EVENT_LOOP_BLOCKED.get(app="test-app") == before + 1
+        capture = monitor.captures[-1]
+        assert "_blocking_wallet_save" in "".join(capture["stack"])
+        # Duracao total do bloqueio (atualizada na volta do heartbeat), nao o limite
+        assert capture["ongoing"] is False
+        assert capture["blocked_ms"] >= 120
@@ -0,0 +1,85 @@
+"""Testes das metricas (formato Prometheus)."""
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+
+from src.observability.metrics import (
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    create_metrics_middleware,
+    metrics_endpoint,
+    timed,
+    HTTP_REQUEST_DURATION,
+)
+
+
+class TestMetrics:
+    """Testes do registro e da exposicao de metricas."""
+    
+    def test_histogram_exposition(self):
+        """Histograma deve expor buckets cumulativos, soma e contagem."""
+        registry = MetricsRegistry()
+        histogram = registry.register(Histogram("op_seconds", "Latencia", ["op"], buckets=(0.1, 1.0)))
+        
+        histogram.observe(0.05, op="a")
+        histogram.observe(0.5, op="a")
+        
+        text = registry.render()
+        assert '# TYPE op_seconds histogram' in text
+        assert 'op_seconds_bucket{op="a",le="0.1"} 1' in text
+        assert 'op_seconds_bucket{op="a",le="1"} 2' in text
+        assert 'op_seconds_bucket{op="a",le="+Inf"} 2' in text
+        assert 'op_seconds_count{op="a"} 2' in text
+    
+    def test_counter_escapes_labels(self):
+        """Valores de label devem ser escapados."""
+        registry = MetricsRegistry()
+        counter = registry.register(Counter("calls_total", "Chamadas", ["name"]))
+        
+        counter.inc(name='a"b')
+        
+        assert 'calls_total{name="a\\"b"} 1' in registry.render()
+    
+    async def test_timed_outcome(self):
+        """Decorator deve registrar resultado derivado do retorno e excecoes."""
+        histogram = Histogram("psp_seconds", "PSP", ["operation", "outcome"])
+        
+        @timed(histogram, outcome=lambda ok: "ok" if ok else "failed", operation="pay")
+        async def pay(ok: bool):
+            if ok is None:
+                raise RuntimeError("boom")
+            return ok
+        
+        await pay(True)
+        await pay(False)
+        with pytest.raises(RuntimeError):
+            await pay(None)
+        
+        assert histogram.get_count(operation="pay", outcome="ok") == 1
+        assert histogram.get_count(operation="pay", outcome="failed") == 1
+        assert histogram.get_count(operation="pay", outcome="error") == 1
+    
+    async def test_middleware_uses_route_template(self):
+        """Latencia deve ser agregada pelo template da rota."""
+        app = FastAPI()
+        router = APIRouter()
+        
+        @router.get("/{book_id}")
+        async def get_book(book_id: str):
+            return {"id": book_id}
+        
+        app.include_router(router, prefix="/books")
+        app.middleware("http")(create_metrics_middleware("test-app"))
+        app.get("/metrics")(metrics_endpoint)
+        
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/books/b1")
+            await client.get("/books/b2")
+            response = await client.get("/metrics")
+        
+        assert response.headers["content-type"].startswith("text/plain")
+        assert HTTP_REQUEST_DURATION.get_count(
+            app="test-app", method="GET", route="/books/{book_id}", status="200"
+        ) == 2
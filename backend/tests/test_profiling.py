@@ -0,0 +1,75 @@
+"""Testes do profiling sob demanda."""
+import marshal
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.config import settings
+from src.observability.profiling import router
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "debug_token", "s3cret")
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+class TestProfiling:
+    """Testes da rota /debug/profile."""
+    
+    def test_requires_token(self, client, monkeypatch):
+        """Token invalido = 403; sem token configurado = 404."""
+        assert client.get("/debug/profile?seconds=0.1").status_code == 403
+        assert client.get(
+            "/debug/profile?seconds=0.1", headers={"X-Debug-Token": "errado"}
+        ).status_code == 403
+        assert client.get(
+            "/debug/profile?seconds=0.1", headers={"X-Debug-Token": "sécret".encode("latin-1")}
+        ).status_code == 403
+        
+        monkeypatch.setattr(settings, "debug_token", "")
+        assert client.get(
+            "/debug/profile?seconds=0.1", headers={"X-Debug-Token": "s3cret"}
+        ).status_code == 404
+    
+    def test_wall_profile_collapsed(self, client):
+        """Modo wall deve retornar stacks collapsed amostradas."""
+        response = client.get(
+            "/debug/profile?seconds=0.2&mode=wall", headers={"X-Debug-Token": "s3cret"}
+        )
+        
+        data = response.json()
+        assert response.status_code == 200
+        assert data["samples"] > 0
+        stack, count = data["collapsed"].splitlines()[0].rsplit(" ", 1)
+        assert ";" in stack and int(count) > 0
+    
+    def test_pstats_file(self, client):
+        """format=pstats deve retornar arquivo carregavel pelo pstats."""
+        response = client.get(
+            "/debug/profile?seconds=0.1&mode=cpu&format=pstats",
+            headers={"X-Debug-Token": "s3cret"},
+        )
+        
+        assert response.headers["content-type"] == "application/octet-stream"
+        assert isinstance(marshal.loads(response.content), dict)
+    
+    def test_alloc_top(self, client):
+        """Modo alloc deve reportar o top de alocacoes."""
+        response = client.get(
+            "/debug/profile?seconds=0.1&mode=alloc&top=5", headers={"X-Debug-Token": "s3cret"}
+        )
+        
+        data = response.json()
+        assert len(data["allocations"]) <= 5
+        assert "peak" in data["traced_memory_kb"]
+    
+    def test_rejects_long_window(self, client):
+        """Janela acima do maximo configurado deve ser recusada."""
+        response = client.get(
+            "/debug/profile?seconds=3600", headers={"X-Debug-Token": "s3cret"}
+        )
+        assert response.status_code == 400
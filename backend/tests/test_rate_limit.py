@@ -0,0 +1,137 @@
+"""Testes do rate limiter (token bucket)."""
+import sqlite3
+
+import httpx
+from fastapi import FastAPI
+
+from src.resilience.rate_limit import (
+    RateLimiter,
+    MemoryBucketStorage,
+    SQLiteBucketStorage,
+)
+
+
+class TestRateLimiter:
+    """Testes do RateLimiter."""
+    
+    async def test_burst_then_limited(self):
+        """Deve permitir ate o burst e depois limitar com Retry-After."""
+        limiter = RateLimiter(MemoryBucketStorage())
+        
+        results = [await limiter.hit("tool:search_books", "agent-a", limit=60, burst=3) for _ in range(4)]
+        
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert results[-1].retry_after > 0
+        assert results[-1].headers()["Retry-After"] == "1"
+        assert limiter.get_stats() == {"tool:search_books": {"allowed": 3, "limited": 1}}
+    
+    async def test_callers_are_isolated(self):
+        """Um chamador nao deve consumir o bucket de outro."""
+        limiter = RateLimiter(MemoryBucketStorage())
+        
+        await limiter.hit("ucp", "agent-a", limit=60, burst=1)
+        blocked = await limiter.hit("ucp", "agent-a", limit=60, burst=1)
+        other = await limiter.hit("ucp", "agent-b", limit=60, burst=1)
+        
+        assert blocked.allowed is False
+        assert other.allowed is True
+    
+    async def test_sqlite_storage_shared(self, tmp_path):
+        """Storage SQLite deve compartilhar o bucket entre instancias."""
+        db_path = str(tmp_path / "rate_limits.db")
+        first = SQLiteBucketStorage(db_path)
+        second = SQLiteBucketStorage(db_path)
+        try:
+            limiter_a = RateLimiter(first)
+            limiter_b = RateLimiter(second)
+            
+            assert (await limiter_a.hit("ucp", "agent-a", limit=60, burst=2)).allowed
+            assert (await limiter_b.hit("ucp", "agent-a", limit=60, burst=2)).allowed
+            assert not (await limiter_a.hit("ucp", "agent-a", limit=60, burst=2)).allowed
+        finally:
+            first.close()
+            second.close()
+    
+    async def test_prune_uses_each_bucket_rate(self, monkeypatch, tmp_path):
+        """Prune remove so buckets cheios pela propria taxa; SQLite expira linhas."""
+        from src.resilience import rate_limit
+        clock = [1000.0]
+        monkeypatch.setattr(rate_limit.time, "monotonic", lambda: clock[0])
+        monkeypatch.setattr(rate_limit.time, "time", lambda: clock[0])
+        storage = MemoryBucketStorage(prune_interval=10.0)
+        
+        await storage.take("fast|a", capacity=1, rate=1.0)
+        await storage.take("slow|a", capacity=1, rate=1 / 60.0)
+        clock[0] += 11
+        await storage.take("other|b", capacity=1, rate=1.0)
+        
+        assert set(storage._buckets) == {"slow|a", "other|b"}
+        
+        db_path = str(tmp_path / "rate_limits.db")
+        sqlite_storage = SQLiteBucketStorage(db_path, prune_interval=10.0)
+        try:
+            await sqlite_storage.take("fast|a", capacity=1, rate=1.0)
+            await sqlite_storage.take("slow|a", capacity=1, rate=1 / 60.0)
+            clock[0] += 11
+            await sqlite_storage.take("other|b", capacity=1, rate=1.0)
+            conn = sqlite3.connect(db_path)
+            rows = conn.execute("SELECT key FROM rate_limit_buckets ORDER BY key").fetchall()
+            conn.close()
+            assert [row[0] for row in rows] == ["other|b", "slow|a"]
+        finally:
+            sqlite_storage.close()
+
+
+class TestMCPRateLimit:
+    """Testes do limite por ferramenta na rota HTTP do MCP."""
+    
+    async def test_tool_call_returns_429(self, monkeypatch):
+        """Chamador acima do rate_limit da ferramenta deve receber 429."""
+        from src.mcp import http_server
+        from src.mcp.registry import get_tool_registry
+        
+        limiter = RateLimiter(MemoryBucketStorage())
+        monkeypatch.setattr(http_server, "get_rate_limiter", lambda: limiter)
+        monkeypatch.setattr(get_tool_registry().get("list_categories"), "rate_limit", 8)
+        
+        async def fake_call_tool(name, arguments):
+            return []
+        monkeypatch.setattr(http_server, "call_tool", fake_call_tool)
+        
+        app = FastAPI()
+        app.include_router(http_server.router)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            statuses = [
+                (await client.post(
+                    "/mcp/tools/list_categories/call",
+                    json={"arguments": {}},
+                    headers={"UCP-Agent": "looping-agent"},
+                )).status_code
+                for _ in range(2)
+            ]
+            limited = await client.post(
+                "/mcp/tools/list_categories/call",
+                json={"arguments": {}},
+                headers={"UCP-Agent": "looping-agent"},
+            )
+        
+        assert statuses == [200, 200]
+        assert limited.status_code == 429
+        assert "Retry-After" in limited.headers
+    
+    async def test_unknown_tool_is_404_without_scope(self, monkeypatch):
+        """Ferramenta desconhecida nao deve criar escopo no rate limiter."""
+        from src.mcp import http_server
+        
+        limiter = RateLimiter(MemoryBucketStorage())
+        monkeypatch.setattr(http_server, "get_rate_limiter", lambda: limiter)
+        
+        app = FastAPI()
+        app.include_router(http_server.router)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/mcp/tools/no_such_tool/call", json={"arguments": {}})
+        
+        assert response.status_code == 404
+        assert limiter.get_stats() == {}
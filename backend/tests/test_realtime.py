@@ -0,0 +1,275 @@
+"""Testes da fila de saida WebSocket (backpressure) e dos eventos push."""
+import asyncio
+
+import pytest
+
+from src.db.products import products_repo
+from src.realtime import ChangeFeedTailer, EventBus, SlowConsumerPolicy, WebSocketOutbox, build_topics, unpack
+from src.ucp_server.models.book import BookCreate
+
+
+class FakeWebSocket:
+    """WebSocket em memoria com envio controlavel."""
+    
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.sent = []
+        self.closed_with = None
+        self.gate = asyncio.Event()
+        self.gate.set()
+    
+    async def send_json(self, message):
+        await self.gate.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("socket closed")
+        self.sent.append(message)
+    
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+async def _drain(outbox: WebSocketOutbox):
+    for _ in range(50):
+        if not outbox.depth:
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.01)
+
+
+class TestWebSocketOutbox:
+    """Testes das politicas para cliente lento."""
+    
+    async def test_drop_oldest(self):
+        """Fila cheia deve descartar o evento mais antigo e manter as respostas."""
+        ws = FakeWebSocket()
+        ws.gate.clear()
+        outbox = WebSocketOutbox(ws, "a2a", max_queue=3)
+        outbox.start()
+        
+        outbox.reply({"id": "r"})
+        for i in range(5):
+            outbox.publish({"id": i})
+        
+        assert outbox.dropped == 2
+        ws.gate.set()
+        await _drain(outbox)
+        assert ws.sent == [{"id": "r"}, {"id": 2}, {"id": 3}, {"id": 4}]
+        outbox.close_nowait()
+    
+    async def test_coalesce(self):
+        """Eventos com a mesma chave devem ser substituidos na fila."""
+        ws = FakeWebSocket()
+        ws.gate.clear()
+        outbox = WebSocketOutbox(ws, "a2a", max_queue=10, policy=SlowConsumerPolicy.COALESCE)
+        outbox.start()
+        
+        for price in (10, 11, 12):
+            outbox.publish({"book": "b1", "price": price}, coalesce_key="price:b1")
+        outbox.publish({"book": "b2", "price": 5}, coalesce_key="price:b2")
+        
+        assert outbox.depth == 2
+        ws.gate.set()
+        await _drain(outbox)
+        assert ws.sent == [{"book": "b1", "price": 12}, {"book": "b2", "price": 5}]
+        outbox.close_nowait()
+    
+    async def test_disconnect_slow_consumer(self):
+        """Politica disconnect deve fechar a conexao com 1013."""
+        ws = FakeWebSocket()
+        ws.gate.clear()
+        closed = []
+        outbox = WebSocketOutbox(
+            ws, "a2a", max_queue=2, policy="disconnect", on_close=closed.append
+        )
+        outbox.start()
+        
+        assert outbox.publish({"n": 1}) and outbox.publish({"n": 2})
+        assert not outbox.publish({"n": 3})
+        await asyncio.sleep(0.01)
+        
+        assert outbox.closed and closed == [outbox]
+        assert ws.closed_with == 1013
+        assert not outbox.publish({"n": 4})
+    
+    async def test_dead_socket_closes_outbox(self):
+        """Erro de envio deve encerrar o writer, fechar o socket e notificar on_close."""
+        ws = FakeWebSocket(fail=True)
+        closed = []
+        outbox = WebSocketOutbox(ws, "chat", on_close=closed.append)
+        outbox.start()
+        
+        outbox.publish({"n": 1})
+        await asyncio.sleep(0.02)
+        assert closed == [outbox]
+        assert ws.closed_with == 1013
+    
+    async def test_slow_consumer_does_not_block_others(self):
+        """Broadcast so enfileira: cliente travado nao atrasa os demais."""
+        stuck = FakeWebSocket()
+        stuck.gate.clear()
+        fast = FakeWebSocket()
+        outboxes = [WebSocketOutbox(stuck, "a2a"), WebSocketOutbox(fast, "a2a")]
+        for outbox in outboxes:
+            outbox.start()
+        
+        for i in range(20):
+            for outbox in outboxes:
+                outbox.publish({"n": i})
+        await _drain(outboxes[1])
+        
+        assert len(fast.sent) == 20
+        assert stuck.sent == []
+        for outbox in outboxes:
+            outbox.close_nowait()
+
+
+class TestEventBus:
+    """Testes de assinaturas e eventos push."""
+    
+    def _bus(self):
+        delivered = []
+        bus = EventBus(deliver=lambda sid, msg, key: delivered.append((sid, msg, key)) or True)
+        return bus, delivered
+    
+    def test_publish_to_matching_topics(self):
+        """Evento vai uma unica vez para cada conexao que assina algum topico."""
+        bus, delivered = self._bus()
+        bus.subscribe("s1", build_topics({"book_ids": ["b1"], "categories": ["Python"]}))
+        bus.subscribe("s2", build_topics({"book_ids": ["b2"]}))
+        
+        count = bus.publish(
+            "price.changed", {"book_id": "b1", "price": 10},
+            ["catalog", "book:b1", "category:python"], coalesce_key="price:b1",
+        )
+        
+        assert count == 1
+        sid, message, key = delivered[0]
+        assert (sid, key) == ("s1", "price:b1")
+        assert message["type"] == "a2a.event"
+        assert message["action"] == "price.changed"
+    
+    def test_unsubscribe(self):
+        """Unsubscribe sem topicos cancela tudo."""
+        bus, delivered = self._bus()
+        bus.subscribe("s1", ["book:b1", "checkout:c1"])
+        
+        assert bus.unsubscribe("s1", ["book:b1"]) == ["checkout:c1"]
+        assert bus.unsubscribe("s1") == []
+        assert not bus.active
+        assert bus.publish("order.status", {}, ["checkout:c1"]) == 0
+    
+    def test_topic_limit_per_connection(self):
+        """Conexao nao pode passar de max_topics assinaturas."""
+        bus = EventBus(max_topics=2)
+        bus.subscribe("s1", ["book:b1", "book:b2"])
+        
+        with pytest.raises(ValueError):
+            bus.subscribe("s1", ["book:b3"])
+        assert bus.subscribe("s1", ["book:b1"]) == ["book:b1", "book:b2"]
+    
+    async def test_checkout_subscription_requires_ownership(self, temp_databases):
+        """So checkouts criados pela sessao podem ser assinados."""
+        from src.agents.a2a import A2AHandler, A2AMessage, A2AMessageType
+        from src.agents.graph import store_agent_runner
+        from src.realtime import get_event_bus
+        
+        await store_agent_runner.store.aset("chat", "owner", {"checkout_ids": ["sess_1"]})
+        handler = A2AHandler()
+        
+        def subscribe(checkout_id):
+            return A2AMessage(
+                type=A2AMessageType.REQUEST, action="subscribe",
+                payload={"checkout_ids": [checkout_id]},
+            )
+        
+        try:
+            own = await handler.handle_message(subscribe("sess_1"), "owner")
+            foreign = await handler.handle_message(subscribe("sess_2"), "owner")
+            stranger = await handler.handle_message(subscribe("sess_1"), "stranger")
+        finally:
+            get_event_bus().unsubscribe("owner")
+            await store_agent_runner.clear_session("owner")
+        
+        assert own.payload["subscriptions"] == ["checkout:sess_1"]
+        assert foreign.type == A2AMessageType.ERROR
+        assert stranger.type == A2AMessageType.ERROR
+    
+    def test_invalid_topic(self):
+        """Topico desconhecido deve ser recusado."""
+        with pytest.raises(ValueError):
+            build_topics({"topics": ["preco:b1"]})
+    
+    async def test_tailer_publishes_catalog_and_checkout_changes(self, temp_databases):
+        """Alteracoes gravadas nos bancos viram eventos para os assinantes."""
+        products_db, transactions_db = temp_databases
+        book = await products_repo.create(
+            BookCreate(title="Livro", author="Autor", price=1000, category="Python", stock=5)
+        )
+        bus, delivered = self._bus()
+        tailer = ChangeFeedTailer(bus)
+        await tailer.start()
+        await tailer.stop()
+        bus.subscribe("s1", ["category:python", "checkout:sess_1"])
+        
+        await products_repo.update_stock(book.id, -2)
+        await products_db.execute("UPDATE books SET price = 900 WHERE id = ?", (book.id,))
+        await transactions_db.execute(
+            "INSERT INTO checkout_sessions (id, status, total) VALUES ('sess_1', 'ready_for_complete', 900)"
+        )
+        await transactions_db.execute(
+            "UPDATE checkout_sessions SET status = 'completed' WHERE id = 'sess_1'"
+        )
+        
+        assert await tailer.poll() == 4
+        payloads = {msg["action"]: msg["payload"] for _, msg, _ in delivered}
+        assert payloads["stock.changed"]["stock"] == 3
+        assert payloads["price.changed"]["price"] == 900
+        assert payloads["order.status"]["status"] == "completed"
+        assert await tailer.poll() == 0
+
+
+class TestWebSocketHandlers:
+    """Frames invalidos e erros de processamento nao vazam a conexao."""
+    
+    def test_invalid_frames_answer_error_and_cleanup(self):
+        """Erro por frame invalido; ao sair, outbox e presenca sao liberados."""
+        from starlette.testclient import TestClient
+        from src.main import app, manager
+        
+        client = TestClient(app)
+        with client.websocket_connect("/ws/a2a", subprotocols=["a2a.msgpack"]) as ws:
+            ws.send_text('{"type": "a2a.ping"}')
+            error = unpack(ws.receive_bytes())
+            assert error["type"] == "a2a.error"
+            assert "binary" in error["error"]
+            ws.send_bytes(b"\xc1")
+            assert unpack(ws.receive_bytes())["type"] == "a2a.error"
+        
+        with client.websocket_connect("/ws/a2a") as ws:
+            ws.send_text("[1, 2]")
+            assert ws.receive_json()["error"] == "Invalid frame: Frame must be an object"
+        
+        assert manager.a2a_connections == {}
+        assert manager.store.keys(manager.NAMESPACE) == []
+    
+    def test_chat_failure_keeps_connection(self, monkeypatch):
+        """Excecao do runner vira frame de erro; a conexao segue aberta."""
+        from starlette.testclient import TestClient
+        from src.main import app, manager, store_agent_runner
+        
+        async def failing(**kwargs):
+            raise RuntimeError("boom")
+            yield
+        
+        monkeypatch.setattr(store_agent_runner, "stream_message", failing)
+        with TestClient(app).websocket_connect("/ws/chat") as ws:
+            assert ws.receive_json()["type"] == "connected"
+            ws.send_text("{invalid")
+            assert ws.receive_json()["message"].startswith("Mensagem invalida")
+            ws.send_json({"message": "oi"})
+            assert ws.receive_json()["type"] == "error"
+        
+        assert manager.chat_connections == {}
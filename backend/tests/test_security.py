@@ -2,7 +2,8 @@
 import pytest
 from src.security.key_manager import KeyManager
 from src.security.ap2_security import AP2Security
-from src.security.signatures import RequestSigner, ConformanceHeaders
+from src.security.signatures import RequestSigner, ConformanceHeaders, canonical_body
+from src.security.verification import SignatureVerifier
 
 
 class TestKeyManager:
@@ -158,6 +159,134 @@ class TestRequestSigner:
         assert error is None
 
 
+class TestSignatureVerifier:
+    """Testes do SignatureVerifier."""
+    
+    def _signed(self, km: KeyManager, body: bytes):
+        signer = RequestSigner(key_manager=km)
+        headers = signer.sign_request(method="POST", path="/checkout-sessions", body=body)
+        headers["ucp-agent"] = "test-agent/1.0"
+        return headers
+    
+    async def test_verify_raw_body(self):
+        """Deve verificar a assinatura sobre os bytes brutos do corpo."""
+        km = KeyManager(key_id="agent-key")
+        verifier = SignatureVerifier(max_workers=1)
+        verifier.register_jwk(km.get_public_jwk())
+        
+        body = b'{"line_items": [], "currency": "BRL"}'
+        headers = self._signed(km, body)
+        
+        valid, error = await verifier.verify(headers, body, "POST", "/checkout-sessions")
+        assert valid is True
+        assert error is None
+        
+        valid, error = await verifier.verify(headers, body + b" ", "POST", "/checkout-sessions")
+        assert valid is False
+        assert error == "Invalid signature"
+    
+    async def test_payload_matches_canonical_body(self):
+        """Assinar payload deve equivaler a assinar o corpo canonico."""
+        km = KeyManager(key_id="agent-key")
+        verifier = SignatureVerifier(max_workers=1)
+        verifier.register_jwk(km.get_public_jwk())
+        
+        payload = {"b": 1, "a": 2}
+        headers = RequestSigner(key_manager=km).sign_request(
+            payload=payload, method="PUT", path="/checkout-sessions/x"
+        )
+        
+        valid, _ = await verifier.verify(headers, canonical_body(payload), "PUT", "/checkout-sessions/x")
+        assert valid is True
+    
+    async def test_unknown_key_is_cached(self):
+        """Key id desconhecido deve falhar e ficar em cache negativo."""
+        km = KeyManager(key_id="stranger-key")
+        verifier = SignatureVerifier(max_workers=1)
+        headers = self._signed(km, b"{}")
+        
+        valid, error = await verifier.verify(headers, b"{}", "POST", "/checkout-sessions")
+        assert valid is False
+        assert error == "Unknown key id"
+        
+        await verifier.verify(headers, b"{}", "POST", "/checkout-sessions")
+        assert verifier.stats["key_misses"] == 1
+        assert verifier.stats["key_hits"] == 1
+    
+    async def test_profile_keys_bound_to_origin(self, monkeypatch):
+        """Perfil de outra origem nao sobrescreve a chave de um key id."""
+        victim = KeyManager(key_id="shared-kid")
+        attacker = KeyManager(key_id="shared-kid")
+        profiles = {
+            "https://victim.example/.well-known/ucp": [victim.get_public_jwk()],
+            "https://attacker.example/.well-known/ucp": [attacker.get_public_jwk()],
+        }
+        verifier = SignatureVerifier(max_workers=1)
+        
+        async def fetch(url):
+            return profiles[url]
+        
+        monkeypatch.setattr(verifier, "_fetch_profile_keys", fetch)
+        
+        attacker_headers = self._signed(attacker, b"{}")
+        attacker_headers["ucp-agent"] = 'evil/1.0; profile="https://attacker.example/.well-known/ucp"'
+        assert (await verifier.verify(attacker_headers, b"{}", "POST", "/checkout-sessions"))[0] is True
+        
+        # Mesma assinatura, identidade da vitima: chave resolvida no perfil da vitima
+        attacker_headers["ucp-agent"] = 'shop/1.0; profile="https://victim.example/.well-known/ucp"'
+        valid, error = await verifier.verify(attacker_headers, b"{}", "POST", "/checkout-sessions")
+        assert (valid, error) == (False, "Invalid signature")
+        
+        victim_headers = self._signed(victim, b"{}")
+        victim_headers["ucp-agent"] = 'shop/1.0; profile="https://victim.example/.well-known/ucp"'
+        assert (await verifier.verify(victim_headers, b"{}", "POST", "/checkout-sessions"))[0] is True
+        
+        # Dois perfis no header: identidade ambigua
+        victim_headers["ucp-agent"] += ' profile="https://attacker.example/.well-known/ucp"'
+        valid, error = await verifier.verify(victim_headers, b"{}", "POST", "/checkout-sessions")
+        assert (valid, error) == (False, "Multiple profiles in UCP-Agent")
+    
+    async def test_unknown_key_ids_share_one_fetch(self, monkeypatch):
+        """Key ids aleatorios nao disparam uma busca cada; cache e limitado."""
+        verifier = SignatureVerifier(max_workers=1, max_cached_profiles=2)
+        fetched = []
+        
+        async def fetch(url):
+            fetched.append(url)
+            return [KeyManager(key_id="agent-key").get_public_jwk()]
+        
+        monkeypatch.setattr(verifier, "_fetch_profile_keys", fetch)
+        
+        agent = 'a/1.0; profile="https://one.example/.well-known/ucp"'
+        for i in range(20):
+            assert await verifier.resolve_key(f"random-{i}", agent) is None
+        assert await verifier.resolve_key("agent-key", agent) is not None
+        assert len(fetched) == 1
+        
+        for host in ("two", "three", "four"):
+            await verifier.resolve_key("agent-key", f'a/1.0; profile="https://{host}.example/"')
+        assert list(verifier._profiles) == ["https://three.example", "https://four.example"]
+    
+    async def test_profile_url_restrictions(self):
+        """Perfis so via https, em hosts publicos e da allowlist."""
+        verifier = SignatureVerifier(max_workers=1, allowed_profile_hosts=["*.example.com", "127.0.0.1"])
+        
+        for url in (
+            "http://agent.example.com/.well-known/ucp",
+            "https://other.org/.well-known/ucp",
+            "https://127.0.0.1/.well-known/ucp",
+            "file:///etc/passwd",
+        ):
+            with pytest.raises(ValueError):
+                await verifier.check_profile_url(url)
+        
+        open_verifier = SignatureVerifier(max_workers=1)
+        for url in ("https://localhost:8182/.well-known/ucp", "https://10.0.0.5/", "https://[::1]/"):
+            with pytest.raises(ValueError):
+                await open_verifier.check_profile_url(url)
+        await open_verifier.check_profile_url("https://8.8.8.8/.well-known/ucp")
+
+
 class TestConformanceHeaders:
     """Testes do ConformanceHeaders."""
     
@@ -0,0 +1,191 @@
+"""Testes do session store."""
+from src.db.session_store import (
+    MemorySessionStore,
+    SQLiteSessionStore,
+    serialize,
+    deserialize,
+)
+from src.mcp.progressive_disclosure import ProgressiveDisclosure
+from src.agents.a2a.protocol import A2AProtocol, AgentProfile
+
+
+class TestSessionStore:
+    """Testes dos backends do session store."""
+    
+    def test_serialize_roundtrip(self):
+        """Valores devem sobreviver a serializacao (sets viram listas)."""
+        value = {"messages": [{"role": "user", "content": "oi"}], "tags": {"b", "a"}}
+        
+        assert deserialize(serialize(value)) == {
+            "messages": [{"role": "user", "content": "oi"}],
+            "tags": ["a", "b"],
+        }
+    
+    def test_sqlite_shared_between_instances(self, tmp_path):
+        """Duas instancias (workers) devem ver o mesmo estado."""
+        db_path = str(tmp_path / "sessions.db")
+        worker_a = SQLiteSessionStore(db_path)
+        worker_b = SQLiteSessionStore(db_path)
+        
+        worker_a.set("chat", "s1", {"cart_total": 4990})
+        assert worker_b.get("chat", "s1") == {"cart_total": 4990}
+        assert worker_b.keys("chat") == ["s1"]
+        
+        worker_b.delete("chat", "s1")
+        assert worker_a.get("chat", "s1") is None
+        
+        worker_a.close()
+        worker_b.close()
+    
+    async def test_disclosure_context_persisted(self, tmp_path):
+        """Upgrade de nivel deve ser visto por outra instancia."""
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+        first = ProgressiveDisclosure()
+        first.store = store
+        second = ProgressiveDisclosure()
+        second.store = store
+        
+        await first.upgrade_level("s1", "shopping")
+        context = await second.get_context("s1")
+        
+        assert context.current_level == "shopping"
+        assert context.can_access("calculate_cart")
+        store.close()
+    
+    async def test_a2a_agents_in_store(self):
+        """Agentes registrados devem ser lidos do store."""
+        protocol = A2AProtocol()
+        protocol.store = MemorySessionStore()
+        
+        await protocol.register_agent(AgentProfile(agent_id="agent-1", name="Comprador"))
+        
+        assert await protocol.is_connected("agent-1")
+        assert (await protocol.get_agent("agent-1")).name == "Comprador"
+        await protocol.unregister_agent("agent-1")
+        assert await protocol.list_agents() == []
+
+
+class TestSessionCache:
+    """Testes do cache limitado (LRU + TTL de inatividade)."""
+    
+    def test_lru_eviction_and_stats(self):
+        """Excesso sobre max_entries deve despejar o menos usado."""
+        store = MemorySessionStore(limits={"chat": (2, None)})
+        
+        store.set("chat", "s1", {"n": 1})
+        store.set("chat", "s2", {"n": 2})
+        store.get("chat", "s1")
+        store.set("chat", "s3", {"n": 3})
+        
+        assert store.keys("chat") == ["s1", "s3"]
+        assert store.get("chat", "s2") is None
+        stats = store.get_stats()["chat"]
+        assert stats["size"] == 2
+        assert stats["evictions"] == 1
+        assert stats["hit_rate"] == 0.5
+    
+    def test_idle_ttl_expires(self, monkeypatch):
+        """Sessao ociosa alem do TTL deve ser descartada."""
+        import src.db.session_store as session_store
+        clock = [1000.0]
+        monkeypatch.setattr(session_store.time, "monotonic", lambda: clock[0])
+        store = MemorySessionStore(limits={"chat": (None, 60.0)})
+        
+        store.set("chat", "s1", {"n": 1})
+        clock[0] += 61
+        
+        assert store.get("chat", "s1") is None
+        assert store.get_stats()["chat"]["expirations"] == 1
+    
+    def test_spill_restores_evicted_session(self, tmp_path):
+        """Com spill, sessao despejada deve voltar do disco no proximo acesso."""
+        spill = SQLiteSessionStore(str(tmp_path / "spill.db"))
+        store = MemorySessionStore(limits={"chat": (1, None)}, spill=spill)
+        
+        store.set("chat", "s1", {"n": 1})
+        store.set("chat", "s2", {"n": 2})
+        
+        assert store.get("chat", "s1") == {"n": 1}
+        assert store.get_stats()["_spill"] == {"spilled": 2, "restored": 1}
+        spill.close()
+    
+    def test_spill_skips_expired_and_prunes_by_age(self, tmp_path, monkeypatch):
+        """Sessao expirada por TTL nao vai ao disco; spill antigo e removido."""
+        import src.db.session_store as session_store
+        clock = [1000.0]
+        monkeypatch.setattr(session_store.time, "monotonic", lambda: clock[0])
+        spill = SQLiteSessionStore(str(tmp_path / "spill.db"))
+        store = MemorySessionStore(limits={"chat": (1, 60.0)}, spill=spill)
+        
+        store.set("chat", "s1", {"n": 1})
+        clock[0] += 61
+        store.set("chat", "s2", {"n": 2})
+        assert store.get("chat", "s1") is None
+        assert spill.keys("chat") == []
+        
+        store.set("chat", "s3", {"n": 3})
+        assert spill.keys("chat") == ["s2"]
+        assert store.prune_spill(3600.0) == 0
+        assert store.prune_spill(-1.0) == 1
+        assert store.get("chat", "s2") is None
+        spill.close()
+    
+    def test_unbounded_namespace_never_evicts(self):
+        """Namespaces sem limite (agentes A2A, presenca) nao despejam."""
+        store = MemorySessionStore(limits={"chat": (1, None)})
+        
+        for i in range(5):
+            store.set("a2a_agents", f"agent-{i}", {"agent_id": f"agent-{i}"})
+        
+        assert len(store.values("a2a_agents")) == 5
+    
+    async def test_async_variants_and_presence_sweep(self, tmp_path):
+        """Variantes async no SQLite; presenca de worker morto e removida."""
+        from src.main import ConnectionManager
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+        
+        await store.aset("chat", "s1", {"n": 1})
+        assert await store.aget("chat", "s1") == {"n": 1}
+        await store.adelete("chat", "s1")
+        assert await store.aget("chat", "s1") is None
+        
+        manager = ConnectionManager()
+        manager.store = store
+        store.set("ws", "dead", {"kind": "chat", "worker_pid": 2 ** 22 + 1})
+        store.set("ws", "alive", {"kind": "chat", "worker_pid": 1})
+        
+        assert manager.sweep_presence() == 1
+        assert store.keys("ws") == ["alive"]
+        store.close()
+    
+    def test_sqlite_idle_sessions_expire(self, tmp_path, monkeypatch):
+        """No SQLite, sessoes sem escrita alem do TTL saem no prune_idle."""
+        import src.db.session_store as session_store
+        clock = [1000.0]
+        monkeypatch.setattr(session_store.time, "time", lambda: clock[0])
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"), idle_ttls={"chat": 60.0})
+        
+        store.set("chat", "old", {"n": 1})
+        store.set("a2a_agents", "agent-1", {"n": 1})
+        clock[0] += 61
+        store.set("chat", "new", {"n": 2})
+        
+        assert store.prune_idle() == 1
+        assert store.keys("chat") == ["new"]
+        assert store.keys("a2a_agents") == ["agent-1"]
+        store.close()
+    
+    def test_a2a_tasks_are_bounded(self, monkeypatch):
+        """Tasks do JSON-RPC A2A usam cache limitado no backend memory."""
+        import src.db.session_store as session_store
+        from src.config import settings
+        monkeypatch.setattr(session_store, "_session_store", None)
+        monkeypatch.setattr(settings, "session_store", "memory")
+        monkeypatch.setattr(settings, "session_cache_spill_path", "")
+        monkeypatch.setattr(settings, "a2a_task_max_entries", 2)
+        store = session_store.get_session_store()
+        
+        for i in range(3):
+            store.set("a2a_tasks", f"task-{i}", {"id": f"task-{i}"})
+        
+        assert store.keys("a2a_tasks") == ["task-1", "task-2"]
@@ -0,0 +1,108 @@
+"""Testes do tracing distribuido."""
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import src.observability.tracing as tracing
+from src.observability import (
+    DB_QUERY_DURATION,
+    InMemorySpanExporter,
+    JsonlSpanExporter,
+    Tracer,
+    create_tracing_middleware,
+    http_client,
+    parse_traceparent,
+    start_span,
+    track,
+)
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+@pytest.fixture
+def exporter(monkeypatch):
+    """Tracer global com exporter em memoria."""
+    exporter = InMemorySpanExporter()
+    monkeypatch.setattr(tracing, "_tracer", Tracer(exporter=exporter))
+    return exporter
+
+
+class TestTracing:
+    """Testes de spans e propagacao W3C."""
+    
+    def test_parse_traceparent(self):
+        """Header valido vira (trace_id, span_id); invalido e ignorado."""
+        assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID)
+        assert parse_traceparent("00-abc-def-01") is None
+        assert parse_traceparent(f"00-{'0' * 32}-{PARENT_ID}-01") is None
+    
+    def test_nested_spans_share_trace(self, exporter):
+        """Spans aninhados (ex: DB dentro de no do grafo) formam arvore."""
+        with start_span("agent.discovery") as parent:
+            with track(DB_QUERY_DURATION, span="db.products.search", repository="products", method="search"):
+                pass
+        
+        child, root = exporter.get_spans()
+        assert child.name == "db.products.search"
+        assert child.trace_id == root.trace_id == parent.trace_id
+        assert child.parent_id == root.span_id
+        assert root.parent_id is None
+    
+    def test_error_marks_span(self, exporter):
+        """Excecao dentro do span deve marcar status "error"."""
+        with pytest.raises(ValueError):
+            with start_span("psp.process_payment"):
+                raise ValueError("boom")
+        
+        assert exporter.get_spans()[0].status == "error"
+    
+    def test_middleware_continues_incoming_trace(self, exporter):
+        """Request com traceparent deve continuar o trace e devolver o header."""
+        app = FastAPI()
+        app.middleware("http")(create_tracing_middleware("ucp-server"))
+        
+        @app.get("/ping")
+        async def ping():
+            return {"ok": True}
+        
+        response = TestClient(app).get(
+            "/ping",
+            headers={"traceparent": f"00-{TRACE_ID}-{PARENT_ID}-01", "request-id": "req-1"},
+        )
+        
+        span = exporter.get_spans(TRACE_ID)[0]
+        assert span.parent_id == PARENT_ID
+        assert span.service == "ucp-server"
+        assert span.attributes["request_id"] == "req-1"
+        assert response.headers["traceparent"] == span.traceparent
+    
+    async def test_http_client_injects_traceparent(self, exporter):
+        """Chamadas de saida devem levar o span atual no traceparent."""
+        seen = {}
+        
+        def handler(request: httpx.Request):
+            seen.update(request.headers)
+            return httpx.Response(200)
+        
+        async with http_client(transport=httpx.MockTransport(handler)) as client:
+            with start_span("gateway.proxy") as span:
+                await client.get("http://ucp.local/checkout-sessions")
+        
+        assert seen["traceparent"] == span.traceparent
+    
+    def test_jsonl_exporter(self, tmp_path):
+        """Spans devem ser gravados um por linha apos flush."""
+        path = tmp_path / "traces.jsonl"
+        tracer = Tracer(exporter=JsonlSpanExporter(str(path)))
+        
+        with tracer.start_span("llm.detect_intent", operation="detect_intent"):
+            pass
+        tracer.shutdown()
+        
+        record = json.loads(path.read_text().strip())
+        assert record["name"] == "llm.detect_intent"
+        assert record["attributes"] == {"operation": "detect_intent"}
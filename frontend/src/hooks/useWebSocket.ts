@@ -7,6 +7,8 @@ interface ChatResponse {
   type: string;
   session_id: string;
   message: string;
+  // Frames parciais: token (texto do LLM), progress, search_results
+  text?: string;
   metadata?: Record<string, unknown>;
   cart?: {
     items: Array<{
@@ -30,9 +32,12 @@ interface ChatResponse {
 export function useWebSocket() {
   const wsRef = useRef<WebSocket | null>(null);
   const reconnectTimeoutRef = useRef<number>();
+  // Resposta em construcao a partir dos frames `token`
+  const draftRef = useRef<{ id: string; content: string } | null>(null);
 
   const {
     addMessage,
+    upsertMessage,
     setSessionId,
     setConnected,
     isConnected,
@@ -62,15 +67,31 @@ export function useWebSocket() {
             return;
           }
 
+          if (data.type === 'token' && data.text) {
+            const draft = draftRef.current ?? { id: crypto.randomUUID(), content: '' };
+            draft.content += data.text;
+            draftRef.current = draft;
+            upsertMessage({
+              id: draft.id,
+              role: 'assistant',
+              content: draft.content,
+              timestamp: new Date(),
+            });
+            return;
+          }
+
           if (data.type === 'response') {
+            // O frame final e o texto definitivo (substitui o rascunho)
+            const draftId = draftRef.current?.id;
+            draftRef.current = null;
             const message: Message = {
-              id: crypto.randomUUID(),
+              id: draftId ?? crypto.randomUUID(),
               role: 'assistant',
               content: data.message,
               timestamp: new Date(),
               metadata: data.metadata,
             };
-            addMessage(message);
+            upsertMessage(message);
             
             // Verificar se foi um checkout/compra concluida para atualizar estoque
             const isCheckout = 
@@ -106,7 +127,7 @@ export function useWebSocket() {
     } catch (err) {
       console.error('Failed to connect:', err);
     }
-  }, [addMessage, setSessionId, setConnected, triggerRefresh]);
+  }, [upsertMessage, setSessionId, setConnected, triggerRefresh]);
 
   const sendMessage = useCallback((content: string) => {
     if (wsRef.current?.readyState !== WebSocket.OPEN) {
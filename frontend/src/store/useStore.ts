@@ -17,6 +17,7 @@ interface AppState {
   sessionId: string | null;
   isConnected: boolean;
   addMessage: (message: Message) => void;
+  upsertMessage: (message: Message) => void;
   setSessionId: (id: string) => void;
   setConnected: (connected: boolean) => void;
   clearMessages: () => void;
@@ -105,6 +106,17 @@ export const useStore = create<AppState>()(
       addMessage: (message: Message) =>
         set({ messages: [...get().messages, message] }),
 
+      // Substitui a mensagem com o mesmo id (resposta em streaming) ou adiciona
+      upsertMessage: (message: Message) => {
+        const messages = get().messages;
+        const index = messages.findIndex((m) => m.id === message.id);
+        if (index === -1) {
+          set({ messages: [...messages, message] });
+        } else {
+          set({ messages: messages.map((m, i) => (i === index ? message : m)) });
+        }
+      },
+
       setSessionId: (id: string) => set({ sessionId: id }),
 
       setConnected: (connected: boolean) => set({ isConnected: connected }),
@@ -5,6 +5,7 @@ import structlog
 
 from .state import UserAgentState, create_initial_state, Message, UserIntent
 from .nodes import discovery_node, shopping_node, compare_node
+from .keywords import KeywordMatcher
 from .llm import is_llm_enabled, detect_intent_with_llm, generate_response, USER_AGENT_SYSTEM_PROMPT
 
 logger = structlog.get_logger()
@@ -139,26 +140,28 @@ async def _handle_confirmation(message: str, state: UserAgentState) -> Dict[str,
         }
 
 
+# Keywords do fallback sem LLM (ordem = prioridade)
+FALLBACK_INTENT_KEYWORDS = {
+    "discover": ["descobrir", "conectar", "url", "http", "loja"],
+    "search": ["buscar", "procurar", "encontrar", "pesquisar", "quero", "preciso"],
+    "compare": ["comparar", "comparacao", "diferenca", "melhor preco"],
+    "add_to_cart": ["adicionar", "colocar", "incluir"],
+    "remove_from_cart": ["remover", "tirar", "excluir"],
+    "view_cart": ["carrinho", "cart", "meu carrinho"],
+    "checkout": ["comprar", "finalizar", "pagar", "checkout"],
+    "apply_discount": ["cupom", "desconto", "codigo"],
+    "help": ["ajuda", "help", "ola", "oi", "como"]
+}
+
+# Compilado uma vez (automato unico)
+_fallback_matcher = KeywordMatcher(FALLBACK_INTENT_KEYWORDS, phrase_first=False)
+
+
 def _detect_intent_keywords(message: str) -> Dict[str, Any]:
     """Fallback: detectar intencao por palavras-chave."""
-    message_lower = message.lower()
-    
-    intent_keywords = {
-        "discover": ["descobrir", "conectar", "url", "http", "loja"],
-        "search": ["buscar", "procurar", "encontrar", "pesquisar", "quero", "preciso"],
-        "compare": ["comparar", "comparacao", "diferenca", "melhor preco"],
-        "add_to_cart": ["adicionar", "colocar", "incluir"],
-        "remove_from_cart": ["remover", "tirar", "excluir"],
-        "view_cart": ["carrinho", "cart", "meu carrinho"],
-        "checkout": ["comprar", "finalizar", "pagar", "checkout"],
-        "apply_discount": ["cupom", "desconto", "codigo"],
-        "help": ["ajuda", "help", "ola", "oi", "como"]
-    }
-    
-    for intent, keywords in intent_keywords.items():
-        for keyword in keywords:
-            if keyword in message_lower:
-                return {"intent": intent, "params": {}, "confidence": 0.7}
+    intent = _fallback_matcher.match(message.lower())
+    if intent:
+        return {"intent": intent, "params": {}, "confidence": 0.7}
     
     return {"intent": "chat", "params": {}, "confidence": 0.5}
 
@@ -0,0 +1,191 @@
+"""
+Matcher de keywords (Aho-Corasick) para a deteccao de intencao por regras.
+
+As tabelas `{intencao: [keywords]}` sao compiladas uma vez num automato
+unico; cada mensagem e varrida uma so vez, independente do numero de
+keywords. Prioridade = ordem das intencoes na tabela; com `phrase_first`,
+keywords com espaco (frases) vencem palavras soltas.
+
+`KeywordTable` acrescenta keywords de um arquivo JSON e recompila quando
+o arquivo muda, sem reiniciar o processo.
+"""
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+KeywordTableData = Dict[str, Sequence[str]]
+
+
+class KeywordMatcher:
+    """
+    Automato Aho-Corasick com a melhor intencao por estado.
+    
+    Usage:
+        matcher = KeywordMatcher({"cart": ["carrinho"], "help": ["ajuda"]})
+        matcher.match("ver meu carrinho")  # "cart"
+    """
+    
+    def __init__(self, table: KeywordTableData, phrase_first: bool = True):
+        self.intents: List[str] = list(table)
+        self.phrase_first = phrase_first
+        # Transicoes completas (DFA): sem seguir links de falha na varredura
+        self._delta: List[Dict[str, int]] = [{}]
+        # Melhor rank (menor = mais prioritario) que termina em cada estado
+        self._best: List[Optional[Tuple[int, int]]] = [None]
+        self._top: Optional[Tuple[int, int]] = None
+        self.size = 0
+        
+        for priority, (intent, keywords) in enumerate(table.items()):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    self._add(keyword, (0 if phrase_first and " " in keyword else 1, priority))
+        self._build()
+    
+    def _add(self, keyword: str, rank: Tuple[int, int]):
+        state = 0
+        for char in keyword:
+            next_state = self._delta[state].get(char)
+            if next_state is None:
+                next_state = len(self._delta)
+                self._delta.append({})
+                self._best.append(None)
+                self._delta[state][char] = next_state
+            state = next_state
+        current = self._best[state]
+        self._best[state] = rank if current is None else min(current, rank)
+        self._top = rank if self._top is None else min(self._top, rank)
+        self.size += 1
+    
+    def _build(self):
+        """Links de falha (BFS) e transicoes completas a partir deles."""
+        trie = [dict(edges) for edges in self._delta]
+        fail = [0] * len(trie)
+        queue = deque(trie[0].values())
+        
+        while queue:
+            state = queue.popleft()
+            for char, child in trie[state].items():
+                fallback = fail[state]
+                while fallback and char not in trie[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = trie[fallback].get(char, 0) if state else 0
+                inherited = self._best[fail[child]]
+                if inherited is not None:
+                    current = self._best[child]
+                    self._best[child] = inherited if current is None else min(current, inherited)
+                queue.append(child)
+            # Estado herda as transicoes do link de falha (ja completas na ordem BFS)
+            if state:
+                for char, target in self._delta[fail[state]].items():
+                    self._delta[state].setdefault(char, target)
+    
+    def match(self, text: str) -> Optional[str]:
+        """Intencao de maior prioridade encontrada em `text` (ja em minusculas)."""
+        delta = self._delta
+        best_ranks = self._best
+        top = self._top
+        state = 0
+        best = None
+        for char in text:
+            state = delta[state].get(char, 0)
+            rank = best_ranks[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                if rank == top:
+                    break
+        return self.intents[best[1]] if best else None
+
+
+def load_keyword_file(path: str) -> KeywordTableData:
+    """Ler tabela JSON `{intencao: [keywords]}` (ordem = prioridade)."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not all(isinstance(v, list) for v in data.values()):
+        raise ValueError("keyword file must map intent -> list of keywords")
+    for intent, keywords in data.items():
+        if not all(isinstance(k, str) and k.strip() for k in keywords):
+            raise ValueError(f"keywords of {intent!r} must be non-empty strings")
+    return data
+
+
+def merge_tables(base: KeywordTableData, extra: KeywordTableData) -> Dict[str, List[str]]:
+    """Keywords extras no fim de cada intencao; intencoes novas no fim da tabela."""
+    merged = {intent: list(keywords) for intent, keywords in base.items()}
+    for intent, keywords in extra.items():
+        current = merged.setdefault(intent, [])
+        current.extend(k for k in keywords if k not in current)
+    return merged
+
+
+class KeywordTable:
+    """
+    Tabela compilada e recarregavel a partir de um arquivo JSON.
+    
+    O arquivo (opcional) acrescenta keywords as do codigo. A data de
+    modificacao e verificada no maximo a cada `check_interval` segundos;
+    um arquivo invalido mantem o automato anterior.
+    """
+    
+    def __init__(
+        self,
+        defaults: KeywordTableData,
+        path: str = "",
+        phrase_first: bool = True,
+        check_interval: float = 5.0,
+    ):
+        self.defaults = defaults
+        self.path = path
+        self.phrase_first = phrase_first
+        self.check_interval = check_interval
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._matcher = KeywordMatcher(defaults, phrase_first)
+        if path:
+            self.reload()
+    
+    @property
+    def matcher(self) -> KeywordMatcher:
+        if self.path:
+            now = time.monotonic()
+            if now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                try:
+                    changed = os.stat(self.path).st_mtime != self._mtime
+                except OSError:
+                    changed = self._mtime is not None
+                if changed:
+                    self.reload()
+        return self._matcher
+    
+    def reload(self) -> bool:
+        """Recompilar a partir do arquivo; False se o arquivo for invalido."""
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            # Arquivo removido: volta para a tabela do codigo
+            self._mtime = None
+            self._matcher = KeywordMatcher(self.defaults, self.phrase_first)
+            return True
+        
+        try:
+            table = merge_tables(self.defaults, load_keyword_file(self.path))
+        except (OSError, ValueError) as e:
+            logger.warning("Invalid intent keyword file", path=self.path, error=str(e))
+            self._mtime = mtime
+            return False
+        
+        self._matcher = KeywordMatcher(table, self.phrase_first)
+        self._mtime = mtime
+        logger.info("Intent keywords loaded", path=self.path, keywords=self._matcher.size)
+        return True
+    
+    def match(self, text: str) -> Optional[str]:
+        return self.matcher.match(text)
@@ -4,6 +4,7 @@ from typing import Dict, Any, Optional, List
 import structlog
 
 from ..config import settings
+from .keywords import KeywordTable
 
 logger = structlog.get_logger()
 
@@ -232,6 +233,50 @@ async def detect_intent_with_llm(
         return _detect_intent_keywords(message)
 
 
+# Mapeamento de keywords para intencoes (ordem importa - mais especifico primeiro)
+# Keywords extras: settings.intent_keywords_path
+INTENT_KEYWORDS = {
+    # Agentes (A2A) - APENAS se mencionar "agente"
+    "discover_agent": ["descobrir agente", "conectar agente", "agente em", "agente http"],
+    "list_agents": ["listar agentes", "meus agentes", "agentes conectados"],
+    "talk_to_agent": ["falar com agente", "perguntar ao agente", "enviar para agente"],
+    
+    # CHECKOUT PRIMEIRO - "comprar" deve ser checkout, nao discover
+    "checkout": ["comprar", "finalizar", "pagar", "checkout", "concluir compra", "finalizar compra"],
+    
+    # Comercio (UCP) - Padrao para URLs sem "agente"
+    "discover": ["descobrir http", "conectar http", "loja http", "descobrir loja", "conectar loja"],
+    "search": ["buscar", "procurar", "encontrar", "pesquisar"],
+    "compare": ["comparar", "comparacao", "diferenca", "melhor preco", "versus"],
+    "add_to_cart": ["adicionar", "colocar no carrinho", "incluir", "add"],
+    "remove_from_cart": ["remover", "tirar", "excluir do carrinho", "deletar"],
+    "view_cart": ["carrinho", "cart", "ver carrinho", "meu carrinho"],
+    "apply_discount": ["cupom", "desconto", "codigo promocional", "promocao"],
+    
+    # Ferramentas (MCP)
+    "use_tool": ["usar ferramenta", "executar", "rodar"],
+    "list_tools": ["listar ferramentas", "ferramentas disponiveis", "quais ferramentas"],
+    
+    # Geral
+    "help": ["ajuda", "help", "opcoes", "o que voce pode", "comandos"],
+    "question": ["o que e", "como funciona", "por que", "quando", "onde", "quem", 
+                 "explique", "me diga", "qual", "quantos", "quanto"],
+    "chat": []  # Default para conversas casuais
+}
+
+
+# Automato compilado de INTENT_KEYWORDS (singleton, recarrega o arquivo ao mudar)
+_intent_keywords: Optional[KeywordTable] = None
+
+
+def get_intent_keywords() -> KeywordTable:
+    """Tabela de keywords compilada (ordem = prioridade, sem precedencia de frases)."""
+    global _intent_keywords
+    if _intent_keywords is None:
+        _intent_keywords = KeywordTable(INTENT_KEYWORDS, settings.intent_keywords_path, phrase_first=False)
+    return _intent_keywords
+
+
 def _detect_intent_keywords(message: str) -> Dict[str, Any]:
     """Fallback: detectar intencao por palavras-chave."""
     message_lower = message.lower()
@@ -239,45 +284,8 @@ def _detect_intent_keywords(message: str) -> Dict[str, Any]:
     # Verificar primeiro se é sobre agentes (mais específico)
     is_agent_related = "agente" in message_lower
     
-    # Mapeamento de keywords para intencoes (ordem importa - mais especifico primeiro)
-    intent_keywords = {
-        # Agentes (A2A) - APENAS se mencionar "agente"
-        "discover_agent": ["descobrir agente", "conectar agente", "agente em", "agente http"],
-        "list_agents": ["listar agentes", "meus agentes", "agentes conectados"],
-        "talk_to_agent": ["falar com agente", "perguntar ao agente", "enviar para agente"],
-        
-        # CHECKOUT PRIMEIRO - "comprar" deve ser checkout, nao discover
-        "checkout": ["comprar", "finalizar", "pagar", "checkout", "concluir compra", "finalizar compra"],
-        
-        # Comercio (UCP) - Padrao para URLs sem "agente"
-        "discover": ["descobrir http", "conectar http", "loja http", "descobrir loja", "conectar loja"],
-        "search": ["buscar", "procurar", "encontrar", "pesquisar"],
-        "compare": ["comparar", "comparacao", "diferenca", "melhor preco", "versus"],
-        "add_to_cart": ["adicionar", "colocar no carrinho", "incluir", "add"],
-        "remove_from_cart": ["remover", "tirar", "excluir do carrinho", "deletar"],
-        "view_cart": ["carrinho", "cart", "ver carrinho", "meu carrinho"],
-        "apply_discount": ["cupom", "desconto", "codigo promocional", "promocao"],
-        
-        # Ferramentas (MCP)
-        "use_tool": ["usar ferramenta", "executar", "rodar"],
-        "list_tools": ["listar ferramentas", "ferramentas disponiveis", "quais ferramentas"],
-        
-        # Geral
-        "help": ["ajuda", "help", "opcoes", "o que voce pode", "comandos"],
-        "question": ["o que e", "como funciona", "por que", "quando", "onde", "quem", 
-                     "explique", "me diga", "qual", "quantos", "quanto"],
-        "chat": []  # Default para conversas casuais
-    }
-    
-    # Detectar intent - verificar keywords mais específicas primeiro
-    detected_intent = "chat"
-    for intent, keywords in intent_keywords.items():
-        for keyword in keywords:
-            if keyword in message_lower:
-                detected_intent = intent
-                break
-        if detected_intent != "chat":
-            break
+    # Detectar intent - automato unico, keywords mais especificas primeiro
+    detected_intent = get_intent_keywords().match(message_lower) or "chat"
     
     # Se começa com saudação, é chat
     greetings = ["oi", "ola", "bom dia", "boa tarde", "boa noite", "e ai", "hey"]
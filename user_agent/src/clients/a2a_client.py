@@ -13,8 +13,18 @@ from websockets.exceptions import ConnectionClosed
 
 from ..config import settings
 
+# msgpack e opcional; sem ele os frames continuam JSON
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
 logger = structlog.get_logger()
 
+A2A_MSGPACK_SUBPROTOCOL = "a2a.msgpack"
+A2A_JSON_SUBPROTOCOL = "a2a.json"
+
 
 @dataclass
 class A2AResponse:
@@ -50,7 +60,8 @@ class A2AClient:
         agent_id: str = None,
         auto_reconnect: bool = True,
         reconnect_interval: float = None,
-        ping_interval: float = None
+        ping_interval: float = None,
+        wire_format: str = None
     ):
         """
         Inicializar cliente.
@@ -61,12 +72,15 @@ class A2AClient:
             auto_reconnect: Reconectar automaticamente se desconectar
             reconnect_interval: Intervalo entre tentativas de reconexao
             ping_interval: Intervalo de ping para keep-alive
+            wire_format: "json" ou "msgpack" (frames binarios, se o servidor aceitar)
         """
         self.store_url = self._normalize_url(store_url)
         self.agent_id = agent_id or f"user-agent-{uuid.uuid4().hex[:8]}"
         self.auto_reconnect = auto_reconnect
         self.reconnect_interval = reconnect_interval or settings.a2a_reconnect_interval
         self.ping_interval = ping_interval or settings.a2a_ping_interval
+        self.wire_format = wire_format or settings.a2a_wire_format
+        self.binary = False
         
         self.ws: Optional[WebSocketClientProtocol] = None
         self.connected = False
@@ -114,6 +128,18 @@ class A2AClient:
         
         return http_url.rstrip("/")
     
+    def _encode(self, message: Dict[str, Any]):
+        """Serializar frame no formato negociado."""
+        if self.binary:
+            return msgpack.packb(message, use_bin_type=True)
+        return json.dumps(message)
+    
+    def _decode(self, frame) -> Dict[str, Any]:
+        """Desserializar frame (binario = MessagePack)."""
+        if isinstance(frame, bytes):
+            return msgpack.unpackb(frame, raw=False)
+        return json.loads(frame)
+    
     async def get_agent_card(self, timeout: float = 10.0) -> Optional[Dict[str, Any]]:
         """
         Obter Agent Card via HTTP (sem WebSocket).
@@ -154,10 +180,16 @@ class A2AClient:
             True se conectou com sucesso
         """
         try:
+            subprotocols = [A2A_JSON_SUBPROTOCOL]
+            if self.wire_format == "msgpack" and MSGPACK_AVAILABLE:
+                subprotocols.insert(0, A2A_MSGPACK_SUBPROTOCOL)
+            
             self.ws = await asyncio.wait_for(
-                websockets.connect(self.store_url),
+                websockets.connect(self.store_url, subprotocols=subprotocols),
                 timeout=timeout
             )
+            # Servidores antigos ignoram o subprotocolo: frames JSON
+            self.binary = self.ws.subprotocol == A2A_MSGPACK_SUBPROTOCOL
             
             # Enviar mensagem de conexao
             connect_msg = {
@@ -174,11 +206,11 @@ class A2AClient:
                 }
             }
             
-            await self.ws.send(json.dumps(connect_msg))
+            await self.ws.send(self._encode(connect_msg))
             
             # Aguardar resposta
             response = await asyncio.wait_for(self.ws.recv(), timeout=timeout)
-            data = json.loads(response)
+            data = self._decode(response)
             
             if data.get("status") == "connected":
                 self.connected = True
@@ -264,7 +296,7 @@ class A2AClient:
                     "message_id": str(uuid.uuid4()),
                     "agent_id": self.agent_id
                 }
-                await self.ws.send(json.dumps(disconnect_msg))
+                await self.ws.send(self._encode(disconnect_msg))
                 await self.ws.close()
             except:
                 pass
@@ -281,7 +313,8 @@ class A2AClient:
         self,
         action: str,
         payload: Dict[str, Any],
-        timeout: float = 30.0
+        timeout: float = 30.0,
+        message_type: str = "a2a.request"
     ) -> A2AResponse:
         """
         Enviar requisicao A2A e aguardar resposta.
@@ -290,6 +323,7 @@ class A2AClient:
             action: Acao a executar
             payload: Dados da requisicao
             timeout: Timeout em segundos
+            message_type: Tipo da mensagem (a2a.request ou a2a.batch)
             
         Returns:
             A2AResponse com resultado
@@ -305,7 +339,7 @@ class A2AClient:
         message_id = str(uuid.uuid4())
         
         request_msg = {
-            "type": "a2a.request",
+            "type": message_type,
             "message_id": message_id,
             "timestamp": int(time.time()),
             "agent_id": self.agent_id,
@@ -314,7 +348,7 @@ class A2AClient:
         }
         
         try:
-            await self.ws.send(json.dumps(request_msg))
+            await self.ws.send(self._encode(request_msg))
             
             # Aguardar resposta
             response = await asyncio.wait_for(
@@ -322,7 +356,7 @@ class A2AClient:
                 timeout=timeout
             )
             
-            data = json.loads(response)
+            data = self._decode(response)
             
             # Callback de mensagem
             if self.on_message:
@@ -468,6 +502,47 @@ class A2AClient:
         """Ping para verificar conexao."""
         return await self.request("ping", {})
     
+    async def batch(
+        self,
+        requests: List[Dict[str, Any]],
+        timeout: float = 30.0
+    ) -> List[A2AResponse]:
+        """
+        Enviar varias requisicoes em uma unica ida e volta (a2a.batch).
+        
+        Args:
+            requests: Lista de {"action": ..., "payload": {...}}
+            timeout: Timeout do lote inteiro
+        
+        Returns:
+            Uma A2AResponse por requisicao, na mesma ordem
+        """
+        response = await self.request(
+            "batch", {"requests": requests}, timeout=timeout, message_type="a2a.batch"
+        )
+        results = response.data.get("results")
+        if results is None:
+            return [
+                A2AResponse(
+                    success=False,
+                    action=item.get("action", ""),
+                    data={},
+                    error=response.error or "Batch failed"
+                )
+                for item in requests
+            ]
+        
+        return [
+            A2AResponse(
+                success=result.get("status") != "error",
+                action=result.get("action", ""),
+                data=result.get("payload") or {},
+                error=result.get("error"),
+                message_id=result.get("message_id")
+            )
+            for result in results
+        ]
+    
     # =========================================================================
     # Context Manager
     # =========================================================================
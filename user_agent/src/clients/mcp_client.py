@@ -4,6 +4,8 @@ from dataclasses import dataclass
 import httpx
 import structlog
 
+from ..tracing import http_client
+
 logger = structlog.get_logger()
 
 
@@ -39,7 +41,7 @@ class MCPClient:
         """
         self.server_url = server_url.rstrip("/")
         self.tools: Dict[str, MCPTool] = {}
-        self._client = httpx.AsyncClient(timeout=30.0)
+        self._client = http_client(timeout=30.0)
     
     async def discover_tools(self) -> List[MCPTool]:
         """
@@ -4,6 +4,8 @@ from dataclasses import dataclass
 import httpx
 import structlog
 
+from ..tracing import http_client
+
 logger = structlog.get_logger()
 
 
@@ -44,7 +46,7 @@ class UCPClient:
         """
         self.store_url = store_url.rstrip("/")
         self.profile: Optional[UCPProfile] = None
-        self._client = httpx.AsyncClient(timeout=30.0)
+        self._client = http_client(timeout=30.0)
     
     async def discover(self) -> Optional[UCPProfile]:
         """
@@ -21,6 +21,11 @@ class Settings(BaseSettings):
     # A2A
     a2a_reconnect_interval: float = 5.0
     a2a_ping_interval: float = 30.0
+    # Frames A2A: "json" ou "msgpack" (subprotocolo a2a.msgpack, requer msgpack)
+    a2a_wire_format: str = "json"
+    
+    # Keywords extras da deteccao por regras (JSON {intencao: [keywords]}), recarregado ao mudar
+    intent_keywords_path: str = ""
     
     # Default stores
     default_stores: List[str] = ["http://localhost:8182"]
@@ -31,6 +36,13 @@ class Settings(BaseSettings):
     jwt_expiry_seconds: int = 3600
     user_key_id: str = "user-agent-key-001"
     
+    # Tracing: arquivo JSONL de spans (vazio = desativado)
+    tracing_jsonl_path: str = ""
+    
+    # Monitor de lag do event loop (opt-in)
+    loop_monitor_enabled: bool = False
+    loop_block_threshold_ms: float = 100.0
+    
     # Debug
     debug: bool = True
     log_level: str = "INFO"
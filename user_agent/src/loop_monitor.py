@@ -0,0 +1,73 @@
+"""
+Monitor de lag do event loop da API do User Agent.
+
+Versao enxuta do monitor do backend (projetos separados): mede o lag
+continuamente (`event_loop_lag_seconds`) e, quando um callback bloqueia o
+loop alem do limite (ex: `VirtualWallet._save`), loga a stack culpada.
+"""
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+import structlog
+
+from .metrics import EVENT_LOOP_LAG
+
+logger = structlog.get_logger()
+
+
+class LoopLagMonitor:
+    """Task de medicao + thread watchdog."""
+    
+    def __init__(self, interval: float = 0.1, block_threshold_ms: float = 100.0):
+        self.interval = interval
+        self.block_threshold = block_threshold_ms / 1000
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+    
+    def start(self):
+        """Iniciar (chamar dentro do loop)."""
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+    
+    def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+    
+    async def _measure(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            self._heartbeat = time.monotonic()
+            EVENT_LOOP_LAG.observe(max(0.0, self._heartbeat - expected))
+    
+    def _watch(self):
+        # Na deteccao so se sabe o minimo; a duracao total sai na volta do heartbeat
+        captured_for: Optional[float] = None
+        while not self._stopped.wait(self.block_threshold / 2):
+            heartbeat = self._heartbeat
+            if captured_for is not None and heartbeat != captured_for:
+                logger.info(
+                    "Event loop unblocked",
+                    blocked_ms=round((heartbeat - captured_for - self.interval) * 1000, 1),
+                )
+                captured_for = None
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.block_threshold or captured_for == heartbeat:
+                continue
+            captured_for = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame, limit=15) if frame is not None else []
+            logger.warning(
+                "Event loop blocked",
+                blocked_at_least_ms=round(stalled * 1000, 1),
+                stack="".join(stack[-5:]),
+            )
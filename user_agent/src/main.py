@@ -9,10 +9,17 @@ from fastapi.middleware.cors import CORSMiddleware
 import structlog
 
 from .api import wallet_router
+from .metrics import metrics_middleware, metrics_endpoint
+from .tracing import shutdown_tracing, tracing_middleware
+from .loop_monitor import LoopLagMonitor
+from .config import settings
 from .wallet import get_wallet
 
 logger = structlog.get_logger()
 
+# Monitor de lag do event loop (LOOP_MONITOR_ENABLED)
+loop_monitor = LoopLagMonitor(block_threshold_ms=settings.loop_block_threshold_ms)
+
 # Criar app FastAPI
 app = FastAPI(
     title="User Agent API",
@@ -35,6 +42,14 @@ app.add_middleware(
 )
 
 
+# Metricas (latencia por rota e operacoes da carteira)
+app.middleware("http")(metrics_middleware)
+app.get("/metrics", include_in_schema=False)(metrics_endpoint)
+
+# Tracing (continua o traceparent recebido do PSP da loja)
+app.middleware("http")(tracing_middleware)
+
+
 # =========================================================================
 # Registrar Routers
 # =========================================================================
@@ -80,6 +95,8 @@ async def health():
 async def startup():
     """Inicializar recursos."""
     wallet = get_wallet()
+    if settings.loop_monitor_enabled:
+        loop_monitor.start()
     logger.info(
         "User Agent API starting",
         wallet_id=wallet.wallet_id,
@@ -90,6 +107,8 @@ async def startup():
 @app.on_event("shutdown")
 async def shutdown():
     """Limpar recursos."""
+    loop_monitor.stop()
+    shutdown_tracing()
     logger.info("User Agent API shutting down")
 
 
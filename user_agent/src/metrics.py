@@ -0,0 +1,177 @@
+"""
+Metricas da API do User Agent (formato de texto do Prometheus).
+
+Versao enxuta das metricas do backend (projetos separados):
+- latencia HTTP por rota e requests em andamento
+- latencia das operacoes da carteira, com resultado
+- lag do event loop (quando o monitor esta ativo)
+"""
+import functools
+import threading
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+from fastapi import Request, Response
+
+from .tracing import start_span
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Histograma cumulativo por bucket."""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = DEFAULT_BUCKETS + (float("inf"),)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, total_sum, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total_sum + value, count + 1)
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total_sum, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total_sum}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Valor que sobe e desce."""
+    
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+    
+    def inc(self, amount: int = 1):
+        self.value += amount
+    
+    def dec(self, amount: int = 1):
+        self.value -= amount
+    
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {self.value}",
+        ]
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de requests HTTP por rota",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests HTTP em andamento",
+)
+WALLET_OPERATION_DURATION = Histogram(
+    "wallet_operation_duration_seconds",
+    "Latencia de operacoes da carteira",
+    ["operation", "outcome"],
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Atraso do event loop em relacao ao agendado",
+    [],
+)
+
+_METRICS = [
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS_IN_FLIGHT,
+    WALLET_OPERATION_DURATION,
+    EVENT_LOOP_LAG,
+]
+
+
+def timed_wallet(operation: str):
+    """
+    Decorator de metodo da carteira (sincrono), executado em um span.
+    
+    Retorno falso (None/False) conta como "rejected"; excecao como "error".
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            outcome = "error"
+            try:
+                with start_span(f"wallet.{operation}") as span:
+                    result = func(*args, **kwargs)
+                    outcome = "ok" if result else "rejected"
+                    span["attributes"]["outcome"] = outcome
+                return result
+            finally:
+                WALLET_OPERATION_DURATION.observe(
+                    time.perf_counter() - start, operation=operation, outcome=outcome
+                )
+        return wrapper
+    return decorator
+
+
+def _route_template(request: Request) -> str:
+    """Template da rota (ex: /wallet/can-pay/{amount})."""
+    if request.scope.get("route") is None:
+        return "unmatched"
+    params = {str(value): name for name, value in request.scope.get("path_params", {}).items()}
+    return "/".join(
+        "{" + params[segment] + "}" if segment in params else segment
+        for segment in request.scope.get("path", "").split("/")
+    )
+
+
+async def metrics_middleware(request: Request, call_next):
+    """Middleware HTTP de latencia por rota e requests em andamento."""
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=_route_template(request),
+            status=status,
+        )
+
+
+async def metrics_endpoint():
+    """Metricas no formato de texto do Prometheus."""
+    lines: List[Any] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return Response(content="\n".join(lines) + "\n", media_type=CONTENT_TYPE)
@@ -0,0 +1,183 @@
+"""
+Tracing do User Agent (propagacao W3C `traceparent`).
+
+Versao enxuta do tracing do backend (projetos separados):
+- requests recebidos (ex: /wallet/process-payment vindo do PSP) continuam o trace
+- operacoes da carteira viram spans filhos
+- clientes httpx criados com `http_client()` propagam o trace para a loja
+- spans vao para JSONL local (em lote, numa thread) quando `tracing_jsonl_path`
+  esta configurado
+"""
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi import Request
+import structlog
+
+from .config import settings
+
+logger = structlog.get_logger()
+
+TRACEPARENT_HEADER = "traceparent"
+SERVICE_NAME = "user-agent"
+
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_span", default=None)
+
+
+def _parse_traceparent(value: Optional[str]) -> Optional[tuple]:
+    parts = (value or "").strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    return parts[1].lower(), parts[2].lower()
+
+
+class JsonlSpanWriter:
+    """
+    Spans em JSONL gravados em lote, como o exporter do backend.
+    
+    As linhas ficam em buffer; a cada `flush_every` spans o lote vai para
+    uma thread dedicada (uma so, para manter a ordem), fora do event loop.
+    """
+    
+    def __init__(self, path: str, flush_every: int = 64):
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="span-export")
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    
+    def export(self, span: Dict[str, Any]):
+        line = json.dumps(span, ensure_ascii=False, default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if len(self._buffer) < self.flush_every:
+                return
+            lines, self._buffer = self._buffer, []
+        self._writer.submit(self._write, lines)
+    
+    def flush(self):
+        """Gravar o buffer e esperar os lotes pendentes."""
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        self._writer.submit(self._write, lines).result()
+    
+    def _write(self, lines: List[str]):
+        if not lines:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning("Span export failed", path=self.path, spans=len(lines), error=str(e))
+    
+    def shutdown(self):
+        self.flush()
+        self._writer.shutdown(wait=True)
+
+
+_writer: Optional[JsonlSpanWriter] = None
+
+
+def _export(span: Dict[str, Any]):
+    """Enfileirar span finalizado (JSONL), se configurado."""
+    global _writer
+    if not settings.tracing_jsonl_path:
+        return
+    if _writer is None:
+        _writer = JsonlSpanWriter(settings.tracing_jsonl_path)
+    _writer.export(span)
+
+
+def shutdown_tracing():
+    """Gravar spans pendentes (shutdown)."""
+    global _writer
+    if _writer is not None:
+        _writer.shutdown()
+        _writer = None
+
+
+@contextmanager
+def start_span(name: str, traceparent: Optional[str] = None, kind: str = "internal", **attributes):
+    """Abrir span filho do span atual (ou do `traceparent` recebido)."""
+    parent = _current.get()
+    remote = _parse_traceparent(traceparent) if traceparent else None
+    if remote:
+        trace_id, parent_id = remote
+    elif parent:
+        trace_id, parent_id = parent["trace_id"], parent["span_id"]
+    else:
+        trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+    
+    span = {
+        "trace_id": trace_id,
+        "span_id": f"{random.getrandbits(64):016x}",
+        "parent_id": parent_id,
+        "name": name,
+        "service": SERVICE_NAME,
+        "kind": kind,
+        "start_time": time.time(),
+        "status": "ok",
+        "attributes": attributes,
+    }
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span["status"] = "error"
+        span["attributes"].setdefault("error", type(e).__name__)
+        raise
+    finally:
+        _current.reset(token)
+        span["duration_ms"] = round((time.time() - span["start_time"]) * 1000, 3)
+        _export(span)
+
+
+def current_traceparent() -> Optional[str]:
+    """Header traceparent do span atual."""
+    span = _current.get()
+    if not span:
+        return None
+    return f"00-{span['trace_id']}-{span['span_id']}-01"
+
+
+async def _trace_outgoing(request: httpx.Request):
+    traceparent = current_traceparent()
+    if traceparent:
+        request.headers[TRACEPARENT_HEADER] = traceparent
+
+
+def http_client(**kwargs) -> httpx.AsyncClient:
+    """httpx.AsyncClient que propaga `traceparent`."""
+    return httpx.AsyncClient(event_hooks={"request": [_trace_outgoing]}, **kwargs)
+
+
+async def tracing_middleware(request: Request, call_next):
+    """Middleware HTTP: span de servidor continuando o trace recebido."""
+    with start_span(
+        f"{request.method} {request.url.path}",
+        traceparent=request.headers.get(TRACEPARENT_HEADER),
+        kind="server",
+        method=request.method,
+        path=request.url.path,
+        request_id=request.headers.get("request-id"),
+    ) as span:
+        response = await call_next(request)
+        span["attributes"]["status_code"] = response.status_code
+        if response.status_code >= 500:
+            span["status"] = "error"
+        response.headers[TRACEPARENT_HEADER] = current_traceparent()
+        return response
@@ -11,6 +11,8 @@ from datetime import datetime
 from dataclasses import dataclass, field, asdict
 import structlog
 
+from ..metrics import timed_wallet
+
 logger = structlog.get_logger()
 
 
@@ -127,6 +129,7 @@ class VirtualWallet:
         """Verificar se pode pagar valor."""
         return self._balance >= amount
     
+    @timed_wallet("generate_token")
     def generate_payment_token(
         self,
         checkout_session_id: Optional[str] = None
@@ -148,6 +151,7 @@ class VirtualWallet:
         
         return token
     
+    @timed_wallet("validate_token")
     def validate_token(self, token: str) -> bool:
         """
         Validar se um token existe e nao foi usado.
@@ -169,6 +173,7 @@ class VirtualWallet:
         
         return True
     
+    @timed_wallet("use_token")
     def use_token(self, token: str) -> bool:
         """
         Marcar token como usado.
@@ -186,6 +191,7 @@ class VirtualWallet:
             return True
         return False
     
+    @timed_wallet("debit")
     def debit(
         self,
         amount: int,
@@ -237,6 +243,7 @@ class VirtualWallet:
         
         return txn
     
+    @timed_wallet("credit")
     def credit(
         self,
         amount: int,